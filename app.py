@@ -29,10 +29,16 @@ from src.prompts.templates import (
 )
 from src.search.search_service import SearchService
 from src.search.citation_processor import CitationProcessor
-from src.agents import ReActAgent, AgentStep
+from src.agents import AgentEventBus, AgentStep, create_agent
+from src.agents.checkpointing import discard_thread
 from src.agents.tools import create_search_tool
 from src.config.mcp_config import get_mcp_configs, is_mcp_available
+from src.config.memory_config import get_memory_config
+from src.config.ui_config import get_ui_config
 from src.mcp import MCPClient, create_mcp_tools
+from src.memory import ConversationMemory, create_model_summarizer
+from src.runtime.cancellation import CancelReason, RequestTracker, get_cancellation_stats
+from src.ui import StreamRenderer
 
 # Load environment variables
 load_dotenv()
@@ -57,6 +63,57 @@ _mcp_clients_initialized = False
 _mcp_initialization_lock = asyncio.Lock()
 
 
+def get_conversation_memory() -> ConversationMemory:
+    """Get the session's conversation memory, creating it for the current model.
+    
+    Returns:
+        ConversationMemory bound to the session's model wrapper
+    """
+    memory = cl.user_session.get("conversation_memory")
+    if memory is None:
+        model_wrapper = cl.user_session.get("model_wrapper")
+        memory_config = get_memory_config()
+        memory = ConversationMemory(
+            count_tokens=model_wrapper.count_tokens,
+            config=memory_config,
+            summarizer=create_model_summarizer(model_wrapper, memory_config.max_summary_tokens),
+        )
+        cl.user_session.set("conversation_memory", memory)
+    return memory
+
+
+def reset_conversation_memory():
+    """Clear the session's conversation memory (recreated lazily on next use)."""
+    memory = cl.user_session.get("conversation_memory")
+    if memory is not None:
+        memory.clear()
+    cl.user_session.set("conversation_memory", None)
+
+
+async def discard_agent_conversation(agent) -> None:
+    """Delete the conversation checkpoints of an agent that is no longer used."""
+    if agent is None:
+        return
+    await discard_thread(getattr(agent, "checkpointer", None), getattr(agent, "conversation_thread_id", None))
+
+
+async def set_session_agent(agent) -> None:
+    """Store the session's agent, discarding the conversation of the one it replaces."""
+    previous = cl.user_session.get("agent")
+    if previous is not None and previous is not agent:
+        await discard_agent_conversation(previous)
+    cl.user_session.set("agent", agent)
+
+
+def get_request_tracker() -> RequestTracker:
+    """Get the session's tracker of the in-flight request."""
+    tracker = cl.user_session.get("request_tracker")
+    if tracker is None:
+        tracker = RequestTracker()
+        cl.user_session.set("request_tracker", tracker)
+    return tracker
+
+
 async def get_or_create_model_wrapper(provider: str):
     """Get cached model wrapper or create new one.
     
@@ -218,7 +275,7 @@ async def settings_update(settings):
         if conversation_mode and conversation_mode != current_mode:
             # Mode switched - reset conversation
             cl.user_session.set("conversation_mode", conversation_mode)
-            cl.user_session.set("conversation_history", [])
+            reset_conversation_memory()
             
             # Re-initialize agent if switching to agent mode
             if conversation_mode == "agent":
@@ -241,14 +298,14 @@ async def settings_update(settings):
                         agent_config=agent_config
                     )
                     
-                    agent = ReActAgent(
+                    agent = create_agent(
                         llm=function_call_llm,
                         search_tool=search_tool,
                         config=agent_config,
                         answer_llm=answer_llm,
                         additional_tools=mcp_tools,
                     )
-                    cl.user_session.set("agent", agent)
+                    await set_session_agent(agent)
                     
                     mode_display = "🤖 Agent 模式"
                     mode_desc = "模型会自主决策何时使用搜索工具"
@@ -310,7 +367,7 @@ async def settings_update(settings):
                         model_wrapper.config.max_tokens = 8192
                 
                 # Clear conversation history
-                cl.user_session.set("conversation_history", [])
+                reset_conversation_memory()
                 
                 # Send confirmation message
                 model_display = "💭 推理模型" if deepseek_model == "deepseek-reasoner" else "💬 对话模型"
@@ -387,7 +444,7 @@ async def start():
                         agent_config=agent_config
                     )
                     
-                    agent = ReActAgent(
+                    agent = create_agent(
                         llm=function_call_llm,
                         search_tool=search_tool,
                         config=agent_config,
@@ -403,14 +460,14 @@ async def start():
             cl.user_session.set("model_wrapper", model_wrapper)
             cl.user_session.set("current_provider", default_provider)
             cl.user_session.set("available_providers", available_providers)
-            cl.user_session.set("conversation_history", [])
+            reset_conversation_memory()
             cl.user_session.set("search_service", search_service)
             # Get default search enabled state from config (Chat mode only, Agent mode controls search automatically)
             search_config = get_search_config()
             default_search_enabled = search_config.enabled if default_mode == "chat" else False
             cl.user_session.set("search_enabled", default_search_enabled)
             cl.user_session.set("conversation_mode", default_mode)
-            cl.user_session.set("agent", agent)
+            await set_session_agent(agent)
             
             # Prepare welcome message first
             if search_available and search_service:
@@ -559,11 +616,12 @@ async def main(message: cl.Message):
         # Check conversation mode
         conversation_mode = cl.user_session.get("conversation_mode", "chat")
         
-        # Route to appropriate handler
-        if conversation_mode == "agent":
-            await handle_agent_mode(user_message)
-        else:
-            await handle_chat_mode(user_message)
+        # Route to appropriate handler; a new message cancels the one still running
+        async with get_request_tracker().track(conversation_mode):
+            if conversation_mode == "agent":
+                await handle_agent_mode(user_message)
+            else:
+                await handle_chat_mode(user_message)
     
     except Exception as e:
         logger.error(f"Error in message handler: {str(e)}")
@@ -573,6 +631,22 @@ async def main(message: cl.Message):
         ).send()
 
 
+@cl.on_stop
+async def on_stop():
+    """Cancel the in-flight request when the user presses stop."""
+    get_request_tracker().cancel(CancelReason.STOPPED)
+
+
+@cl.on_chat_end
+async def on_chat_end():
+    """Cancel the in-flight request and drop the agent conversation when the user disconnects."""
+    tracker = get_request_tracker()
+    if tracker.cancel(CancelReason.DISCONNECTED):
+        # The cancelled turn unwinds first, so it cannot write to the deleted thread
+        await tracker.wait()
+    await discard_agent_conversation(cl.user_session.get("agent"))
+
+
 async def handle_agent_mode(user_message: str):
     """Handle Agent mode conversation.
     
@@ -590,13 +664,22 @@ async def handle_agent_mode(user_message: str):
         
         logger.info(f"🤖 Agent 模式处理: {user_message}")
         
-        # Track steps for better UI handling
+        # Track steps for better UI handling; streamed text is sent as deltas at the render frame rate
+        render_fps = get_ui_config().render_fps
         thinking_step = None
+        thinking_renderer = None
+        thinking_type = None
         current_action_step = None
+        final_msg = None
+        answer_renderer = None
+        answer_parts = []
         
-        # Stream agent execution with timeout
+        # The agent publishes its steps to a bounded bus; the UI is one subscriber
+        bus = AgentEventBus(maxsize=agent.config.event_buffer_size, max_lag=agent.config.event_max_lag)
+        ui_steps = bus.subscribe("ui")
+        producer = asyncio.create_task(bus.pump(agent.stream(user_message)))
         try:
-            async for step in agent.stream(user_message):
+            async for step in ui_steps:
                 logger.debug(f"收到 Agent 步骤: type={step.type}, content_length={len(step.content) if step.content else 0}")
                 
                 if step.type == "reasoning":
@@ -613,23 +696,23 @@ async def handle_agent_mode(user_message: str):
                         step_name = "💭 思考中"
                     
                     # If this is a new reasoning type or we don't have a thinking step, create a new one
+                    if thinking_step is not None and thinking_type != reasoning_type:
+                        # Reasoning type changed: close current step and create new one
+                        await _end_step(thinking_step, thinking_renderer)
+                        thinking_step = None
                     if thinking_step is None:
                         thinking_step = cl.Step(name=step_name, type="tool")
                         await thinking_step.__aenter__()
-                    else:
-                        # Update step name if reasoning type changed
-                        if thinking_step.name != step_name:
-                            # Close current step and create new one
-                            await thinking_step.__aexit__(None, None, None)
-                            thinking_step = cl.Step(name=step_name, type="tool")
-                            await thinking_step.__aenter__()
+                        thinking_renderer = StreamRenderer(thinking_step, fps=render_fps, field="output")
+                        thinking_type = reasoning_type
                     
-                    # Update thinking content (streaming update)
-                    # For reasoning steps, content is the full reasoning text (not incremental)
-                    thinking_step.output = step.content
-                    # Update UI to show the latest content
+                    # Update thinking content (streaming update): delta steps carry new
+                    # text, the others the full reasoning text (only the unseen part is sent)
                     try:
-                        await thinking_step.update()
+                        if step.metadata and step.metadata.get("delta"):
+                            await thinking_renderer.append(step.content)
+                        else:
+                            await thinking_renderer.set_text(step.content)
                     except Exception as e:
                         # If update fails, log but continue (some Chainlit versions may not support update)
                         logger.debug(f"Step update failed (may not be supported): {e}")
@@ -637,7 +720,7 @@ async def handle_agent_mode(user_message: str):
                 elif step.type == "action":
                     # Close thinking step if open
                     if thinking_step:
-                        await thinking_step.__aexit__(None, None, None)
+                        await _end_step(thinking_step, thinking_renderer)
                         thinking_step = None
                     
                     # Close previous action step if still open (shouldn't happen, but safety check)
@@ -666,21 +749,15 @@ async def handle_agent_mode(user_message: str):
                 
                 elif step.type == "citation_update":
                     # Handle citation conversion - replace accumulated content with converted version
-                    final_answer_key = "final_answer_msg"
-                    final_msg = cl.user_session.get(final_answer_key)
-                    
                     if final_msg:
-                        # Replace content with citation-converted version
-                        final_msg.content = step.content
-                        await final_msg.update()
-                        # Update stored content
-                        cl.user_session.set("final_answer_content", step.content)
+                        await answer_renderer.replace(step.content)
+                        answer_parts = [step.content]
                         logger.info("🔗 引用链接已转换并更新到UI")
                 
                 elif step.type == "final":
                     # Close any open steps
                     if thinking_step:
-                        await thinking_step.__aexit__(None, None, None)
+                        await _end_step(thinking_step, thinking_renderer)
                         thinking_step = None
                     if current_action_step:
                         await current_action_step.__aexit__(None, None, None)
@@ -688,9 +765,6 @@ async def handle_agent_mode(user_message: str):
                     
                     # Show final answer with streaming support
                     # Check if this is the first final step (create message) or continuation (update)
-                    final_answer_key = "final_answer_msg"
-                    final_msg = cl.user_session.get(final_answer_key)
-                    
                     if final_msg is None:
                         # Create new message for streaming
                         final_msg = cl.Message(
@@ -698,17 +772,11 @@ async def handle_agent_mode(user_message: str):
                             author="Assistant",
                         )
                         await final_msg.send()
-                        cl.user_session.set(final_answer_key, final_msg)
-                        cl.user_session.set("final_answer_content", "")
-                    
-                    # Get the message and accumulate content
-                    accumulated_content = cl.user_session.get("final_answer_content", "")
-                    accumulated_content += step.content
-                    cl.user_session.set("final_answer_content", accumulated_content)
+                        answer_renderer = StreamRenderer(final_msg, fps=render_fps)
                     
-                    # Update message content (streaming)
-                    final_msg.content = accumulated_content
-                    await final_msg.update()
+                    # Stream the delta; the full answer is joined once the stream completes
+                    answer_parts.append(step.content)
+                    await answer_renderer.append(step.content)
                     
                     # Update conversation history only after stream completes
                     # (We'll do this after the loop ends)
@@ -716,7 +784,7 @@ async def handle_agent_mode(user_message: str):
                 elif step.type == "error":
                     # Close any open steps
                     if thinking_step:
-                        await thinking_step.__aexit__(None, None, None)
+                        await _end_step(thinking_step, thinking_renderer)
                         thinking_step = None
                     if current_action_step:
                         await current_action_step.__aexit__(None, None, None)
@@ -732,34 +800,38 @@ async def handle_agent_mode(user_message: str):
             # Ensure all steps are closed
             if thinking_step:
                 try:
-                    await thinking_step.__aexit__(None, None, None)
-                except:
+                    await _end_step(thinking_step, thinking_renderer)
+                except Exception:
                     pass
             if current_action_step:
                 try:
                     await current_action_step.__aexit__(None, None, None)
-                except:
+                except Exception:
                     pass
             
-            # Update conversation history after stream completes
-            final_answer_content = cl.user_session.get("final_answer_content")
-            if final_answer_content:
-                history = cl.user_session.get("conversation_history", [])
-                history.append({
-                    "role": "user",
-                    "content": user_message,
-                })
-                history.append({
-                    "role": "assistant",
-                    "content": final_answer_content,
-                })
-                cl.user_session.set("conversation_history", history)
-                # Clean up session variables
-                cl.user_session.set("final_answer_msg", None)
-                cl.user_session.set("final_answer_content", None)
+            # Send the answer's last frame and end the stream (persists the full message)
+            if final_msg:
+                await answer_renderer.close()
+                await final_msg.update()
+                logger.debug(f"回答渲染统计: {answer_renderer.stats()}")
+            
+            # The agent keeps its own history in its checkpointed conversation;
+            # Chat mode's memory only records Chat mode turns
             
             logger.info("✅ Agent 模式处理完成")
         
+        except asyncio.CancelledError:
+            # Stopped, superseded or disconnected: end the agent run (its partial
+            # turn is dropped) and keep the partial answer out of the history
+            await _stop_producer(producer)
+            get_cancellation_stats().record_discarded(sum(len(part) for part in answer_parts))
+            for open_step in (thinking_step, current_action_step):
+                if open_step:
+                    try:
+                        await open_step.__aexit__(None, None, None)
+                    except Exception:
+                        pass
+            raise
         except asyncio.TimeoutError:
             logger.error("⏱️ Agent 执行超时")
             await cl.Message(
@@ -772,6 +844,14 @@ async def handle_agent_mode(user_message: str):
                 content=f"❌ Agent 执行失败: {str(stream_error)}\n\n请尝试切换到 Chat 模式。",
                 author="System",
             ).send()
+        finally:
+            ui_steps.close()
+            await _stop_producer(producer)
+            # No frame is sent after the run ended or failed
+            for renderer in (thinking_renderer, answer_renderer):
+                if renderer is not None:
+                    renderer.discard()
+            logger.debug(f"Agent 事件总线统计: {bus.summary()}")
     
     except Exception as e:
         logger.error(f"❌ Agent 模式错误: {str(e)}", exc_info=True)
@@ -781,6 +861,19 @@ async def handle_agent_mode(user_message: str):
         ).send()
 
 
+async def _end_step(step: cl.Step, renderer: Optional[StreamRenderer]) -> None:
+    """Send a streamed step's last frame and close it."""
+    if renderer is not None:
+        await renderer.close()
+    await step.__aexit__(None, None, None)
+
+
+async def _stop_producer(producer: asyncio.Task) -> None:
+    """Cancel the agent run feeding the event bus and wait for it to unwind."""
+    producer.cancel()
+    await asyncio.gather(producer, return_exceptions=True)
+
+
 async def handle_chat_mode(user_message: str):
     """Handle Chat mode conversation.
     
@@ -841,13 +934,22 @@ async def handle_chat_mode(user_message: str):
                 search_results_text,
             )
             
+            # Multi-turn context: recent turns verbatim + summary of older ones
+            memory = get_conversation_memory()
+            history = memory.get_messages() if memory.config.enabled else []
+            if memory.config.enabled:
+                system_message = memory.add_summary_to_system_message(system_message)
+            
             # Count tokens
             token_count = count_prompt_tokens(
                 user_message,
                 system_message,
-            )
+            ) + (memory.history_tokens if history else 0)
             
-            logger.info(f"Processing message with {token_count} tokens (search: {search_enabled})")
+            logger.info(
+                f"Processing message with {token_count} tokens "
+                f"(search: {search_enabled}, history turns: {len(history) // 2})"
+            )
             
             # Check if using deepseek-reasoner
             config = model_wrapper.config
@@ -856,17 +958,29 @@ async def handle_chat_mode(user_message: str):
                 config.model_variant == "deepseek-reasoner"
             )
             
-            # Generate streaming response
+            # Generate streaming response; text reaches the UI as deltas at the render frame rate
+            render_fps = get_ui_config().render_fps
             thinking_step = None
-            reasoning_content = ""
-            full_response = ""
+            thinking_renderer = None
+            reasoning_parts = []
+            response_parts = []
             response_msg = None
+            response_renderer = None
             
+            # Inline citations are linked token by token while the answer streams
+            citation_processor = None
+            citations = None
+            if search_response and not search_response.is_empty():
+                citation_processor = CitationProcessor(search_response)
+                citations = citation_processor.stream_converter()
+            
+            chunks = model_wrapper.generate_stream(
+                prompt=user_message,
+                system_message=system_message,
+                history=history,
+            )
             try:
-                async for chunk in model_wrapper.generate_stream(
-                    prompt=user_message,
-                    system_message=system_message,
-                ):
+                async for chunk in chunks:
                     # Skip if chunk is None or missing required attributes
                     if chunk is None:
                         logger.warning("Received None chunk from model")
@@ -888,12 +1002,12 @@ async def handle_chat_mode(user_message: str):
                                 author="💭 思考中",
                             )
                             await thinking_step.send()
+                            thinking_renderer = StreamRenderer(thinking_step, fps=render_fps)
                             logger.debug("Thinking message created for real-time streaming")
                         
                         # Stream reasoning content in real-time
-                        reasoning_content += chunk.content
-                        thinking_step.content = reasoning_content
-                        await thinking_step.update()
+                        reasoning_parts.append(chunk.content)
+                        await thinking_renderer.append(chunk.content)
                     
                     # Handle answer content
                     elif chunk.chunk_type == "answer":
@@ -901,10 +1015,11 @@ async def handle_chat_mode(user_message: str):
                         if thinking_step is not None:
                             if not hasattr(thinking_step, '_collapsed_already'):
                                 logger.info("💡 Converting thinking to collapsed step (answer started)")
+                                thinking_renderer.discard()
                                 
                                 # Create a collapsed Step with the thinking content
                                 collapsed_step = cl.Step(name="💡 思考过程", type="tool")
-                                collapsed_step.output = reasoning_content
+                                collapsed_step.output = "".join(reasoning_parts)
                                 
                                 # Use context manager to create collapsed step
                                 async with collapsed_step:
@@ -925,20 +1040,28 @@ async def handle_chat_mode(user_message: str):
                                 author="Assistant",
                             )
                             await response_msg.send()
+                            response_renderer = StreamRenderer(response_msg, fps=render_fps)
                         
                         # Stream answer content in real-time
-                        full_response += chunk.content
-                        response_msg.content = full_response
-                        await response_msg.update()
+                        response_parts.append(chunk.content)
+                        await response_renderer.append(citations.feed(chunk.content) if citations else chunk.content)
             
             finally:
+                # Closes the provider stream if the request was cancelled mid-answer
+                await chunks.aclose()
+                # Send the answer's last frame; the thinking message is replaced below
+                if thinking_renderer is not None:
+                    thinking_renderer.discard()
+                if response_renderer is not None:
+                    await response_renderer.close()
+                
                 # Ensure thinking message is converted to collapsed step even in case of errors
                 if thinking_step is not None and not hasattr(thinking_step, '_collapsed_already'):
                     logger.info("💡 Converting thinking to collapsed step (cleanup)")
                     try:
                         # Create a collapsed Step with the thinking content
                         collapsed_step = cl.Step(name="💡 思考过程", type="tool")
-                        collapsed_step.output = reasoning_content
+                        collapsed_step.output = "".join(reasoning_parts)
                         
                         # Use context manager to create collapsed step
                         async with collapsed_step:
@@ -953,22 +1076,23 @@ async def handle_chat_mode(user_message: str):
                     except Exception as cleanup_error:
                         logger.error(f"Error during thinking step cleanup: {cleanup_error}")
             
-            # Process inline citations if search was used
-            if search_response and not search_response.is_empty() and response_msg:
+            # Finish inline citations: held-back text and the list of cited sources
+            if citations and response_msg:
                 try:
-                    logger.info("🔗 Processing inline citations")
-                    citation_processor = CitationProcessor(search_response)
-                    processed_response = citation_processor.process_response(full_response)
-                    
-                    # Update the response message with clickable citations
-                    response_msg.content = processed_response
-                    await response_msg.update()
-                    
-                    logger.info("✅ Inline citations processed successfully")
+                    await response_renderer.append(
+                        citations.flush() + citation_processor.format_citations_list(citations.cited)
+                    )
+                    logger.info(f"✅ Inline citations linked while streaming ({len(citations.cited)} cited)")
                 except Exception as e:
                     logger.error(f"Failed to process citations: {e}")
                     # Continue without citations on error
             
+            # End the stream (persists the full message)
+            if response_renderer is not None:
+                await response_renderer.close()
+                await response_msg.update()
+                logger.debug(f"回答渲染统计: {response_renderer.stats()}")
+            
             # Display search sources if available
             if search_response and not search_response.is_empty():
                 sources_text = search_service.format_sources(search_response)
@@ -977,17 +1101,10 @@ async def handle_chat_mode(user_message: str):
                     author="System",
                 ).send()
             
-            # Update conversation history
-            history = cl.user_session.get("conversation_history", [])
-            history.append({
-                "role": "user",
-                "content": user_message,
-            })
-            history.append({
-                "role": "assistant",
-                "content": full_response,
-            })
-            cl.user_session.set("conversation_history", history)
+            # Update conversation memory (evicted turns are summarized in the background)
+            full_response = "".join(response_parts)
+            if full_response:
+                memory.add_turn(user_message, full_response)
             
             # Count completion tokens (approximate)
             completion_tokens = model_wrapper.count_tokens(full_response)
@@ -1010,6 +1127,12 @@ async def handle_chat_mode(user_message: str):
                 author="System",
             ).send()
         
+        except asyncio.CancelledError:
+            # Stopped, superseded or disconnected: the partial answer is not added to memory
+            get_cancellation_stats().record_call("llm_stream")
+            get_cancellation_stats().record_discarded(sum(len(part) for part in response_parts))
+            raise
+        
         except Exception as e:
             logger.error(f"Error generating response: {str(e)}")
             if response_msg is not None:
@@ -1133,7 +1256,11 @@ async def handle_command(command: str):
         await cl.Message(content=config_msg, author="System").send()
     
     elif cmd == "/reset":
-        cl.user_session.set("conversation_history", [])
+        reset_conversation_memory()
+        # Agent mode: start a new conversation (earlier turns, evidence and citation numbers)
+        agent = cl.user_session.get("agent")
+        if agent is not None:
+            agent.reset()
         await cl.Message(
             content="✅ Conversation history cleared.",
             author="System",
@@ -1176,7 +1303,7 @@ To change: `/mode chat` or `/mode agent`
         
         # Switch mode
         cl.user_session.set("conversation_mode", mode)
-        cl.user_session.set("conversation_history", [])
+        reset_conversation_memory()
         
         # Initialize agent if switching to agent mode
         if mode == "agent":
@@ -1199,14 +1326,14 @@ To change: `/mode chat` or `/mode agent`
                         agent_config=agent_config
                     )
                     
-                    agent = ReActAgent(
+                    agent = create_agent(
                         llm=function_call_llm,
                         search_tool=search_tool,
                         config=agent_config,
                         answer_llm=answer_llm,
                         additional_tools=mcp_tools,
                     )
-                    cl.user_session.set("agent", agent)
+                    await set_session_agent(agent)
                     
                     await cl.Message(
                         content="✅ 已切换到 🤖 **Agent 模式**\n\n模型会自主决策何时使用搜索工具。\n对话历史已清除。",
@@ -1311,7 +1438,7 @@ To change: `/search on` or `/search off`
             cl.user_session.set("current_provider", provider)
             
             # Clear history
-            cl.user_session.set("conversation_history", [])
+            reset_conversation_memory()
             
             await cl.Message(
                 content=f"""✅ Switched to **{provider}**
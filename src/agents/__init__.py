@@ -9,7 +9,10 @@ from src.agents.base import (
     AgentExecutionError,
     AgentIterationLimitError,
 )
+from src.agents.event_bus import AgentEventBus, OverflowPolicy, StepSubscription
 from src.agents.react_agent import ReActAgent
+from src.agents.plan_execute_agent import PlanExecuteAgent
+from src.agents.factory import create_agent
 
 __all__ = [
     "BaseAgent",
@@ -19,6 +22,11 @@ __all__ = [
     "AgentTimeoutError",
     "AgentExecutionError",
     "AgentIterationLimitError",
+    "AgentEventBus",
+    "OverflowPolicy",
+    "StepSubscription",
     "ReActAgent",
+    "PlanExecuteAgent",
+    "create_agent",
 ]
 
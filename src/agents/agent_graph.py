@@ -0,0 +1,258 @@
+"""Compiled LangGraph agent graphs shared across sessions.
+
+Binding tools and compiling a ReAct graph is the expensive part of creating an
+agent, yet the LLM configuration and tool set are almost always the same for
+every session. Graphs are therefore compiled once per (LLM config, tool set)
+and cached. They hold no per-session state: everything that belongs to a
+session or a run is passed in the run config under ``configurable``:
+
+- ``citation_manager``: GlobalCitationManager of the session
+- ``context_manager``: ContextManager trimming messages before each model call
+- ``verbatim_tool_steps`` / ``max_iteration_tokens``: history compaction
+  settings (see ``src/agents/history_compaction.py``)
+- ``tool_semaphore``: per-session tool concurrency limit
+- ``global_max_parallel_tools``: process-wide tool concurrency limit
+- ``thread_id``: checkpoint thread of the run (graphs compiled with a
+  checkpointer, see ``src/agents/checkpointing.py``)
+"""
+
+import asyncio
+import json
+import logging
+import time
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Optional, Sequence, Tuple
+
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage
+from langchain_core.runnables import RunnableConfig
+from langchain_core.tools import BaseTool
+from langgraph.prebuilt import ToolNode, create_react_agent
+
+from src.agents.history_compaction import compact_observations
+from src.agents.tools.search_tool import SearchTool
+from src.models.context_manager import ContextWindowExceededError
+from src.search.global_citation_manager import current_citation_ticket
+
+logger = logging.getLogger(__name__)
+
+# Maximum number of compiled graphs kept (LRU)
+MAX_CACHED_GRAPHS = 32
+
+# Default process-wide tool concurrency when the run config does not set one
+DEFAULT_GLOBAL_MAX_PARALLEL_TOOLS = 16
+
+# Latest tool steps whose observations reach the LLM verbatim when the run
+# config does not set it
+DEFAULT_VERBATIM_TOOL_STEPS = 1
+
+_graph_cache: "OrderedDict[Tuple, Any]" = OrderedDict()
+
+# Process-wide tool concurrency limit, bound to the event loop it was created on
+_global_tool_semaphore: Optional[Tuple[asyncio.AbstractEventLoop, asyncio.Semaphore]] = None
+
+
+def _get_global_tool_semaphore(limit: int) -> asyncio.Semaphore:
+    """Get the semaphore limiting concurrent tool calls across all sessions."""
+    global _global_tool_semaphore
+    loop = asyncio.get_running_loop()
+    if _global_tool_semaphore is None or _global_tool_semaphore[0] is not loop:
+        _global_tool_semaphore = (loop, asyncio.Semaphore(limit))
+    return _global_tool_semaphore[1]
+
+
+@asynccontextmanager
+async def tool_slot(
+    session_semaphore: Optional[asyncio.Semaphore],
+    global_max_parallel_tools: int = DEFAULT_GLOBAL_MAX_PARALLEL_TOOLS,
+) -> AsyncIterator[None]:
+    """Hold one per-session and one process-wide tool slot.
+    
+    The session slot is taken first. Both semaphores are FIFO, so callers
+    entering in order get their slots in that order.
+    
+    Args:
+        session_semaphore: Per-session tool semaphore (None for no limit)
+        global_max_parallel_tools: Process-wide tool concurrency limit
+    """
+    if session_semaphore is not None:
+        await session_semaphore.acquire()
+    try:
+        async with _get_global_tool_semaphore(global_max_parallel_tools):
+            yield
+    finally:
+        if session_semaphore is not None:
+            session_semaphore.release()
+
+
+def _get_configurable(config: Optional[RunnableConfig]) -> dict:
+    return (config or {}).get("configurable") or {}
+
+
+def fit_context(state: dict, config: RunnableConfig) -> dict:
+    """Pre-model hook: compact and trim the messages sent to the LLM.
+    
+    Observations older than the latest tool steps are replaced by digests,
+    then the messages are fitted to the per-iteration token ceiling (or, if
+    the protected messages exceed it, to the context window). Only the LLM
+    input is changed; the graph state keeps the full history.
+    
+    Args:
+        state: LangGraph agent state
+        config: Run config carrying the session's ``context_manager``
+    
+    Returns:
+        State update with ``llm_input_messages``
+    """
+    configurable = _get_configurable(config)
+    context_manager = configurable.get("context_manager")
+    if context_manager is None:
+        return {"llm_input_messages": state["messages"]}
+    
+    messages = compact_observations(
+        state["messages"],
+        context_manager,
+        verbatim_tool_steps=configurable.get("verbatim_tool_steps", DEFAULT_VERBATIM_TOOL_STEPS),
+    )
+    max_iteration_tokens = configurable.get("max_iteration_tokens")
+    if max_iteration_tokens:
+        try:
+            return {"llm_input_messages": context_manager.fit_messages(messages, max_iteration_tokens)}
+        except ContextWindowExceededError:
+            logger.warning(f"⚠️ 消息无法压缩到单次迭代上限 ({max_iteration_tokens} tokens)，仅按上下文窗口裁剪")
+    return {"llm_input_messages": context_manager.fit_messages(messages)}
+
+
+async def run_tool_call(request, execute):
+    """Tool node wrapper: run one tool call under the concurrency limits.
+    
+    LangGraph runs all tool calls of an AIMessage concurrently. Search calls
+    get citation tickets in call order, so global citation numbers do not
+    depend on which search finishes first.
+    
+    Args:
+        request: LangGraph ToolCallRequest
+        execute: Callable executing the request
+    
+    Returns:
+        ToolMessage (or Command) produced by the tool
+    """
+    configurable = _get_configurable(request.runtime.config)
+    citation_manager = configurable.get("citation_manager")
+    
+    call = request.tool_call
+    ticket = None
+    if citation_manager is not None and isinstance(request.tool, SearchTool):
+        ticket = _reserve_citation_ticket(citation_manager, request)
+    token = current_citation_ticket.set(ticket)
+    start = time.monotonic()
+    try:
+        # Calls of a step enter in call order and both semaphores are FIFO,
+        # so a search never holds a slot while an earlier ticket waits for one
+        async with tool_slot(
+            configurable.get("tool_semaphore"),
+            configurable.get("global_max_parallel_tools", DEFAULT_GLOBAL_MAX_PARALLEL_TOOLS),
+        ):
+            return await execute(request)
+    finally:
+        current_citation_ticket.reset(token)
+        if ticket is not None:
+            await citation_manager.release_ticket(ticket)
+        logger.debug(f"🔧 工具 {call['name']} 耗时 {time.monotonic() - start:.2f}s")
+
+
+def _reserve_citation_ticket(citation_manager, request) -> int:
+    """Reserve citation tickets for all search calls of the request's AIMessage.
+    
+    Args:
+        citation_manager: GlobalCitationManager of the run
+        request: LangGraph ToolCallRequest
+    
+    Returns:
+        Ticket of this request's tool call
+    """
+    call_id = request.tool_call["id"]
+    search_name = request.tool.name
+    state = request.state
+    messages = state.get("messages", []) if isinstance(state, dict) else (state or [])
+    for msg in reversed(messages):
+        if isinstance(msg, AIMessage) and any(c.get("id") == call_id for c in msg.tool_calls):
+            search_ids = [c["id"] for c in msg.tool_calls if c.get("name") == search_name]
+            citation_manager.reserve_tickets(search_ids)
+            break
+    return citation_manager.reserve_tickets([call_id])[0]
+
+
+def _llm_cache_key(llm: BaseChatModel) -> Tuple:
+    """Key identifying an LLM configuration (not the instance)."""
+    try:
+        params = json.dumps(llm._identifying_params, sort_keys=True, default=str)
+    except Exception:
+        params = repr(llm)
+    base_url = getattr(llm, "openai_api_base", None) or getattr(llm, "base_url", None)
+    return (type(llm).__qualname__, params, str(base_url))
+
+
+def _tool_cache_key(tool: BaseTool) -> Tuple:
+    """Key identifying a tool: its type, schema-facing text and backing service."""
+    backend = getattr(tool, "search_service", None) or getattr(tool, "mcp_client", None)
+    return (type(tool).__qualname__, tool.name, tool.description, id(backend))
+
+
+def _bind_tools(llm: BaseChatModel, tools: Sequence[BaseTool]):
+    # LangGraph's create_react_agent requires the model to have tools bound.
+    # Some models (like DeepSeek) need explicit tool binding
+    try:
+        if hasattr(llm, "bind_tools"):
+            logger.info(f"🔧 绑定 {len(tools)} 个工具到模型...")
+            return llm.bind_tools(list(tools))
+        logger.debug("模型不支持 bind_tools，使用原始模型")
+    except Exception as e:
+        logger.warning(f"⚠️ 工具绑定失败，使用原始模型: {e}")
+    return llm
+
+
+def get_compiled_agent_graph(
+    llm: BaseChatModel,
+    tools: Sequence[BaseTool],
+    checkpointer: Optional[Any] = None,
+):
+    """Get a compiled ReAct graph for an LLM config and tool set, compiling it once.
+    
+    Args:
+        llm: Function-calling chat model
+        tools: Agent tools
+        checkpointer: Optional shared checkpoint saver (runs then need a
+            ``thread_id`` in ``configurable``)
+    
+    Returns:
+        Compiled LangGraph graph (shared; pass per-run state via ``configurable``)
+    """
+    key = (
+        _llm_cache_key(llm),
+        tuple(_tool_cache_key(tool) for tool in tools),
+        id(checkpointer) if checkpointer is not None else None,
+    )
+    graph = _graph_cache.get(key)
+    if graph is not None:
+        _graph_cache.move_to_end(key)
+        logger.debug("♻️ 复用已编译的 Agent 图")
+        return graph
+    
+    graph = create_react_agent(
+        model=_bind_tools(llm, tools),
+        tools=ToolNode(list(tools), awrap_tool_call=run_tool_call),
+        pre_model_hook=fit_context,
+        checkpointer=checkpointer,
+    )
+    _graph_cache[key] = graph
+    while len(_graph_cache) > MAX_CACHED_GRAPHS:
+        _graph_cache.popitem(last=False)
+    logger.info(f"✅ Agent 图编译完成并缓存 (缓存数量: {len(_graph_cache)})")
+    return graph
+
+
+def clear_agent_graph_cache() -> None:
+    """Drop all cached graphs (e.g. after tools or model settings change)."""
+    _graph_cache.clear()
@@ -0,0 +1,64 @@
+"""Answer-phase context built from structured tool artifacts.
+
+Search tools return content and artifact: the function-call LLM reads the
+compact observation text, and the answer phase renders its own context from
+the SearchArtifact (full result content under the global citation numbers).
+Sources that several tool calls returned (repeated or memoized searches) are
+listed once. Tools without an artifact (MCP tools) contribute their text.
+"""
+
+from typing import Any, List, Optional, Sequence
+
+from src.agents.tools.search_tool import SearchArtifact
+
+
+def format_search_artifact(artifact: SearchArtifact, skip_numbers: Optional[set] = None) -> str:
+    """Render the results of one search for the answer LLM.
+    
+    Args:
+        artifact: Search artifact
+        skip_numbers: Citation numbers already in the context (updated in place)
+    
+    Returns:
+        Numbered sources with their full content, or "" if all were skipped
+    """
+    skip_numbers = skip_numbers if skip_numbers is not None else set()
+    sources = []
+    for number, result in artifact.numbered():
+        if number in skip_numbers:
+            continue
+        skip_numbers.add(number)
+        sources.append(f"[{number}] {result.title}\n来源: {result.url}\n内容: {result.content}")
+    if not sources:
+        return ""
+    return f"查询: {artifact.query}\n\n" + "\n\n".join(sources)
+
+
+def build_answer_context(
+    tool_results: Sequence[str],
+    tool_artifacts: Optional[Sequence[Any]] = None,
+) -> List[str]:
+    """Build one context block per tool result for the answer prompt.
+    
+    Args:
+        tool_results: Tool observation texts in call order
+        tool_artifacts: Tool artifacts aligned with tool_results (None entries,
+            or a missing list, fall back to the observation text; artifacts
+            restored from checkpoints as dicts are accepted)
+    
+    Returns:
+        Context blocks in call order (searches that only repeated earlier
+        sources are dropped)
+    """
+    artifacts = list(tool_artifacts or [])
+    seen_numbers: set = set()
+    blocks = []
+    for i, result in enumerate(tool_results):
+        artifact = SearchArtifact.from_value(artifacts[i]) if i < len(artifacts) else None
+        if artifact is not None:
+            block = format_search_artifact(artifact, seen_numbers)
+            if block:
+                blocks.append(block)
+        else:
+            blocks.append(result)
+    return blocks
@@ -0,0 +1,300 @@
+"""Answer phase shared by the agents: the answer_llm writes the final answer.
+
+Once the tools have run, ``ReActAgent`` and ``PlanExecuteAgent`` answer the
+same way: the tool artifacts are rendered into a context fitted to the
+answer_llm's window, the answer is streamed with citations linked token by
+token, and a non-streaming call serves as fallback. ``AnswerPhaseMixin``
+holds that code so both agents use it as their own methods.
+"""
+
+import logging
+from datetime import datetime
+from typing import Optional
+
+from langchain_core.messages import HumanMessage, SystemMessage
+
+from src.agents.answer_context import build_answer_context
+from src.agents.base import AgentStep
+
+logger = logging.getLogger(__name__)
+
+# Token allowance for the answer-phase system prompt and framing text
+ANSWER_PROMPT_OVERHEAD_TOKENS = 512
+
+
+class AnswerPhaseMixin:
+    """Answer generation with the answer_llm, mixed into the agents.
+    
+    The host agent provides ``answer_llm``, ``answer_context_manager`` and
+    ``citation_manager``. Agents with conversation memory set
+    ``_history_text`` and ``_history_evidence`` at the start of each turn;
+    the defaults answer without history.
+    """
+    
+    # Transcript and (tool_results, tool_artifacts) evidence of earlier turns
+    _history_text: str = ""
+    _history_evidence: tuple = ((), ())
+    
+    def _fit_answer_context(
+        self,
+        user_input: str,
+        tool_results: list[str],
+        tool_artifacts: Optional[list] = None,
+    ) -> list[str]:
+        """Build the answer context and compact it to the answer_llm context window.
+        
+        Args:
+            user_input: Original user question
+            tool_results: List of tool execution results
+            tool_artifacts: Tool artifacts aligned with tool_results (search
+                results are rendered from these instead of the observation text)
+        
+        Returns:
+            Context blocks (earlier turns' evidence included) that fit the
+            answer prompt budget
+        """
+        # Evidence of earlier turns comes first, so it is compacted first
+        history_results, history_artifacts = self._history_evidence
+        tool_artifacts = list(tool_artifacts or [])
+        tool_artifacts += [None] * (len(tool_results) - len(tool_artifacts))
+        blocks = build_answer_context(
+            [*history_results, *tool_results], [*history_artifacts, *tool_artifacts]
+        )
+        # Instructions and prompt framing take well under this many tokens
+        reserved = self.answer_context_manager.count_tokens(user_input) + ANSWER_PROMPT_OVERHEAD_TOKENS
+        return self.answer_context_manager.fit_observations(blocks, reserved)
+    
+    def _with_history(self, user_prompt: str) -> str:
+        """Prefix an answer prompt with the transcript of earlier turns."""
+        if not self._history_text:
+            return user_prompt
+        return f"对话历史:\n{self._history_text}\n\n{user_prompt}"
+    
+    def _build_answer_messages(
+        self,
+        user_input: str,
+        tool_results: list[str],
+        tool_artifacts: Optional[list] = None,
+        note: Optional[str] = None,
+    ) -> list:
+        """Build the answer prompt: fitted tool results, or the model's own knowledge.
+        
+        Args:
+            user_input: Original user question
+            tool_results: List of tool execution results
+            tool_artifacts: Tool artifacts aligned with tool_results
+            note: Extra instruction appended to the rules
+        
+        Returns:
+            System and user messages for the answer_llm
+        """
+        current_date = datetime.now().strftime("%Y-%m-%d")
+        context_blocks = self._fit_answer_context(user_input, tool_results, tool_artifacts)
+        
+        if context_blocks:
+            # Has tool results - generate answer based on them
+            rules = [
+                "仔细分析搜索结果，提取相关信息",
+                "在回答中使用 [数字] 格式引用搜索结果来源",
+                "如果搜索结果不足以回答问题，如实说明",
+                "回答应该准确、完整、有条理",
+                "如果用户询问日期或时间相关问题，请使用上述当前日期信息回答",
+            ]
+            intro = "基于以下搜索结果，为用户的问题提供一个准确、完整、有引用的回答。"
+            context = "\n\n".join(f"[搜索结果 {i}]\n{block}" for i, block in enumerate(context_blocks, 1))
+            user_prompt = f"""用户问题: {user_input}
+
+搜索结果:
+{context}
+
+请基于以上搜索结果回答用户的问题。"""
+        else:
+            # No tool results - answer directly from model knowledge
+            rules = [
+                "提供准确、完整、有条理的回答",
+                "如果不确定答案，请如实说明",
+                "如果用户询问日期或时间相关问题，请使用上述当前日期信息回答",
+            ]
+            intro = "请基于你的知识直接回答用户的问题。"
+            user_prompt = f"""用户问题: {user_input}
+
+请基于你的知识回答用户的问题。"""
+        if note:
+            rules.append(f"注意：{note}")
+        
+        numbered_rules = "\n".join(f"{i}. {rule}" for i, rule in enumerate(rules, 1))
+        system_prompt = f"""你是一个有用的 AI 助手。{intro}
+
+当前日期：{current_date}
+
+重要规则:
+{numbered_rules}
+"""
+        return [
+            SystemMessage(content=system_prompt),
+            HumanMessage(content=self._with_history(user_prompt)),
+        ]
+    
+    async def _generate_answer_with_answer_llm_streaming(
+        self, 
+        user_input: str, 
+        tool_results: list[str],
+        tool_calls: list[dict],
+        tool_artifacts: Optional[list] = None,
+        note: Optional[str] = None,
+    ):
+        """Generate final answer using answer_llm with streaming support.
+        
+        This method yields AgentStep objects for reasoning and answer content.
+        
+        Args:
+            user_input: Original user question
+            tool_results: List of tool execution results
+            tool_calls: List of tool call information
+            tool_artifacts: Tool artifacts aligned with tool_results
+            note: Extra instruction appended to the rules (e.g. why the
+                tool loop stopped early)
+            
+        Yields:
+            AgentStep objects for reasoning and answer content
+        """
+        messages = self._build_answer_messages(user_input, tool_results, tool_artifacts, note)
+        
+        logger.info(f"使用 answer_llm 流式生成最终回答...")
+        
+        # Citations are linked token by token as the answer streams
+        reasoning_started = False
+        citations = self.citation_manager.stream_converter()
+        
+        # Stream the response with error handling
+        try:
+            async for chunk in self.answer_llm.astream(messages):
+                # Check for reasoning_content (DeepSeek-R1 and similar models)
+                if hasattr(chunk, 'additional_kwargs'):
+                    deepseek_reasoning = chunk.additional_kwargs.get('reasoning_content')
+                    if deepseek_reasoning:
+                        if not reasoning_started:
+                            reasoning_started = True
+                            logger.info("🧠 Answer LLM 输出推理过程")
+                        # Reasoning is streamed as deltas (the UI appends them)
+                        yield AgentStep(
+                            type="reasoning",
+                            content=deepseek_reasoning,
+                            metadata={
+                                "reasoning_type": "answer_phase",
+                                "is_deepseek_reasoning": True,
+                                "model": "answer_llm",
+                                "delta": True,
+                            }
+                        )
+                
+                # Handle regular content
+                if hasattr(chunk, 'content') and chunk.content:
+                    token = citations.feed(chunk.content)
+                    if token:
+                        yield AgentStep(
+                            type="final",
+                            content=token,
+                        )
+            
+            for step in self._finish_streamed_citations(citations):
+                yield step
+            
+            logger.info("✅ Answer LLM 流式输出完成")
+            
+        except Exception as e:
+            error_type = type(e).__name__
+            error_msg = str(e)
+            
+            # Check if this is a timeout error
+            is_timeout = "timeout" in error_msg.lower() or "timed out" in error_msg.lower()
+            
+            if is_timeout:
+                logger.error(f"⏱️ Answer LLM 流式输出超时: {e}")
+                # Don't yield error here, let the caller handle it with fallback
+                raise
+            else:
+                logger.error(f"❌ Answer LLM 流式输出失败 ({error_type}): {e}", exc_info=True)
+                # For other errors, raise to trigger fallback
+                raise
+    
+    def _finish_streamed_citations(self, citations) -> list[AgentStep]:
+        """Build the steps closing a streamed answer: held-back text and the citation list.
+        
+        Args:
+            citations: StreamingCitationConverter the answer tokens went through
+            
+        Returns:
+            Final steps to yield after the last answer token
+        """
+        steps = []
+        tail = citations.flush()
+        if tail:
+            steps.append(AgentStep(type="final", content=tail))
+        if citations.cited:
+            logger.info(f"✅ 添加引用列表，包含 {len(citations.cited)} 条引用")
+            steps.append(AgentStep(
+                type="final",
+                content=self.citation_manager.generate_citations_list(citations.cited),
+            ))
+        return steps
+    
+    def _final_answer_steps(self, answer: str, link_citations: bool = True) -> list[AgentStep]:
+        """Build the steps showing a complete (not streamed) answer.
+        
+        Args:
+            answer: Answer text
+            link_citations: Whether to link inline citations and append the
+                citation list
+        
+        Returns:
+            Final steps to yield
+        """
+        if not link_citations:
+            return [AgentStep(type="final", content=answer)]
+        citations = self.citation_manager.stream_converter()
+        return [
+            AgentStep(type="final", content=citations.feed(answer)),
+            *self._finish_streamed_citations(citations),
+        ]
+    
+    async def _generate_answer_with_answer_llm(
+        self, 
+        user_input: str, 
+        tool_results: list[str],
+        tool_calls: list[dict],
+        tool_artifacts: Optional[list] = None,
+        note: Optional[str] = None,
+    ) -> str:
+        """Generate final answer using answer_llm (non-streaming fallback).
+        
+        This method uses ainvoke (non-streaming) instead of astream, 
+        making it a true fallback when streaming fails or times out.
+        
+        Args:
+            user_input: Original user question
+            tool_results: List of tool execution results
+            tool_calls: List of tool call information
+            tool_artifacts: Tool artifacts aligned with tool_results
+            note: Extra instruction appended to the rules (e.g. why the
+                tool loop stopped early)
+            
+        Returns:
+            Generated final answer
+        """
+        logger.info("尝试使用回退方法...")
+        
+        messages = self._build_answer_messages(user_input, tool_results, tool_artifacts, note)
+        
+        try:
+            # Use ainvoke (non-streaming) with increased timeout
+            response = await self.answer_llm.ainvoke(messages)
+            full_answer = response.content if hasattr(response, 'content') else str(response)
+            
+            logger.info(f"✅ 回退方法成功，回答长度: {len(full_answer)}")
+            return full_answer
+            
+        except Exception as e:
+            logger.error(f"❌ 回退方法失败: {e}")
+            # Return a basic error message
+            return "抱歉，由于网络原因，无法生成完整的回答。请稍后重试。"
@@ -0,0 +1,153 @@
+"""Checkpoint savers for ReAct graph runs.
+
+Each agent run gets its own LangGraph thread, and the compiled graph saves a
+checkpoint after every completed step (model call, tool step). When the
+streaming run fails, the non-streaming fallback resumes the same thread from
+its last checkpoint, so completed LLM calls and tool calls are never
+repeated. Savers are shared per backend; the thread of a single-turn run is
+discarded once the run is over. Savers keep every checkpoint of a thread
+for its lifetime, so a multi-turn conversation carries its latest state over
+to a fresh thread at the start of each turn (:func:`carry_over_thread`,
+see ``src/agents/conversation_state.py``) and stays at a few checkpoints.
+With the SQLite backend, checkpoints of runs that were interrupted by a
+worker restart stay on disk.
+"""
+
+import asyncio
+import logging
+import uuid
+from pathlib import Path
+from typing import Any, Dict, Optional, Set, Tuple
+
+from langchain_core.messages import HumanMessage
+from langgraph.checkpoint.memory import InMemorySaver
+
+from src.config.agent_config import CheckpointBackend
+
+logger = logging.getLogger(__name__)
+
+_savers: Dict[Tuple[str, str], Any] = {}
+
+# Scheduled thread deletions (the event loop only keeps weak references to tasks)
+_pending_discards: Set[asyncio.Task] = set()
+
+
+def get_checkpointer(
+    backend: CheckpointBackend,
+    path: str = "data/agent_checkpoints.sqlite",
+) -> Optional[Any]:
+    """Get the shared checkpoint saver of a backend.
+    
+    The SQLite saver binds to the running event loop, so it must be created
+    from async code (agents are created in Chainlit handlers).
+    
+    Args:
+        backend: Checkpoint backend
+        path: SQLite file of the sqlite backend
+    
+    Returns:
+        LangGraph checkpoint saver, or None if checkpointing is disabled
+    """
+    if backend == CheckpointBackend.NONE:
+        return None
+    key = (backend.value, path if backend == CheckpointBackend.SQLITE else "")
+    saver = _savers.get(key)
+    if saver is not None:
+        return saver
+    
+    if backend == CheckpointBackend.SQLITE:
+        try:
+            import aiosqlite
+            from langgraph.checkpoint.sqlite.aio import AsyncSqliteSaver
+        except ImportError:
+            logger.warning(
+                "⚠️ langgraph-checkpoint-sqlite 未安装，改用内存检查点。"
+                "请运行: pip install langgraph-checkpoint-sqlite"
+            )
+            return get_checkpointer(CheckpointBackend.MEMORY)
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        # The connection is opened lazily by the saver's setup
+        saver = AsyncSqliteSaver(aiosqlite.connect(path))
+        logger.info(f"💾 Agent 检查点: SQLite ({path})")
+    else:
+        saver = InMemorySaver()
+        logger.info("💾 Agent 检查点: 内存")
+    _savers[key] = saver
+    return saver
+
+
+def new_thread_id() -> str:
+    """Get a fresh checkpoint thread id for one agent run."""
+    return f"agent-run-{uuid.uuid4().hex}"
+
+
+async def has_checkpoint(graph, config: dict, user_input: str) -> bool:
+    """Check whether the run config's thread holds a checkpoint of this input's turn.
+    
+    Args:
+        graph: Compiled LangGraph graph with a checkpointer
+        config: Run config carrying ``configurable["thread_id"]``
+        user_input: User's question of the interrupted run
+    
+    Returns:
+        True if the run can be resumed (its latest question is user_input)
+    """
+    try:
+        snapshot = await graph.aget_state(config)
+    except Exception as e:
+        logger.warning(f"⚠️ 读取检查点失败: {e}")
+        return False
+    questions = [m for m in snapshot.values.get("messages", []) if isinstance(m, HumanMessage)]
+    return bool(questions) and questions[-1].content == user_input
+
+
+async def discard_thread(checkpointer, thread_id: Optional[str]) -> None:
+    """Delete the checkpoints of a finished run (best effort).
+    
+    Args:
+        checkpointer: Checkpoint saver (None if checkpointing is disabled)
+        thread_id: Thread of the run
+    """
+    if checkpointer is None or thread_id is None:
+        return
+    try:
+        await checkpointer.adelete_thread(thread_id)
+    except Exception as e:
+        logger.debug(f"删除检查点失败 ({thread_id}): {e}")
+
+
+def discard_thread_later(checkpointer, thread_id: Optional[str]) -> None:
+    """Schedule discard_thread from synchronous code (skipped without a running loop)."""
+    if checkpointer is None or thread_id is None:
+        return
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        logger.debug(f"没有运行中的事件循环，保留检查点 ({thread_id})")
+        return
+    task = loop.create_task(discard_thread(checkpointer, thread_id))
+    _pending_discards.add(task)
+    task.add_done_callback(_pending_discards.discard)
+
+
+async def carry_over_thread(graph, checkpointer, config: dict, values: dict) -> str:
+    """Move a thread's state to a fresh thread and delete the old one.
+    
+    The fresh thread starts with a single checkpoint holding ``values``, so
+    superseded checkpoints of earlier steps do not accumulate in the saver.
+    
+    Args:
+        graph: Compiled LangGraph graph with a checkpointer
+        checkpointer: Checkpoint saver of the graph
+        config: Run config carrying the old ``configurable["thread_id"]``
+        values: State to keep (e.g. the trimmed ``messages``; empty to start over)
+    
+    Returns:
+        Id of the fresh thread
+    """
+    thread_id = new_thread_id()
+    if values.get("messages"):
+        new_config = {**config, "configurable": {**config.get("configurable", {}), "thread_id": thread_id}}
+        await graph.aupdate_state(new_config, values, as_node="agent")
+    await discard_thread(checkpointer, config.get("configurable", {}).get("thread_id"))
+    return thread_id
@@ -0,0 +1,169 @@
+"""Conversation-scoped ReAct graph state.
+
+In multi-turn Agent mode every turn of a conversation continues the
+checkpointed graph state of the previous one, which carries the earlier questions, tool
+calls, observations and answers, and follow-ups can reuse evidence instead of
+searching again. Citation numbers of earlier turns stay valid because the
+session's GlobalCitationManager is only reset with the conversation.
+
+The stored state is bounded: before each turn the oldest whole turns are
+removed until the earlier turns fit a token budget, and the remaining state
+moves to a fresh checkpoint thread, so the saver does not keep the
+superseded checkpoints either. A turn is a HumanMessage and everything up to
+the next one.
+"""
+
+import logging
+import re
+from typing import List, Optional, Sequence, Tuple
+
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage, RemoveMessage, ToolMessage
+
+from src.models.context_manager import ContextManager
+
+logger = logging.getLogger(__name__)
+
+# Fixed id of the date system message: each turn replaces it in place
+DATE_MESSAGE_ID = "agent-date"
+
+# Linked citation as rendered by StreamingCitationConverter
+_LINKED_CITATION = re.compile(r"\[\[(\d+)\]\]\([^)]*\)")
+
+# Start of the reference list appended to displayed answers
+_REFERENCES_MARKER = "\n\n---\n**📚"
+
+
+def split_turns(messages: Sequence[BaseMessage]) -> List[List[BaseMessage]]:
+    """Split graph messages into turns (messages before the first question are skipped)."""
+    turns: List[List[BaseMessage]] = []
+    for msg in messages:
+        if isinstance(msg, HumanMessage):
+            turns.append([msg])
+        elif turns:
+            turns[-1].append(msg)
+    return turns
+
+
+def current_turn(messages: Sequence[BaseMessage]) -> List[BaseMessage]:
+    """Get the messages of the latest turn (all messages if there is no question)."""
+    turns = split_turns(messages)
+    return turns[-1] if turns else list(messages)
+
+
+def turn_answer(turn: Sequence[BaseMessage]) -> str:
+    """Get the final answer of a turn ("" if it has none)."""
+    for msg in reversed(turn):
+        if isinstance(msg, AIMessage) and not msg.tool_calls and isinstance(msg.content, str):
+            return msg.content
+    return ""
+
+
+def plain_answer(displayed: str) -> str:
+    """Turn a displayed answer back into model text.
+    
+    Citation links become ``[n]`` markers again and the reference list is
+    dropped, so stored answers do not spend tokens on URLs.
+    
+    Args:
+        displayed: Answer as shown to the user
+    
+    Returns:
+        Answer text for the conversation state
+    """
+    text = displayed.split(_REFERENCES_MARKER, 1)[0]
+    return _LINKED_CITATION.sub(r"[\1]", text).strip()
+
+
+def dangling_tool_calls(messages: Sequence[BaseMessage]) -> List[RemoveMessage]:
+    """Select tool-calling AIMessages whose calls never got results.
+    
+    A turn stopped by the recursion limit or an error can end with tool calls
+    that were not executed; chat APIs reject such histories.
+    
+    Args:
+        messages: Graph state messages of the conversation
+    
+    Returns:
+        RemoveMessage updates for the unanswered tool-calling messages
+    """
+    answered = {msg.tool_call_id for msg in messages if isinstance(msg, ToolMessage)}
+    return [
+        RemoveMessage(id=msg.id)
+        for msg in messages
+        if isinstance(msg, AIMessage) and msg.tool_calls and msg.id
+        and any(call.get("id") not in answered for call in msg.tool_calls)
+    ]
+
+
+def trim_turns(
+    messages: Sequence[BaseMessage],
+    context_manager: ContextManager,
+    max_tokens: int,
+) -> List[RemoveMessage]:
+    """Select the oldest turns to remove so the stored turns fit a budget.
+    
+    Args:
+        messages: Graph state messages of the conversation
+        context_manager: Context manager used to count tokens
+        max_tokens: Token budget of the stored turns
+    
+    Returns:
+        RemoveMessage updates for the dropped messages (oldest turns first)
+    """
+    turns = split_turns(messages)
+    sizes = [context_manager.count_messages(turn) for turn in turns]
+    total = sum(sizes)
+    removals = []
+    dropped = 0
+    for turn, size in zip(turns, sizes):
+        if total <= max_tokens:
+            break
+        removals.extend(RemoveMessage(id=msg.id) for msg in turn if msg.id)
+        total -= size
+        dropped += 1
+    if dropped:
+        logger.info(f"✂️ Agent 对话状态超出预算 ({max_tokens} tokens)，移除最早的 {dropped} 轮")
+    return removals
+
+
+def conversation_history(
+    turns: Sequence[Sequence[BaseMessage]],
+    context_manager: ContextManager,
+    answer_tokens: int = 300,
+) -> str:
+    """Render earlier turns as a short transcript for answer prompts.
+    
+    Args:
+        turns: Earlier turns of the conversation
+        context_manager: Context manager used to truncate answers
+        answer_tokens: Size limit of each earlier answer
+    
+    Returns:
+        Transcript of questions and answers ("" if there are none)
+    """
+    lines = []
+    for turn in turns:
+        question = turn[0].content if isinstance(turn[0].content, str) else str(turn[0].content)
+        lines.append(f"用户: {question}")
+        answer = turn_answer(turn)
+        if answer:
+            lines.append(f"助手: {context_manager.truncate_text(answer, answer_tokens)}")
+    return "\n".join(lines)
+
+
+def turn_evidence(turns: Sequence[Sequence[BaseMessage]]) -> Tuple[List[str], List[Optional[object]]]:
+    """Collect the tool observations and artifacts of earlier turns.
+    
+    Args:
+        turns: Earlier turns of the conversation
+    
+    Returns:
+        Observation texts and their artifacts, aligned (see build_answer_context)
+    """
+    results, artifacts = [], []
+    for turn in turns:
+        for msg in turn:
+            if isinstance(msg, ToolMessage) and str(msg.content):
+                results.append(str(msg.content))
+                artifacts.append(msg.artifact)
+    return results, artifacts
@@ -0,0 +1,332 @@
+"""Bounded, multi-subscriber bus for Agent steps.
+
+The agent produces ``AgentStep`` objects faster than some consumers take
+them: a token arrives every few milliseconds while a UI update is a
+websocket round-trip. :class:`AgentEventBus` sits between the producer and
+its subscribers (UI, metrics, transcript persistence) and keeps each
+subscriber's backlog bounded:
+
+- Token steps are coalesced into the subscriber's newest unread step:
+  answer deltas (``final``) and reasoning deltas (``"delta": True``) are
+  appended to it, streamed reasoning snapshots (``"streaming": True``)
+  replace it. A slow subscriber receives fewer, larger steps instead of a
+  growing queue, and appending collects parts that are joined once on
+  delivery instead of re-concatenating the string per token.
+- Other steps take a buffer slot. When a subscriber's buffer is full, a
+  ``BLOCK`` subscriber (UI, transcript) applies backpressure: the producer
+  waits for space, but at most ``max_lag`` seconds. After that the
+  subscriber is marked as lagging and its buffer grows past ``maxsize``
+  until it catches up; a BLOCK subscriber never loses a step. Token steps
+  still coalesce, so the overflow is limited to the run's non-token steps
+  (a few per tool call). A ``DROP`` subscriber (metrics) loses the step
+  right away.
+
+Slow subscribers therefore neither grow memory per token nor stall the
+producer for long.
+"""
+
+import asyncio
+import logging
+from collections import deque
+from contextlib import aclosing
+from enum import Enum
+from typing import Any, AsyncIterator, Deque, List, Optional
+
+from src.agents.base import AgentStep
+
+logger = logging.getLogger(__name__)
+
+# Coalescing modes of token steps
+APPEND = "append"
+REPLACE = "replace"
+
+
+class OverflowPolicy(str, Enum):
+    """What happens to a step that does not fit a subscriber's buffer."""
+    
+    BLOCK = "block"
+    DROP = "drop"
+
+
+def coalesce_mode(step: AgentStep) -> Optional[str]:
+    """Get how a step merges into an unread step of the same kind.
+    
+    Args:
+        step: Agent step
+    
+    Returns:
+        APPEND for answer and reasoning deltas, REPLACE for streamed
+        reasoning snapshots, None for steps that are delivered one by one
+    """
+    if step.type == "final":
+        return APPEND
+    if step.type == "reasoning" and step.metadata:
+        if step.metadata.get("delta"):
+            return APPEND
+        if step.metadata.get("streaming"):
+            return REPLACE
+    return None
+
+
+class _Entry:
+    """Buffered step; appended token parts are joined on delivery."""
+    
+    __slots__ = ("type", "metadata", "mode", "parts")
+    
+    def __init__(self, step: AgentStep):
+        self.type = step.type
+        self.metadata = step.metadata
+        self.mode = coalesce_mode(step)
+        self.parts: List[str] = [step.content]
+    
+    def merge(self, step: AgentStep) -> bool:
+        """Merge a later step into this one if both are of the same kind."""
+        if self.mode is None or self.mode != coalesce_mode(step):
+            return False
+        if self.type != step.type or self.metadata != step.metadata:
+            return False
+        if self.mode == APPEND:
+            self.parts.append(step.content)
+        else:
+            self.parts = [step.content]
+        return True
+    
+    def to_step(self) -> AgentStep:
+        content = self.parts[0] if len(self.parts) == 1 else "".join(self.parts)
+        return AgentStep(type=self.type, content=content, metadata=self.metadata)
+
+
+class StepSubscription:
+    """One subscriber's view of the bus.
+    
+    Iterate it to receive the steps; iteration ends when the bus is closed
+    and re-raises the producer's error, if any, after the buffered steps.
+    
+    Attributes:
+        name: Subscriber name (for logs and stats)
+        maxsize: Buffer slots
+        policy: Overflow policy
+        delivered: Steps handed to the subscriber
+        coalesced: Steps merged into an unread step
+        overflowed: Steps buffered past maxsize while a BLOCK subscriber lagged
+        dropped: Steps a DROP subscriber lost because the buffer was full
+    """
+    
+    def __init__(self, name: str, maxsize: int, policy: OverflowPolicy):
+        """Initialize the subscription.
+        
+        Args:
+            name: Subscriber name
+            maxsize: Buffer slots
+            policy: Overflow policy
+        """
+        self.name = name
+        self.maxsize = maxsize
+        self.policy = policy
+        self.delivered = 0
+        self.coalesced = 0
+        self.overflowed = 0
+        self.dropped = 0
+        self.lagging = False
+        self._buffer: Deque[_Entry] = deque()
+        self._readable = asyncio.Event()
+        self._writable = asyncio.Event()
+        self._closed = False
+        self._error: Optional[BaseException] = None
+    
+    @property
+    def closed(self) -> bool:
+        """Whether no more steps are accepted."""
+        return self._closed
+    
+    def _full(self) -> bool:
+        return len(self._buffer) >= self.maxsize
+    
+    def _try_put(self, step: AgentStep) -> bool:
+        """Coalesce or buffer a step without waiting."""
+        if self._buffer and self._buffer[-1].merge(step):
+            self.coalesced += 1
+            return True
+        if self._full():
+            return False
+        self._buffer.append(_Entry(step))
+        self._readable.set()
+        return True
+    
+    async def put(self, step: AgentStep, max_lag: float) -> None:
+        """Offer a step, waiting for space according to the overflow policy.
+        
+        Args:
+            step: Agent step
+            max_lag: Longest wait for space of a BLOCK subscriber
+        """
+        if self._closed:
+            return
+        if self.lagging and not self._full():
+            # The subscriber caught up
+            self.lagging = False
+        if self._try_put(step):
+            return
+        if self.policy == OverflowPolicy.DROP:
+            self.dropped += 1
+            return
+        if not self.lagging:
+            try:
+                async with asyncio.timeout(max_lag):
+                    while self._full() and not self._closed:
+                        self._writable.clear()
+                        await self._writable.wait()
+            except TimeoutError:
+                self.lagging = True
+                logger.warning(f"⚠️ 事件订阅者 {self.name} 处理过慢，不再等待，步骤暂存直到其赶上")
+            else:
+                if self._closed or self._try_put(step):
+                    return
+        # Lagging BLOCK subscriber: the step is kept past maxsize
+        self._buffer.append(_Entry(step))
+        self._readable.set()
+        self.overflowed += 1
+    
+    def close(self, error: Optional[BaseException] = None) -> None:
+        """Stop accepting steps; the subscriber still receives the buffered ones.
+        
+        Args:
+            error: Error re-raised to the subscriber after the buffered steps
+        """
+        if self._closed:
+            return
+        self._closed = True
+        self._error = error
+        self._readable.set()
+        self._writable.set()
+    
+    def __aiter__(self) -> "StepSubscription":
+        return self
+    
+    async def __anext__(self) -> AgentStep:
+        while not self._buffer:
+            if self._closed:
+                if self._error is not None:
+                    error, self._error = self._error, None
+                    raise error
+                raise StopAsyncIteration
+            self._readable.clear()
+            await self._readable.wait()
+        entry = self._buffer.popleft()
+        self._writable.set()
+        self.delivered += 1
+        return entry.to_step()
+    
+    def stats(self) -> dict:
+        """Get the subscriber's counters."""
+        return {
+            "policy": self.policy.value,
+            "delivered": self.delivered,
+            "coalesced": self.coalesced,
+            "overflowed": self.overflowed,
+            "dropped": self.dropped,
+            "buffered": len(self._buffer),
+        }
+
+
+class AgentEventBus:
+    """Fans Agent steps out to bounded subscriber buffers.
+    
+    Attributes:
+        maxsize: Default buffer slots per subscriber
+        max_lag: Longest time the producer waits for a BLOCK subscriber
+        published: Steps published
+    """
+    
+    def __init__(self, maxsize: int = 64, max_lag: float = 5.0):
+        """Initialize the bus.
+        
+        Args:
+            maxsize: Default buffer slots per subscriber
+            max_lag: Longest time the producer waits for a BLOCK subscriber
+        """
+        self.maxsize = maxsize
+        self.max_lag = max_lag
+        self.published = 0
+        self._subscriptions: List[StepSubscription] = []
+        self._closed = False
+        self._error: Optional[BaseException] = None
+    
+    def subscribe(
+        self,
+        name: str,
+        policy: OverflowPolicy = OverflowPolicy.BLOCK,
+        maxsize: Optional[int] = None,
+    ) -> StepSubscription:
+        """Add a subscriber.
+        
+        Subscribers only receive steps published after they subscribed.
+        
+        Args:
+            name: Subscriber name
+            policy: Overflow policy (BLOCK for consumers that need every
+                step, DROP for best-effort ones)
+            maxsize: Buffer slots (defaults to the bus's)
+        
+        Returns:
+            Subscription to iterate
+        """
+        subscription = StepSubscription(name, maxsize or self.maxsize, policy)
+        if self._closed:
+            subscription.close(self._error)
+        else:
+            self._subscriptions.append(subscription)
+        return subscription
+    
+    async def publish(self, step: AgentStep) -> None:
+        """Offer a step to every open subscriber.
+        
+        Args:
+            step: Agent step
+        """
+        self.published += 1
+        for subscription in self._subscriptions:
+            if not subscription.closed:
+                await subscription.put(step, self.max_lag)
+    
+    def close(self, error: Optional[BaseException] = None) -> None:
+        """End the stream for all subscribers.
+        
+        Args:
+            error: Producer error re-raised to each subscriber
+        """
+        if self._closed:
+            return
+        self._closed = True
+        self._error = error
+        for subscription in self._subscriptions:
+            subscription.close(error)
+    
+    async def pump(self, steps: AsyncIterator[AgentStep]) -> None:
+        """Publish all steps of a producer, then close the bus.
+        
+        An error of the producer is handed to the subscribers instead of
+        being raised here; cancelling the pump closes the producer.
+        
+        Args:
+            steps: Async generator of Agent steps (e.g. ``ReActAgent.stream()``)
+        """
+        try:
+            async with aclosing(steps):
+                async for step in steps:
+                    await self.publish(step)
+        except Exception as e:
+            self.close(e)
+        finally:
+            self.close()
+    
+    def summary(self) -> dict[str, Any]:
+        """Get the bus counters.
+        
+        Returns:
+            Dict with ``published`` and per-subscriber counters
+        """
+        return {
+            "published": self.published,
+            "subscribers": {s.name: s.stats() for s in self._subscriptions},
+        }
@@ -0,0 +1,51 @@
+"""Factory for creating the agent selected by the agent configuration."""
+
+import logging
+from typing import List, Optional
+
+from langchain_core.language_models import BaseChatModel
+from langchain_core.tools import BaseTool
+
+from src.agents.base import BaseAgent
+from src.agents.plan_execute_agent import PlanExecuteAgent
+from src.agents.react_agent import ReActAgent
+from src.agents.tools.search_tool import SearchTool
+from src.config.agent_config import AgentConfig, AgentType
+
+logger = logging.getLogger(__name__)
+
+
+def create_agent(
+    llm: BaseChatModel,
+    search_tool: SearchTool,
+    config: Optional[AgentConfig] = None,
+    answer_llm: Optional[BaseChatModel] = None,
+    additional_tools: Optional[List[BaseTool]] = None,
+) -> BaseAgent:
+    """Create the agent selected by ``config.agent_type``.
+    
+    Args:
+        llm: Language model instance for function calling / planning
+        search_tool: Search tool instance
+        config: Agent configuration (optional)
+        answer_llm: Optional language model for answer generation
+        additional_tools: Optional list of additional tools (e.g., MCP tools)
+    
+    Returns:
+        ReActAgent or PlanExecuteAgent instance
+    """
+    config = config or AgentConfig()
+    if config.agent_type == AgentType.PLAN_EXECUTE:
+        logger.debug("Creating Plan-and-Execute agent")
+        agent_class = PlanExecuteAgent
+    else:
+        logger.debug("Creating ReAct agent")
+        agent_class = ReActAgent
+    
+    return agent_class(
+        llm=llm,
+        search_tool=search_tool,
+        config=config,
+        answer_llm=answer_llm,
+        additional_tools=additional_tools,
+    )
@@ -0,0 +1,94 @@
+"""Compaction of older tool observations inside the ReAct loop.
+
+Every LangGraph iteration sends the whole message list back to the
+function-call LLM, so verbose observations of earlier tool steps are paid for
+again on each iteration and the token cost grows roughly quadratically with
+the number of iterations. Before each model call, observations older than the
+latest tool steps are replaced by short digests. Search digests keep the
+global citation numbers and titles, so the model can still cite ``[n]`` and
+knows what it already searched for. Only the LLM input is compacted; the
+graph state keeps the full observations for the answer phase.
+"""
+
+import logging
+import re
+from typing import List, Sequence
+
+from langchain_core.messages import AIMessage, BaseMessage, ToolMessage
+
+from src.models.context_manager import ContextManager
+
+logger = logging.getLogger(__name__)
+
+# Numbered search result line as formatted by SearchTool.format_results
+_CITATION_LINE = re.compile(r"^\[(\d+)\] (.+)$", re.M)
+
+# Marks an observation that is already a digest
+DIGEST_PREFIX = "[较早的工具结果摘要]"
+
+
+def digest_observation(content: str, context_manager: ContextManager, max_tokens: int) -> str:
+    """Shorten an older tool observation.
+    
+    Args:
+        content: Full observation text
+        context_manager: Context manager used to count and truncate tokens
+        max_tokens: Size of digests of observations without citations
+    
+    Returns:
+        Digest listing the citation numbers and titles of search results,
+        or the head of other observations
+    """
+    if content.startswith(DIGEST_PREFIX):
+        return content
+    entries = _CITATION_LINE.findall(content)
+    if entries:
+        lines = [f"[{number}] {title}" for number, title in entries]
+        return f"{DIGEST_PREFIX} 搜索结果（可继续用 [数字] 引用）:\n" + "\n".join(lines)
+    digest = context_manager.truncate_text(content, max_tokens)
+    if digest == content:
+        return content
+    return f"{DIGEST_PREFIX}\n{digest}"
+
+
+def compact_observations(
+    messages: Sequence[BaseMessage],
+    context_manager: ContextManager,
+    verbatim_tool_steps: int = 1,
+    digest_tokens: int = 100,
+) -> List[BaseMessage]:
+    """Replace observations of older tool steps with digests.
+    
+    A tool step is an AIMessage with tool calls plus the ToolMessages answering
+    it. Compacted messages are copies; the input is never mutated.
+    
+    Args:
+        messages: Agent messages (system, human, ai, tool)
+        context_manager: Context manager used to count and truncate tokens
+        verbatim_tool_steps: Number of latest tool steps kept verbatim
+        digest_tokens: Size of digests of observations without citations
+    
+    Returns:
+        Messages with older observations compacted
+    """
+    messages = list(messages)
+    step_starts = [
+        i for i, m in enumerate(messages) if isinstance(m, AIMessage) and m.tool_calls
+    ]
+    if len(step_starts) <= verbatim_tool_steps:
+        return messages
+    
+    cutoff = step_starts[-verbatim_tool_steps] if verbatim_tool_steps > 0 else len(messages)
+    compacted = 0
+    for i in range(cutoff):
+        msg = messages[i]
+        if not isinstance(msg, ToolMessage) or not isinstance(msg.content, str):
+            continue
+        digest = digest_observation(msg.content, context_manager, digest_tokens)
+        if digest != msg.content:
+            messages[i] = msg.model_copy(update={"content": digest})
+            compacted += 1
+    
+    if compacted:
+        logger.debug(f"🗜️ 压缩了 {compacted} 条较早的工具结果")
+    return messages
@@ -0,0 +1,355 @@
+"""Plan-and-execute agent: one planning call, parallel searches, one answer call.
+
+The ReAct loop pays one function-call LLM round-trip per search iteration.
+For research questions whose searches do not depend on each other,
+``PlanExecuteAgent`` asks the function-call LLM once for all queries, runs
+them concurrently through ``SearchService`` and streams a single answer
+from the answer_llm - two LLM round-trips per turn regardless of how many
+searches the plan contains.
+
+Citation numbers are assigned in plan order after all searches finished,
+so they are stable no matter which search returns first.
+"""
+
+import asyncio
+import json
+import logging
+import re
+import time
+from datetime import datetime
+from typing import AsyncIterator, List, Optional, Tuple
+
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import HumanMessage, SystemMessage
+from langchain_core.tools import BaseTool
+
+from src.agents.agent_graph import tool_slot
+from src.agents.answer_phase import AnswerPhaseMixin
+from src.agents.base import (
+    BaseAgent,
+    AgentStep,
+    AgentResult,
+    AgentExecutionError,
+    AgentTimeoutError,
+)
+from src.agents.tools.search_tool import SearchArtifact, SearchTool
+from src.agents.tools.tool_memo import ToolMemo
+from src.config.agent_config import AgentConfig
+from src.models.context_manager import ContextManager
+from src.runtime.deadline import deadline_scope, get_deadline
+from src.search.global_citation_manager import GlobalCitationManager
+from src.search.models import SearchResponse
+
+logger = logging.getLogger(__name__)
+
+# First JSON array in the planner's reply (models often wrap it in prose or fences)
+_JSON_ARRAY_PATTERN = re.compile(r"\[.*?\]", re.S)
+
+
+PLAN_PROMPT_TEMPLATE = """你是一个研究规划助手。请为用户的问题制定搜索计划。
+
+当前日期：{current_date}
+
+重要规则:
+1. 列出回答问题所需的网络搜索查询，最多 {max_queries} 条
+2. 每条查询应该具体、清晰、互不重复，覆盖问题的不同方面
+3. 如果问题无需搜索即可回答，返回空列表 []
+4. 只输出一个 JSON 字符串数组，不要输出其他内容
+
+示例: ["2024年诺贝尔物理学奖得主", "2024年诺贝尔物理学奖 获奖理由"]
+"""
+
+
+def parse_plan(text: str, max_queries: int) -> Optional[List[str]]:
+    """Parse the planner's reply into search queries.
+    
+    Args:
+        text: Planner LLM output
+        max_queries: Maximum number of queries to keep
+    
+    Returns:
+        Unique non-empty queries in plan order (empty if no search is needed),
+        or None if the reply contains no JSON array of strings
+    """
+    match = _JSON_ARRAY_PATTERN.search(text or "")
+    if not match:
+        return None
+    try:
+        items = json.loads(match.group(0))
+    except json.JSONDecodeError:
+        return None
+    if not isinstance(items, list):
+        return None
+    
+    queries: List[str] = []
+    for item in items:
+        if isinstance(item, str) and item.strip() and item.strip() not in queries:
+            queries.append(item.strip())
+    return queries[:max_queries]
+
+
+class PlanExecuteAgent(AnswerPhaseMixin, BaseAgent):
+    """Agent planning all searches up front and running them in parallel.
+    
+    Takes the same arguments as ``ReActAgent`` so either can be created from
+    the agent config (see ``create_agent``). Only the search tool is used;
+    additional tools (e.g. MCP) need the ReAct loop. Turns are planned and
+    answered independently (no conversation history in prompts).
+    
+    Attributes:
+        config: Agent configuration
+        function_call_llm: Language model for planning
+        answer_llm: Language model for answer generation
+        search_tool: Search tool (its SearchService runs the planned queries)
+        citation_manager: Global citation numbering of the session
+    """
+    
+    def __init__(
+        self,
+        llm: BaseChatModel,
+        search_tool: SearchTool,
+        config: Optional[AgentConfig] = None,
+        answer_llm: Optional[BaseChatModel] = None,
+        additional_tools: Optional[List[BaseTool]] = None,
+    ):
+        """Initialize Plan-and-Execute Agent.
+        
+        Args:
+            llm: Language model instance for planning (function_call_llm)
+            search_tool: Search tool instance
+            config: Agent configuration (optional)
+            answer_llm: Optional language model for answer generation.
+                       If None, uses llm for both stages
+            additional_tools: Ignored (plan-and-execute only searches)
+        """
+        self.config = config or AgentConfig()
+        self.function_call_llm = llm
+        self.answer_llm = answer_llm if answer_llm is not None else llm
+        self.search_tool = search_tool
+        self.citation_manager = GlobalCitationManager()
+        self.answer_context_manager = ContextManager.for_llm(self.answer_llm)
+        
+        # Planned searches run concurrently, bounded per session
+        self._search_semaphore = asyncio.Semaphore(self.config.max_parallel_tools)
+        
+        # Searches repeated across turns of this conversation are reused
+        self.tool_memo = ToolMemo()
+        
+        if additional_tools:
+            logger.warning(
+                f"⚠️ Plan-and-Execute 模式仅使用搜索工具，忽略 {len(additional_tools)} 个额外工具"
+            )
+        
+        logger.info(
+            f"✅ Plan-and-Execute Agent 初始化完成 "
+            f"(max_plan_queries={self.config.max_plan_queries}, "
+            f"max_parallel_tools={self.config.max_parallel_tools}, "
+            f"dual_llm_mode={answer_llm is not None})"
+        )
+    
+    async def _plan(self, user_input: str) -> List[str]:
+        """Ask the function-call LLM for the search queries of this turn.
+        
+        Args:
+            user_input: User's question
+        
+        Returns:
+            Planned queries (falls back to the question itself if the reply
+            cannot be parsed)
+        """
+        system_prompt = PLAN_PROMPT_TEMPLATE.format(
+            current_date=datetime.now().strftime("%Y-%m-%d"),
+            max_queries=self.config.max_plan_queries,
+        )
+        response = await self.function_call_llm.ainvoke([
+            SystemMessage(content=system_prompt),
+            HumanMessage(content=user_input),
+        ])
+        content = response.content if isinstance(response.content, str) else str(response.content)
+        
+        queries = parse_plan(content, self.config.max_plan_queries)
+        if queries is None:
+            logger.warning(f"⚠️ 无法解析搜索计划，直接搜索原问题: {content[:200]}")
+            return [user_input]
+        logger.info(f"📋 搜索计划: {queries}")
+        return queries
+    
+    async def _search(self, query: str) -> Tuple[SearchResponse, bool]:
+        """Run one planned search under the session and global concurrency limits.
+        
+        Returns:
+            Tuple of (response, whether it came from the tool memo)
+        """
+        memoized = self.tool_memo.get(self.search_tool.name, {"query": query})
+        if memoized is not None:
+            return memoized[0], True
+        async with tool_slot(self._search_semaphore, self.config.global_max_parallel_tools):
+            return await self.search_tool.search_service.search(query), False
+    
+    def _format_observation(
+        self, query: str, response, from_memo: bool = False
+    ) -> Tuple[str, Optional[SearchArtifact]]:
+        """Format one search outcome like the search tool does (adds citations).
+        
+        Only fresh searches are memoized; putting memo hits back would keep
+        extending their TTL.
+        """
+        if isinstance(response, BaseException):
+            logger.error(f"❌ 搜索失败 ({query}): {response}")
+            return f"搜索失败: {str(response)}。", None
+        if not response or response.is_empty() or not response.results:
+            return "未找到相关搜索结果。", None
+        number_range = self.citation_manager.add_search_results(response.results, query)
+        observation = self.search_tool.format_results(
+            response.results, query=query, number_range=number_range, citation_manager=self.citation_manager
+        )
+        if not from_memo:
+            self.tool_memo.put(
+                self.search_tool.name, {"query": query}, (response, observation, number_range),
+                ttl=self.tool_memo.ttl_for(self.search_tool.name),
+            )
+        return observation, self.search_tool.build_artifact(response.results, query, number_range)
+    
+    async def _execute(self, user_input: str) -> AsyncIterator[AgentStep]:
+        """Plan, search in parallel and stream the answer (see stream)."""
+        # Reset citation manager for new conversation
+        self.citation_manager.reset()
+        queries = await self._plan(user_input)
+        
+        tool_results = []
+        tool_artifacts = []
+        if queries:
+            yield AgentStep(
+                type="reasoning",
+                content="搜索计划:\n" + "\n".join(f"{i}. {q}" for i, q in enumerate(queries, 1)),
+                metadata={"reasoning_type": "plan", "queries": queries},
+            )
+            for query in queries:
+                yield AgentStep(
+                    type="action",
+                    content=f"调用工具: {self.search_tool.name}",
+                    metadata={"tool": self.search_tool.name, "tool_input": str({"query": query})},
+                )
+            
+            # Searches still running when only answer_reserve_time is left are dropped
+            deadline = get_deadline()
+            search_timeout = deadline.timeout(reserve=self.config.answer_reserve_time) if deadline else None
+            start = time.monotonic()
+            tasks = [asyncio.ensure_future(self._search(query)) for query in queries]
+            try:
+                done, pending = await asyncio.wait(tasks, timeout=search_timeout)
+            finally:
+                # Also on cancellation: asyncio.wait leaves its tasks running
+                pending = [task for task in tasks if not task.done()]
+                for task in pending:
+                    task.cancel()
+            if pending:
+                logger.warning(f"⏳ 剩余时间不足，放弃 {len(pending)} 个未完成的搜索，基于已有结果生成回答")
+            outcomes = [
+                (task.exception() or task.result()) if task in done else TimeoutError("剩余时间不足")
+                for task in tasks
+            ]
+            logger.info(f"🔍 {len(done)} 个搜索并行完成，耗时 {time.monotonic() - start:.2f}s")
+            
+            # Number citations in plan order, independent of completion order
+            for query, outcome in zip(queries, outcomes):
+                response, from_memo = (outcome, False) if isinstance(outcome, BaseException) else outcome
+                observation, artifact = self._format_observation(query, response, from_memo)
+                if artifact is not None:
+                    tool_results.append(observation)
+                    tool_artifacts.append(artifact)
+                yield AgentStep(type="observation", content=observation)
+        
+        tool_calls = [{"name": self.search_tool.name, "args": {"query": q}} for q in queries]
+        answer_started = False
+        try:
+            async for step in self._generate_answer_with_answer_llm_streaming(
+                user_input, tool_results, tool_calls, tool_artifacts
+            ):
+                answer_started = answer_started or step.type == "final"
+                yield step
+        except Exception as e:
+            if answer_started:
+                raise
+            logger.warning(f"⚠️ 流式回答失败，使用回退方法: {e}")
+            answer = await self._generate_answer_with_answer_llm(
+                user_input, tool_results, tool_calls, tool_artifacts
+            )
+            for step in self._final_answer_steps(answer, link_citations=bool(tool_results)):
+                yield step
+    
+    async def stream(self, user_input: str) -> AsyncIterator[AgentStep]:
+        """Stream plan, search and answer steps.
+        
+        Args:
+            user_input: User's question
+        
+        Yields:
+            AgentStep objects as they are generated
+        
+        Raises:
+            AgentTimeoutError: If execution exceeds time limit
+            AgentExecutionError: If execution fails
+        """
+        logger.info(f"🤖 Plan-and-Execute Agent 开始执行: {user_input}")
+        # Search and model calls of the turn shrink their timeouts to the time left
+        with deadline_scope(self.config.max_execution_time) as deadline:
+            steps = self._execute(user_input)
+            try:
+                while True:
+                    # The step runs in this task, under the deadline's scope
+                    try:
+                        async with asyncio.timeout(deadline.remaining()):
+                            step = await anext(steps)
+                    except StopAsyncIteration:
+                        break
+                    yield step
+            except TimeoutError:
+                raise AgentTimeoutError(
+                    f"Agent 执行超时 ({self.config.max_execution_time}秒)。"
+                    f"请尝试简化问题或切换到 Chat 模式。"
+                )
+            except (AgentTimeoutError, AgentExecutionError):
+                raise
+            except Exception as e:
+                logger.error(f"❌ Plan-and-Execute Agent 执行失败: {e}", exc_info=True)
+                raise AgentExecutionError(f"Agent 执行失败: {str(e)}")
+            finally:
+                await steps.aclose()
+    
+    async def run(self, user_input: str) -> AgentResult:
+        """Run agent on user input.
+        
+        Args:
+            user_input: User's question
+        
+        Returns:
+            AgentResult with final answer and steps
+        
+        Raises:
+            AgentTimeoutError: If execution exceeds time limit
+            AgentExecutionError: If execution fails
+        """
+        steps = []
+        answer = ""
+        async for step in self.stream(user_input):
+            if step.type == "final":
+                answer += step.content
+                continue
+            if step.type == "citation_update":
+                answer = step.content
+                continue
+            steps.append(step)
+        
+        steps.append(AgentStep(type="final", content=answer))
+        return AgentResult(
+            final_answer=answer,
+            steps=steps,
+            total_iterations=1 if any(s.type == "action" for s in steps) else 0,
+        )
+    
+    def reset(self) -> None:
+        """Reset agent state."""
+        logger.info("🔄 重置 Agent 状态")
+        # Citations are reset at the start of each turn, only memoized searches remain
+        self.tool_memo.clear()
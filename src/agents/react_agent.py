@@ -2,16 +2,14 @@
 
 import asyncio
 import logging
+import re
 import time
+from contextlib import aclosing
 from typing import Optional, AsyncIterator, Any, List
-
-from langgraph.prebuilt import create_react_agent
 from langchain_core.prompts import ChatPromptTemplate
-from langchain_core.agents import AgentAction, AgentFinish
-from langchain_core.callbacks import AsyncCallbackHandler
 from langchain_core.language_models import BaseChatModel
 from langchain_core.tools import BaseTool
-from langchain_core.messages import HumanMessage, AIMessage, SystemMessage
+from langchain_core.messages import HumanMessage, AIMessage, AIMessageChunk, RemoveMessage, SystemMessage, ToolMessage
 from datetime import datetime
 
 from src.agents.base import (
@@ -22,13 +20,47 @@ from src.agents.base import (
     AgentIterationLimitError,
     AgentExecutionError,
 )
+from src.agents.agent_graph import get_compiled_agent_graph
+from src.agents.answer_phase import AnswerPhaseMixin
+from src.agents.checkpointing import (
+    carry_over_thread,
+    discard_thread,
+    discard_thread_later,
+    get_checkpointer,
+    has_checkpoint,
+    new_thread_id,
+)
+from src.agents.conversation_state import (
+    DATE_MESSAGE_ID,
+    conversation_history,
+    current_turn,
+    dangling_tool_calls,
+    plain_answer,
+    split_turns,
+    trim_turns,
+    turn_evidence,
+)
+from src.agents.router import QueryRouter, Route, get_router_stats
+from src.agents.speculative_answer import SpeculativeAnswer
+from src.agents.speculative_search import SpeculativeSearch
+from src.agents.tool_selection_stream import ToolSelectionStream
 from src.agents.tools.search_tool import SearchTool
-from src.config.agent_config import AgentConfig
+from src.agents.tools.tool_memo import ToolMemo
+from src.config.agent_config import AgentConfig, AnswerPolicy
 from src.config.langsmith_config import get_langsmith_tracer
+from src.models.context_manager import ContextManager
+from src.runtime.deadline import deadline_scope, get_deadline
 from src.search.global_citation_manager import GlobalCitationManager
 
 logger = logging.getLogger(__name__)
 
+# Inline citation such as [3] (answer policy "auto" checks that results are cited)
+CITATION_PATTERN = re.compile(r"\[\d+\]")
+
+# Answer-prompt notes when the recursion limit stopped the tool loop
+ITERATION_LIMIT_NOTE = "由于达到最大迭代次数，请基于已有信息给出最佳答案"
+ITERATION_LIMIT_NO_RESULTS_NOTE = "由于达到最大迭代次数限制，未能收集到搜索结果，请基于你的知识直接回答"
+
 
 # ReAct Prompt Template (中文版)
 REACT_PROMPT_TEMPLATE = """你是一个有用的 AI 助手，可以使用工具来帮助回答用户的问题。
@@ -99,124 +131,32 @@ def add_date_to_messages(messages):
     return modified_messages
 
 
-class StreamingCallbackHandler(AsyncCallbackHandler):
-    """Callback handler for streaming Agent steps."""
-    
-    def __init__(self, step_queue: asyncio.Queue):
-        """Initialize callback handler.
-        
-        Args:
-            step_queue: Queue to put AgentStep objects
-        """
-        self.step_queue = step_queue
-        self.current_reasoning = ""
-    
-    async def on_agent_action(
-        self, action: AgentAction, **kwargs: Any
-    ) -> None:
-        """Called when agent takes an action.
-        
-        Args:
-            action: AgentAction object
-        """
-        # Send reasoning step if we have accumulated text
-        if self.current_reasoning:
-            await self.step_queue.put(
-                AgentStep(
-                    type="reasoning",
-                    content=self.current_reasoning.strip(),
-                )
-            )
-            self.current_reasoning = ""
-        
-        # Send action step
-        await self.step_queue.put(
-            AgentStep(
-                type="action",
-                content=f"使用工具: {action.tool}",
-                metadata={
-                    "tool": action.tool,
-                    "tool_input": action.tool_input,
-                }
-            )
-        )
-    
-    async def on_agent_finish(
-        self, finish: AgentFinish, **kwargs: Any
-    ) -> None:
-        """Called when agent finishes.
-        
-        Args:
-            finish: AgentFinish object
-        """
-        # Send final reasoning if any
-        if self.current_reasoning:
-            await self.step_queue.put(
-                AgentStep(
-                    type="reasoning",
-                    content=self.current_reasoning.strip(),
-                )
-            )
-        
-        # Send final answer
-        await self.step_queue.put(
-            AgentStep(
-                type="final",
-                content=finish.return_values.get("output", ""),
-            )
-        )
-    
-    async def on_tool_start(
-        self, serialized: dict[str, Any], input_str: str, **kwargs: Any
-    ) -> None:
-        """Called when tool starts.
-        
-        Args:
-            serialized: Tool serialization
-            input_str: Tool input string
-        """
-        tool_name = serialized.get("name", "unknown")
-        logger.info(f"🔧 工具开始: {tool_name}, 输入: {input_str}")
-    
-    async def on_tool_end(self, output: str, **kwargs: Any) -> None:
-        """Called when tool ends.
-        
-        Args:
-            output: Tool output string
-        """
-        # Send observation step
-        await self.step_queue.put(
-            AgentStep(
-                type="observation",
-                content=output,
-            )
-        )
+class _StreamRun:
+    """State of one streamed ReAct run, shared by the stages of _stream_agent."""
     
-    async def on_tool_error(self, error: Exception, **kwargs: Any) -> None:
-        """Called when tool encounters an error.
-        
-        Args:
-            error: Exception that occurred
-        """
-        logger.error(f"❌ 工具执行错误: {error}")
-        await self.step_queue.put(
-            AgentStep(
-                type="observation",
-                content=f"工具执行失败: {str(error)}",
-            )
-        )
+    def __init__(self, citation_manager: GlobalCitationManager):
+        self.has_yielded = False
+        self.all_messages: list = []
+        self.tool_results: list[str] = []
+        self.tool_artifacts: list = []
+        self.tool_calls: list[dict] = []
+        self.tool_iterations = 0
+        self.stopped_for_deadline = False
+        # Single LLM mode: the graph's answer, and whether its tokens were streamed
+        self.final_answer_from_function_call: Optional[str] = None
+        self.streamed_answer = False
+        self.answer_citations = citation_manager.stream_converter()
+        # Dual LLM mode: answer started before the function-call LLM finished
+        self.speculative_answer: Optional[SpeculativeAnswer] = None
     
-    async def on_llm_new_token(self, token: str, **kwargs: Any) -> None:
-        """Called when LLM generates a new token.
-        
-        Args:
-            token: New token string
-        """
-        # Accumulate reasoning tokens
-        self.current_reasoning += token
+    def cancel_speculative_answer(self) -> None:
+        """Cancel the speculatively started answer, if any."""
+        if self.speculative_answer is not None:
+            self.speculative_answer.cancel()
+            self.speculative_answer = None
 
 
-class ReActAgent(BaseAgent):
+class ReActAgent(AnswerPhaseMixin, BaseAgent):
     """ReAct Agent implementation.
     
     This agent implements the ReAct (Reasoning + Acting) pattern using LangChain.
@@ -257,41 +197,48 @@ class ReActAgent(BaseAgent):
         # If answer_llm is not provided, use function_call_llm for both stages
         self.answer_llm = answer_llm if answer_llm is not None else llm
         
-        # Create global citation manager for Agent mode
+        # Per-session state lives on the instance and reaches the shared graph
+        # through the run config (see _get_run_config)
         self.citation_manager = GlobalCitationManager()
+        self.search_tool = search_tool
+        
+        # Tool calls of one step run concurrently, bounded per session
+        self._tool_semaphore = asyncio.Semaphore(self.config.max_parallel_tools)
         
-        # Attach citation manager to search tool for global numbering
-        search_tool.citation_manager = self.citation_manager
+        # Repeated tool calls of this conversation reuse earlier results
+        self.tool_memo = ToolMemo()
         
         self.tools = [search_tool]
         if additional_tools:
             self.tools.extend(additional_tools)
         
-        # CRITICAL: Bind tools to the model for function calling
-        # LangGraph's create_react_agent requires the model to have tools bound
-        # Some models (like DeepSeek) need explicit tool binding
-        try:
-            # Try to bind tools if the model supports it
-            if hasattr(self.function_call_llm, 'bind_tools'):
-                logger.info(f"🔧 绑定 {len(self.tools)} 个工具到模型...")
-                bound_llm = self.function_call_llm.bind_tools(self.tools)
-            else:
-                # If bind_tools is not available, use the model as-is
-                # LangGraph's create_react_agent should handle tool binding internally
-                logger.debug("模型不支持 bind_tools，使用原始模型")
-                bound_llm = self.function_call_llm
-        except Exception as e:
-            logger.warning(f"⚠️ 工具绑定失败，使用原始模型: {e}")
-            bound_llm = self.function_call_llm
-        
-        # Create ReAct agent using LangGraph with function_call_llm
-        # LangGraph's create_react_agent handles prompt creation internally
-        # It will automatically bind tools if not already bound
-        self.agent_executor = create_react_agent(
-            model=bound_llm,
-            tools=self.tools,
+        # Budget each model call against the function-call model's context window
+        self.context_manager = ContextManager.for_llm(self.function_call_llm)
+        self.answer_context_manager = ContextManager.for_llm(self.answer_llm)
+        
+        # Cheap pre-router: messages needing no tools skip the agent loop
+        self.router = QueryRouter(self.config.router_threshold) if self.config.router_enabled else None
+        
+        # Runs are checkpointed so a fallback resumes instead of re-executing
+        self.checkpointer = get_checkpointer(self.config.checkpoint_backend, self.config.checkpoint_path)
+        
+        # Compiled ReAct graph (bound tools + LangGraph), shared across sessions
+        # with the same LLM config, tool set and checkpointer
+        self.agent_executor = get_compiled_agent_graph(
+            self.function_call_llm, self.tools, checkpointer=self.checkpointer
         )
         
+        # Multi-turn: the conversation state is checkpointed and carried over between turns
+        self.conversation_thread_id = None
+        if self.config.multi_turn and self.checkpointer is not None:
+            self.conversation_thread_id = new_thread_id()
+        elif self.config.multi_turn:
+            logger.warning("⚠️ 未启用检查点，Agent 模式按单轮对话运行")
+        
+        # Transcript and evidence of earlier turns, loaded at the start of each turn
+        self._history_text = ""
+        self._history_evidence = ([], [])
+        
         logger.info(f"✅ Agent executor 创建完成，工具数量: {len(self.tools)}")
         
         # Track if using dual LLM mode
@@ -307,6 +254,46 @@ class ReActAgent(BaseAgent):
             f"tools={tool_names})"
         )
     
+    def _get_run_config(
+        self,
+        callbacks: Optional[list] = None,
+        speculative_search: Optional[SpeculativeSearch] = None,
+        thread_id: Optional[str] = None,
+    ) -> dict:
+        """Build the run config carrying this session's state into the shared graph.
+        
+        Args:
+            callbacks: Optional callback handlers
+            speculative_search: Optional handler starting searches from streamed tool calls
+            thread_id: Checkpoint thread of the run (a fresh one if None;
+                ignored without a checkpointer)
+        
+        Returns:
+            LangGraph run config
+        """
+        # LangGraph uses recursion_limit to control max iterations
+        run_config = {
+            "recursion_limit": self.config.max_iterations,
+            "configurable": {
+                "citation_manager": self.citation_manager,
+                "context_manager": self.context_manager,
+                "verbatim_tool_steps": self.config.verbatim_tool_steps,
+                "max_iteration_tokens": self.config.max_iteration_tokens,
+                "tool_semaphore": self._tool_semaphore,
+                "tool_memo": self.tool_memo,
+                "global_max_parallel_tools": self.config.global_max_parallel_tools,
+            },
+        }
+        if self.checkpointer is not None:
+            # The checkpointed graph needs a thread even for one-off runs
+            run_config["configurable"]["thread_id"] = thread_id or new_thread_id()
+        if speculative_search is not None:
+            run_config["configurable"]["speculative_search"] = speculative_search
+            callbacks = [*(callbacks or []), speculative_search]
+        if callbacks:
+            run_config["callbacks"] = callbacks
+        return run_config
+    
     def _should_generate_answer(self, tool_results: list[str], iteration_count: int) -> bool:
         """Evaluate if tool calling results are sufficient to generate answer.
         
@@ -333,343 +320,91 @@ class ReActAgent(BaseAgent):
         # Continue tool calling
         return False
     
-    async def _generate_answer_with_answer_llm_streaming(
-        self, 
-        user_input: str, 
-        tool_results: list[str],
-        tool_calls: list[dict]
-    ):
-        """Generate final answer using answer_llm with streaming support.
-        
-        This method yields AgentStep objects for reasoning and answer content.
+    def _should_resynthesize_answer(self, answer: Optional[str], tool_results: list[str]) -> bool:
+        """Evaluate if single-LLM mode needs a separate answer phase (see AnswerPolicy).
         
         Args:
-            user_input: Original user question
+            answer: Final answer produced by the agent graph
             tool_results: List of tool execution results
-            tool_calls: List of tool call information
-            
-        Yields:
-            AgentStep objects for reasoning and answer content
-        """
-        # Build context from tool results
-        current_date = datetime.now().strftime("%Y-%m-%d")
-        
-        if tool_results:
-            # Has tool results - generate answer based on them
-            context_parts = []
-            for i, result in enumerate(tool_results, 1):
-                context_parts.append(f"[搜索结果 {i}]\n{result}")
-            
-            context = "\n\n".join(context_parts)
-            
-            system_prompt = f"""你是一个有用的 AI 助手。基于以下搜索结果，为用户的问题提供一个准确、完整、有引用的回答。
-
-当前日期：{current_date}
-
-重要规则:
-1. 仔细分析搜索结果，提取相关信息
-2. 在回答中使用 [数字] 格式引用搜索结果来源
-3. 如果搜索结果不足以回答问题，如实说明
-4. 回答应该准确、完整、有条理
-5. 如果用户询问日期或时间相关问题，请使用上述当前日期信息回答
-"""
-            
-            user_prompt = f"""用户问题: {user_input}
-
-搜索结果:
-{context}
-
-请基于以上搜索结果回答用户的问题。"""
-        else:
-            # No tool results - answer directly from model knowledge
-            system_prompt = f"""你是一个有用的 AI 助手。请基于你的知识直接回答用户的问题。
-
-当前日期：{current_date}
-
-重要规则:
-1. 提供准确、完整、有条理的回答
-2. 如果不确定答案，请如实说明
-3. 如果用户询问日期或时间相关问题，请使用上述当前日期信息回答
-4. 注意：由于达到最大迭代次数限制，未能收集到搜索结果，请基于你的知识直接回答
-"""
-            
-            user_prompt = f"""用户问题: {user_input}
-
-请基于你的知识回答用户的问题。"""
-        
-        # Generate answer using answer_llm with streaming
-        messages = [
-            SystemMessage(content=system_prompt),
-            HumanMessage(content=user_prompt)
-        ]
-        
-        logger.info(f"使用 answer_llm 流式生成最终回答...")
-        
-        # Variables to collect full answer for citation processing
-        full_answer_content = ""
-        reasoning_content = ""
-        reasoning_sent = False
-        
-        # Import citation utilities
-        citation_processor = None
-        if self.citation_manager:
-            from src.search.citation_processor import CitationProcessor
-            from src.search.models import SearchResponse
-            
-            # Create a CitationProcessor with the global citation map
-            citation_processor = CitationProcessor(
-                SearchResponse(query="", results=[], total_results=0, search_time=0.0), 
-                offset=0
-            )
-            citation_processor.citation_map = self.citation_manager.get_global_citation_map()
-        
-        # Stream the response with error handling
-        try:
-            async for chunk in self.answer_llm.astream(messages):
-                # Check for reasoning_content (DeepSeek-R1 and similar models)
-                if hasattr(chunk, 'additional_kwargs'):
-                    deepseek_reasoning = chunk.additional_kwargs.get('reasoning_content')
-                    if deepseek_reasoning and not reasoning_sent:
-                        reasoning_content = deepseek_reasoning
-                        reasoning_sent = True
-                        logger.info(f"🧠 Answer LLM 推理过程，长度: {len(reasoning_content)}")
-                        yield AgentStep(
-                            type="reasoning",
-                            content=reasoning_content,
-                            metadata={
-                                "reasoning_type": "answer_phase",
-                                "is_deepseek_reasoning": True,
-                                "model": "answer_llm"
-                            }
-                        )
-                
-                # Handle regular content
-                if hasattr(chunk, 'content') and chunk.content:
-                    token = chunk.content
-                    full_answer_content += token
-                    
-                    # Stream tokens directly - we'll convert citations after streaming completes
-                    # Real-time conversion is complex due to token boundaries
-                    yield AgentStep(
-                        type="final",
-                        content=token,
-                    )
-            
-            # After streaming completes, convert citations and send updated content
-            if citation_processor and full_answer_content:
-                # Convert inline citations [1] -> [[1]](url)
-                converted_answer = citation_processor.convert_citations(full_answer_content)
-                
-                # Extract which citations were actually used
-                cited_nums = citation_processor._extract_citations(full_answer_content)
-                
-                # Send a special step to tell UI to replace content with converted version
-                logger.info(f"🔗 转换引用链接，共 {len(cited_nums)} 个引用")
-                yield AgentStep(
-                    type="citation_update",
-                    content=converted_answer,
-                    metadata={"replace_content": True}
-                )
-                
-                # Add citations list
-                if cited_nums:
-                    citations_list = self.citation_manager.generate_citations_list(list(cited_nums))
-                    logger.info(f"✅ 添加引用列表，包含 {len(cited_nums)} 条引用")
-                    yield AgentStep(
-                        type="final",
-                        content=citations_list,
-                    )
-            
-            logger.info("✅ Answer LLM 流式输出完成")
-            
-        except Exception as e:
-            error_type = type(e).__name__
-            error_msg = str(e)
-            
-            # Check if this is a timeout error
-            is_timeout = "timeout" in error_msg.lower() or "timed out" in error_msg.lower()
-            
-            if is_timeout:
-                logger.error(f"⏱️ Answer LLM 流式输出超时: {e}")
-                # Don't yield error here, let the caller handle it with fallback
-                raise
-            else:
-                logger.error(f"❌ Answer LLM 流式输出失败 ({error_type}): {e}", exc_info=True)
-                # For other errors, raise to trigger fallback
-                raise
-    
-    def _convert_citation_token(
-        self, 
-        token: str, 
-        full_content: str,
-        citation_processor
-    ) -> str:
-        """Convert citation patterns in a token to clickable links in real-time.
-        
-        This method detects [num] patterns and converts them to Markdown links.
-        Since tokens come one by one, we need to handle partial patterns carefully.
-        
-        Strategy:
-        - We buffer tokens and detect when a complete [num] pattern is formed
-        - When detected, we append the URL in Markdown format: [num](url)
-        - The UI will render this as a clickable link
         
-        Args:
-            token: Current token being streamed
-            full_content: Full content accumulated so far
-            citation_processor: CitationProcessor instance with citation map
-            
         Returns:
-            Converted token (may be original if no complete pattern found)
+            True if the answer should be generated again, False to use the graph's answer
         """
-        import re
-        
-        # Only process if token contains [ or ] or digits
-        if not any(c in token for c in ['[', ']', '0', '1', '2', '3', '4', '5', '6', '7', '8', '9']):
-            return token
-        
-        # Check the last few characters of full_content for complete [num] patterns
-        # Look back up to 15 characters to catch patterns like [123]
-        lookback = min(15, len(full_content))
-        recent_content = full_content[-lookback:] if lookback > 0 else ""
-        
-        # Find all complete citation patterns [num]
-        pattern = r'\[(\d+)\]'
-        matches = list(re.finditer(pattern, recent_content))
-        
-        if not matches:
-            return token
-        
-        # Check if any match ends at the current position (just completed)
-        last_match = matches[-1]
-        match_end_in_full = len(full_content) - lookback + last_match.end()
-        
-        # If the match just completed (ends at current position)
-        if match_end_in_full == len(full_content):
-            citation_num = int(last_match.group(1))
-            citation_info = citation_processor.citation_map.get(citation_num)
-            
-            if citation_info:
-                # Get the URL from citation info
-                url = citation_info.get('url', '')
-                
-                # Calculate the pattern string
-                pattern_str = f"[{citation_num}]"
-                
-                # If entire pattern is in current token (e.g., token is "[1]")
-                if pattern_str in token:
-                    # Replace the entire pattern with markdown link
-                    return token.replace(pattern_str, f"[{citation_num}]({url})")
-                
-                # More likely: the pattern spans multiple tokens
-                # Current token is probably just ']'
-                if token.endswith(']'):
-                    # We need to append the URL part: (url)
-                    # The UI will combine previous tokens [num] with this to form [num](url)
-                    return token + f"({url})"
-                
-                logger.debug(f"引用模式检测到但无法转换: token='{token}', pattern='{pattern_str}'")
-            else:
-                logger.warning(f"引用编号 {citation_num} 在 citation_map 中未找到")
-        
-        return token
+        if not answer or not answer.strip():
+            return True
+        policy = self.config.answer_policy
+        if policy == AnswerPolicy.RESYNTHESIZE:
+            return True
+        if policy == AnswerPolicy.AUTO and tool_results and not CITATION_PATTERN.search(answer):
+            logger.info("回答未引用任何工具结果，重新生成回答")
+            return True
+        return False
     
-    async def _generate_answer_with_answer_llm(
-        self, 
-        user_input: str, 
-        tool_results: list[str],
-        tool_calls: list[dict]
-    ) -> str:
-        """Generate final answer using answer_llm (non-streaming fallback).
+    async def run(self, user_input: str) -> AgentResult:
+        """Run agent on user input.
         
-        This method uses ainvoke (non-streaming) instead of astream, 
-        making it a true fallback when streaming fails or times out.
+        Messages the router judges to need no tools are answered directly.
         
         Args:
-            user_input: Original user question
-            tool_results: List of tool execution results
-            tool_calls: List of tool call information
+            user_input: User's question
             
         Returns:
-            Generated final answer
-        """
-        logger.info("尝试使用回退方法...")
-        
-        # Build context from tool results
-        current_date = datetime.now().strftime("%Y-%m-%d")
-        
-        if tool_results:
-            context = "\n\n".join(tool_results)
-            
-            system_prompt = f"""你是一个有用的 AI 助手。基于以下搜索结果，为用户的问题提供一个准确、完整、有引用的回答。
-
-当前日期：{current_date}
-
-重要规则:
-1. 仔细分析搜索结果，提取相关信息
-2. 在回答中使用 [数字] 格式引用搜索结果来源
-3. 如果搜索结果不足以回答问题，如实说明
-4. 回答应该准确、完整、有条理
-5. 如果用户询问日期或时间相关问题，请使用上述当前日期信息回答
-"""
-            
-            user_prompt = f"""用户问题: {user_input}
-
-搜索结果:
-{context}
-
-请基于以上搜索结果回答用户的问题。"""
-        else:
-            system_prompt = f"""你是一个有用的 AI 助手。请基于你的知识直接回答用户的问题。
-
-当前日期：{current_date}
-
-重要规则:
-1. 提供准确、完整、有条理的回答
-2. 如果不确定答案，请如实说明
-3. 如果用户询问日期或时间相关问题，请使用上述当前日期信息回答
-"""
-            
-            user_prompt = f"""用户问题: {user_input}
-
-请基于你的知识回答用户的问题。"""
-        
-        messages = [
-            SystemMessage(content=system_prompt),
-            HumanMessage(content=user_prompt)
-        ]
-        
-        try:
-            # Use ainvoke (non-streaming) with increased timeout
-            response = await self.answer_llm.ainvoke(messages)
-            full_answer = response.content if hasattr(response, 'content') else str(response)
+            AgentResult with final answer and steps
             
-            logger.info(f"✅ 回退方法成功，回答长度: {len(full_answer)}")
-            return full_answer
+        Raises:
+            AgentTimeoutError: If execution exceeds time limit
+            AgentExecutionError: If execution fails
+        """
+        # Every layer below shrinks its timeouts to the time left in the run
+        with deadline_scope(self.config.max_execution_time):
+            await self._start_turn()
+            decision = self.router.route(user_input) if self.router else None
+            if decision is not None and decision.route == Route.DIRECT:
+                try:
+                    answer = await self._generate_direct_answer(user_input)
+                except Exception as e:
+                    logger.warning(f"⚠️ 直接回答失败，改用 Agent 循环: {e}")
+                else:
+                    get_router_stats().record_direct_outcome(decision, answer)
+                    await self._record_answer(user_input, answer)
+                    return AgentResult(
+                        final_answer=answer,
+                        steps=[AgentStep(type="final", content=answer)],
+                        total_iterations=0,
+                    )
             
-        except Exception as e:
-            logger.error(f"❌ 回退方法失败: {e}")
-            # Return a basic error message
-            return "抱歉，由于网络原因，无法生成完整的回答。请稍后重试。"
+            result = await self._run_agent(user_input)
+            if decision is not None:
+                used_tools = any(step.type == "action" for step in result.steps)
+                get_router_stats().record_agent_outcome(decision, used_tools)
+            await self._record_answer(user_input, result.final_answer)
+            return result
     
-    async def run(self, user_input: str) -> AgentResult:
-        """Run agent on user input.
+    async def _run_agent(self, user_input: str, resume_thread_id: Optional[str] = None) -> AgentResult:
+        """Run the ReAct loop on user input (see run).
         
         Args:
             user_input: User's question
-            
+            resume_thread_id: Checkpoint thread of an interrupted run of the
+                same input; the run resumes from its last completed step
+        
         Returns:
             AgentResult with final answer and steps
-            
-        Raises:
-            AgentTimeoutError: If execution exceeds time limit
-            AgentExecutionError: If execution fails
         """
         logger.info(f"🤖 Agent 开始执行: {user_input}")
         start_time = time.time()
         
-        # Reset citation manager for new conversation
-        self.citation_manager.reset()
+        thread_id = resume_thread_id or self.conversation_thread_id or new_thread_id()
+        resuming = (
+            resume_thread_id is not None and self.checkpointer is not None
+            and await has_checkpoint(self.agent_executor, self._get_run_config(thread_id=thread_id), user_input)
+        )
+        if resuming:
+            # Completed tool steps keep the citation numbers they were given
+            logger.info(f"♻️ 从检查点恢复 Agent 运行: {thread_id}")
+        elif self.conversation_thread_id is None:
+            # Reset citation manager for new conversation
+            self.citation_manager.reset()
         
         # Check if using dual LLM mode
         using_dual_llm = self.answer_llm is not self.function_call_llm
@@ -683,32 +418,43 @@ class ReActAgent(BaseAgent):
             # LangGraph expects messages, not a dict with "input" key
             # Add date information to the input message
             user_msg = HumanMessage(content=user_input)
-            # Create a system message with date info for the agent
-            current_date = datetime.now().strftime("%Y-%m-%d")
-            date_msg = SystemMessage(content=f"当前日期：{current_date}\n\n重要提示：如果用户询问日期或时间相关问题，请直接使用上述当前日期信息回答，无需使用搜索工具。")
-            invoke_input = {"messages": [date_msg, user_msg]}
+            invoke_input = None if resuming else {"messages": [self._date_message(), user_msg]}
             
-            # Prepare config with callbacks and recursion limit
-            # LangGraph uses recursion_limit to control max iterations
-            invoke_config = {
-                "recursion_limit": self.config.max_iterations,
-            }
-            if callbacks:
-                invoke_config["callbacks"] = callbacks
+            # Prepare config with callbacks, recursion limit and session state
+            invoke_config = self._get_run_config(callbacks, thread_id=thread_id)
             
-            result = await asyncio.wait_for(
-                self.agent_executor.ainvoke(invoke_input, config=invoke_config),
-                timeout=self.config.max_execution_time,
-            )
+            # Under a deadline the loop stops while answer_reserve_time is still
+            # left; its completed steps are read back from the checkpoint
+            graph_timeout = self.config.max_execution_time
+            deadline = get_deadline()
+            if deadline is not None:
+                reserve = self.config.answer_reserve_time if self.checkpointer is not None else 0.0
+                graph_timeout = deadline.timeout(reserve=reserve)
+            
+            stopped_for_deadline = False
+            try:
+                result = await asyncio.wait_for(
+                    self.agent_executor.ainvoke(invoke_input, config=invoke_config),
+                    timeout=graph_timeout,
+                )
+            except asyncio.TimeoutError:
+                result = await self._checkpointed_result(invoke_config, user_input)
+                if result is None:
+                    raise
+                stopped_for_deadline = True
+                logger.warning("⏳ 剩余时间不足，停止工具调用，基于已有结果生成回答")
             
             elapsed_time = time.time() - start_time
             logger.info(f"✅ Agent 工具调用阶段完成，耗时 {elapsed_time:.2f}s")
             
-            # LangGraph result contains messages
-            messages = result.get("messages", [])
+            # LangGraph result contains messages (earlier turns excluded)
+            messages = current_turn(result.get("messages", []))
+            if messages and isinstance(messages[0], HumanMessage):
+                messages = messages[1:]
             
             # Extract tool results and tool calls
             tool_results = []
+            tool_artifacts = []
             tool_calls = []
             steps = []
             iteration_count = 0
@@ -745,6 +491,7 @@ class ReActAgent(BaseAgent):
                 elif hasattr(msg, "content") and str(msg.content):
                     # Tool message (observation)
                     tool_results.append(str(msg.content))
+                    tool_artifacts.append(getattr(msg, "artifact", None))
                     steps.append(
                         AgentStep(
                             type="observation",
@@ -757,7 +504,7 @@ class ReActAgent(BaseAgent):
                 # Dual LLM mode: use answer_llm to generate final answer
                 logger.info("🔄 切换到 answer_llm 生成最终回答...")
                 final_answer = await self._generate_answer_with_answer_llm(
-                    user_input, tool_results, tool_calls
+                    user_input, tool_results, tool_calls, tool_artifacts
                 )
                 steps.append(
                     AgentStep(
@@ -767,14 +514,15 @@ class ReActAgent(BaseAgent):
                 )
             else:
                 # Single LLM mode: use the answer from agent_executor
-                final_message = messages[-1] if messages else None
+                final_message = messages[-1] if messages and not stopped_for_deadline else None
                 final_answer = final_message.content if final_message else ""
-                if not final_answer:
-                    # Fallback: generate answer if agent didn't produce one
-                    logger.warning("⚠️ Agent 未生成最终回答，使用 answer_llm 生成...")
+                if self._should_resynthesize_answer(final_answer, tool_results):
+                    # Fallback (no answer) or answer policy: generate the answer again
+                    logger.warning("⚠️ 按回答策略重新生成最终回答...")
                     final_answer = await self._generate_answer_with_answer_llm(
-                        user_input, tool_results, tool_calls
+                        user_input, tool_results, tool_calls, tool_artifacts
                     )
+                    steps = [step for step in steps if step.type != "final"]
                     steps.append(
                         AgentStep(
                             type="final",
@@ -821,9 +569,43 @@ class ReActAgent(BaseAgent):
             else:
                 raise AgentExecutionError(f"Agent 执行失败: {str(e)}")
     
+        finally:
+            # A resumed thread belongs to the streaming run that created it
+            if resume_thread_id is None and thread_id != self.conversation_thread_id:
+                await discard_thread(self.checkpointer, thread_id)
+    
+    async def _checkpointed_result(self, config: dict, user_input: str) -> Optional[dict]:
+        """Read the completed steps of a run stopped by the deadline.
+        
+        Args:
+            config: Run config of the stopped run
+            user_input: User's question
+        
+        Returns:
+            Graph state with the run's messages, or None if no tool step of
+            this question completed (nothing to answer from)
+        """
+        if self.checkpointer is None:
+            return None
+        try:
+            snapshot = await self.agent_executor.aget_state(config)
+        except Exception as e:
+            logger.warning(f"⚠️ 读取 Agent 检查点失败: {e}")
+            return None
+        messages = snapshot.values.get("messages", [])
+        turn = current_turn(messages)
+        if not turn or turn[0].content != user_input:
+            return None
+        if not any(isinstance(msg, ToolMessage) for msg in turn):
+            return None
+        return {"messages": messages}
+    
     async def stream(self, user_input: str) -> AsyncIterator[AgentStep]:
         """Stream agent execution steps.
         
+        Messages the router judges to need no tools get a single streamed
+        answer instead of the agent loop.
+        
         Args:
             user_input: User's question
             
@@ -833,390 +615,251 @@ class ReActAgent(BaseAgent):
         Raises:
             AgentTimeoutError: If execution exceeds time limit
         """
-        logger.info(f"🤖 Agent 开始流式执行: {user_input}")
+        # Search, MCP and model calls of the turn shrink their timeouts to the time left
+        with deadline_scope(self.config.max_execution_time):
+            await self._start_turn()
+            decision = self.router.route(user_input) if self.router else None
+            if decision is not None and decision.route == Route.DIRECT:
+                answer_parts: List[str] = []
+                try:
+                    async for step in self._stream_direct_answer(user_input):
+                        if step.type == "final":
+                            answer_parts.append(step.content)
+                        yield step
+                except Exception as e:
+                    if any(answer_parts):
+                        logger.error(f"❌ 直接回答流式输出失败: {e}", exc_info=True)
+                        yield AgentStep(
+                            type="error",
+                            content="抱歉，由于网络原因，无法生成完整的回答。请稍后重试。",
+                        )
+                        return
+                    logger.warning(f"⚠️ 直接回答失败，改用 Agent 循环: {e}")
+                else:
+                    answer = "".join(answer_parts)
+                    get_router_stats().record_direct_outcome(decision, answer)
+                    await self._record_answer(user_input, answer)
+                    return
+            
+            used_tools = False
+            answer_parts = []
+            thread_id = self.conversation_thread_id or new_thread_id()
+            try:
+                async with aclosing(self._stream_agent(user_input, thread_id)) as agent_steps:
+                    async for step in agent_steps:
+                        used_tools = used_tools or step.type == "action"
+                        if step.type == "final":
+                            answer_parts.append(step.content)
+                        elif step.type == "citation_update":
+                            answer_parts = [step.content]
+                        yield step
+            except (asyncio.CancelledError, GeneratorExit):
+                # Abandoned by the consumer: the partial turn is not kept
+                await self._discard_turn(user_input)
+                raise
+            finally:
+                if thread_id != self.conversation_thread_id:
+                    await discard_thread(self.checkpointer, thread_id)
+            if decision is not None:
+                get_router_stats().record_agent_outcome(decision, used_tools)
+            await self._record_answer(user_input, "".join(answer_parts))
+    
+    def _date_message(self) -> SystemMessage:
+        """Build the date system message of a turn (later turns replace it in place)."""
+        current_date = datetime.now().strftime("%Y-%m-%d")
+        return SystemMessage(
+            content=f"当前日期：{current_date}\n\n重要提示：如果用户询问日期或时间相关问题，请直接使用上述当前日期信息回答，无需使用搜索工具。",
+            id=DATE_MESSAGE_ID,
+        )
+    
+    async def _start_turn(self) -> None:
+        """Load the earlier turns of the conversation and bound the stored state.
         
-        # Check if using dual LLM mode
-        using_dual_llm = self.answer_llm is not self.function_call_llm
+        Unanswered tool calls of interrupted turns and the oldest turns beyond
+        ``conversation_max_tokens`` are removed from the graph state, and the
+        remaining state moves to a fresh checkpoint thread (the saver would
+        otherwise keep every checkpoint of earlier turns); the transcript and
+        evidence of the remaining turns are kept for the answer prompts.
+        """
+        self._history_text = ""
+        self._history_evidence = ([], [])
+        if self.conversation_thread_id is None:
+            return
         
+        config = self._get_run_config(thread_id=self.conversation_thread_id)
         try:
-            # Try streaming first
-            has_yielded = False
-            all_messages = []
-            tool_results = []
-            tool_calls = []
-            final_answer_from_function_call = None
-            
-            # Get LangSmith tracer if enabled
-            tracer = get_langsmith_tracer()
-            callbacks = [tracer] if tracer else None
-            
-            # Stream events from LangGraph
-            # Add date information to the input message
-            user_msg = HumanMessage(content=user_input)
-            current_date = datetime.now().strftime("%Y-%m-%d")
-            date_msg = SystemMessage(content=f"当前日期：{current_date}\n\n重要提示：如果用户询问日期或时间相关问题，请直接使用上述当前日期信息回答，无需使用搜索工具。")
-            stream_input = {"messages": [date_msg, user_msg]}
-            
-            # Prepare config with callbacks and recursion limit
-            # LangGraph uses recursion_limit to control max iterations
-            stream_config = {
-                "recursion_limit": self.config.max_iterations,
-            }
-            if callbacks:
-                stream_config["callbacks"] = callbacks
-            
-            event_stream = self.agent_executor.astream(stream_input, config=stream_config)
-            
-            # Track the last observation to detect reasoning after observation
-            last_observation_time = None
-            pending_reasoning_after_observation = False
-            
-            async for event in event_stream:
-                has_yielded = True
-                # LangGraph returns events with node names as keys
-                # e.g., {"agent": {...}, "tools": {...}}
-                event_keys = list(event.keys())
-                logger.debug(f"收到事件: {event_keys}")
-                
-                # Log if we're receiving agent events but no tool calls
-                if "agent" in event and "tools" not in event_keys:
-                    logger.debug(f"🔍 Agent 节点事件，检查是否包含工具调用...")
-                
-                # Check for agent node (thinking/reasoning)
-                if "agent" in event:
-                    agent_data = event["agent"]
-                    if isinstance(agent_data, dict) and "messages" in agent_data:
-                        messages = agent_data["messages"]
-                        all_messages.extend(messages)
-                        
-                        # Check for reasoning and tool calls in AI messages
-                        for msg in messages:
-                            if isinstance(msg, AIMessage):
-                                # First, check for DeepSeek reasoning_content (if available)
-                                deepseek_reasoning = None
-                                if hasattr(msg, "additional_kwargs") and msg.additional_kwargs:
-                                    deepseek_reasoning = msg.additional_kwargs.get("reasoning_content")
-                                
-                                # Then check for regular content (thinking process)
-                                content = msg.content
-                                has_reasoning = content and content.strip()
-                                
-                                # Check for tool_calls in multiple possible locations
-                                msg_tool_calls = None
-                                if hasattr(msg, "tool_calls") and msg.tool_calls:
-                                    msg_tool_calls = msg.tool_calls
-                                elif hasattr(msg, "additional_kwargs") and msg.additional_kwargs:
-                                    msg_tool_calls = msg.additional_kwargs.get("tool_calls")
-                                
-                                # Determine reasoning type based on context
-                                # Key logic:
-                                # 1. If has tool_calls -> reasoning before tool call (tool_selection)
-                                # 2. If no tool_calls and no observation -> final answer (don't show as reasoning)
-                                reasoning_type = None
-                                
-                                if msg_tool_calls:
-                                    # Has tool calls -> this is reasoning before tool selection
-                                    reasoning_type = "tool_selection"
-                                elif last_observation_time is not None:
-                                    # Just received observation but no tool calls - reset tracking
-                                    # Don't show this as a reasoning step (user doesn't need to see "thinking about continuing")
-                                    pending_reasoning_after_observation = False
-                                    last_observation_time = None
-                                    reasoning_type = None
-                                elif not using_dual_llm and has_reasoning:
-                                    # Single LLM mode, no tool calls, has content -> this is final answer, not reasoning
-                                    # Don't show as reasoning step
-                                    reasoning_type = None
-                                
-                                # Show DeepSeek reasoning_content if available (always show this as it's internal thinking)
-                                if deepseek_reasoning and deepseek_reasoning.strip():
-                                    logger.info(f"🧠 DeepSeek 内部思考过程，长度: {len(deepseek_reasoning)}")
-                                    yield AgentStep(
-                                        type="reasoning",
-                                        content=deepseek_reasoning.strip(),
-                                        metadata={
-                                            "reasoning_type": "deepseek_internal",
-                                            "is_deepseek_reasoning": True,
-                                        }
-                                    )
-                                
-                                # Only show regular reasoning if we determined it's actually reasoning (not final answer)
-                                # Skip if it's the same as deepseek_reasoning to avoid duplication
-                                if has_reasoning and reasoning_type is not None:
-                                    reasoning_content = content.strip()
-                                    
-                                    # Skip if this content is the same as deepseek_reasoning (avoid duplication)
-                                    if deepseek_reasoning and reasoning_content == deepseek_reasoning.strip():
-                                        logger.debug("跳过重复的 reasoning content（与 DeepSeek reasoning_content 相同）")
-                                    else:
-                                        # Only show tool_selection reasoning (before using a tool)
-                                        if reasoning_type == "tool_selection":
-                                            logger.info(f"💭 Agent 思考选择工具，长度: {len(reasoning_content)}")
-                                            yield AgentStep(
-                                                type="reasoning",
-                                                content=reasoning_content,
-                                                metadata={
-                                                    "reasoning_type": reasoning_type,
-                                                }
-                                            )
-                                
-                                # Then send tool calls if present
-                                if msg_tool_calls:
-                                    # This is a tool call decision (after reasoning about tool selection)
-                                    logger.info(f"🔧 Agent 决定调用工具，工具调用数量: {len(msg_tool_calls)}")
-                                    for tool_call in msg_tool_calls:
-                                        # Handle different tool_call formats
-                                        if isinstance(tool_call, dict):
-                                            tool_name = tool_call.get("name") or tool_call.get("function", {}).get("name", "unknown")
-                                            tool_input = tool_call.get("args") or tool_call.get("function", {}).get("arguments", {})
-                                        else:
-                                            # Handle object format
-                                            tool_name = getattr(tool_call, "name", "unknown")
-                                            tool_input = getattr(tool_call, "args", {})
-                                        
-                                        tool_calls.append({
-                                            "name": tool_name,
-                                            "args": tool_input,
-                                        })
-                                        logger.info(f"🔧 Agent 决定调用工具: {tool_name}, 输入: {tool_input}")
-                                        yield AgentStep(
-                                            type="action",
-                                            content=f"调用工具: {tool_name}",
-                                            metadata={
-                                                "tool": tool_name,
-                                                "tool_input": str(tool_input),
-                                            }
-                                        )
-                                    # Reset observation tracking after tool call decision
-                                    last_observation_time = None
-                                elif not has_reasoning and not using_dual_llm:
-                                    # No tool calls, no reasoning, and single LLM mode - might be final answer
-                                    # Store for later use if this is the final message
-                                    if content and len(all_messages) > 1:
-                                        final_answer_from_function_call = content
-                                    # Reset observation tracking
-                                    last_observation_time = None
-                                elif has_reasoning and reasoning_type is None:
-                                    # This is final answer in single LLM mode, store it
-                                    if not using_dual_llm and len(all_messages) > 1:
-                                        final_answer_from_function_call = content
-                                    # Reset observation tracking
-                                    last_observation_time = None
-                
-                # Check for tools node (tool execution results)
-                elif "tools" in event:
-                    tools_data = event["tools"]
-                    if isinstance(tools_data, dict) and "messages" in tools_data:
-                        tool_messages = tools_data["messages"]
-                        all_messages.extend(tool_messages)
-                        
-                        # Extract tool output
-                        for msg in tool_messages:
-                            if hasattr(msg, "content"):
-                                tool_output = str(msg.content)
-                                tool_results.append(tool_output)
-                                logger.info(f"✅ 工具执行完成，结果长度: {len(tool_output)}")
-                                yield AgentStep(
-                                    type="observation",
-                                    content=tool_output[:500] + "..." if len(tool_output) > 500 else tool_output,
-                                )
-                                # Mark that we just received an observation - next reasoning will be about continuing
-                                last_observation_time = time.time()
-                                pending_reasoning_after_observation = True
-            
-            # Generate final answer
-            if using_dual_llm:
-                # Dual LLM mode: use answer_llm to generate final answer
-                logger.info("🔄 切换到 answer_llm 生成最终回答...")
+            snapshot = await self.agent_executor.aget_state(config)
+            messages = snapshot.values.get("messages", [])
+            removals = dangling_tool_calls(messages)
+            removed = {r.id for r in removals}
+            messages = [m for m in messages if m.id not in removed]
+            trimmed = trim_turns(messages, self.context_manager, self.config.conversation_max_tokens)
+            removed.update(r.id for r in trimmed)
+            messages = [m for m in messages if m.id not in removed]
+            if snapshot.values:
+                self.conversation_thread_id = await carry_over_thread(
+                    self.agent_executor, self.checkpointer, config, {"messages": messages}
+                )
+        except Exception as e:
+            logger.warning(f"⚠️ 读取 Agent 对话状态失败: {e}")
+            return
+        
+        turns = split_turns(messages)
+        self._history_text = conversation_history(turns, self.answer_context_manager)
+        self._history_evidence = turn_evidence(turns)
+        if turns:
+            logger.info(f"💬 Agent 对话历史: {len(turns)} 轮, {len(self._history_evidence[0])} 条工具结果")
+    
+    async def _record_answer(self, user_input: str, answer: str) -> None:
+        """Store the answer shown to the user as the turn's final message.
+        
+        In dual-LLM mode, after a resynthesis or for direct answers the graph
+        state does not hold the answer the user saw; later turns should.
+        
+        Args:
+            user_input: User's question
+            answer: Answer as displayed (citation links are turned back into [n])
+        """
+        if self.conversation_thread_id is None or not answer:
+            return
+        
+        answer = plain_answer(answer)
+        config = self._get_run_config(thread_id=self.conversation_thread_id)
+        try:
+            snapshot = await self.agent_executor.aget_state(config)
+            messages = snapshot.values.get("messages", [])
+            turn = current_turn(messages)
+            if not turn or not isinstance(turn[0], HumanMessage) or turn[0].content != user_input:
+                # Answered without the graph: add the whole turn
+                update = [HumanMessage(content=user_input), AIMessage(content=answer)]
+                if not messages:
+                    update.insert(0, self._date_message())
+            elif isinstance(turn[-1], AIMessage) and not turn[-1].tool_calls:
+                if turn[-1].content == answer:
+                    return
+                # Same id: replaces the graph's final message in place
+                update = [AIMessage(content=answer, id=turn[-1].id)]
+            else:
+                update = [AIMessage(content=answer)]
+            await self.agent_executor.aupdate_state(config, {"messages": update}, as_node="agent")
+        except Exception as e:
+            logger.warning(f"⚠️ 保存 Agent 回答失败: {e}")
+    
+    async def _discard_turn(self, user_input: str) -> None:
+        """Remove an abandoned turn from the conversation state.
+        
+        A cancelled turn may stop in the middle of a tool step; keeping its
+        question and partial evidence would make later turns treat it as
+        answered.
+        
+        Args:
+            user_input: Question of the abandoned turn
+        """
+        if self.conversation_thread_id is None:
+            return
+        
+        config = self._get_run_config(thread_id=self.conversation_thread_id)
+        try:
+            snapshot = await self.agent_executor.aget_state(config)
+            turn = current_turn(snapshot.values.get("messages", []))
+            if not turn or not isinstance(turn[0], HumanMessage) or turn[0].content != user_input:
+                return
+            removals = [RemoveMessage(id=msg.id) for msg in turn if msg.id]
+            await self.agent_executor.aupdate_state(config, {"messages": removals}, as_node="agent")
+            logger.info(f"🗑️ 已丢弃被取消的一轮对话 ({len(removals)} 条消息)")
+        except Exception as e:
+            logger.warning(f"⚠️ 丢弃被取消的对话状态失败: {e}")
+    
+    def _build_direct_answer_messages(self, user_input: str) -> list:
+        """Build the prompt for answering without tools."""
+        current_date = datetime.now().strftime("%Y-%m-%d")
+        system_prompt = f"""你是一个有用的 AI 助手。请直接回答用户的问题。
+
+当前日期：{current_date}
+
+重要规则:
+1. 提供准确、完整、有条理的回答
+2. 如果不确定答案，请如实说明
+3. 如果用户询问日期或时间相关问题，请使用上述当前日期信息回答
+"""
+        return [SystemMessage(content=system_prompt), HumanMessage(content=self._with_history(user_input))]
+    
+    async def _stream_direct_answer(self, user_input: str) -> AsyncIterator[AgentStep]:
+        """Stream a single answer from answer_llm, bypassing the agent loop.
+        
+        Args:
+            user_input: User's question
+        
+        Yields:
+            Reasoning deltas (DeepSeek reasoning) and answer tokens
+        """
+        logger.info("⚡ 无需工具，直接生成回答")
+        async for chunk in self.answer_llm.astream(self._build_direct_answer_messages(user_input)):
+            reasoning_delta = chunk.additional_kwargs.get("reasoning_content")
+            if reasoning_delta:
+                # Reasoning is streamed as deltas (the UI appends them)
                 yield AgentStep(
                     type="reasoning",
-                    content="正在使用 answer_llm 生成最终回答...",
+                    content=reasoning_delta,
+                    metadata={
+                        "reasoning_type": "answer_phase",
+                        "is_deepseek_reasoning": True,
+                        "model": "answer_llm",
+                        "delta": True,
+                    }
                 )
-                
-                # Use the new streaming method with reasoning support
-                try:
-                    async for answer_step in self._generate_answer_with_answer_llm_streaming(
-                        user_input, tool_results, tool_calls
-                    ):
-                        yield answer_step
-                    
-                    # 双 LLM 模式答案生成完成，终止流式输出
-                    logger.info("✅ 双 LLM 模式流式输出完成")
-                    return
-                    
-                except Exception as stream_error:
-                    error_msg = str(stream_error)
-                    is_timeout = "timeout" in error_msg.lower() or "timed out" in error_msg.lower()
-                    
-                    if is_timeout:
-                        logger.warning(f"⏱️ Answer LLM 流式输出超时，尝试使用回退方法...")
-                    else:
-                        logger.warning(f"⚠️ Answer LLM 流式输出失败 ({type(stream_error).__name__})，尝试使用回退方法...")
-                    
-                    # Try fallback method (non-streaming)
-                    try:
-                        answer = await self._generate_answer_with_answer_llm(
-                            user_input, tool_results, tool_calls
-                        )
-                        
-                        # Process citations if available
-                        if self.citation_manager and tool_results:
-                            from src.search.citation_processor import CitationProcessor
-                            from src.search.models import SearchResponse
-                            
-                            citation_processor = CitationProcessor(
-                                SearchResponse(query="", results=[], total_results=0, search_time=0.0),
-                                offset=0
-                            )
-                            citation_processor.citation_map = self.citation_manager.get_global_citation_map()
-                            
-                            # Convert citations and get reference list
-                            converted_answer = citation_processor.convert_citations(answer)
-                            cited_nums = citation_processor._extract_citations(answer)
-                            
-                            yield AgentStep(
-                                type="final",
-                                content=converted_answer,
-                            )
-                            
-                            if cited_nums:
-                                citations_list = self.citation_manager.generate_citations_list(list(cited_nums))
-                                logger.info(f"✅ (回退方法) 添加引用列表，包含 {len(cited_nums)} 条引用")
-                                yield AgentStep(
-                                    type="final",
-                                    content=citations_list,
-                                )
-                        else:
-                            yield AgentStep(
-                                type="final",
-                                content=answer,
-                            )
-                        
-                        logger.info("✅ 回退方法成功完成")
-                        return
-                        
-                    except Exception as fallback_error:
-                        logger.error(f"❌ 回退方法也失败: {fallback_error}", exc_info=True)
-                        yield AgentStep(
-                            type="error",
-                            content="抱歉，由于网络原因，无法生成完整的回答。请稍后重试。",
-                        )
-                        return
-            elif not using_dual_llm:
-                # Single LLM mode: use answer from function_call_llm
-                if not final_answer_from_function_call:
-                    # Extract final answer from all messages
-                    for msg in reversed(all_messages):
-                        if isinstance(msg, AIMessage):
-                            if not (hasattr(msg, "tool_calls") and msg.tool_calls):
-                                final_answer_from_function_call = msg.content
-                                break
-                
-                if final_answer_from_function_call:
-                    logger.info("✅ Agent 生成最终答案（单 LLM 模式）")
-                    # Process citations if available
-                    if self.citation_manager and tool_results:
-                        from src.search.citation_processor import CitationProcessor
-                        from src.search.models import SearchResponse
-                        
-                        # Create a CitationProcessor with the global citation map
-                        citation_processor = CitationProcessor(
-                            SearchResponse(query="", results=[], total_results=0, search_time=0.0), 
-                            offset=0
-                        )
-                        citation_processor.citation_map = self.citation_manager.get_global_citation_map()
-                        
-                        # Convert inline citations and append reference list
-                        converted_answer = citation_processor.convert_citations(final_answer_from_function_call)
-                        cited_nums = citation_processor._extract_citations(final_answer_from_function_call)
-                        
-                        yield AgentStep(
-                            type="final",
-                            content=converted_answer,
-                        )
-                        
-                        if cited_nums:
-                            citations_list = self.citation_manager.generate_citations_list(list(cited_nums))
-                            logger.info(f"✅ 添加引用列表（单 LLM 模式），包含 {len(cited_nums)} 条引用")
-                            yield AgentStep(
-                                type="final",
-                                content=citations_list,
-                            )
-                    else:
-                        yield AgentStep(
-                            type="final",
-                            content=final_answer_from_function_call,
-                        )
-                    
-                    # 单 LLM 模式答案生成完成，终止流式输出
-                    logger.info("✅ 单 LLM 模式流式输出完成")
-                    return
-                elif not has_yielded:
-                    # Fallback: if streaming didn't work, use non-streaming method
-                    logger.warning("⚠️ 流式输出未返回事件，使用回退方法")
-                    yield AgentStep(
-                        type="reasoning",
-                        content="正在处理请求...",
-                    )
-                    result = await self.run(user_input)
-                    for step in result.steps:
-                        yield step
-                    logger.info("✅ 回退方法完成")
-                    return
-                else:
-                    # Last resort: generate answer using answer_llm if available
-                    logger.warning("⚠️ Agent 未从流式输出中找到最终答案，尝试使用回退方法...")
-                    try:
-                        # Use the fallback method with real non-streaming API call
-                        answer = await self._generate_answer_with_answer_llm(
-                            user_input, tool_results, tool_calls
-                        )
-                        
-                        # Process citations if available
-                        if self.citation_manager and tool_results:
-                            from src.search.citation_processor import CitationProcessor
-                            from src.search.models import SearchResponse
-                            
-                            citation_processor = CitationProcessor(
-                                SearchResponse(query="", results=[], total_results=0, search_time=0.0),
-                                offset=0
-                            )
-                            citation_processor.citation_map = self.citation_manager.get_global_citation_map()
-                            
-                            # Convert citations and get reference list
-                            converted_answer = citation_processor.convert_citations(answer)
-                            cited_nums = citation_processor._extract_citations(answer)
-                            
-                            yield AgentStep(
-                                type="final",
-                                content=converted_answer,
-                            )
-                            
-                            if cited_nums:
-                                citations_list = self.citation_manager.generate_citations_list(list(cited_nums))
-                                logger.info(f"✅ (回退方法) 添加引用列表，包含 {len(cited_nums)} 条引用")
-                                yield AgentStep(
-                                    type="final",
-                                    content=citations_list,
-                                )
-                        else:
-                            yield AgentStep(
-                                type="final",
-                                content=answer,
-                            )
-                        
-                        logger.info("✅ 回退方法成功完成")
-                        return
-                    except Exception as gen_error:
-                        logger.error(f"❌ 回退方法也失败: {gen_error}", exc_info=True)
-                        yield AgentStep(
-                            type="error",
-                            content="抱歉，由于网络原因，无法生成完整的回答。请稍后重试。",
-                        )
-                        return
+            if isinstance(chunk.content, str) and chunk.content:
+                yield AgentStep(type="final", content=chunk.content)
+    
+    async def _generate_direct_answer(self, user_input: str) -> str:
+        """Generate a single answer from answer_llm without streaming (see run)."""
+        logger.info("⚡ 无需工具，直接生成回答")
+        response = await self.answer_llm.ainvoke(self._build_direct_answer_messages(user_input))
+        return response.content if isinstance(response.content, str) else str(response.content)
+    
+    async def _stream_agent(self, user_input: str, thread_id: str) -> AsyncIterator[AgentStep]:
+        """Stream the ReAct loop's steps (see stream).
+        
+        The tool-selection loop runs first, then the answer phase of the LLM
+        mode. If the loop fails, the answer is recovered from the results
+        collected so far.
+        
+        Args:
+            user_input: User's question
+            thread_id: Checkpoint thread of the run; fallbacks resume it
+        
+        Yields:
+            AgentStep objects as they are generated
+        """
+        logger.info(f"🤖 Agent 开始流式执行: {user_input}")
+        
+        # Check if using dual LLM mode
+        using_dual_llm = self.answer_llm is not self.function_call_llm
+        run = _StreamRun(self.citation_manager)
+        
+        try:
+            async with aclosing(self._stream_tool_loop(user_input, thread_id, run, using_dual_llm)) as steps:
+                async for step in steps:
+                    yield step
             
-            logger.info("✅ Agent 流式执行完成")
+            if run.stopped_for_deadline:
+                logger.warning(
+                    f"⏳ 剩余时间不足 ({get_deadline().remaining():.1f}s)，停止工具调用，"
+                    f"基于已有的 {len(run.tool_results)} 条工具结果生成回答"
+                )
+                yield AgentStep(
+                    type="reasoning",
+                    content="剩余时间不足，停止搜索，基于已有结果生成回答...",
+                )
             
+            if using_dual_llm:
+                answer_steps = self._stream_dual_llm_answer(user_input, run)
+            else:
+                answer_steps = self._stream_single_llm_answer(user_input, thread_id, run)
+            async with aclosing(answer_steps) as steps:
+                async for step in steps:
+                    yield step
+        
         except asyncio.TimeoutError:
             logger.error(f"⏱️ Agent 流式执行超时")
             yield AgentStep(
@@ -1224,193 +867,511 @@ class ReActAgent(BaseAgent):
                 content=f"执行超时 ({self.config.max_execution_time}秒)",
             )
         except Exception as e:
-            error_msg = str(e)
             logger.error(f"❌ Agent 流式执行失败: {e}", exc_info=True)
-            
-            # Check if this is a recursion limit error
-            is_recursion_limit = (
-                "recursion_limit" in error_msg.lower() or 
-                "GRAPH_RECURSION_LIMIT" in error_msg or
-                "need more steps" in error_msg.lower()
+            async with aclosing(self._recover_stream(user_input, thread_id, run, using_dual_llm, e)) as steps:
+                async for step in steps:
+                    yield step
+    
+    async def _stream_tool_loop(
+        self,
+        user_input: str,
+        thread_id: str,
+        run: "_StreamRun",
+        using_dual_llm: bool,
+    ) -> AsyncIterator[AgentStep]:
+        """Stream the graph's tool-selection loop, collecting its results into run.
+        
+        Args:
+            user_input: User's question
+            thread_id: Checkpoint thread of the run
+            run: State of the run (updated in place)
+            using_dual_llm: Whether the answer_llm writes the answer
+        
+        Yields:
+            Tool-selection, action and observation steps (in single LLM mode
+            also the graph's answer tokens)
+        """
+        # Get LangSmith tracer if enabled
+        tracer = get_langsmith_tracer()
+        callbacks = [tracer] if tracer else None
+        
+        # Add date information to the input message
+        stream_input = {"messages": [self._date_message(), HumanMessage(content=user_input)]}
+        
+        # Searches may start while the function-call LLM is still streaming
+        # the tool call (only the streaming path sees argument deltas)
+        speculative_search = None
+        if self.config.speculative_search:
+            speculative_search = SpeculativeSearch(
+                self.search_tool,
+                tool_semaphore=self._tool_semaphore,
+                tool_memo=self.tool_memo,
+                global_max_parallel_tools=self.config.global_max_parallel_tools,
             )
-            
-            if is_recursion_limit:
-                # We hit recursion limit - generate answer from collected results (or without)
-                if tool_results:
-                    logger.warning(f"⚠️ 达到最大迭代次数 ({self.config.max_iterations})，已收集到 {len(tool_results)} 个工具结果，将基于现有结果生成答案")
-                else:
-                    logger.warning(f"⚠️ 达到最大迭代次数 ({self.config.max_iterations})，未收集到工具结果，将基于模型知识直接回答问题")
+        
+        # Prepare config with callbacks, recursion limit and session state
+        stream_config = self._get_run_config(callbacks, speculative_search, thread_id)
+        
+        # "messages" forwards tokens and tool-call deltas of the agent node as
+        # they arrive; "updates" delivers completed messages per node
+        event_stream = self.agent_executor.astream(
+            stream_input, config=stream_config, stream_mode=["messages", "updates"]
+        )
+        selection_stream = ToolSelectionStream()
+        
+        # Dual LLM mode may start the answer once results look sufficient,
+        # overlapping it with the function-call LLM's next decision
+        can_speculate_answer = using_dual_llm and self.config.speculative_answer
+        
+        # Single LLM mode streams the graph's final answer tokens directly
+        stream_answer_tokens = (
+            not using_dual_llm and self.config.answer_policy != AnswerPolicy.RESYNTHESIZE
+        )
+        
+        # The tool loop stops while answer_reserve_time is still left; an
+        # answer already streaming from the graph is not cut off
+        deadline = get_deadline()
+        
+        try:
+            while True:
+                step_timeout = None
+                if deadline is not None and not run.streamed_answer:
+                    step_timeout = deadline.remaining() - self.config.answer_reserve_time
+                try:
+                    async with asyncio.timeout(step_timeout):
+                        stream_mode, data = await anext(event_stream)
+                except StopAsyncIteration:
+                    break
+                except TimeoutError:
+                    run.stopped_for_deadline = True
+                    break
+                run.has_yielded = True
                 
-                # Always generate answer when hitting recursion limit, regardless of tool_results
-                if using_dual_llm:
-                    # Use answer_llm to generate final answer
-                    current_date = datetime.now().strftime("%Y-%m-%d")
-                    
-                    if tool_results:
-                        # Has tool results - generate answer based on them
-                        context = "\n\n".join(tool_results)
-                        
-                        system_prompt = f"""你是一个有用的 AI 助手。基于以下搜索结果，为用户的问题提供一个准确、完整、有引用的回答。
-
-当前日期：{current_date}
-
-重要规则:
-1. 仔细分析搜索结果，提取相关信息
-2. 在回答中使用 [数字] 格式引用搜索结果来源
-3. 如果搜索结果不足以回答问题，如实说明
-4. 回答应该准确、完整、有条理
-5. 如果用户询问日期或时间相关问题，请使用上述当前日期信息回答
-6. 注意：由于达到最大迭代次数，请基于已有信息给出最佳答案
-"""
-                        
-                        user_prompt = f"""用户问题: {user_input}
-
-搜索结果:
-{context}
-
-请基于以上搜索结果回答用户的问题。"""
-                    else:
-                        # No tool results - answer directly from model knowledge
-                        system_prompt = f"""你是一个有用的 AI 助手。请基于你的知识直接回答用户的问题。
-
-当前日期：{current_date}
-
-重要规则:
-1. 提供准确、完整、有条理的回答
-2. 如果不确定答案，请如实说明
-3. 如果用户询问日期或时间相关问题，请使用上述当前日期信息回答
-4. 注意：由于达到最大迭代次数限制，未能收集到搜索结果，请基于你的知识直接回答
-"""
+                if stream_mode == "messages":
+                    chunk, chunk_metadata = data
+                    if chunk_metadata.get("langgraph_node") == "agent" and isinstance(chunk, AIMessageChunk):
+                        if run.speculative_answer is not None and chunk.tool_call_chunks:
+                            logger.info("🔁 函数调用 LLM 继续调用工具，取消预先生成的回答")
+                            run.cancel_speculative_answer()
+                        for step in selection_stream.feed(chunk):
+                            yield step
+                        if stream_answer_tokens:
+                            for step in self._answer_token_steps(run, chunk, selection_stream):
+                                yield step
+                    continue
+                
+                # LangGraph returns updates with node names as keys
+                # e.g., {"agent": {...}, "tools": {...}}
+                event = data
+                logger.debug(f"收到事件: {list(event.keys())}")
+                
+                # Check for agent node (thinking/reasoning)
+                if "agent" in event:
+                    agent_data = event["agent"]
+                    if isinstance(agent_data, dict) and "messages" in agent_data:
+                        for step in self._agent_update_steps(
+                            run, agent_data["messages"], selection_stream, using_dual_llm
+                        ):
+                            yield step
+                
+                # Check for tools node (tool execution results)
+                elif "tools" in event:
+                    tools_data = event["tools"]
+                    if isinstance(tools_data, dict) and "messages" in tools_data:
+                        for step in self._tool_update_steps(run, tools_data["messages"]):
+                            yield step
                         
-                        user_prompt = f"""用户问题: {user_input}
-
-请基于你的知识回答用户的问题。"""
-                    
-                    messages = [
-                        SystemMessage(content=system_prompt),
-                        HumanMessage(content=user_prompt)
-                    ]
-                    
-                    # Stream answer generation and collect the full answer
-                    streamed_answer = ""
-                    async for chunk in self.answer_llm.astream(messages):
-                        if hasattr(chunk, 'content') and chunk.content:
-                            streamed_answer += chunk.content
-                            yield AgentStep(
-                                type="final",
-                                content=chunk.content,
+                        if (
+                            can_speculate_answer and run.speculative_answer is None
+                            and self._should_generate_answer(run.tool_results, run.tool_iterations)
+                        ):
+                            logger.info("⚡ 工具结果看起来已足够，预先开始生成回答")
+                            run.speculative_answer = SpeculativeAnswer(
+                                self._generate_answer_with_answer_llm_streaming(
+                                    user_input, list(run.tool_results), list(run.tool_calls),
+                                    list(run.tool_artifacts),
+                                ),
+                                started_at_observation=len(run.tool_results),
                             )
-                    
-                    # After streaming is complete, convert citations and add reference list
-                    if self.citation_manager and tool_results:
-                        from src.search.citation_processor import CitationProcessor
-                        from src.search.models import SearchResponse
-                        
-                        # Create a CitationProcessor with the global citation map
-                        citation_processor = CitationProcessor(
-                            SearchResponse(query="", results=[], total_results=0, search_time=0.0), 
-                            offset=0
-                        )
-                        citation_processor.citation_map = self.citation_manager.get_global_citation_map()
-                        
-                        # Convert inline citations [1] -> [[1]](url)
-                        converted_answer = citation_processor.convert_citations(streamed_answer)
                         
-                        # Extract which citations were actually used
-                        cited_nums = citation_processor._extract_citations(streamed_answer)
-                        
-                        # Send citation update to replace content
-                        logger.info(f"🔗 (错误恢复) 转换引用链接，共 {len(cited_nums)} 个引用")
-                        yield AgentStep(
-                            type="citation_update",
-                            content=converted_answer,
-                            metadata={"replace_content": True}
-                        )
-                        
-                        # Generate and append the global citations list
-                        if cited_nums:
-                            citations_list = self.citation_manager.generate_citations_list(list(cited_nums))
-                            logger.info(f"✅ (错误恢复) 添加引用列表，包含 {len(cited_nums)} 条引用")
-                            yield AgentStep(
-                                type="final",
-                                content=citations_list,
-                            )
-                    
-                    # Successfully generated answer, exit exception handler
-                    return
+                        if deadline is not None and deadline.expired(self.config.answer_reserve_time):
+                            run.stopped_for_deadline = True
+                            break
+        except BaseException:
+            run.cancel_speculative_answer()
+            raise
+        finally:
+            if speculative_search is not None:
+                speculative_search.cancel_pending()
+            await event_stream.aclose()
+    
+    def _answer_token_steps(self, run: "_StreamRun", chunk: AIMessageChunk, selection_stream: ToolSelectionStream):
+        """Single LLM mode: stream the graph's answer tokens with citations linked."""
+        if selection_stream.tool_calls:
+            if run.streamed_answer:
+                # The text was a preamble to a tool call, not the answer
+                run.streamed_answer = False
+                run.answer_citations.reset()
+                yield AgentStep(
+                    type="citation_update",
+                    content="",
+                    metadata={"replace_content": True}
+                )
+        elif isinstance(chunk.content, str) and chunk.content:
+            run.streamed_answer = True
+            token = run.answer_citations.feed(chunk.content)
+            if token:
+                yield AgentStep(type="final", content=token)
+    
+    def _agent_update_steps(
+        self,
+        run: "_StreamRun",
+        messages: list,
+        selection_stream: ToolSelectionStream,
+        using_dual_llm: bool,
+    ):
+        """Turn the agent node's completed messages into reasoning and action steps."""
+        run.all_messages.extend(messages)
+        
+        # Check for reasoning and tool calls in AI messages
+        for msg in messages:
+            if not isinstance(msg, AIMessage):
+                continue
+            
+            # DeepSeek reasoning_content (if available) and regular content
+            deepseek_reasoning = msg.additional_kwargs.get("reasoning_content")
+            content = msg.content
+            has_reasoning = content and content.strip()
+            msg_tool_calls = msg.tool_calls
+            
+            # Show DeepSeek reasoning_content unless it was already streamed
+            if (
+                deepseek_reasoning and deepseek_reasoning.strip()
+                and not selection_stream.was_streamed(msg, "reasoning")
+            ):
+                logger.info(f"🧠 DeepSeek 内部思考过程，长度: {len(deepseek_reasoning)}")
+                yield AgentStep(
+                    type="reasoning",
+                    content=deepseek_reasoning.strip(),
+                    metadata={
+                        "reasoning_type": "deepseek_internal",
+                        "is_deepseek_reasoning": True,
+                    }
+                )
+            
+            # Only content before a tool call is shown as reasoning (tool_selection),
+            # unless it was streamed; without tool calls it is the final answer.
+            # Skip if it's the same as deepseek_reasoning to avoid duplication
+            if (
+                has_reasoning and msg_tool_calls
+                and not selection_stream.was_streamed(msg, "tool_selection")
+            ):
+                reasoning_content = content.strip()
+                if deepseek_reasoning and reasoning_content == deepseek_reasoning.strip():
+                    logger.debug("跳过重复的 reasoning content（与 DeepSeek reasoning_content 相同）")
                 else:
-                    # Single LLM mode - always generate answer when hitting recursion limit
-                    if final_answer_from_function_call:
-                        # Use existing answer if available
-                        yield AgentStep(
-                            type="final",
-                            content=final_answer_from_function_call,
-                        )
-                    else:
-                        # Generate answer from tool results or directly from model
-                        if tool_results:
-                            yield AgentStep(
-                                type="reasoning",
-                                content="基于已收集的工具结果生成答案...",
-                            )
-                        else:
-                            yield AgentStep(
-                                type="reasoning",
-                                content="基于模型知识直接生成答案...",
-                            )
-                        
-                        answer = await self._generate_answer_with_answer_llm(
-                            user_input, tool_results, tool_calls
-                        )
-                        yield AgentStep(
-                            type="final",
-                            content=answer,
-                        )
-                    
-                    # Successfully generated answer, exit exception handler
+                    logger.info(f"💭 Agent 思考选择工具，长度: {len(reasoning_content)}")
+                    yield AgentStep(
+                        type="reasoning",
+                        content=reasoning_content,
+                        metadata={
+                            "reasoning_type": "tool_selection",
+                        }
+                    )
+            
+            # Then send tool calls if present
+            if msg_tool_calls:
+                # This is a tool call decision (after reasoning about tool selection)
+                logger.info(f"🔧 Agent 决定调用工具，工具调用数量: {len(msg_tool_calls)}")
+                run.tool_iterations += 1
+                if run.speculative_answer is not None:
+                    logger.info("🔁 函数调用 LLM 继续调用工具，取消预先生成的回答")
+                    run.cancel_speculative_answer()
+                for tool_call in msg_tool_calls:
+                    tool_name = tool_call["name"]
+                    tool_input = tool_call["args"]
+                    run.tool_calls.append({
+                        "name": tool_name,
+                        "args": tool_input,
+                    })
+                    logger.info(f"🔧 Agent 决定调用工具: {tool_name}, 输入: {tool_input}")
+                    yield AgentStep(
+                        type="action",
+                        content=f"调用工具: {tool_name}",
+                        metadata={
+                            "tool": tool_name,
+                            "tool_input": str(tool_input),
+                        }
+                    )
+            elif content and not using_dual_llm and len(run.all_messages) > 1:
+                # No tool calls: in single LLM mode this is the final answer
+                run.final_answer_from_function_call = content
+    
+    def _tool_update_steps(self, run: "_StreamRun", messages: list):
+        """Collect the tools node's results and turn them into observation steps."""
+        run.all_messages.extend(messages)
+        
+        # Extract tool output
+        for msg in messages:
+            if hasattr(msg, "content"):
+                tool_output = str(msg.content)
+                run.tool_results.append(tool_output)
+                run.tool_artifacts.append(getattr(msg, "artifact", None))
+                logger.info(f"✅ 工具执行完成，结果长度: {len(tool_output)}")
+                yield AgentStep(
+                    type="observation",
+                    content=tool_output[:500] + "..." if len(tool_output) > 500 else tool_output,
+                )
+    
+    async def _stream_dual_llm_answer(self, user_input: str, run: "_StreamRun") -> AsyncIterator[AgentStep]:
+        """Dual LLM mode: stream the answer_llm's answer (non-streaming fallback on failure)."""
+        logger.info("🔄 切换到 answer_llm 生成最终回答...")
+        yield AgentStep(
+            type="reasoning",
+            content="正在使用 answer_llm 生成最终回答...",
+        )
+        
+        # Use the streaming method with reasoning support (possibly already
+        # running speculatively on the same tool results)
+        speculative_answer = run.speculative_answer
+        if speculative_answer is not None and speculative_answer.started_at_observation == len(run.tool_results):
+            logger.info("♻️ 使用预先生成的回答")
+            answer_steps = speculative_answer.stream()
+        else:
+            run.cancel_speculative_answer()
+            answer_steps = self._generate_answer_with_answer_llm_streaming(
+                user_input, run.tool_results, run.tool_calls, run.tool_artifacts
+            )
+        try:
+            async for answer_step in answer_steps:
+                yield answer_step
+            
+            # 双 LLM 模式答案生成完成，终止流式输出
+            logger.info("✅ 双 LLM 模式流式输出完成")
+            return
+        
+        except Exception as stream_error:
+            error_msg = str(stream_error)
+            is_timeout = "timeout" in error_msg.lower() or "timed out" in error_msg.lower()
+            
+            if is_timeout:
+                logger.warning(f"⏱️ Answer LLM 流式输出超时，尝试使用回退方法...")
+            else:
+                logger.warning(f"⚠️ Answer LLM 流式输出失败 ({type(stream_error).__name__})，尝试使用回退方法...")
+        
+        async for step in self._fallback_answer_steps(user_input, run):
+            yield step
+    
+    async def _stream_single_llm_answer(
+        self, user_input: str, thread_id: str, run: "_StreamRun"
+    ) -> AsyncIterator[AgentStep]:
+        """Single LLM mode: finish the graph's answer, or generate one by the answer policy."""
+        # Single LLM mode: use answer from function_call_llm
+        answer = run.final_answer_from_function_call
+        if run.stopped_for_deadline:
+            # The loop was stopped before the model answered
+            answer = None
+        elif not answer:
+            # Extract final answer from all messages
+            for msg in reversed(run.all_messages):
+                if isinstance(msg, AIMessage) and not msg.tool_calls:
+                    answer = msg.content
+                    break
+        run.final_answer_from_function_call = answer
+        
+        if run.stopped_for_deadline or (answer and self._should_resynthesize_answer(answer, run.tool_results)):
+            # Answer policy (or the deadline) asks for a separate answer phase with the same model
+            logger.info("🔄 按回答策略重新生成最终回答（单 LLM 模式）...")
+            if run.streamed_answer:
+                yield AgentStep(
+                    type="citation_update",
+                    content="",
+                    metadata={"replace_content": True}
+                )
+            try:
+                async for answer_step in self._generate_answer_with_answer_llm_streaming(
+                    user_input, run.tool_results, run.tool_calls, run.tool_artifacts
+                ):
+                    yield answer_step
+            except Exception as resynthesis_error:
+                if not answer:
+                    logger.error(f"❌ 生成回答失败: {resynthesis_error}", exc_info=True)
+                    yield AgentStep(
+                        type="error",
+                        content="抱歉，由于网络原因，无法生成完整的回答。请稍后重试。",
+                    )
                     return
+                logger.warning(f"⚠️ 重新生成回答失败，使用 Agent 的回答: {resynthesis_error}")
+                yield AgentStep(
+                    type="citation_update",
+                    content=answer,
+                    metadata={"replace_content": True}
+                )
+            logger.info("✅ 单 LLM 模式流式输出完成")
+        elif answer:
+            logger.info("✅ Agent 生成最终答案（单 LLM 模式）")
+            if run.streamed_answer:
+                # Tokens were already shown with their citations linked
+                steps = self._finish_streamed_citations(run.answer_citations)
             else:
-                # Other errors - try fallback method
-                try:
-                    logger.info("尝试使用回退方法...")
+                # Convert inline citations and append reference list
+                steps = self._final_answer_steps(answer, link_citations=bool(run.tool_results))
+            for step in steps:
+                yield step
+            
+            # 单 LLM 模式答案生成完成，终止流式输出
+            logger.info("✅ 单 LLM 模式流式输出完成")
+        elif not run.has_yielded:
+            # Fallback: if streaming didn't work, use non-streaming method
+            logger.warning("⚠️ 流式输出未返回事件，使用回退方法")
+            yield AgentStep(
+                type="reasoning",
+                content="正在处理请求...",
+            )
+            result = await self._run_agent(user_input, resume_thread_id=thread_id)
+            for step in result.steps:
+                yield step
+            logger.info("✅ 回退方法完成")
+        else:
+            # Last resort: generate answer using answer_llm if available
+            logger.warning("⚠️ Agent 未从流式输出中找到最终答案，尝试使用回退方法...")
+            async for step in self._fallback_answer_steps(user_input, run):
+                yield step
+    
+    async def _fallback_answer_steps(self, user_input: str, run: "_StreamRun") -> AsyncIterator[AgentStep]:
+        """Answer with a non-streaming answer_llm call, citations linked."""
+        try:
+            answer = await self._generate_answer_with_answer_llm(
+                user_input, run.tool_results, run.tool_calls, run.tool_artifacts
+            )
+        except Exception as fallback_error:
+            logger.error(f"❌ 回退方法也失败: {fallback_error}", exc_info=True)
+            yield AgentStep(
+                type="error",
+                content="抱歉，由于网络原因，无法生成完整的回答。请稍后重试。",
+            )
+            return
+        
+        # Convert inline citations and append reference list
+        for step in self._final_answer_steps(answer, link_citations=bool(run.tool_results)):
+            yield step
+        logger.info("✅ 回退方法成功完成")
+    
+    async def _recover_stream(
+        self,
+        user_input: str,
+        thread_id: str,
+        run: "_StreamRun",
+        using_dual_llm: bool,
+        error: Exception,
+    ) -> AsyncIterator[AgentStep]:
+        """Answer after the streamed run failed, from the results collected so far.
+        
+        Args:
+            user_input: User's question
+            thread_id: Checkpoint thread of the run; the fallback resumes it
+            run: State of the failed run
+            using_dual_llm: Whether the answer_llm writes the answer
+            error: Exception that stopped the run
+        
+        Yields:
+            Steps of the recovered answer, or an error step
+        """
+        error_msg = str(error)
+        
+        # Check if this is a recursion limit error
+        is_recursion_limit = (
+            "recursion_limit" in error_msg.lower() or
+            "GRAPH_RECURSION_LIMIT" in error_msg or
+            "need more steps" in error_msg.lower()
+        )
+        
+        if is_recursion_limit:
+            # We hit recursion limit - generate answer from collected results (or without)
+            if run.tool_results:
+                logger.warning(f"⚠️ 达到最大迭代次数 ({self.config.max_iterations})，已收集到 {len(run.tool_results)} 个工具结果，将基于现有结果生成答案")
+            else:
+                logger.warning(f"⚠️ 达到最大迭代次数 ({self.config.max_iterations})，未收集到工具结果，将基于模型知识直接回答问题")
+            
+            # Always generate answer when hitting recursion limit, regardless of tool_results
+            if using_dual_llm:
+                # Use answer_llm to generate final answer
+                note = ITERATION_LIMIT_NOTE if run.tool_results else ITERATION_LIMIT_NO_RESULTS_NOTE
+                async for step in self._generate_answer_with_answer_llm_streaming(
+                    user_input, run.tool_results, run.tool_calls, run.tool_artifacts, note=note
+                ):
+                    yield step
+            elif run.final_answer_from_function_call:
+                # Single LLM mode: use existing answer if available
+                yield AgentStep(
+                    type="final",
+                    content=run.final_answer_from_function_call,
+                )
+            else:
+                # Generate answer from tool results or directly from model
+                if run.tool_results:
                     yield AgentStep(
                         type="reasoning",
-                        content="流式输出遇到问题，使用备用方法处理...",
+                        content="基于已收集的工具结果生成答案...",
                     )
-                    result = await self.run(user_input)
-                    for step in result.steps:
-                        yield step
+                else:
                     yield AgentStep(
-                        type="final",
-                        content=result.final_answer,
+                        type="reasoning",
+                        content="基于模型知识直接生成答案...",
                     )
-                    # Successfully generated answer using fallback, exit exception handler
-                    return
-                except Exception as fallback_error:
-                    logger.error(f"回退方法也失败: {fallback_error}")
-                    # If fallback also hits recursion limit, handle it
-                    if "recursion_limit" in str(fallback_error).lower() and tool_results:
-                        logger.warning("回退方法也达到递归限制，使用已收集的结果生成答案")
-                        answer = await self._generate_answer_with_answer_llm(
-                            user_input, tool_results, tool_calls
-                        )
-                        yield AgentStep(
-                            type="final",
-                            content=answer,
-                        )
-                        # Successfully generated answer, exit exception handler
-                        return
-                    else:
-                        yield AgentStep(
-                            type="error",
-                            content=f"执行失败: {str(e)}",
-                        )
+                
+                answer = await self._generate_answer_with_answer_llm(
+                    user_input, run.tool_results, run.tool_calls, run.tool_artifacts
+                )
+                yield AgentStep(
+                    type="final",
+                    content=answer,
+                )
+            return
+        
+        # Other errors - try fallback method
+        try:
+            logger.info("尝试使用回退方法...")
+            yield AgentStep(
+                type="reasoning",
+                content="流式输出遇到问题，使用备用方法处理...",
+            )
+            result = await self._run_agent(user_input, resume_thread_id=thread_id)
+            for step in result.steps:
+                yield step
+            yield AgentStep(
+                type="final",
+                content=result.final_answer,
+            )
+        except Exception as fallback_error:
+            logger.error(f"回退方法也失败: {fallback_error}")
+            # If fallback also hits recursion limit, handle it
+            if "recursion_limit" in str(fallback_error).lower() and run.tool_results:
+                logger.warning("回退方法也达到递归限制，使用已收集的结果生成答案")
+                answer = await self._generate_answer_with_answer_llm(
+                    user_input, run.tool_results, run.tool_calls, run.tool_artifacts
+                )
+                yield AgentStep(
+                    type="final",
+                    content=answer,
+                )
+            else:
+                yield AgentStep(
+                    type="error",
+                    content=f"执行失败: {error_msg}",
+                )
     
     def reset(self) -> None:
-        """Reset agent state."""
+        """Reset agent state (starts a new conversation in multi-turn mode)."""
         logger.info("🔄 重置 Agent 状态")
-        # ReAct agent is stateless, nothing to reset
-        pass
+        # Only memoized tool results and the conversation outlive a turn
+        self.tool_memo.clear()
+        if self.conversation_thread_id is not None:
+            discard_thread_later(self.checkpointer, self.conversation_thread_id)
+            self.conversation_thread_id = new_thread_id()
+            self.citation_manager.reset()
+            self._history_text = ""
+            self._history_evidence = ([], [])
     
     def _convert_messages_to_steps(self, messages: list) -> list[AgentStep]:
         """Convert LangGraph messages to AgentStep objects.
@@ -0,0 +1,219 @@
+"""Pre-router that answers messages needing no tools without the agent loop.
+
+Greetings, date questions and pure-knowledge questions do not need the ReAct
+loop (a function-call LLM turn followed by the answer phase). ``QueryRouter``
+is a cheap local heuristic that scores how likely a message needs tools;
+below the threshold the agent streams a single direct answer instead.
+
+Routing accuracy is recorded in ``RouterStats``: for agent routes we observe
+whether tools were actually used, for direct routes whether the answer admits
+it lacked real-time information. Outcomes are bucketed by score so the
+threshold can be tuned from the logs.
+"""
+
+import logging
+import re
+import threading
+from dataclasses import dataclass, field
+from enum import Enum
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Score of a message without any cue (at or above the threshold -> agent loop)
+BASE_SCORE = 0.5
+
+# Default threshold: messages scoring below it are answered directly
+DEFAULT_ROUTER_THRESHOLD = 0.35
+
+# (pattern, weight): positive weights push towards the agent loop
+_CUES: List[Tuple[str, "re.Pattern[str]", float]] = [
+    ("greeting", re.compile(
+        r"^\s*(你好|您好|嗨|哈喽|早上好|晚上好|hi|hello|hey|good (morning|evening))[\s!！,，.。~]*$", re.I
+    ), -0.45),
+    ("thanks", re.compile(r"^\s*(谢谢|多谢|感谢|thanks|thank you|好的|ok|再见|bye)[\s!！,，.。~]*$", re.I), -0.45),
+    ("date", re.compile(r"(今天|现在).{0,4}(几号|几月|几点|日期|星期几|周几)|what (day|date|time) is|today'?s date", re.I), -0.4),
+    ("knowledge", re.compile(
+        r"什么是|是什么意思|解释|定义|原理|为什么|怎么写|如何实现|翻译|写一(首|篇|段|个)|计算|证明|"
+        r"what is|what are|explain|define|why does|how (do|does|to)|translate|write a", re.I
+    ), -0.25),
+    ("freshness", re.compile(
+        r"最新|最近|近期|实时|目前|当前|现在的|新闻|今日|今年|价格|股价|汇率|天气|比分|发布|上市|"
+        r"股市|股票|大盘|行情|比特币|加密货币|币价|涨|跌|选举|比赛|赛果|地震|事故|发生了什么|"
+        r"latest|recent|current|news|price|weather|score|released?|"
+        r"stocks?|market|bitcoin|crypto|election|earthquake|what happened", re.I
+    ), 0.35),
+    ("time", re.compile(
+        r"今天|昨天|前天|明天|今晚|今早|本周|这周|上周|下周|本月|这个月|上个月|去年|刚刚|刚才|"
+        r"today|yesterday|tomorrow|tonight|this (week|month|year)|last (night|week|month|year)|right now|"
+        r"\b20\d\d\b", re.I
+    ), 0.3),
+    # Product, API and version questions depend on documentation newer than the model
+    ("docs", re.compile(r"\bAPI\b|\bSDK\b|文档|版本|documentation|\bdocs\b|\bversion\b|\bv\d+(\.\d+)+\b", re.I), 0.35),
+    ("search", re.compile(r"搜索|搜一下|查一下|查找|查询|上网|search|look up|google", re.I), 0.5),
+    ("url", re.compile(r"https?://"), 0.5),
+]
+
+# Cues ignored when another cue matched: "why" / "explain" questions about
+# something that just happened still need a search, and a time reference in a
+# date question ("今天星期几") does not
+_SUPPRESSED_BY = {
+    "knowledge": ("time", "freshness", "docs", "search", "url"),
+    "time": ("date",),
+}
+
+# Direct answers admitting they needed live data (likely misroutes)
+_NEEDS_TOOLS_ADMISSION = re.compile(
+    r"无法(获取|访问|查询|提供)(最新|实时|当前)|没有(实时|联网)|知识截止|截至我的知识|"
+    r"real-time (information|data)|don't have access to (current|live)|as of my (last|knowledge)",
+    re.I,
+)
+
+
+class Route(str, Enum):
+    """Where a message is handled."""
+    DIRECT = "direct"
+    AGENT = "agent"
+
+
+@dataclass
+class RouteDecision:
+    """Routing decision for one message.
+    
+    Attributes:
+        route: Chosen route
+        score: Estimated probability that the message needs tools (0-1)
+        cues: Names of the cues that matched
+    """
+    route: Route
+    score: float
+    cues: List[str] = field(default_factory=list)
+
+
+class QueryRouter:
+    """Local heuristic classifier deciding whether a message needs the agent loop.
+    
+    Attributes:
+        threshold: Messages scoring below it are answered directly
+    """
+    
+    def __init__(self, threshold: float = DEFAULT_ROUTER_THRESHOLD):
+        """Initialize the router.
+        
+        Args:
+            threshold: Score below which messages are answered directly
+        """
+        self.threshold = threshold
+    
+    def score(self, message: str) -> Tuple[float, List[str]]:
+        """Score how likely a message needs tools.
+        
+        Args:
+            message: User message
+        
+        Returns:
+            Tuple of (score clamped to 0-1, names of matched cues)
+        """
+        matched = {name: weight for name, pattern, weight in _CUES if pattern.search(message)}
+        cues = [
+            name for name in matched
+            if not any(other in matched for other in _SUPPRESSED_BY.get(name, ()))
+        ]
+        score = BASE_SCORE + sum(matched[name] for name in cues)
+        return min(max(score, 0.0), 1.0), cues
+    
+    def route(self, message: str) -> RouteDecision:
+        """Decide the route of a message.
+        
+        Args:
+            message: User message
+        
+        Returns:
+            RouteDecision
+        """
+        score, cues = self.score(message)
+        route = Route.DIRECT if score < self.threshold else Route.AGENT
+        logger.info(f"🧭 路由: {route.value} (score={score:.2f}, cues={cues})")
+        return RouteDecision(route=route, score=score, cues=cues)
+
+
+class RouterStats:
+    """Process-wide routing outcomes, bucketed by score for threshold tuning.
+    
+    A decision counts as correct when an agent route actually used tools, or
+    when a direct answer did not admit that it lacked real-time information.
+    """
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        # score bucket (0.0, 0.1, ...) -> route -> [correct, total]
+        self._buckets: Dict[float, Dict[Route, List[int]]] = {}
+    
+    def record(self, decision: RouteDecision, correct: bool) -> None:
+        """Record the observed outcome of a routing decision.
+        
+        Args:
+            decision: Routing decision
+            correct: Whether the route turned out to be right
+        """
+        bucket = round(int(decision.score * 10) / 10, 1)
+        with self._lock:
+            counts = self._buckets.setdefault(bucket, {}).setdefault(decision.route, [0, 0])
+            counts[0] += int(correct)
+            counts[1] += 1
+        logger.debug(
+            f"🧭 路由结果: {decision.route.value} score={decision.score:.2f} "
+            f"{'正确' if correct else '可能错误'}"
+        )
+    
+    def record_agent_outcome(self, decision: RouteDecision, used_tools: bool) -> None:
+        """Record an agent route (correct if tools were used)."""
+        self.record(decision, correct=used_tools)
+    
+    def record_direct_outcome(self, decision: RouteDecision, answer: str) -> None:
+        """Record a direct route (correct unless the answer asks for live data)."""
+        self.record(decision, correct=not _NEEDS_TOOLS_ADMISSION.search(answer or ""))
+    
+    def summary(self) -> dict:
+        """Get routing accuracy overall, per route and per score bucket.
+        
+        Returns:
+            Dict with ``total``, ``accuracy``, ``routes`` and ``buckets``
+        """
+        with self._lock:
+            buckets = {
+                bucket: {route.value: tuple(counts) for route, counts in routes.items()}
+                for bucket, routes in sorted(self._buckets.items())
+            }
+        routes: Dict[str, List[int]] = {}
+        for per_route in buckets.values():
+            for route, (correct, total) in per_route.items():
+                counts = routes.setdefault(route, [0, 0])
+                counts[0] += correct
+                counts[1] += total
+        correct = sum(c for c, _ in routes.values())
+        total = sum(t for _, t in routes.values())
+        return {
+            "total": total,
+            "accuracy": correct / total if total else None,
+            "routes": {
+                route: {"correct": c, "total": t, "accuracy": c / t} for route, (c, t) in routes.items()
+            },
+            "buckets": buckets,
+        }
+    
+    def reset(self) -> None:
+        """Clear all recorded outcomes."""
+        with self._lock:
+            self._buckets.clear()
+
+
+_router_stats: Optional[RouterStats] = None
+
+
+def get_router_stats() -> RouterStats:
+    """Get the process-wide router statistics."""
+    global _router_stats
+    if _router_stats is None:
+        _router_stats = RouterStats()
+    return _router_stats
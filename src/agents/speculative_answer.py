@@ -0,0 +1,74 @@
+"""Answer generation started before the tool loop has finished.
+
+In dual-LLM mode the answer_llm normally starts only after the function-call
+LLM has decided it needs no more tools - one full function-call round-trip
+after the last observation. ``SpeculativeAnswer`` runs the answer stream in a
+background task as soon as the results look sufficient and buffers its steps.
+If the function-call LLM finishes, the buffered steps are replayed and the
+rest streams live; if it issues more tool calls, the speculative answer is
+cancelled (and may be restarted after the next observation).
+"""
+
+import asyncio
+import logging
+from typing import AsyncIterator, Union
+
+from src.agents.base import AgentStep
+
+logger = logging.getLogger(__name__)
+
+# Queue marker: the answer stream is exhausted
+_DONE = object()
+
+
+class SpeculativeAnswer:
+    """Background consumer of an answer step stream.
+    
+    Attributes:
+        started_at_observation: Number of observations when the answer started
+    """
+    
+    def __init__(self, steps: AsyncIterator[AgentStep], started_at_observation: int = 0):
+        """Start consuming the answer steps in a background task.
+        
+        Args:
+            steps: Answer step stream (e.g. ``_generate_answer_with_answer_llm_streaming``)
+            started_at_observation: Number of observations the answer is based on
+        """
+        self.started_at_observation = started_at_observation
+        self._queue: "asyncio.Queue[Union[AgentStep, BaseException, object]]" = asyncio.Queue()
+        self._task = asyncio.create_task(self._pump(steps))
+    
+    async def _pump(self, steps: AsyncIterator[AgentStep]) -> None:
+        try:
+            async for step in steps:
+                self._queue.put_nowait(step)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            # Re-raised to the consumer, which falls back to the non-streaming answer
+            self._queue.put_nowait(e)
+        finally:
+            self._queue.put_nowait(_DONE)
+    
+    def cancel(self) -> None:
+        """Discard the speculative answer."""
+        if not self._task.done():
+            self._task.cancel()
+    
+    async def stream(self) -> AsyncIterator[AgentStep]:
+        """Yield the buffered steps, then the remaining ones as they arrive.
+        
+        Raises:
+            Exception: The error raised by the answer stream, if any
+        """
+        try:
+            while True:
+                item = await self._queue.get()
+                if item is _DONE:
+                    return
+                if isinstance(item, BaseException):
+                    raise item
+                yield item
+        finally:
+            self.cancel()
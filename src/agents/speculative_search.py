@@ -0,0 +1,190 @@
+"""Speculative web searches launched from streaming tool-call arguments.
+
+While the function-call LLM streams a ``web_search`` call, the ``query``
+argument is usually complete well before the message ends and LangGraph
+dispatches the tool. ``SpeculativeSearch`` watches the tool-call argument
+deltas (as a callback handler of the run) and starts the search as soon as
+the ``query`` JSON string is closed. ``SearchTool`` then reuses the running
+search via ``configurable["speculative_search"]``; searches whose final call
+differs are cancelled when the LLM call ends. Speculative searches take the
+same per-session and process-wide tool slots as tool calls, and queries the
+tool memo already holds are not launched.
+"""
+
+import asyncio
+import json
+import logging
+import re
+from typing import Any, Dict, Optional, Tuple
+from uuid import UUID
+
+from langchain_core.callbacks import AsyncCallbackHandler
+from langchain_core.messages import AIMessageChunk
+from langchain_core.outputs import LLMResult
+
+from src.agents.agent_graph import DEFAULT_GLOBAL_MAX_PARALLEL_TOOLS, tool_slot
+
+logger = logging.getLogger(__name__)
+
+# A complete JSON string value of the "query" key
+_QUERY_PATTERN = re.compile(r'"query"\s*:\s*"((?:[^"\\]|\\.)*)"')
+
+
+def extract_closed_query(args: str) -> Optional[str]:
+    """Return the ``query`` value once its JSON string is closed in partial arguments.
+    
+    Args:
+        args: Tool-call arguments streamed so far (possibly incomplete JSON)
+    
+    Returns:
+        Decoded query, or None while the value is still open
+    """
+    match = _QUERY_PATTERN.search(args)
+    if match is None:
+        return None
+    try:
+        return json.loads(f'"{match.group(1)}"')
+    except ValueError:
+        return None
+
+
+class _PendingCall:
+    """Tool call being streamed: accumulated arguments and its speculative search."""
+    
+    __slots__ = ("name", "args", "query", "task")
+    
+    def __init__(self):
+        self.name = ""
+        self.args = ""
+        self.query: Optional[str] = None
+        self.task: Optional[asyncio.Task] = None
+
+
+class SpeculativeSearch(AsyncCallbackHandler):
+    """Per-run handler that starts searches before the tool node runs.
+    
+    Attributes:
+        search_tool: SearchTool whose service runs the searches
+        tool_semaphore: Per-session tool semaphore the searches wait for
+        tool_memo: ToolMemo of the session (memoized queries are not launched)
+        global_max_parallel_tools: Process-wide tool concurrency limit
+        launched: Number of speculative searches started
+        reused: Number of speculative searches taken by the tool
+        cancelled: Number of speculative searches cancelled
+    """
+    
+    def __init__(
+        self,
+        search_tool: Any,
+        tool_semaphore: Optional[asyncio.Semaphore] = None,
+        tool_memo: Optional[Any] = None,
+        global_max_parallel_tools: int = DEFAULT_GLOBAL_MAX_PARALLEL_TOOLS,
+    ):
+        """Initialize the handler.
+        
+        Args:
+            search_tool: SearchTool of the session
+            tool_semaphore: Per-session tool semaphore (None for no limit)
+            tool_memo: ToolMemo of the session
+            global_max_parallel_tools: Process-wide tool concurrency limit
+        """
+        self.search_tool = search_tool
+        self.tool_semaphore = tool_semaphore
+        self.tool_memo = tool_memo
+        self.global_max_parallel_tools = global_max_parallel_tools
+        self.launched = 0
+        self.reused = 0
+        self.cancelled = 0
+        # (LLM run id, tool-call index) -> call being streamed
+        self._calls: Dict[Tuple[UUID, int], _PendingCall] = {}
+        # query -> search confirmed by the final tool calls, waiting for the tool
+        self._ready: Dict[str, asyncio.Task] = {}
+    
+    async def on_llm_new_token(
+        self,
+        token: str,
+        *,
+        chunk: Any = None,
+        run_id: UUID,
+        **kwargs: Any,
+    ) -> None:
+        """Accumulate tool-call argument deltas and launch closed queries."""
+        message = getattr(chunk, "message", None)
+        if not isinstance(message, AIMessageChunk):
+            return
+        for tool_chunk in message.tool_call_chunks:
+            index = tool_chunk.get("index") or 0
+            call = self._calls.setdefault((run_id, index), _PendingCall())
+            call.name += tool_chunk.get("name") or ""
+            call.args += tool_chunk.get("args") or ""
+            if call.task is None and call.name == self.search_tool.name:
+                call.query = extract_closed_query(call.args)
+                if call.query and not self._is_memoized(call.query):
+                    call.task = asyncio.create_task(self._search(call.query))
+                    self.launched += 1
+                    logger.info(f"⚡ 预先启动搜索: {call.query}")
+    
+    def _is_memoized(self, query: str) -> bool:
+        return self.tool_memo is not None and self.tool_memo.contains(self.search_tool.name, {"query": query})
+    
+    async def _search(self, query: str):
+        # Launched before the tool calls of the same message, so in the FIFO
+        # semaphores a speculative search never waits behind the tool taking it
+        async with tool_slot(self.tool_semaphore, self.global_max_parallel_tools):
+            return await self.search_tool.search_service.search(query)
+    
+    async def on_llm_end(self, response: LLMResult, *, run_id: UUID, **kwargs: Any) -> None:
+        """Keep searches matching the final tool calls, cancel the others."""
+        final_queries = set()
+        for generations in response.generations:
+            for generation in generations:
+                for tool_call in getattr(getattr(generation, "message", None), "tool_calls", None) or []:
+                    if tool_call["name"] == self.search_tool.name:
+                        final_queries.add(tool_call["args"].get("query"))
+        
+        for key in [key for key in self._calls if key[0] == run_id]:
+            call = self._calls.pop(key)
+            if call.task is None:
+                continue
+            if call.query in final_queries and call.query not in self._ready:
+                self._ready[call.query] = call.task
+            else:
+                self._cancel(call.task, call.query)
+    
+    async def on_llm_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:
+        """Cancel the searches of a failed LLM call."""
+        for key in [key for key in self._calls if key[0] == run_id]:
+            call = self._calls.pop(key)
+            if call.task is not None:
+                self._cancel(call.task, call.query)
+    
+    def take(self, query: str) -> Optional[asyncio.Task]:
+        """Take the speculative search for a query, if one was started.
+        
+        Args:
+            query: Query of the tool call being executed
+        
+        Returns:
+            Task resolving to the SearchResponse, or None
+        """
+        task = self._ready.pop(query, None)
+        if task is not None:
+            self.reused += 1
+            logger.info(f"♻️ 复用预先启动的搜索: {query}")
+        return task
+    
+    def cancel_pending(self) -> None:
+        """Cancel all searches not taken by the tool (call at the end of the run)."""
+        for call in self._calls.values():
+            if call.task is not None:
+                self._cancel(call.task, call.query)
+        for query, task in self._ready.items():
+            self._cancel(task, query)
+        self._calls.clear()
+        self._ready.clear()
+    
+    def _cancel(self, task: asyncio.Task, query: Optional[str]) -> None:
+        if not task.done():
+            task.cancel()
+            self.cancelled += 1
+            logger.debug(f"🚫 取消预先启动的搜索: {query}")
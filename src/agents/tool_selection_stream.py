@@ -0,0 +1,111 @@
+"""Incremental rendering of the function-call LLM's output while it streams.
+
+With ``stream_mode="messages"`` LangGraph forwards every ``AIMessageChunk`` of
+the agent node as it arrives. ``ToolSelectionStream`` folds those chunks into
+the reasoning and tool-selection text shown in the UI, so users see activity
+within the model's first-token time instead of after the whole tool-selection
+completion.
+"""
+
+import json
+from typing import Dict, List, Optional, Set
+
+from langchain_core.messages import AIMessage, AIMessageChunk
+
+from src.agents.base import AgentStep
+
+REASONING = "reasoning"
+TOOL_SELECTION = "tool_selection"
+
+
+class ToolSelectionStream:
+    """Accumulates the chunks of the function-call LLM message being streamed.
+    
+    Reasoning deltas (DeepSeek ``reasoning_content``) are forwarded right away.
+    Text content is only shown once the message starts a tool call: without
+    tool calls it is the final answer, which is handled after the graph ends.
+    Each emitted step carries the full text so far, matching how the UI
+    replaces the thinking step output.
+    """
+    
+    def __init__(self):
+        self.message_id: Optional[str] = None
+        self.reasoning = ""
+        self.content = ""
+        self.tool_calls: Dict[int, Dict[str, str]] = {}
+        # message id -> parts already shown while streaming
+        self._streamed: Dict[str, Set[str]] = {}
+    
+    def feed(self, chunk: AIMessageChunk) -> List[AgentStep]:
+        """Add a chunk and return the steps to show for it.
+        
+        Args:
+            chunk: Message chunk from the agent node
+        
+        Returns:
+            Reasoning steps with the accumulated text (possibly empty)
+        """
+        if chunk.id != self.message_id:
+            self._start(chunk.id)
+        
+        steps = []
+        reasoning = chunk.additional_kwargs.get("reasoning_content")
+        if reasoning:
+            self.reasoning += reasoning
+            self._mark(REASONING)
+            steps.append(AgentStep(
+                type="reasoning",
+                content=self.reasoning,
+                metadata={
+                    "reasoning_type": "deepseek_internal",
+                    "is_deepseek_reasoning": True,
+                    "streaming": True,
+                },
+            ))
+        
+        text = chunk.content if isinstance(chunk.content, str) else ""
+        self.content += text
+        for tool_chunk in chunk.tool_call_chunks:
+            index = tool_chunk.get("index")
+            if index is None:
+                index = len(self.tool_calls)
+            entry = self.tool_calls.setdefault(index, {"name": "", "args": ""})
+            entry["name"] += tool_chunk.get("name") or ""
+            entry["args"] += tool_chunk.get("args") or ""
+        
+        if self.tool_calls and (text or chunk.tool_call_chunks):
+            self._mark(TOOL_SELECTION)
+            steps.append(AgentStep(
+                type="reasoning",
+                content=self._render_tool_selection(),
+                metadata={"reasoning_type": TOOL_SELECTION, "streaming": True},
+            ))
+        return steps
+    
+    def was_streamed(self, msg: AIMessage, part: str) -> bool:
+        """Whether a part ("reasoning" or "tool_selection") of a message was already shown."""
+        return part in self._streamed.get(msg.id, ())
+    
+    def _start(self, message_id: Optional[str]) -> None:
+        self.message_id = message_id
+        self.reasoning = ""
+        self.content = ""
+        self.tool_calls = {}
+    
+    def _mark(self, part: str) -> None:
+        if self.message_id is not None:
+            self._streamed.setdefault(self.message_id, set()).add(part)
+    
+    def _render_tool_selection(self) -> str:
+        lines = [self.content.strip()] if self.content.strip() else []
+        for entry in self.tool_calls.values():
+            lines.append(f"🔧 {entry['name'] or '...'}: {_format_partial_args(entry['args'])}")
+        return "\n\n".join(lines)
+
+
+def _format_partial_args(args: str) -> str:
+    """Show tool arguments compactly once complete, verbatim while partial."""
+    try:
+        return json.dumps(json.loads(args), ensure_ascii=False)
+    except ValueError:
+        return args
@@ -1,8 +1,9 @@
 """Tools for LangChain Agents."""
 
-from src.agents.tools.search_tool import SearchTool, create_search_tool
+from src.agents.tools.search_tool import SearchArtifact, SearchTool, create_search_tool
 
 __all__ = [
+    "SearchArtifact",
     "SearchTool",
     "create_search_tool",
 ]
@@ -1,13 +1,16 @@
 """Search tool for LangChain Agent."""
 
 import logging
-from typing import Any, Optional, Type
+from dataclasses import dataclass
+from typing import Any, List, Optional, Tuple, Type
 
 from langchain.tools import BaseTool
+from langchain_core.runnables import RunnableConfig
 from pydantic import BaseModel, Field
 
 from src.search.search_service import SearchService
 from src.search.models import SearchResult
+from src.search.global_citation_manager import current_citation_ticket
 
 logger = logging.getLogger(__name__)
 
@@ -20,6 +23,52 @@ class SearchInput(BaseModel):
     )
 
 
+@dataclass
+class SearchArtifact:
+    """Structured outcome of one search, attached to its ToolMessage.
+    
+    The tool returns content and artifact: the model reads the compact
+    observation text, while the answer phase builds its own context from the
+    artifact (full result content, citation numbers) instead of re-parsing it.
+    
+    Attributes:
+        query: Search query
+        results: Search results in citation order
+        first_number: Citation number of the first result (local numbering
+            starts at 1 when no citation manager is used)
+    """
+    
+    query: str
+    results: List[SearchResult]
+    first_number: int = 1
+    
+    def numbered(self) -> List[Tuple[int, SearchResult]]:
+        """Get the results with their citation numbers."""
+        return [(self.first_number + i, result) for i, result in enumerate(self.results)]
+    
+    @classmethod
+    def from_value(cls, value: Any) -> Optional["SearchArtifact"]:
+        """Get the artifact from a ToolMessage artifact.
+        
+        Messages restored from a checkpoint carry the artifact as a plain dict.
+        
+        Args:
+            value: ToolMessage artifact
+        
+        Returns:
+            SearchArtifact, or None if the value is not a search artifact
+        """
+        if isinstance(value, cls):
+            return value
+        if isinstance(value, dict) and "query" in value and "results" in value:
+            results = [r if isinstance(r, SearchResult) else SearchResult(**r) for r in value["results"]]
+            return cls(query=value["query"], results=results, first_number=value.get("first_number", 1))
+        return None
+
+
+SearchOutput = Tuple[str, Optional[SearchArtifact]]
+
+
 class SearchTool(BaseTool):
     """Web search tool for Agent.
     
@@ -32,7 +81,14 @@ class SearchTool(BaseTool):
         args_schema: Input schema (Pydantic model)
         search_service: SearchService instance
         citation_manager: Optional GlobalCitationManager for Agent mode
+            (the run config's ``configurable["citation_manager"]`` takes precedence,
+            so one tool instance can serve many sessions)
+        (``configurable["speculative_search"]`` may hold a SpeculativeSearch whose
+        already running search is reused for the same query, and
+        ``configurable["tool_memo"]`` a ToolMemo answering repeated searches)
         return_direct: Whether to return result directly (False for Agent)
+        response_format: Tool calls return a ToolMessage whose artifact is a
+            SearchArtifact (None for errors and empty results)
     """
     
     name: str = "web_search"
@@ -46,12 +102,18 @@ class SearchTool(BaseTool):
     search_service: SearchService = Field(exclude=True)
     citation_manager: Optional[Any] = Field(default=None, exclude=True)  # GlobalCitationManager
     return_direct: bool = False
+    response_format: str = "content_and_artifact"
     
     class Config:
         """Pydantic config."""
         arbitrary_types_allowed = True
     
-    def _run(self, query: str) -> str:
+    def _get_citation_manager(self, config: Optional[RunnableConfig]) -> Optional[Any]:
+        """Get the citation manager of the current run (falls back to the instance field)."""
+        configurable = (config or {}).get("configurable") or {}
+        return configurable.get("citation_manager") or self.citation_manager
+    
+    def _run(self, query: str, config: RunnableConfig = None) -> SearchOutput:
         """Execute search synchronously.
         
         Note: SearchService uses async operations, so this method uses asyncio.run
@@ -59,9 +121,10 @@ class SearchTool(BaseTool):
         
         Args:
             query: Search query string
+            config: Run config (injected by LangChain)
             
         Returns:
-            Formatted search results as string
+            Formatted search results and their SearchArtifact
         """
         import asyncio
         try:
@@ -73,7 +136,7 @@ class SearchTool(BaseTool):
                     # If we're already in an async context, we can't use run()
                     # This shouldn't happen in LangChain Agent, but handle it gracefully
                     logger.warning("⚠️ 同步调用在异步上下文中，应该使用 _arun 方法")
-                    return "搜索工具需要在异步上下文中使用。请使用异步方法。"
+                    return "搜索工具需要在异步上下文中使用。请使用异步方法。", None
             except RuntimeError:
                 # No event loop running, we can create one
                 pass
@@ -82,71 +145,144 @@ class SearchTool(BaseTool):
             search_response = asyncio.run(self.search_service.search(query))
             
             if not search_response or search_response.is_empty():
-                return "未找到相关搜索结果。请尝试使用不同的关键词或基于已有知识回答。"
+                return "未找到相关搜索结果。请尝试使用不同的关键词或基于已有知识回答。", None
             
             # Extract results from SearchResponse
             results = search_response.results if search_response.results else []
             
             if not results:
-                return "未找到相关搜索结果。请尝试使用不同的关键词或基于已有知识回答。"
+                return "未找到相关搜索结果。请尝试使用不同的关键词或基于已有知识回答。", None
             
             # Format results for Agent
-            formatted = self._format_results(results, query=query)
+            citation_manager = self._get_citation_manager(config)
+            number_range = citation_manager.add_search_results(results, query) if citation_manager else None
+            formatted = self.format_results(
+                results, query=query, number_range=number_range, citation_manager=citation_manager
+            )
             logger.info(f"✅ 搜索完成，找到 {len(results)} 条结果")
-            return formatted
+            return formatted, self.build_artifact(results, query, number_range)
             
         except Exception as e:
             logger.error(f"❌ 搜索工具执行失败: {e}", exc_info=True)
-            return f"搜索失败: {str(e)}。请尝试重新搜索或基于已有知识回答。"
+            return f"搜索失败: {str(e)}。请尝试重新搜索或基于已有知识回答。", None
     
-    async def _arun(self, query: str) -> str:
+    async def _arun(self, query: str, config: RunnableConfig = None) -> SearchOutput:
         """Execute search asynchronously.
         
         Args:
             query: Search query string
+            config: Run config (injected by LangChain)
             
         Returns:
-            Formatted search results as string
+            Formatted search results and their SearchArtifact
         """
         try:
             logger.info(f"🔍 Agent 调用搜索工具 (异步): {query}")
-            # SearchService.search is already async, use it directly
-            search_response = await self.search_service.search(query)
+            configurable = (config or {}).get("configurable") or {}
+            citation_manager = self._get_citation_manager(config)
+            
+            # An equivalent earlier search of this conversation is reused
+            tool_memo = configurable.get("tool_memo")
+            memoized = tool_memo.get(self.name, {"query": query}) if tool_memo is not None else None
+            if memoized is not None:
+                search_response, observation, number_range = memoized
+                if citation_manager and citation_manager.holds_results(search_response.results, number_range):
+                    # Its results still carry the same citation numbers
+                    return observation, self.build_artifact(search_response.results, query, number_range)
+            else:
+                # Reuse a search started while the tool call was still streaming
+                speculative_search = configurable.get("speculative_search")
+                task = speculative_search.take(query) if speculative_search else None
+                if task is not None:
+                    search_response = await task
+                else:
+                    # SearchService.search is already async, use it directly
+                    search_response = await self.search_service.search(query)
             
             if not search_response or search_response.is_empty():
-                return "未找到相关搜索结果。请尝试使用不同的关键词或基于已有知识回答。"
+                return "未找到相关搜索结果。请尝试使用不同的关键词或基于已有知识回答。", None
             
             # Extract results from SearchResponse
             results = search_response.results if search_response.results else []
             
             if not results:
-                return "未找到相关搜索结果。请尝试使用不同的关键词或基于已有知识回答。"
+                return "未找到相关搜索结果。请尝试使用不同的关键词或基于已有知识回答。", None
+            
+            # Parallel searches in one agent step are numbered in call order
+            number_range = None
+            ticket = current_citation_ticket.get()
+            if citation_manager and ticket is not None:
+                number_range = await citation_manager.add_search_results_in_order(
+                    results, query, ticket
+                )
+            elif citation_manager:
+                number_range = citation_manager.add_search_results(results, query)
             
             # Format results for Agent
-            formatted = self._format_results(results, query=query)
+            formatted = self.format_results(
+                results, query=query, number_range=number_range, citation_manager=citation_manager
+            )
+            if tool_memo is not None:
+                tool_memo.put(
+                    self.name, {"query": query}, (search_response, formatted, number_range),
+                    ttl=tool_memo.ttl_for(self.name),
+                )
             logger.info(f"✅ 搜索完成，找到 {len(results)} 条结果")
-            return formatted
+            return formatted, self.build_artifact(results, query, number_range)
             
         except Exception as e:
             logger.error(f"❌ 搜索工具执行失败: {e}", exc_info=True)
-            return f"搜索失败: {str(e)}。请尝试重新搜索或基于已有知识回答。"
+            return f"搜索失败: {str(e)}。请尝试重新搜索或基于已有知识回答。", None
     
-    def _format_results(self, results: list[SearchResult], query: str = "") -> str:
+    @staticmethod
+    def build_artifact(
+        results: list[SearchResult],
+        query: str,
+        number_range: Optional[Tuple[int, int]] = None,
+    ) -> SearchArtifact:
+        """Build the artifact of a search.
+        
+        Args:
+            results: List of SearchResult objects
+            query: Search query string
+            number_range: Global numbers assigned to the results (None for local numbering)
+        
+        Returns:
+            SearchArtifact for the answer phase
+        """
+        first_number = number_range[0] if number_range else 1
+        return SearchArtifact(query=query, results=list(results), first_number=first_number)
+    
+    def format_results(
+        self,
+        results: list[SearchResult],
+        query: str = "",
+        number_range: Optional[Tuple[int, int]] = None,
+        citation_manager: Optional[Any] = None
+    ) -> str:
         """Format search results for Agent consumption.
         
+        Also used by agents that run searches themselves (plan-and-execute),
+        so their observations match the tool's.
+        
         Args:
             results: List of SearchResult objects
             query: Search query string (for citation manager)
+            number_range: Global numbers already assigned to these results
+                (if None, they are added to the citation manager here)
+            citation_manager: GlobalCitationManager of the run (defaults to the instance field)
             
         Returns:
             Formatted string with numbered results
         """
         formatted_parts = ["搜索结果:\n"]
         
+        citation_manager = citation_manager or self.citation_manager
+        
         # If we have a citation manager (Agent mode), use global numbering
-        if self.citation_manager:
+        if citation_manager:
             # Add results to citation manager and get global number range
-            start_num, end_num = self.citation_manager.add_search_results(results, query)
+            start_num, end_num = number_range or citation_manager.add_search_results(results, query)
             
             # Use global numbers in formatting
             for i, result in enumerate(results):
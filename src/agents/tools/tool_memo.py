@@ -0,0 +1,139 @@
+"""Per-conversation memo of tool results.
+
+Within one agent run, and across turns of the same conversation, the model
+often repeats a tool call with identical or trivially different arguments
+("OpenAI news" vs. "openai  news "). ``ToolMemo`` keys results by tool name
+and normalized arguments so tools can return the earlier result instead of
+executing again. It lives on the agent (one per conversation) and reaches
+the tools through the run config's ``configurable["tool_memo"]``.
+"""
+
+import json
+import logging
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from src.config.tool_memo_config import ToolMemoConfig, get_tool_memo_config
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_args(args: Dict[str, Any]) -> str:
+    """Normalize tool arguments into a stable key.
+    
+    Strings are case-folded with whitespace collapsed, None values dropped
+    and keys sorted.
+    
+    Args:
+        args: Tool arguments
+    
+    Returns:
+        JSON string identifying the arguments
+    """
+    def normalize(value: Any) -> Any:
+        if isinstance(value, str):
+            return " ".join(value.split()).casefold()
+        if isinstance(value, dict):
+            return {k: normalize(v) for k, v in value.items() if v is not None}
+        if isinstance(value, (list, tuple)):
+            return [normalize(v) for v in value]
+        return value
+    
+    return json.dumps(normalize(args), sort_keys=True, ensure_ascii=False, default=str)
+
+
+@dataclass
+class MemoEntry:
+    """A memoized tool result.
+    
+    Attributes:
+        value: What the tool stored (e.g. observation text, search response)
+        expires_at: Monotonic time after which the entry is stale
+    """
+    value: Any
+    expires_at: float
+
+
+class ToolMemo:
+    """LRU memo of tool results with per-tool TTLs.
+    
+    Attributes:
+        config: Memo configuration (TTLs, cacheability, size)
+        hits: Number of lookups answered from the memo
+        misses: Number of lookups that had to execute the tool
+    """
+    
+    def __init__(
+        self,
+        config: Optional[ToolMemoConfig] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        """Initialize the memo.
+        
+        Args:
+            config: Memo configuration (defaults to environment settings)
+            clock: Monotonic time source (injectable for tests)
+        """
+        self.config = config or get_tool_memo_config()
+        self._clock = clock
+        self._entries: "OrderedDict[Tuple[str, str], MemoEntry]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+    
+    def ttl_for(self, tool_name: str, cacheable_by_default: bool = True) -> float:
+        """Get the TTL of a tool's results (0 if they are not memoized)."""
+        return self.config.ttl_for(tool_name, cacheable_by_default)
+    
+    def get(self, tool_name: str, args: Dict[str, Any]) -> Optional[Any]:
+        """Look up a memoized result.
+        
+        Args:
+            tool_name: Tool name
+            args: Tool arguments
+        
+        Returns:
+            The stored value, or None if absent or expired
+        """
+        key = (tool_name, normalize_args(args))
+        entry = self._entries.get(key)
+        if entry is not None and entry.expires_at <= self._clock():
+            del self._entries[key]
+            entry = None
+        if entry is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        logger.info(f"♻️ 复用工具结果: {tool_name} {key[1]}")
+        return entry.value
+    
+    def contains(self, tool_name: str, args: Dict[str, Any]) -> bool:
+        """Check for an unexpired result without counting a hit or miss."""
+        entry = self._entries.get((tool_name, normalize_args(args)))
+        return entry is not None and entry.expires_at > self._clock()
+    
+    def put(self, tool_name: str, args: Dict[str, Any], value: Any, ttl: float) -> None:
+        """Memoize a result.
+        
+        Args:
+            tool_name: Tool name
+            args: Tool arguments
+            value: Value to return for equivalent calls
+            ttl: Seconds the value stays valid (ignored if not positive)
+        """
+        if ttl <= 0:
+            return
+        key = (tool_name, normalize_args(args))
+        self._entries[key] = MemoEntry(value=value, expires_at=self._clock() + ttl)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.config.max_entries:
+            self._entries.popitem(last=False)
+    
+    def clear(self) -> None:
+        """Forget all memoized results."""
+        self._entries.clear()
+    
+    def __len__(self) -> int:
+        return len(self._entries)
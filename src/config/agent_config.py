@@ -2,6 +2,7 @@
 
 import json
 import os
+from enum import Enum
 from typing import Optional, Tuple
 
 from pydantic import BaseModel, Field, field_validator
@@ -11,6 +12,41 @@ from ..models.base import BaseModelWrapper
 from langchain_core.language_models import BaseChatModel
 
 
+class AnswerPolicy(str, Enum):
+    """How single-LLM mode produces the final answer.
+    
+    - direct: stream the graph's own final answer (re-synthesize only if empty)
+    - auto: like direct, but re-synthesize when tool results exist and the
+      answer cites none of them
+    - resynthesize: always run a separate answer phase after the tool loop
+    """
+    DIRECT = "direct"
+    AUTO = "auto"
+    RESYNTHESIZE = "resynthesize"
+
+
+class AgentType(str, Enum):
+    """Which agent handles Agent mode.
+    
+    - react: ReAct loop, one function-call round-trip per tool iteration
+    - plan_execute: one planning call, parallel searches, one answer call
+    """
+    REACT = "react"
+    PLAN_EXECUTE = "plan_execute"
+
+
+class CheckpointBackend(str, Enum):
+    """Where agent graph runs are checkpointed.
+    
+    - none: no checkpoints (a fallback re-runs the whole graph)
+    - memory: in-process saver, fallbacks resume the interrupted run
+    - sqlite: SQLite file, checkpoints also survive worker restarts
+    """
+    NONE = "none"
+    MEMORY = "memory"
+    SQLITE = "sqlite"
+
+
 class AgentConfig(BaseModel):
     """Configuration for Agent mode.
     
@@ -21,6 +57,32 @@ class AgentConfig(BaseModel):
         enable_cache: Whether to enable search result caching
         function_call_model_config: Optional model config JSON string for function calling LLM
         answer_model_config: Optional model config JSON string for answer generation LLM
+        max_parallel_tools: Maximum concurrent tool calls per session (agent step)
+        global_max_parallel_tools: Maximum concurrent tool calls across all sessions
+        speculative_search: Start web searches while the tool call is still streaming
+        speculative_answer: Start the answer_llm before the tool loop ends (dual LLM mode)
+        answer_policy: How single-LLM mode produces the final answer
+        router_enabled: Answer messages needing no tools directly, bypassing the agent loop
+        router_threshold: Router score below which messages are answered directly
+        agent_type: Which agent handles Agent mode
+        max_plan_queries: Maximum searches planned per turn (plan_execute agent)
+        verbatim_tool_steps: Latest tool steps whose observations reach the
+            function-call LLM verbatim (older ones are sent as digests)
+        max_iteration_tokens: Token ceiling of the messages sent per ReAct
+            iteration (0 = only the context window)
+        checkpoint_backend: Where ReAct graph runs are checkpointed
+        checkpoint_path: SQLite file of the sqlite checkpoint backend
+        multi_turn: Keep the ReAct graph state of the whole conversation
+            (needs a checkpoint backend)
+        conversation_max_tokens: Token budget of the earlier turns kept in
+            the graph state (oldest turns are removed first)
+        answer_reserve_time: Seconds of max_execution_time kept for the answer;
+            the tool loop stops once less time than this is left
+        event_buffer_size: Unread steps buffered per event bus subscriber
+            (token steps are coalesced and take no extra slots)
+        event_max_lag: Seconds the agent waits for a full subscriber buffer
+            before it stops waiting (the buffer then grows until the
+            subscriber catches up)
     """
     
     max_iterations: int = Field(
@@ -57,6 +119,111 @@ class AgentConfig(BaseModel):
         description="JSON string for answer generation model configuration (provider, model_name, etc.)"
     )
     
+    max_parallel_tools: int = Field(
+        default=4,
+        ge=1,
+        le=16,
+        description="Maximum concurrent tool calls per session"
+    )
+    
+    global_max_parallel_tools: int = Field(
+        default=16,
+        ge=1,
+        description="Maximum concurrent tool calls across all sessions"
+    )
+    
+    speculative_search: bool = Field(
+        default=True,
+        description="Start web searches as soon as the streamed query argument is complete"
+    )
+    
+    speculative_answer: bool = Field(
+        default=False,
+        description="Start answer generation once results look sufficient (dual LLM mode)"
+    )
+    
+    answer_policy: AnswerPolicy = Field(
+        default=AnswerPolicy.DIRECT,
+        description="How single-LLM mode produces the final answer"
+    )
+    
+    router_enabled: bool = Field(
+        default=False,
+        description="Answer messages needing no tools directly, bypassing the agent loop"
+    )
+    
+    router_threshold: float = Field(
+        default=0.35,
+        ge=0.0,
+        le=1.0,
+        description="Router score below which messages are answered directly"
+    )
+    
+    agent_type: AgentType = Field(
+        default=AgentType.REACT,
+        description="Which agent handles Agent mode"
+    )
+    
+    max_plan_queries: int = Field(
+        default=4,
+        ge=1,
+        le=8,
+        description="Maximum searches planned per turn (plan_execute agent)"
+    )
+    
+    verbatim_tool_steps: int = Field(
+        default=1,
+        ge=0,
+        le=10,
+        description="Latest tool steps whose observations are sent verbatim"
+    )
+    
+    max_iteration_tokens: int = Field(
+        default=16000,
+        ge=0,
+        description="Token ceiling of the messages sent per ReAct iteration (0 = context window)"
+    )
+    
+    checkpoint_backend: CheckpointBackend = Field(
+        default=CheckpointBackend.MEMORY,
+        description="Where ReAct graph runs are checkpointed"
+    )
+    
+    checkpoint_path: str = Field(
+        default="data/agent_checkpoints.sqlite",
+        description="SQLite file of the sqlite checkpoint backend"
+    )
+    
+    multi_turn: bool = Field(
+        default=True,
+        description="Keep the ReAct graph state of the whole conversation"
+    )
+    
+    conversation_max_tokens: int = Field(
+        default=24000,
+        ge=1000,
+        description="Token budget of the earlier turns kept in the graph state"
+    )
+    
+    answer_reserve_time: float = Field(
+        default=15.0,
+        ge=0.0,
+        le=120.0,
+        description="Seconds of max_execution_time kept for generating the answer"
+    )
+    
+    event_buffer_size: int = Field(
+        default=64,
+        ge=1,
+        description="Unread steps buffered per event bus subscriber"
+    )
+    
+    event_max_lag: float = Field(
+        default=5.0,
+        gt=0.0,
+        description="Seconds the agent waits for a slow event bus subscriber"
+    )
+    
     @field_validator("max_iterations")
     @classmethod
     def validate_max_iterations(cls, v: int) -> int:
@@ -107,6 +274,24 @@ def get_agent_config() -> AgentConfig:
         AGENT_ENABLE_CACHE: Whether to enable search result caching (default: true)
         AGENT_FUNCTION_CALL_MODEL: JSON string for function call model config (optional)
         AGENT_ANSWER_MODEL: JSON string for answer generation model config (optional)
+        AGENT_MAX_PARALLEL_TOOLS: Concurrent tool calls per session (default: 4)
+        AGENT_GLOBAL_MAX_PARALLEL_TOOLS: Concurrent tool calls across sessions (default: 16)
+        AGENT_SPECULATIVE_SEARCH: Start searches from streaming tool calls (default: true)
+        AGENT_SPECULATIVE_ANSWER: Start the answer before the tool loop ends (default: false)
+        AGENT_ANSWER_POLICY: direct, auto or resynthesize (default: direct)
+        AGENT_ROUTER_ENABLED: Answer messages needing no tools directly (default: false)
+        AGENT_ROUTER_THRESHOLD: Router score below which messages skip the agent loop (default: 0.35)
+        AGENT_TYPE: react or plan_execute (default: react)
+        AGENT_MAX_PLAN_QUERIES: Searches planned per turn by plan_execute (default: 4)
+        AGENT_VERBATIM_TOOL_STEPS: Latest tool steps sent verbatim, older ones as digests (default: 1)
+        AGENT_MAX_ITERATION_TOKENS: Token ceiling per ReAct iteration, 0 = context window (default: 16000)
+        AGENT_CHECKPOINT_BACKEND: none, memory or sqlite (default: memory)
+        AGENT_CHECKPOINT_PATH: SQLite checkpoint file (default: data/agent_checkpoints.sqlite)
+        AGENT_MULTI_TURN: Keep the graph state across turns of a conversation (default: true)
+        AGENT_CONVERSATION_MAX_TOKENS: Token budget of earlier turns in the graph state (default: 24000)
+        AGENT_ANSWER_RESERVE_TIME: Seconds of the run kept for the answer (default: 15)
+        AGENT_EVENT_BUFFER_SIZE: Unread steps buffered per event bus subscriber (default: 64)
+        AGENT_EVENT_MAX_LAG: Seconds to wait for a slow event bus subscriber (default: 5)
     """
     return AgentConfig(
         max_iterations=int(os.getenv("AGENT_MAX_ITERATIONS", "10")),
@@ -115,6 +300,24 @@ def get_agent_config() -> AgentConfig:
         enable_cache=os.getenv("AGENT_ENABLE_CACHE", "true").lower() == "true",
         function_call_model_config=os.getenv("AGENT_FUNCTION_CALL_MODEL"),
         answer_model_config=os.getenv("AGENT_ANSWER_MODEL"),
+        max_parallel_tools=int(os.getenv("AGENT_MAX_PARALLEL_TOOLS", "4")),
+        global_max_parallel_tools=int(os.getenv("AGENT_GLOBAL_MAX_PARALLEL_TOOLS", "16")),
+        speculative_search=os.getenv("AGENT_SPECULATIVE_SEARCH", "true").lower() == "true",
+        speculative_answer=os.getenv("AGENT_SPECULATIVE_ANSWER", "false").lower() == "true",
+        answer_policy=AnswerPolicy(os.getenv("AGENT_ANSWER_POLICY", "direct").lower()),
+        router_enabled=os.getenv("AGENT_ROUTER_ENABLED", "false").lower() == "true",
+        router_threshold=float(os.getenv("AGENT_ROUTER_THRESHOLD", "0.35")),
+        agent_type=AgentType(os.getenv("AGENT_TYPE", "react").lower()),
+        max_plan_queries=int(os.getenv("AGENT_MAX_PLAN_QUERIES", "4")),
+        verbatim_tool_steps=int(os.getenv("AGENT_VERBATIM_TOOL_STEPS", "1")),
+        max_iteration_tokens=int(os.getenv("AGENT_MAX_ITERATION_TOKENS", "16000")),
+        checkpoint_backend=CheckpointBackend(os.getenv("AGENT_CHECKPOINT_BACKEND", "memory").lower()),
+        checkpoint_path=os.getenv("AGENT_CHECKPOINT_PATH", "data/agent_checkpoints.sqlite"),
+        multi_turn=os.getenv("AGENT_MULTI_TURN", "true").lower() == "true",
+        conversation_max_tokens=int(os.getenv("AGENT_CONVERSATION_MAX_TOKENS", "24000")),
+        answer_reserve_time=float(os.getenv("AGENT_ANSWER_RESERVE_TIME", "15")),
+        event_buffer_size=int(os.getenv("AGENT_EVENT_BUFFER_SIZE", "64")),
+        event_max_lag=float(os.getenv("AGENT_EVENT_MAX_LAG", "5")),
     )
 
 
@@ -0,0 +1,49 @@
+"""Conversation memory configuration management."""
+
+import os
+
+from dotenv import load_dotenv
+from pydantic import BaseModel, Field
+
+# Load environment variables
+load_dotenv()
+
+
+class MemoryConfig(BaseModel):
+    """Configuration for multi-turn chat memory.
+    
+    Attributes:
+        enabled: Whether previous turns are sent to the model in Chat mode
+        max_history_tokens: Token budget for the sliding window of recent turns
+        max_turns: Maximum number of turns kept verbatim per session
+        summarize_evicted: Whether evicted turns are summarized in the background
+        max_summary_tokens: Token budget for the running summary
+        max_pending_turns: Maximum evicted turns waiting for summarization
+    """
+    
+    enabled: bool = Field(default=True)
+    max_history_tokens: int = Field(default=3000, gt=0, le=100000)
+    max_turns: int = Field(default=20, gt=0, le=200)
+    summarize_evicted: bool = Field(default=True)
+    max_summary_tokens: int = Field(default=500, gt=0, le=4000)
+    max_pending_turns: int = Field(default=20, gt=0, le=200)
+    
+    class Config:
+        """Pydantic config."""
+        protected_namespaces = ()
+
+
+def get_memory_config() -> MemoryConfig:
+    """Get memory configuration from environment variables.
+    
+    Returns:
+        MemoryConfig instance with settings loaded from environment.
+    """
+    return MemoryConfig(
+        enabled=os.getenv("CHAT_MEMORY_ENABLED", "true").lower() == "true",
+        max_history_tokens=int(os.getenv("CHAT_MEMORY_MAX_TOKENS", "3000")),
+        max_turns=int(os.getenv("CHAT_MEMORY_MAX_TURNS", "20")),
+        summarize_evicted=os.getenv("CHAT_MEMORY_SUMMARIZE", "true").lower() == "true",
+        max_summary_tokens=int(os.getenv("CHAT_MEMORY_SUMMARY_TOKENS", "500")),
+        max_pending_turns=int(os.getenv("CHAT_MEMORY_MAX_PENDING", "20")),
+    )
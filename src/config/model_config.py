@@ -17,21 +17,23 @@ class ModelProvider(str, Enum):
     OPENAI = "openai"
     ANTHROPIC = "anthropic"
     DEEPSEEK = "deepseek"
+    REPLAY = "replay"
 
 
 class ModelConfig(BaseModel):
     """Configuration for a specific model provider.
     
     Attributes:
-        provider: The LLM provider (openai, anthropic, deepseek)
+        provider: The LLM provider (openai, anthropic, deepseek, replay)
         model_name: Name of the model to use
         api_key: API key for authentication
-        base_url: Base URL for API (optional, mainly for DeepSeek)
+        base_url: Base URL for API (optional, mainly for DeepSeek and replay)
         temperature: Sampling temperature (0.0 to 2.0)
         max_tokens: Maximum tokens to generate
         top_p: Nucleus sampling parameter
         timeout: Request timeout in seconds
         model_variant: Model variant for DeepSeek (deepseek-chat or deepseek-reasoner)
+        context_window: Context window override in tokens (None = built-in per-model limit)
     """
     
     provider: ModelProvider
@@ -43,6 +45,7 @@ class ModelConfig(BaseModel):
     top_p: float = Field(default=1.0, ge=0.0, le=1.0)
     timeout: int = Field(default=30, gt=0)
     model_variant: Optional[str] = None  # For DeepSeek: deepseek-chat or deepseek-reasoner
+    context_window: Optional[int] = Field(default=None, gt=0)
     
     @validator("api_key")
     def validate_api_key(cls, v: str) -> str:
@@ -73,6 +76,12 @@ class ModelConfig(BaseModel):
         protected_namespaces = ()  # Allow model_name field without warning
 
 
+def _get_optional_int(name: str) -> Optional[int]:
+    """Read an optional integer environment variable."""
+    value = os.getenv(name, "").strip()
+    return int(value) if value else None
+
+
 def get_model_config(provider: Optional[str] = None) -> ModelConfig:
     """Get model configuration for a specific provider.
     
@@ -99,6 +108,7 @@ def get_model_config(provider: Optional[str] = None) -> ModelConfig:
             temperature=float(os.getenv("OPENAI_TEMPERATURE", "0.7")),
             max_tokens=int(os.getenv("OPENAI_MAX_TOKENS", "2000")),
             timeout=int(os.getenv("OPENAI_TIMEOUT", "60")),
+            context_window=_get_optional_int("OPENAI_CONTEXT_WINDOW"),
         )
     
     elif provider == ModelProvider.ANTHROPIC:
@@ -109,6 +119,7 @@ def get_model_config(provider: Optional[str] = None) -> ModelConfig:
             temperature=float(os.getenv("ANTHROPIC_TEMPERATURE", "0.7")),
             max_tokens=int(os.getenv("ANTHROPIC_MAX_TOKENS", "2000")),
             timeout=int(os.getenv("ANTHROPIC_TIMEOUT", "60")),
+            context_window=_get_optional_int("ANTHROPIC_CONTEXT_WINDOW"),
         )
     
     elif provider == ModelProvider.DEEPSEEK:
@@ -141,6 +152,22 @@ def get_model_config(provider: Optional[str] = None) -> ModelConfig:
             max_tokens=max_tokens,
             timeout=int(os.getenv("DEEPSEEK_TIMEOUT", "120")),  # DeepSeek reasoner needs more time
             model_variant=model_variant,
+            context_window=_get_optional_int("DEEPSEEK_CONTEXT_WINDOW"),
+        )
+    
+    elif provider == ModelProvider.REPLAY:
+        # Recorded streams served by the fake OpenAI-compatible server.
+        # Without REPLAY_BASE_URL the wrapper starts an in-process server.
+        return ModelConfig(
+            provider=ModelProvider.REPLAY,
+            model_name=os.getenv("REPLAY_MODEL", "deepseek-reasoner"),
+            api_key=os.getenv("REPLAY_API_KEY", "replay"),
+            base_url=os.getenv("REPLAY_BASE_URL") or None,
+            temperature=float(os.getenv("REPLAY_TEMPERATURE", "0.7")),
+            max_tokens=int(os.getenv("REPLAY_MAX_TOKENS", "2000")),
+            timeout=int(os.getenv("REPLAY_TIMEOUT", "120")),
+            model_variant="deepseek-reasoner",  # Surface reasoning_content when recorded
+            context_window=_get_optional_int("REPLAY_CONTEXT_WINDOW"),
         )
     
     else:
@@ -173,5 +200,9 @@ def get_available_providers() -> list[str]:
     if deepseek_key and not deepseek_key.startswith("sk-your-"):
         available.append(ModelProvider.DEEPSEEK)
     
+    # Replay needs no API key, only an explicit cassette directory
+    if os.getenv("REPLAY_CASSETTE_DIR"):
+        available.append(ModelProvider.REPLAY)
+    
     return available
 
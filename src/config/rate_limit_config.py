@@ -0,0 +1,54 @@
+"""Client-side rate limit configuration management."""
+
+import os
+from typing import Optional
+
+from dotenv import load_dotenv
+from pydantic import BaseModel, Field
+
+# Load environment variables
+load_dotenv()
+
+
+class RateLimitConfig(BaseModel):
+    """Configuration for per-provider client-side rate limiting.
+    
+    Attributes:
+        enabled: Whether requests are paced client-side
+        requests_per_minute: Initial RPM limit (None = learn from response headers)
+        tokens_per_minute: Initial TPM limit (None = learn from response headers)
+        max_wait: Maximum seconds a request may queue before failing
+    """
+    
+    enabled: bool = Field(default=True)
+    requests_per_minute: Optional[int] = Field(default=None, gt=0)
+    tokens_per_minute: Optional[int] = Field(default=None, gt=0)
+    max_wait: float = Field(default=10.0, ge=0.0, le=120.0)
+    
+    class Config:
+        """Pydantic config."""
+        protected_namespaces = ()
+
+
+def _get_optional_int(name: str) -> Optional[int]:
+    """Read an optional integer environment variable."""
+    value = os.getenv(name, "").strip()
+    return int(value) if value else None
+
+
+def get_rate_limit_config(provider: str) -> RateLimitConfig:
+    """Get rate limit configuration for a provider from environment variables.
+    
+    Args:
+        provider: Provider name (openai, anthropic, deepseek)
+    
+    Returns:
+        RateLimitConfig instance with settings loaded from environment.
+    """
+    prefix = str(provider).upper()
+    return RateLimitConfig(
+        enabled=os.getenv("RATE_LIMIT_ENABLED", "true").lower() == "true",
+        requests_per_minute=_get_optional_int(f"{prefix}_RPM"),
+        tokens_per_minute=_get_optional_int(f"{prefix}_TPM"),
+        max_wait=float(os.getenv("RATE_LIMIT_MAX_WAIT", "10.0")),
+    )
@@ -0,0 +1,59 @@
+"""Record/replay provider configuration management."""
+
+import os
+from enum import Enum
+from typing import Optional
+
+from dotenv import load_dotenv
+from pydantic import BaseModel, Field
+
+# Load environment variables
+load_dotenv()
+
+
+class ReplayMode(str, Enum):
+    """Fake server operating modes."""
+    
+    REPLAY = "replay"
+    RECORD = "record"
+
+
+class ReplayConfig(BaseModel):
+    """Configuration for the replay provider and fake OpenAI-compatible server.
+    
+    Attributes:
+        mode: "replay" serves cassettes, "record" proxies to the upstream and saves cassettes
+        cassette_dir: Directory containing cassette files
+        timing_scale: Multiplier for recorded delays (1.0 = original timing, 0 = no delays)
+        strict: Only serve exact request matches (otherwise fall back to recorded order)
+        upstream_base_url: OpenAI-compatible API to record from (record mode)
+        upstream_api_key: API key for the upstream (record mode)
+    """
+    
+    mode: ReplayMode = Field(default=ReplayMode.REPLAY)
+    cassette_dir: str = Field(default="tests/cassettes")
+    timing_scale: float = Field(default=1.0, ge=0.0)
+    strict: bool = Field(default=False)
+    upstream_base_url: Optional[str] = None
+    upstream_api_key: Optional[str] = None
+    
+    class Config:
+        """Pydantic config."""
+        use_enum_values = True
+        protected_namespaces = ()
+
+
+def get_replay_config() -> ReplayConfig:
+    """Get replay configuration from environment variables.
+    
+    Returns:
+        ReplayConfig instance with settings loaded from environment.
+    """
+    return ReplayConfig(
+        mode=os.getenv("REPLAY_MODE", "replay").lower(),
+        cassette_dir=os.getenv("REPLAY_CASSETTE_DIR") or "tests/cassettes",
+        timing_scale=float(os.getenv("REPLAY_TIMING_SCALE", "1.0")),
+        strict=os.getenv("REPLAY_STRICT", "false").lower() == "true",
+        upstream_base_url=os.getenv("REPLAY_UPSTREAM_BASE_URL") or None,
+        upstream_api_key=os.getenv("REPLAY_UPSTREAM_API_KEY") or None,
+    )
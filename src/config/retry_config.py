@@ -0,0 +1,49 @@
+"""Retry policy configuration management."""
+
+import os
+
+from dotenv import load_dotenv
+from pydantic import BaseModel, Field
+
+# Load environment variables
+load_dotenv()
+
+
+class RetryConfig(BaseModel):
+    """Configuration for the shared retry policy.
+    
+    Attributes:
+        max_attempts: Maximum attempts per call including the first one
+        base_delay: Exponential backoff base in seconds (full jitter)
+        max_delay: Backoff ceiling in seconds
+        budget_ratio: Allowed retries per request across the process
+        budget_min_retries: Retries always allowed per budget window
+        budget_window: Budget sliding window in seconds
+    """
+    
+    max_attempts: int = Field(default=3, ge=1, le=10)
+    base_delay: float = Field(default=0.5, ge=0.0, le=10.0)
+    max_delay: float = Field(default=8.0, ge=0.0, le=60.0)
+    budget_ratio: float = Field(default=0.2, ge=0.0, le=1.0)
+    budget_min_retries: int = Field(default=10, ge=0)
+    budget_window: float = Field(default=10.0, gt=0.0)
+    
+    class Config:
+        """Pydantic config."""
+        protected_namespaces = ()
+
+
+def get_retry_config() -> RetryConfig:
+    """Get retry configuration from environment variables.
+    
+    Returns:
+        RetryConfig instance with settings loaded from environment.
+    """
+    return RetryConfig(
+        max_attempts=int(os.getenv("RETRY_MAX_ATTEMPTS", "3")),
+        base_delay=float(os.getenv("RETRY_BASE_DELAY", "0.5")),
+        max_delay=float(os.getenv("RETRY_MAX_DELAY", "8.0")),
+        budget_ratio=float(os.getenv("RETRY_BUDGET_RATIO", "0.2")),
+        budget_min_retries=int(os.getenv("RETRY_BUDGET_MIN_RETRIES", "10")),
+        budget_window=float(os.getenv("RETRY_BUDGET_WINDOW", "10.0")),
+    )
@@ -0,0 +1,63 @@
+"""Tool result memoization configuration management."""
+
+import json
+import os
+from typing import Dict
+
+from dotenv import load_dotenv
+from pydantic import BaseModel, Field
+
+# Load environment variables
+load_dotenv()
+
+
+class ToolMemoConfig(BaseModel):
+    """Configuration for the per-conversation tool result memo.
+    
+    Attributes:
+        enabled: Whether repeated tool calls reuse earlier results
+        default_ttl: Seconds a result stays valid for tools cacheable by default
+        max_entries: Maximum memoized results per conversation (LRU)
+        tool_ttls: Per-tool TTL overrides in seconds (0 disables caching);
+            listing a tool also makes tools that are not cacheable by default
+            (MCP tools, which may have side effects) cacheable
+    """
+    
+    enabled: bool = Field(default=True)
+    default_ttl: float = Field(default=600.0, ge=0.0)
+    max_entries: int = Field(default=256, gt=0, le=10000)
+    tool_ttls: Dict[str, float] = Field(default_factory=dict)
+    
+    class Config:
+        """Pydantic config."""
+        protected_namespaces = ()
+    
+    def ttl_for(self, tool_name: str, cacheable_by_default: bool) -> float:
+        """Get the TTL of a tool's results.
+        
+        Args:
+            tool_name: Tool name
+            cacheable_by_default: Whether the tool is cacheable without an override
+        
+        Returns:
+            TTL in seconds (0 means results are not memoized)
+        """
+        if not self.enabled:
+            return 0.0
+        if tool_name in self.tool_ttls:
+            return self.tool_ttls[tool_name]
+        return self.default_ttl if cacheable_by_default else 0.0
+
+
+def get_tool_memo_config() -> ToolMemoConfig:
+    """Get tool memo configuration from environment variables.
+    
+    Returns:
+        ToolMemoConfig instance with settings loaded from environment.
+    """
+    return ToolMemoConfig(
+        enabled=os.getenv("TOOL_MEMO_ENABLED", "true").lower() == "true",
+        default_ttl=float(os.getenv("TOOL_MEMO_TTL", "600")),
+        max_entries=int(os.getenv("TOOL_MEMO_MAX_ENTRIES", "256")),
+        tool_ttls=json.loads(os.getenv("TOOL_MEMO_TOOL_TTLS", "{}")),
+    )
@@ -0,0 +1,31 @@
+"""UI rendering configuration management."""
+
+import os
+
+from dotenv import load_dotenv
+from pydantic import BaseModel, Field
+
+# Load environment variables
+load_dotenv()
+
+
+class UIConfig(BaseModel):
+    """Configuration for streaming answers into the UI.
+    
+    Attributes:
+        render_fps: Frames per second streamed text is sent to the UI at;
+            tokens arriving in between are coalesced into the next frame
+    """
+    
+    render_fps: float = Field(default=20.0, gt=0, le=120)
+
+
+def get_ui_config() -> UIConfig:
+    """Get UI configuration from environment variables.
+    
+    Returns:
+        UIConfig instance with settings loaded from environment.
+    """
+    return UIConfig(
+        render_fps=float(os.getenv("UI_RENDER_FPS", "20")),
+    )
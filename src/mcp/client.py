@@ -3,15 +3,10 @@
 import asyncio
 import json
 import logging
+from datetime import timedelta
 from typing import Dict, List, Optional, Any
 from urllib.parse import urlparse, parse_qs
 import httpx
-from tenacity import (
-    retry,
-    stop_after_attempt,
-    wait_exponential,
-    retry_if_exception_type,
-)
 
 try:
     from mcp.client.session import ClientSession
@@ -22,10 +17,26 @@ except ImportError:
     logger = logging.getLogger(__name__)
     logger.warning("MCP SDK not available, using custom implementation")
 
+from ..runtime.cancellation import get_cancellation_stats
+from ..runtime.deadline import deadline_expired, remaining_timeout
+from ..runtime.retry_policy import RetryPolicy, is_retryable_before_send
 from .models import MCPServerConfig, MCPTool, MCPToolCall, MCPToolResult
 
 logger = logging.getLogger(__name__)
 
+# Default request timeouts in seconds (tool calls shrink them to the run's deadline)
+REQUEST_TIMEOUT = 10.0
+CONNECT_TIMEOUT = 5.0
+SSE_READ_TIMEOUT = 300.0  # MCP SDK default
+
+
+def _tool_call_timeout() -> httpx.Timeout:
+    """Timeout of one tool call attempt, bounded by the current run's deadline."""
+    return httpx.Timeout(
+        remaining_timeout(REQUEST_TIMEOUT),
+        connect=remaining_timeout(CONNECT_TIMEOUT),
+    )
+
 
 class MCPClient:
     """MCP Client for connecting to MCP servers.
@@ -68,7 +79,7 @@ class MCPClient:
         
         try:
             # Create HTTP client
-            timeout = httpx.Timeout(10.0, connect=5.0)
+            timeout = httpx.Timeout(REQUEST_TIMEOUT, connect=CONNECT_TIMEOUT)
             self._client = httpx.AsyncClient(timeout=timeout)
             
             # Discover tools
@@ -213,12 +224,6 @@ class MCPClient:
         except Exception as e:
             logger.warning(f"⚠️ HTTP 工具发现失败: {e}")
     
-    @retry(
-        stop=stop_after_attempt(3),
-        wait=wait_exponential(multiplier=1, min=2, max=10),
-        retry=retry_if_exception_type((httpx.HTTPError, httpx.TimeoutException)),
-        reraise=True,
-    )
     async def call_tool(self, tool_name: str, arguments: Dict[str, Any]) -> MCPToolResult:
         """Call a tool on the MCP server.
         
@@ -235,18 +240,25 @@ class MCPClient:
         if not self._client:
             raise RuntimeError(f"MCP Client {self.config.name} not initialized")
         
+        if deadline_expired():
+            logger.warning(f"⏳ 已到截止时间，跳过 MCP 工具调用: {tool_name}")
+            return MCPToolResult(content="工具调用已跳过: 剩余时间不足", isError=True)
+        
         try:
             logger.info(f"🔧 调用 MCP 工具: {tool_name} (服务器: {self.config.name})")
             
-            if "/sse" in self.base_url.lower():
-                # SSE endpoint - use HTTP POST
-                result = await self._call_tool_sse(tool_name, arguments)
-            else:
-                # Standard HTTP endpoint
-                result = await self._call_tool_http(tool_name, arguments)
+            # Tools may have side effects: only retry failures that prove the
+            # call never reached the server (connect errors, 429/503)
+            result = await _tool_retry_policy().call(self._dispatch_tool_call, tool_name, arguments)
             
             logger.info(f"✅ MCP 工具调用成功: {tool_name}")
             return result
+        
+        except asyncio.CancelledError:
+            # Leaving the SSE session's context closes it
+            get_cancellation_stats().record_call("mcp_tool")
+            logger.info(f"🛑 MCP 工具调用已取消: {tool_name}")
+            raise
             
         except Exception as e:
             logger.error(f"❌ MCP 工具调用失败 ({tool_name}): {e}", exc_info=True)
@@ -255,6 +267,14 @@ class MCPClient:
                 isError=True,
             )
     
+    async def _dispatch_tool_call(self, tool_name: str, arguments: Dict[str, Any]) -> MCPToolResult:
+        """Send a single tool call attempt to the SSE or HTTP endpoint."""
+        if "/sse" in self.base_url.lower():
+            # SSE endpoint - use HTTP POST
+            return await self._call_tool_sse(tool_name, arguments)
+        # Standard HTTP endpoint
+        return await self._call_tool_http(tool_name, arguments)
+    
     async def _call_tool_sse(self, tool_name: str, arguments: Dict[str, Any]) -> MCPToolResult:
         """Call tool via SSE endpoint using MCP SDK."""
         if not MCP_SDK_AVAILABLE:
@@ -267,14 +287,20 @@ class MCPClient:
             # Use MCP SDK's sse_client to connect to SSE endpoint
             from mcp.client.sse import sse_client
             
-            # Connect to SSE endpoint using full URL (includes query params)
-            async with sse_client(self.base_url) as (read, write):
+            # Connect to SSE endpoint using full URL (includes query params);
+            # both timeouts are bounded by the run's deadline
+            read_timeout = remaining_timeout(SSE_READ_TIMEOUT)
+            async with sse_client(
+                self.base_url, timeout=remaining_timeout(CONNECT_TIMEOUT), sse_read_timeout=read_timeout
+            ) as (read, write):
                 async with ClientSession(read, write) as session:
                     # Initialize session
                     await session.initialize()
                     
                     # Call tool
-                    result = await session.call_tool(tool_name, arguments)
+                    result = await session.call_tool(
+                        tool_name, arguments, read_timeout_seconds=timedelta(seconds=read_timeout)
+                    )
                     
                     # Check if result has error
                     if result.isError:
@@ -333,6 +359,8 @@ class MCPClient:
                     return MCPToolResult(content=content, isError=False)
                         
         except Exception as e:
+            if is_retryable_before_send(e):
+                raise
             logger.error(f"❌ 使用 MCP SDK 调用 SSE 工具失败: {e}", exc_info=True)
             return MCPToolResult(
                 content=f"工具调用失败: {str(e)}",
@@ -356,8 +384,13 @@ class MCPClient:
                 "id": 1,
             },
             headers={"Content-Type": "application/json"},
+            timeout=_tool_call_timeout(),
         )
         
+        # Throttled / unavailable: the call was not executed, let the retry policy handle it
+        if response.status_code in (429, 503):
+            response.raise_for_status()
+        
         if response.status_code == 200:
             data = response.json()
             if "result" in data:
@@ -391,3 +424,13 @@ class MCPClient:
             # Note: Can't use async in __del__, so we'll rely on explicit close()
             pass
 
+
+_mcp_retry_policy: Optional[RetryPolicy] = None
+
+
+def _tool_retry_policy() -> RetryPolicy:
+    """Get the retry policy for MCP tool calls (only retries unsent requests)."""
+    global _mcp_retry_policy
+    if _mcp_retry_policy is None:
+        _mcp_retry_policy = RetryPolicy(retryable=is_retryable_before_send)
+    return _mcp_retry_policy
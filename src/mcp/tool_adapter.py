@@ -5,6 +5,7 @@ from typing import Any, Dict, List, Optional, Type
 import json
 
 from langchain.tools import BaseTool
+from langchain_core.runnables import RunnableConfig
 from pydantic import BaseModel, Field, create_model
 
 from .client import MCPClient
@@ -139,10 +140,15 @@ class MCPToolAdapter(BaseTool):
             logger.error(f"❌ MCP 工具执行失败 ({self.mcp_tool.name}): {e}", exc_info=True)
             return f"工具执行失败: {str(e)}"
     
-    async def _arun(self, **kwargs: Any) -> str:
+    async def _arun(self, config: RunnableConfig = None, **kwargs: Any) -> str:
         """Execute tool asynchronously.
         
+        MCP tools may have side effects, so their results are only memoized
+        (``configurable["tool_memo"]``) for tools given a TTL in
+        ``TOOL_MEMO_TOOL_TTLS``.
+        
         Args:
+            config: Run config (injected by LangChain)
             **kwargs: Tool arguments
             
         Returns:
@@ -152,10 +158,19 @@ class MCPToolAdapter(BaseTool):
             # Remove None values
             clean_kwargs = {k: v for k, v in kwargs.items() if v is not None}
             
+            tool_memo = ((config or {}).get("configurable") or {}).get("tool_memo")
+            ttl = tool_memo.ttl_for(self.name, cacheable_by_default=False) if tool_memo is not None else 0
+            if ttl > 0:
+                memoized = tool_memo.get(self.name, clean_kwargs)
+                if memoized is not None:
+                    return memoized
+            
             logger.info(f"🔧 调用 MCP 工具: {self.mcp_tool.name} (参数: {clean_kwargs})")
             result = await self.mcp_client.call_tool(self.mcp_tool.name, clean_kwargs)
             
             formatted = self._format_result(result)
+            if ttl > 0 and not result.isError:
+                tool_memo.put(self.name, clean_kwargs, formatted, ttl)
             logger.info(f"✅ MCP 工具调用完成: {self.mcp_tool.name}")
             return formatted
             
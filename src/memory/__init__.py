@@ -0,0 +1,13 @@
+"""Conversation memory for multi-turn Chat mode."""
+
+from .conversation_memory import (
+    ConversationMemory,
+    ConversationTurn,
+    create_model_summarizer,
+)
+
+__all__ = [
+    "ConversationMemory",
+    "ConversationTurn",
+    "create_model_summarizer",
+]
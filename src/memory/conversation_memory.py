@@ -0,0 +1,223 @@
+"""Token-budgeted multi-turn memory for Chat mode."""
+
+import asyncio
+import logging
+from collections import deque
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Deque, Dict, List, Optional
+
+from ..config.memory_config import MemoryConfig
+
+logger = logging.getLogger(__name__)
+
+
+# (previous_summary, transcript_of_evicted_turns) -> new summary
+Summarizer = Callable[[str, str], Awaitable[str]]
+
+# Per-message formatting overhead, same as count_prompt_tokens
+MESSAGE_OVERHEAD_TOKENS = 4
+
+SUMMARY_SYSTEM_PROMPT = """你是一个对话摘要助手。请将已有摘要与新的对话内容合并成一份简洁的摘要。
+
+要求:
+1. 保留用户的目标、偏好、关键事实和已得出的结论
+2. 省略寒暄和重复内容
+3. 直接输出摘要正文，不要添加前言"""
+
+
+@dataclass
+class ConversationTurn:
+    """One user/assistant exchange with its cached token count.
+    
+    Attributes:
+        user: User message
+        assistant: Assistant reply
+        tokens: Token count of both messages (computed once)
+    """
+    
+    user: str
+    assistant: str
+    tokens: int
+
+
+class ConversationMemory:
+    """Sliding-window conversation memory with background summarization.
+    
+    Recent turns are kept verbatim within a token budget. Turns that fall out
+    of the window are summarized by a background task into a running summary,
+    so the next reply never waits for summarization. Everything stored is
+    bounded: the window by tokens and turn count, pending turns by count and
+    the summary by tokens.
+    
+    Attributes:
+        config: Memory configuration
+        summary: Running summary of evicted turns
+    """
+    
+    def __init__(
+        self,
+        count_tokens: Callable[[str], int],
+        config: Optional[MemoryConfig] = None,
+        summarizer: Optional[Summarizer] = None,
+    ):
+        """Initialize conversation memory.
+        
+        Args:
+            count_tokens: Token counting function (usually the model wrapper's)
+            config: Memory configuration (defaults to MemoryConfig())
+            summarizer: Optional async summarizer for evicted turns
+        """
+        self.config = config or MemoryConfig()
+        self.count_tokens = count_tokens
+        self.summarizer = summarizer if self.config.summarize_evicted else None
+        
+        self.summary = ""
+        self._turns: Deque[ConversationTurn] = deque()
+        self._history_tokens = 0
+        self._pending: Deque[ConversationTurn] = deque(maxlen=self.config.max_pending_turns)
+        self._summary_task: Optional[asyncio.Task] = None
+    
+    @property
+    def history_tokens(self) -> int:
+        """Token count of the turns currently in the window."""
+        return self._history_tokens
+    
+    def __len__(self) -> int:
+        return len(self._turns)
+    
+    def add_turn(self, user_message: str, assistant_message: str) -> None:
+        """Append a completed exchange and evict turns beyond the budget.
+        
+        Args:
+            user_message: User message
+            assistant_message: Assistant reply
+        """
+        tokens = (
+            self.count_tokens(user_message)
+            + self.count_tokens(assistant_message)
+            + 2 * MESSAGE_OVERHEAD_TOKENS
+        )
+        self._turns.append(ConversationTurn(user_message, assistant_message, tokens))
+        self._history_tokens += tokens
+        
+        evicted = 0
+        while self._turns and (
+            self._history_tokens > self.config.max_history_tokens
+            or len(self._turns) > self.config.max_turns
+        ):
+            turn = self._turns.popleft()
+            self._history_tokens -= turn.tokens
+            evicted += 1
+            if self.summarizer:
+                self._pending.append(turn)
+        
+        if evicted:
+            logger.info(f"🧠 对话记忆: 移出 {evicted} 轮对话 (窗口 {len(self._turns)} 轮, {self._history_tokens} tokens)")
+            self._schedule_summary()
+    
+    def get_messages(self) -> List[Dict[str, str]]:
+        """Get the windowed turns as role/content message dicts.
+        
+        Returns:
+            Messages ordered oldest to newest
+        """
+        messages = []
+        for turn in self._turns:
+            messages.append({"role": "user", "content": turn.user})
+            messages.append({"role": "assistant", "content": turn.assistant})
+        return messages
+    
+    def add_summary_to_system_message(self, system_message: str) -> str:
+        """Append the running summary of earlier turns to a system message.
+        
+        Args:
+            system_message: Original system message
+        
+        Returns:
+            System message with the summary appended (unchanged if none)
+        """
+        if not self.summary:
+            return system_message
+        return f"{system_message}\n\n之前对话的摘要：\n{self.summary}"
+    
+    def clear(self) -> None:
+        """Forget all turns and cancel pending summarization."""
+        if self._summary_task and not self._summary_task.done():
+            self._summary_task.cancel()
+        self._summary_task = None
+        self._turns.clear()
+        self._pending.clear()
+        self._history_tokens = 0
+        self.summary = ""
+    
+    async def wait_for_summary(self) -> None:
+        """Wait until background summarization has caught up."""
+        if self._summary_task:
+            await asyncio.gather(self._summary_task, return_exceptions=True)
+    
+    def _schedule_summary(self) -> None:
+        """Start the background summarization task if it is not running."""
+        if not self._pending:
+            return
+        if self._summary_task and not self._summary_task.done():
+            # The running task drains newly pending turns before it exits
+            return
+        try:
+            self._summary_task = asyncio.get_running_loop().create_task(self._summarize_pending())
+        except RuntimeError:
+            logger.debug("没有运行中的事件循环，暂不生成摘要")
+    
+    async def _summarize_pending(self) -> None:
+        """Fold pending turns into the running summary."""
+        while self._pending:
+            batch = list(self._pending)
+            self._pending.clear()
+            transcript = "\n".join(
+                f"用户: {turn.user}\n助手: {turn.assistant}" for turn in batch
+            )
+            try:
+                summary = await self.summarizer(self.summary, transcript)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"⚠️ 对话摘要生成失败，丢弃 {len(batch)} 轮对话: {e}")
+                continue
+            self.summary = self._limit_summary(summary.strip())
+            logger.info(f"🧠 对话摘要已更新 ({len(batch)} 轮对话)")
+    
+    def _limit_summary(self, summary: str) -> str:
+        """Keep the summary within max_summary_tokens."""
+        limit = self.config.max_summary_tokens
+        tokens = self.count_tokens(summary)
+        if tokens <= limit:
+            return summary
+        n_chars = int(len(summary) * limit / tokens)
+        while n_chars > 0 and self.count_tokens(summary[:n_chars]) > limit:
+            n_chars = int(n_chars * 0.9)
+        return summary[:n_chars]
+
+
+def create_model_summarizer(model_wrapper, max_summary_tokens: int = 500) -> Summarizer:
+    """Create a summarizer backed by a model wrapper.
+    
+    Args:
+        model_wrapper: BaseModelWrapper instance
+        max_summary_tokens: Completion limit for the summary
+    
+    Returns:
+        Async summarizer function
+    """
+    async def summarize(previous_summary: str, transcript: str) -> str:
+        prompt = (
+            f"已有摘要:\n{previous_summary or '（无）'}\n\n"
+            f"新的对话内容:\n{transcript}\n\n"
+            f"请输出合并后的摘要（不超过 {max_summary_tokens} tokens）。"
+        )
+        response = await model_wrapper.generate(
+            prompt,
+            system_message=SUMMARY_SYSTEM_PROMPT,
+            max_tokens=max_summary_tokens,
+        )
+        return response.content
+    
+    return summarize
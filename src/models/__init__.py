@@ -1,6 +1,6 @@
 """Model invocation layer with support for multiple LLM providers."""
 
-from .base import BaseModelWrapper, ModelResponse
+from .base import BaseModelWrapper, BatchResult, BatchStats, ModelResponse
 from .factory import get_model_wrapper
 from .openai_wrapper import OpenAIWrapper
 from .deepseek_wrapper import DeepSeekWrapper
@@ -8,6 +8,8 @@ from .deepseek_wrapper import DeepSeekWrapper
 __all__ = [
     "BaseModelWrapper",
     "ModelResponse",
+    "BatchResult",
+    "BatchStats",
     "get_model_wrapper",
     "OpenAIWrapper",
     "DeepSeekWrapper",
@@ -3,16 +3,12 @@
 import logging
 from typing import AsyncIterator, Optional
 
-from anthropic import Anthropic
+from anthropic import AsyncAnthropic
 from langchain_anthropic import ChatAnthropic
-from tenacity import (
-    retry,
-    stop_after_attempt,
-    wait_exponential,
-    retry_if_exception_type,
-)
 
 from ..config.model_config import ModelConfig
+from ..runtime.deadline import remaining_timeout
+from ..runtime.retry_policy import with_retry, with_stream_retry
 from .base import BaseModelWrapper, ModelResponse, StreamChunk
 
 logger = logging.getLogger(__name__)
@@ -29,8 +25,9 @@ class AnthropicWrapper(BaseModelWrapper):
         """
         super().__init__(config)
         
-        # Initialize Anthropic client
-        self.client = Anthropic(api_key=config.api_key)
+        # Initialize async Anthropic client (does not block the event loop)
+        # SDK retries are disabled: the shared retry policy is the only retry layer
+        self.client = AsyncAnthropic(api_key=config.api_key, max_retries=0)
         
         # Initialize LangChain model
         self.model = ChatAnthropic(
@@ -41,12 +38,7 @@ class AnthropicWrapper(BaseModelWrapper):
             timeout=config.timeout,
         )
     
-    @retry(
-        stop=stop_after_attempt(3),
-        wait=wait_exponential(multiplier=1, min=2, max=10),
-        retry=retry_if_exception_type((Exception,)),
-        reraise=True,
-    )
+    @with_retry()
     async def generate(
         self,
         prompt: str,
@@ -59,23 +51,20 @@ class AnthropicWrapper(BaseModelWrapper):
             prompt: User prompt/message
             system_message: Optional system message for context
             **kwargs: Additional Anthropic-specific parameters
+                (``history``: previous turns as role/content dicts)
         
         Returns:
             ModelResponse with generated content and metadata
         
         Raises:
-            Exception: If API call fails after retries
+            Exception: If API call fails (transient errors are retried first)
         """
         try:
-            # Validate context length
-            is_valid, token_count = self.validate_context_length(
-                prompt, system_message
-            )
-            if not is_valid:
-                logger.warning(
-                    f"Prompt length ({token_count} tokens) is close to "
-                    f"context limit. Consider reducing prompt size."
-                )
+            # Previous conversation turns (Chat mode memory)
+            history = kwargs.get("history") or []
+            
+            # Trim lowest-priority context so the request fits the context window
+            prompt, system_message = self.fit_context(prompt, system_message, history)
             
             # Override config with kwargs if provided
             temperature = kwargs.get("temperature", self.config.temperature)
@@ -84,16 +73,25 @@ class AnthropicWrapper(BaseModelWrapper):
             # Add date information to system message
             system_message_with_date = self.add_date_info_to_system_message(system_message)
             
+            # Wait for client-side rate-limit capacity
+            estimated_tokens = await self._acquire_rate_limit(
+                prompt, system_message, history, max_tokens
+            )
+            
             # Call Anthropic API
-            response = self.client.messages.create(
+            raw_response = await self.client.messages.with_raw_response.create(
                 model=self.config.model_name,
                 max_tokens=max_tokens,
                 temperature=temperature,
                 system=system_message_with_date,
                 messages=[
+                    *history,
                     {"role": "user", "content": prompt}
                 ],
+                timeout=remaining_timeout(self.config.timeout),
             )
+            self._update_rate_limit(raw_response.headers)
+            response = await raw_response.parse()
             
             # Extract response
             content = response.content[0].text
@@ -102,6 +100,7 @@ class AnthropicWrapper(BaseModelWrapper):
             
             # Build structured response
             usage = response.usage
+            self._record_rate_limit_usage(usage.input_tokens + usage.output_tokens, estimated_tokens)
             return ModelResponse(
                 content=content,
                 model=response.model,
@@ -115,12 +114,7 @@ class AnthropicWrapper(BaseModelWrapper):
             logger.error(f"Anthropic API call failed: {str(e)}")
             raise
     
-    @retry(
-        stop=stop_after_attempt(3),
-        wait=wait_exponential(multiplier=1, min=2, max=10),
-        retry=retry_if_exception_type((Exception,)),
-        reraise=True,
-    )
+    @with_stream_retry()
     async def generate_stream(
         self,
         prompt: str,
@@ -133,23 +127,20 @@ class AnthropicWrapper(BaseModelWrapper):
             prompt: User prompt/message
             system_message: Optional system message for context
             **kwargs: Additional Anthropic-specific parameters
+                (``history``: previous turns as role/content dicts)
         
         Yields:
             StreamChunk objects containing response text chunks
         
         Raises:
-            Exception: If API call fails after retries
+            Exception: If API call fails (transient errors are retried first)
         """
         try:
-            # Validate context length
-            is_valid, token_count = self.validate_context_length(
-                prompt, system_message
-            )
-            if not is_valid:
-                logger.warning(
-                    f"Prompt length ({token_count} tokens) is close to "
-                    f"context limit. Consider reducing prompt size."
-                )
+            # Previous conversation turns (Chat mode memory)
+            history = kwargs.get("history") or []
+            
+            # Trim lowest-priority context so the request fits the context window
+            prompt, system_message = self.fit_context(prompt, system_message, history)
             
             # Override config with kwargs if provided
             temperature = kwargs.get("temperature", self.config.temperature)
@@ -158,18 +149,31 @@ class AnthropicWrapper(BaseModelWrapper):
             # Add date information to system message
             system_message_with_date = self.add_date_info_to_system_message(system_message)
             
+            # Wait for client-side rate-limit capacity
+            await self._acquire_rate_limit(prompt, system_message, history, max_tokens)
+            
             # Call Anthropic API with streaming
-            with self.client.messages.stream(
+            raw_response = await self.client.messages.with_raw_response.create(
                 model=self.config.model_name,
                 max_tokens=max_tokens,
                 temperature=temperature,
                 system=system_message_with_date,
                 messages=[
+                    *history,
                     {"role": "user", "content": prompt}
                 ],
-            ) as stream:
-                for text in stream.text_stream:
-                    yield StreamChunk(content=text)
+                stream=True,
+                timeout=remaining_timeout(self.config.timeout),
+            )
+            self._update_rate_limit(raw_response.headers)
+            stream = await raw_response.parse()
+            
+            # Closing the stream releases the connection when the consumer stops early
+            # (cancelled or superseded request)
+            async with stream:
+                async for event in stream:
+                    if event.type == "content_block_delta" and event.delta.type == "text_delta":
+                        yield StreamChunk(content=event.delta.text)
         
         except Exception as e:
             logger.error(f"Anthropic streaming call failed: {str(e)}")
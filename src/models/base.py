@@ -1,12 +1,28 @@
 """Base model wrapper interface."""
 
+import asyncio
+import logging
+import math
+import time
 from abc import ABC, abstractmethod
+from contextvars import ContextVar
 from dataclasses import dataclass
-from typing import AsyncIterator, Optional, List
+from typing import AsyncIterator, Dict, Iterable, Optional, List
 from datetime import datetime
 
 from ..config.model_config import ModelConfig
 from ..config.langsmith_config import get_langsmith_tracer
+from .context_manager import ContextManager
+from .rate_limiter import RateLimiter, RateLimitCallbackHandler, get_rate_limiter
+
+logger = logging.getLogger(__name__)
+
+# Default number of in-flight requests for generate_many()
+DEFAULT_BATCH_CONCURRENCY = 8
+
+# Rate-limit queueing override for the current task (None = limiter default).
+# generate_many() sets it to infinity: offline batches wait for capacity instead of failing.
+_rate_limit_max_wait: ContextVar[Optional[float]] = ContextVar("rate_limit_max_wait", default=None)
 
 
 @dataclass
@@ -45,6 +61,79 @@ class StreamChunk:
     chunk_type: str = "answer"  # Default to 'answer' for backward compatibility
 
 
+@dataclass
+class BatchResult:
+    """Result of one prompt in a generate_many() batch.
+    
+    Attributes:
+        index: Position of the prompt in the input
+        prompt: The prompt
+        response: ModelResponse if the call succeeded
+        error: Exception if the call failed (after retries)
+        latency: Seconds from start of the call to its completion
+    """
+    
+    index: int
+    prompt: str
+    response: Optional[ModelResponse] = None
+    error: Optional[Exception] = None
+    latency: float = 0.0
+    
+    @property
+    def ok(self) -> bool:
+        """Whether the call succeeded."""
+        return self.error is None
+
+
+@dataclass
+class BatchStats:
+    """Aggregate statistics of a generate_many() batch, updated as results arrive.
+    
+    Attributes:
+        total: Number of prompts
+        succeeded: Successful calls so far
+        failed: Failed calls so far
+        tokens_used: Total tokens of successful calls
+        prompt_tokens: Prompt tokens of successful calls
+        completion_tokens: Completion tokens of successful calls
+        elapsed: Seconds since the batch started
+    """
+    
+    total: int = 0
+    succeeded: int = 0
+    failed: int = 0
+    tokens_used: int = 0
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    elapsed: float = 0.0
+    
+    @property
+    def completed(self) -> int:
+        """Number of finished calls."""
+        return self.succeeded + self.failed
+    
+    @property
+    def requests_per_second(self) -> float:
+        """Completed calls per second."""
+        return self.completed / self.elapsed if self.elapsed > 0 else 0.0
+    
+    @property
+    def tokens_per_second(self) -> float:
+        """Total tokens per second."""
+        return self.tokens_used / self.elapsed if self.elapsed > 0 else 0.0
+    
+    def record(self, result: BatchResult, elapsed: float) -> None:
+        """Add a finished result."""
+        self.elapsed = elapsed
+        if result.response is None:
+            self.failed += 1
+            return
+        self.succeeded += 1
+        self.tokens_used += result.response.tokens_used
+        self.prompt_tokens += result.response.prompt_tokens
+        self.completion_tokens += result.response.completion_tokens
+
+
 class BaseModelWrapper(ABC):
     """Abstract base class for model wrappers.
     
@@ -59,6 +148,9 @@ class BaseModelWrapper(ABC):
             config: Model configuration
         """
         self.config = config
+        self._context_manager: Optional[ContextManager] = None
+        self._rate_limiter: Optional[RateLimiter] = None
+        self._rate_limiter_loaded = False
     
     @abstractmethod
     async def generate(
@@ -104,6 +196,98 @@ class BaseModelWrapper(ABC):
         """
         pass
     
+    async def generate_many(
+        self,
+        prompts: Iterable[str],
+        system_message: Optional[str] = None,
+        max_concurrency: int = DEFAULT_BATCH_CONCURRENCY,
+        stats: Optional[BatchStats] = None,
+        **kwargs
+    ) -> AsyncIterator[BatchResult]:
+        """Generate responses for many prompts with bounded concurrency.
+        
+        At most ``max_concurrency`` calls are in flight. Each call still goes
+        through the shared rate limiter, which paces the batch to the provider
+        limits; unlike interactive calls, batch calls wait for capacity as long
+        as needed instead of failing after the limiter's max wait. A failing
+        prompt does not stop the batch - its error is reported in the result.
+        
+        Args:
+            prompts: Prompts to generate responses for
+            system_message: Optional system message shared by all prompts
+            max_concurrency: Maximum number of concurrent calls
+            stats: Optional BatchStats, updated as results arrive
+            **kwargs: Additional parameters passed to generate()
+        
+        Yields:
+            BatchResult objects in completion order (use ``index`` to reorder)
+        """
+        items = list(enumerate(prompts))
+        stats = stats if stats is not None else BatchStats()
+        stats.total = len(items)
+        if not items:
+            return
+        
+        pending = iter(items)
+        results: asyncio.Queue = asyncio.Queue()
+        start = time.monotonic()
+        
+        async def worker() -> None:
+            # Each task has its own context copy
+            _rate_limit_max_wait.set(math.inf)
+            for index, prompt in pending:
+                call_start = time.monotonic()
+                try:
+                    response = await self.generate(prompt, system_message, **kwargs)
+                    result = BatchResult(index, prompt, response=response)
+                except Exception as e:
+                    logger.warning(f"⚠️ 批量生成第 {index} 条失败: {e}")
+                    result = BatchResult(index, prompt, error=e)
+                result.latency = time.monotonic() - call_start
+                await results.put(result)
+        
+        workers = [
+            asyncio.create_task(worker())
+            for _ in range(max(1, min(max_concurrency, len(items))))
+        ]
+        
+        async def next_result() -> BatchResult:
+            # A worker stopped by a BaseException (e.g. cancelled) never puts
+            # its prompt's result, so watch the workers instead of waiting on
+            # the queue forever
+            getter = asyncio.ensure_future(results.get())
+            try:
+                while not getter.done():
+                    running = [task for task in workers if not task.done()]
+                    if not running and results.empty():
+                        cause = next(
+                            (task.exception() for task in workers if not task.cancelled() and task.exception()),
+                            None,
+                        )
+                        raise RuntimeError(
+                            f"批量生成的工作任务提前退出，{stats.total - stats.completed} 条结果缺失"
+                        ) from cause
+                    await asyncio.wait([getter, *running], return_when=asyncio.FIRST_COMPLETED)
+                return getter.result()
+            finally:
+                getter.cancel()
+        
+        try:
+            for _ in range(len(items)):
+                result = await next_result()
+                stats.record(result, time.monotonic() - start)
+                yield result
+        finally:
+            for task in workers:
+                task.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+        
+        logger.info(
+            f"📦 批量生成完成: {stats.succeeded}/{stats.total} 成功, "
+            f"{stats.tokens_used} tokens, {stats.elapsed:.1f}s, "
+            f"{stats.requests_per_second:.2f} req/s, {stats.tokens_per_second:.0f} tokens/s"
+        )
+    
     @abstractmethod
     def count_tokens(self, text: str) -> int:
         """Count the number of tokens in text.
@@ -131,10 +315,69 @@ class BaseModelWrapper(ABC):
         Returns:
             List of callback handlers (may be empty if LangSmith is disabled)
         """
+        callbacks = []
         tracer = get_langsmith_tracer()
         if tracer:
-            return [tracer]
-        return []
+            callbacks.append(tracer)
+        if self.rate_limiter:
+            callbacks.append(
+                RateLimitCallbackHandler(self.rate_limiter, self.count_tokens, self.config.max_tokens)
+            )
+        return callbacks
+    
+    @property
+    def rate_limiter(self) -> Optional[RateLimiter]:
+        """Shared client-side rate limiter for this provider model (None if disabled)."""
+        if not self._rate_limiter_loaded:
+            self._rate_limiter = get_rate_limiter(self.config.provider, self.config.model_name)
+            self._rate_limiter_loaded = True
+        return self._rate_limiter
+    
+    async def _acquire_rate_limit(
+        self,
+        prompt: str,
+        system_message: Optional[str],
+        history: Optional[List[Dict[str, str]]],
+        max_tokens: int
+    ) -> int:
+        """Wait for rate-limit capacity before sending a request.
+        
+        Args:
+            prompt: User prompt
+            system_message: System message
+            history: Previous turns
+            max_tokens: Completion limit of the request
+        
+        Returns:
+            Estimated request tokens (pass to _record_rate_limit_usage)
+        
+        Raises:
+            RateLimitExceededError: If capacity will not be available in time
+        """
+        estimated_tokens = self.context_manager.count_prompt(prompt, system_message) + max_tokens
+        estimated_tokens += sum(
+            self.context_manager.count_prompt(turn["content"]) for turn in history or []
+        )
+        if self.rate_limiter:
+            await self.rate_limiter.acquire(estimated_tokens, max_wait=_rate_limit_max_wait.get())
+        return estimated_tokens
+    
+    def _update_rate_limit(self, headers) -> None:
+        """Update the rate limiter from response headers."""
+        if self.rate_limiter:
+            self.rate_limiter.update_from_headers(headers)
+    
+    def _record_rate_limit_usage(self, actual_tokens: Optional[int], estimated_tokens: int) -> None:
+        """Correct the rate limiter with the actual usage of a request."""
+        if self.rate_limiter:
+            self.rate_limiter.record_usage(actual_tokens, estimated_tokens)
+    
+    @property
+    def context_manager(self) -> ContextManager:
+        """Context manager budgeting requests against the model's context window."""
+        if self._context_manager is None:
+            self._context_manager = ContextManager.from_config(self.config, self.count_tokens)
+        return self._context_manager
     
     def validate_context_length(
         self,
@@ -143,6 +386,9 @@ class BaseModelWrapper(ABC):
     ) -> tuple[bool, int]:
         """Check if prompt fits within context window.
         
+        The prompt budget is the model's context window minus the completion
+        reserve (max_tokens) and a safety margin.
+        
         Args:
             prompt: User prompt
             system_message: Optional system message
@@ -150,15 +396,33 @@ class BaseModelWrapper(ABC):
         Returns:
             Tuple of (is_valid, total_tokens)
         """
-        total_text = (system_message or "") + prompt
-        total_tokens = self.count_tokens(total_text)
-        
-        # Rough estimate: leave room for completion
-        max_prompt_tokens = self.config.max_tokens * 0.75
-        is_valid = total_tokens <= max_prompt_tokens
+        total_tokens = self.context_manager.count_prompt(prompt, system_message)
+        is_valid = total_tokens <= self.context_manager.budget.prompt_budget
         
         return is_valid, total_tokens
     
+    def fit_context(
+        self,
+        prompt: str,
+        system_message: Optional[str] = None,
+        history: Optional[List[Dict[str, str]]] = None
+    ) -> tuple[str, Optional[str]]:
+        """Trim prompt and system message so the request fits the context window.
+        
+        Args:
+            prompt: User prompt
+            system_message: Optional system message
+            history: Optional previous turns (role/content dicts), already
+                     budgeted by the conversation memory
+        
+        Returns:
+            Tuple of (prompt, system_message), unchanged if they already fit
+        """
+        history_tokens = sum(
+            self.context_manager.count_prompt(turn["content"]) for turn in history or []
+        )
+        return self.context_manager.fit_prompt(prompt, system_message, history_tokens)
+    
     @staticmethod
     def get_current_date_info() -> str:
         """Get current date information in YYYY-MM-DD format.
@@ -0,0 +1,421 @@
+"""Context window management with per-model limits.
+
+Budgets a request against the model's real context window:
+
+    context_window = prompt budget + completion reserve + safety margin
+
+When a prompt does not fit, the lowest-priority parts are trimmed
+deterministically *before* the API call instead of letting the provider
+reject the request:
+
+1. Tool observations (oldest first) are compacted
+2. Older conversation turns (oldest first) are dropped
+3. Long system context (e.g. injected search results) is cut in the middle
+4. As a last resort the latest user message is truncated
+
+The system instructions and the latest user question are always kept.
+"""
+
+import json
+import logging
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+import tiktoken
+from langchain_core.messages import (
+    AIMessage,
+    BaseMessage,
+    HumanMessage,
+    SystemMessage,
+    ToolMessage,
+)
+
+logger = logging.getLogger(__name__)
+
+
+# Context window sizes (prompt + completion) in tokens, matched by longest prefix
+MODEL_CONTEXT_WINDOWS: Dict[str, int] = {
+    # OpenAI
+    "gpt-5": 400000,
+    "gpt-4.1": 1047576,
+    "gpt-4o": 128000,
+    "gpt-4-turbo": 128000,
+    "gpt-4-1106": 128000,
+    "gpt-4-0125": 128000,
+    "gpt-4-32k": 32768,
+    "gpt-4": 8192,
+    "gpt-3.5-turbo": 16385,
+    "o1": 200000,
+    "o3": 200000,
+    "o4": 200000,
+    # Anthropic
+    "claude": 200000,
+    # DeepSeek
+    "deepseek-chat": 128000,
+    "deepseek-reasoner": 128000,
+}
+
+# Used for unknown models - deliberately conservative
+DEFAULT_CONTEXT_WINDOW = 8192
+
+# Per-message formatting overhead (role, delimiters), same as count_prompt_tokens
+MESSAGE_OVERHEAD_TOKENS = 4
+
+TRUNCATION_MARKER = "\n...[内容已截断]...\n"
+
+
+class ContextWindowExceededError(ValueError):
+    """Raised when a request cannot be trimmed to fit the context window."""
+    pass
+
+
+def get_context_window(model_name: Optional[str], override: Optional[int] = None) -> int:
+    """Get the context window size for a model.
+    
+    Args:
+        model_name: Model name (e.g., "gpt-4o-mini", "deepseek-chat")
+        override: Explicit context window from configuration (takes precedence)
+    
+    Returns:
+        Context window size in tokens
+    """
+    if override:
+        return override
+    
+    name = (model_name or "").lower()
+    for prefix in sorted(MODEL_CONTEXT_WINDOWS, key=len, reverse=True):
+        if name.startswith(prefix):
+            return MODEL_CONTEXT_WINDOWS[prefix]
+    
+    logger.debug(f"未知模型 {model_name} 的上下文窗口，使用默认值 {DEFAULT_CONTEXT_WINDOW}")
+    return DEFAULT_CONTEXT_WINDOW
+
+
+_default_tokenizer = None
+
+
+def default_count_tokens(text: str) -> int:
+    """Count tokens with the cl100k_base tokenizer (shared instance)."""
+    global _default_tokenizer
+    if _default_tokenizer is None:
+        _default_tokenizer = tiktoken.get_encoding("cl100k_base")
+    return len(_default_tokenizer.encode(text))
+
+
+@dataclass
+class ContextBudget:
+    """Token budget for a single request.
+    
+    Attributes:
+        context_window: Model context window in tokens
+        completion_reserve: Tokens reserved for the completion
+        safety_margin: Tokens kept free for tokenizer drift and formatting
+    """
+    
+    context_window: int
+    completion_reserve: int
+    safety_margin: int = 256
+    
+    @property
+    def prompt_budget(self) -> int:
+        """Maximum number of prompt tokens."""
+        return max(0, self.context_window - self.completion_reserve - self.safety_margin)
+
+
+class ContextManager:
+    """Fits prompts and message lists into a model's context window.
+    
+    Attributes:
+        budget: Token budget derived from model limits
+        count_tokens: Token counting function
+        min_observation_tokens: Size tool observations are compacted to
+    """
+    
+    def __init__(
+        self,
+        context_window: int,
+        completion_reserve: int,
+        count_tokens: Optional[Callable[[str], int]] = None,
+        safety_margin: int = 256,
+        min_observation_tokens: int = 200,
+    ):
+        """Initialize the context manager.
+        
+        Args:
+            context_window: Model context window in tokens
+            completion_reserve: Tokens reserved for the completion
+                               (capped at half of the context window)
+            count_tokens: Token counting function (defaults to cl100k_base)
+            safety_margin: Tokens kept free for formatting overhead
+            min_observation_tokens: Size tool observations are compacted to
+        """
+        self.budget = ContextBudget(
+            context_window=context_window,
+            completion_reserve=min(completion_reserve, context_window // 2),
+            safety_margin=safety_margin,
+        )
+        self.count_tokens = count_tokens or default_count_tokens
+        self.min_observation_tokens = min_observation_tokens
+    
+    @classmethod
+    def from_config(cls, config, count_tokens: Optional[Callable[[str], int]] = None) -> "ContextManager":
+        """Create a context manager from a ModelConfig.
+        
+        Args:
+            config: ModelConfig instance
+            count_tokens: Token counting function of the model wrapper
+        
+        Returns:
+            ContextManager instance
+        """
+        return cls(
+            context_window=get_context_window(config.model_name, config.context_window),
+            completion_reserve=config.max_tokens,
+            count_tokens=count_tokens,
+        )
+    
+    @classmethod
+    def for_llm(cls, llm, context_window: Optional[int] = None) -> "ContextManager":
+        """Create a context manager for a LangChain chat model.
+        
+        Args:
+            llm: LangChain chat model (ChatOpenAI, ChatAnthropic, ...)
+            context_window: Optional explicit context window
+        
+        Returns:
+            ContextManager instance
+        """
+        model_name = getattr(llm, "model_name", None) or getattr(llm, "model", None)
+        max_tokens = getattr(llm, "max_tokens", None) or 2000
+        return cls(
+            context_window=get_context_window(model_name, context_window),
+            completion_reserve=max_tokens,
+        )
+    
+    # ------------------------------------------------------------------
+    # Plain prompts (model wrappers)
+    # ------------------------------------------------------------------
+    
+    def count_prompt(self, prompt: str, system_message: Optional[str] = None) -> int:
+        """Count prompt tokens including message overhead."""
+        tokens = self.count_tokens(prompt) + MESSAGE_OVERHEAD_TOKENS
+        if system_message:
+            tokens += self.count_tokens(system_message) + MESSAGE_OVERHEAD_TOKENS
+        return tokens
+    
+    def fit_prompt(
+        self,
+        prompt: str,
+        system_message: Optional[str] = None,
+        reserved_tokens: int = 0,
+    ) -> Tuple[str, Optional[str]]:
+        """Trim a system message + prompt pair to the prompt budget.
+        
+        The system message is cut in the middle first (that is where injected
+        search results live), keeping its leading instructions and trailing
+        notes. Only if that is not enough is the user prompt truncated.
+        
+        Args:
+            prompt: User prompt
+            system_message: Optional system message
+            reserved_tokens: Tokens already used by other messages (e.g. history)
+        
+        Returns:
+            Tuple of (prompt, system_message), unchanged if they already fit
+        """
+        budget = max(0, self.budget.prompt_budget - reserved_tokens)
+        total = self.count_prompt(prompt, system_message)
+        if total <= budget:
+            return prompt, system_message
+        
+        logger.warning(
+            f"⚠️ 提示词 ({total} tokens) 超出上下文预算 ({budget} tokens)，开始裁剪"
+        )
+        
+        prompt_tokens = self.count_tokens(prompt) + MESSAGE_OVERHEAD_TOKENS
+        if system_message:
+            system_budget = max(0, budget - prompt_tokens - MESSAGE_OVERHEAD_TOKENS)
+            system_message = self.truncate_middle(system_message, system_budget)
+            total = self.count_prompt(prompt, system_message)
+        
+        if total > budget:
+            system_tokens = (
+                self.count_tokens(system_message) + MESSAGE_OVERHEAD_TOKENS
+                if system_message else 0
+            )
+            prompt = self.truncate_text(prompt, max(0, budget - system_tokens - MESSAGE_OVERHEAD_TOKENS))
+        
+        logger.info(f"✂️ 裁剪后提示词: {self.count_prompt(prompt, system_message)} tokens")
+        return prompt, system_message
+    
+    # ------------------------------------------------------------------
+    # Message lists (agent)
+    # ------------------------------------------------------------------
+    
+    def count_message(self, message: BaseMessage) -> int:
+        """Count tokens of a single message including tool call arguments."""
+        content = message.content if isinstance(message.content, str) else json.dumps(
+            message.content, ensure_ascii=False
+        )
+        tokens = self.count_tokens(content) + MESSAGE_OVERHEAD_TOKENS
+        if isinstance(message, AIMessage) and message.tool_calls:
+            tokens += self.count_tokens(
+                json.dumps([tc.get("args", {}) for tc in message.tool_calls], ensure_ascii=False)
+            )
+        return tokens
+    
+    def count_messages(self, messages: Sequence[BaseMessage]) -> int:
+        """Count tokens of a message list."""
+        return sum(self.count_message(m) for m in messages)
+    
+    def fit_messages(
+        self,
+        messages: Sequence[BaseMessage],
+        max_tokens: Optional[int] = None,
+    ) -> List[BaseMessage]:
+        """Trim a message list to the prompt budget.
+        
+        Trimming never mutates the input messages; compacted messages are
+        copies. Tool-call / tool-result pairs are never split.
+        
+        Args:
+            messages: Conversation messages (system, human, ai, tool)
+            max_tokens: Optional ceiling below the prompt budget
+        
+        Returns:
+            Messages that fit the prompt budget
+        
+        Raises:
+            ContextWindowExceededError: If even the protected messages do not fit
+        """
+        budget = self.budget.prompt_budget
+        if max_tokens is not None:
+            budget = min(budget, max_tokens)
+        messages = list(messages)
+        sizes = [self.count_message(m) for m in messages]
+        total = sum(sizes)
+        if total <= budget:
+            return messages
+        
+        logger.warning(f"⚠️ 消息 ({total} tokens) 超出上下文预算 ({budget} tokens)，开始裁剪")
+        
+        # 1. Compact tool observations, oldest first
+        for i, msg in enumerate(messages):
+            if total <= budget:
+                break
+            if not isinstance(msg, ToolMessage) or not isinstance(msg.content, str):
+                continue
+            compacted = self.truncate_text(msg.content, self.min_observation_tokens)
+            if compacted == msg.content:
+                continue
+            messages[i] = msg.model_copy(update={"content": compacted})
+            new_size = self.count_message(messages[i])
+            total -= sizes[i] - new_size
+            sizes[i] = new_size
+        
+        # 2. Drop older conversation turns, oldest first
+        if total > budget:
+            messages, sizes, total = self._drop_old_turns(messages, sizes, total, budget)
+        
+        if total > budget:
+            raise ContextWindowExceededError(
+                f"消息无法裁剪到上下文预算内 ({total} > {budget} tokens)"
+            )
+        
+        logger.info(f"✂️ 裁剪后消息: {len(messages)} 条, {total} tokens")
+        return messages
+    
+    def _drop_old_turns(
+        self,
+        messages: List[BaseMessage],
+        sizes: List[int],
+        total: int,
+        budget: int,
+    ) -> Tuple[List[BaseMessage], List[int], int]:
+        """Drop whole turns (HumanMessage up to the next one) before the latest turn."""
+        human_indices = [i for i, m in enumerate(messages) if isinstance(m, HumanMessage)]
+        if len(human_indices) < 2:
+            return messages, sizes, total
+        
+        drop = set()
+        for start, end in zip(human_indices, human_indices[1:]):
+            if total <= budget:
+                break
+            for i in range(start, end):
+                if isinstance(messages[i], SystemMessage):
+                    continue
+                drop.add(i)
+                total -= sizes[i]
+        
+        kept = [i for i in range(len(messages)) if i not in drop]
+        return [messages[i] for i in kept], [sizes[i] for i in kept], total
+    
+    def fit_observations(self, observations: Sequence[str], reserved_tokens: int = 0) -> List[str]:
+        """Trim tool observations that are inlined into a single prompt.
+        
+        Observations are compacted oldest first; if that is not enough, every
+        observation gets an equal share of the remaining budget.
+        
+        Args:
+            observations: Tool results in call order
+            reserved_tokens: Tokens already used by the rest of the prompt
+        
+        Returns:
+            Observations that fit the prompt budget
+        """
+        budget = max(0, self.budget.prompt_budget - reserved_tokens)
+        observations = list(observations)
+        sizes = [self.count_tokens(o) for o in observations]
+        total = sum(sizes)
+        if total <= budget:
+            return observations
+        
+        logger.warning(f"⚠️ 工具结果 ({total} tokens) 超出上下文预算 ({budget} tokens)，开始压缩")
+        
+        for i, observation in enumerate(observations):
+            if total <= budget:
+                break
+            observations[i] = self.truncate_text(observation, self.min_observation_tokens)
+            new_size = self.count_tokens(observations[i])
+            total -= sizes[i] - new_size
+            sizes[i] = new_size
+        
+        if total > budget and observations:
+            share = budget // len(observations)
+            observations = [self.truncate_text(o, share) for o in observations]
+        
+        return observations
+    
+    # ------------------------------------------------------------------
+    # Text helpers
+    # ------------------------------------------------------------------
+    
+    def truncate_text(self, text: str, max_tokens: int) -> str:
+        """Keep the head of a text within max_tokens."""
+        if self.count_tokens(text) <= max_tokens:
+            return text
+        return self._shrink(text, max_tokens, lambda t, n: t[:n] + TRUNCATION_MARKER)
+    
+    def truncate_middle(self, text: str, max_tokens: int) -> str:
+        """Keep the head and tail of a text within max_tokens."""
+        if self.count_tokens(text) <= max_tokens:
+            return text
+        return self._shrink(
+            text,
+            max_tokens,
+            lambda t, n: t[: n // 2] + TRUNCATION_MARKER + t[len(t) - n // 2:],
+        )
+    
+    def _shrink(self, text: str, max_tokens: int, cut: Callable[[str, int], str]) -> str:
+        """Shrink text with ``cut(text, n_chars)`` until it fits max_tokens."""
+        if max_tokens <= self.count_tokens(TRUNCATION_MARKER):
+            return ""
+        
+        tokens = self.count_tokens(text)
+        n_chars = int(len(text) * max_tokens / max(tokens, 1))
+        result = cut(text, n_chars)
+        # Character/token ratios vary - shrink proportionally until it fits
+        while n_chars > 0 and self.count_tokens(result) > max_tokens:
+            n_chars = int(n_chars * 0.9)
+            result = cut(text, n_chars)
+        return result
@@ -8,6 +8,7 @@ from .base import BaseModelWrapper
 from .openai_wrapper import OpenAIWrapper
 from .deepseek_wrapper import DeepSeekWrapper
 from .anthropic_wrapper import AnthropicWrapper
+from .replay_wrapper import ReplayWrapper
 
 logger = logging.getLogger(__name__)
 
@@ -19,7 +20,7 @@ def get_model_wrapper(
     """Get a model wrapper instance for the specified provider.
     
     Args:
-        provider: Provider name (openai, anthropic, deepseek).
+        provider: Provider name (openai, anthropic, deepseek, replay).
                  If None, uses DEFAULT_PROVIDER from environment.
         config: Optional ModelConfig. If None, loads from environment.
     
@@ -46,6 +47,10 @@ def get_model_wrapper(
         logger.debug(f"Creating DeepSeek wrapper with model: {config.model_name}")
         return DeepSeekWrapper(config)
     
+    elif config.provider == ModelProvider.REPLAY:
+        logger.debug(f"Creating replay wrapper with model: {config.model_name}")
+        return ReplayWrapper(config)
+    
     else:
         raise ValueError(
             f"Unsupported provider: {config.provider}. "
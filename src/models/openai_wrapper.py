@@ -5,15 +5,11 @@ from typing import AsyncIterator, Optional
 
 import tiktoken
 from langchain_openai import ChatOpenAI
-from openai import OpenAI
-from tenacity import (
-    retry,
-    stop_after_attempt,
-    wait_exponential,
-    retry_if_exception_type,
-)
+from openai import AsyncOpenAI
 
 from ..config.model_config import ModelConfig
+from ..runtime.deadline import remaining_timeout
+from ..runtime.retry_policy import with_retry, with_stream_retry
 from .base import BaseModelWrapper, ModelResponse, StreamChunk
 
 logger = logging.getLogger(__name__)
@@ -30,8 +26,9 @@ class OpenAIWrapper(BaseModelWrapper):
         """
         super().__init__(config)
         
-        # Initialize OpenAI client
-        self.client = OpenAI(api_key=config.api_key)
+        # Initialize async OpenAI client (does not block the event loop)
+        # SDK retries are disabled: the shared retry policy is the only retry layer
+        self.client = AsyncOpenAI(api_key=config.api_key, max_retries=0)
         
         # Initialize LangChain model
         self.model = ChatOpenAI(
@@ -52,12 +49,7 @@ class OpenAIWrapper(BaseModelWrapper):
             )
             self.tokenizer = tiktoken.get_encoding("cl100k_base")
     
-    @retry(
-        stop=stop_after_attempt(3),
-        wait=wait_exponential(multiplier=1, min=2, max=10),
-        retry=retry_if_exception_type((Exception,)),
-        reraise=True,
-    )
+    @with_retry()
     async def generate(
         self,
         prompt: str,
@@ -70,42 +62,47 @@ class OpenAIWrapper(BaseModelWrapper):
             prompt: User prompt/message
             system_message: Optional system message for context
             **kwargs: Additional OpenAI-specific parameters
+                (``history``: previous turns as role/content dicts)
         
         Returns:
             ModelResponse with generated content and metadata
         
         Raises:
-            Exception: If API call fails after retries
+            Exception: If API call fails (transient errors are retried first)
         """
         try:
-            # Validate context length
-            is_valid, token_count = self.validate_context_length(
-                prompt, system_message
-            )
-            if not is_valid:
-                logger.warning(
-                    f"Prompt length ({token_count} tokens) is close to "
-                    f"context limit. Consider reducing prompt size."
-                )
+            # Previous conversation turns (Chat mode memory)
+            history = kwargs.get("history") or []
+            
+            # Trim lowest-priority context so the request fits the context window
+            prompt, system_message = self.fit_context(prompt, system_message, history)
             
             # Prepare messages with date information
             messages = []
             system_message_with_date = self.add_date_info_to_system_message(system_message)
             messages.append({"role": "system", "content": system_message_with_date})
+            messages.extend(history)
             messages.append({"role": "user", "content": prompt})
             
             # Override config with kwargs if provided
             temperature = kwargs.get("temperature", self.config.temperature)
             max_tokens = kwargs.get("max_tokens", self.config.max_tokens)
             
+            # Wait for client-side rate-limit capacity
+            estimated_tokens = await self._acquire_rate_limit(
+                prompt, system_message, history, max_tokens
+            )
+            
             # Call OpenAI API
-            response = self.client.chat.completions.create(
+            raw_response = await self.client.chat.completions.with_raw_response.create(
                 model=self.config.model_name,
                 messages=messages,
                 temperature=temperature,
                 max_tokens=max_tokens,
-                timeout=self.config.timeout,
+                timeout=remaining_timeout(self.config.timeout),
             )
+            self._update_rate_limit(raw_response.headers)
+            response = raw_response.parse()
             
             # Extract response
             content = response.choices[0].message.content
@@ -114,6 +111,7 @@ class OpenAIWrapper(BaseModelWrapper):
             
             # Build structured response
             usage = response.usage
+            self._record_rate_limit_usage(usage.total_tokens, estimated_tokens)
             return ModelResponse(
                 content=content,
                 model=response.model,
@@ -127,12 +125,7 @@ class OpenAIWrapper(BaseModelWrapper):
             logger.error(f"OpenAI API call failed: {str(e)}")
             raise
     
-    @retry(
-        stop=stop_after_attempt(3),
-        wait=wait_exponential(multiplier=1, min=2, max=10),
-        retry=retry_if_exception_type((Exception,)),
-        reraise=True,
-    )
+    @with_stream_retry()
     async def generate_stream(
         self,
         prompt: str,
@@ -145,51 +138,59 @@ class OpenAIWrapper(BaseModelWrapper):
             prompt: User prompt/message
             system_message: Optional system message for context
             **kwargs: Additional OpenAI-specific parameters
+                (``history``: previous turns as role/content dicts)
         
         Yields:
             StreamChunk objects containing response text chunks
         
         Raises:
-            Exception: If API call fails after retries
+            Exception: If API call fails (transient errors are retried first)
         """
         try:
-            # Validate context length
-            is_valid, token_count = self.validate_context_length(
-                prompt, system_message
-            )
-            if not is_valid:
-                logger.warning(
-                    f"Prompt length ({token_count} tokens) is close to "
-                    f"context limit. Consider reducing prompt size."
-                )
+            # Previous conversation turns (Chat mode memory)
+            history = kwargs.get("history") or []
+            
+            # Trim lowest-priority context so the request fits the context window
+            prompt, system_message = self.fit_context(prompt, system_message, history)
             
             # Prepare messages with date information
             messages = []
             system_message_with_date = self.add_date_info_to_system_message(system_message)
             messages.append({"role": "system", "content": system_message_with_date})
+            messages.extend(history)
             messages.append({"role": "user", "content": prompt})
             
             # Override config with kwargs if provided
             temperature = kwargs.get("temperature", self.config.temperature)
             max_tokens = kwargs.get("max_tokens", self.config.max_tokens)
             
+            # Wait for client-side rate-limit capacity
+            await self._acquire_rate_limit(
+                prompt, system_message, history, max_tokens
+            )
+            
             # Call OpenAI API with streaming
-            stream = self.client.chat.completions.create(
+            raw_response = await self.client.chat.completions.with_raw_response.create(
                 model=self.config.model_name,
                 messages=messages,
                 temperature=temperature,
                 max_tokens=max_tokens,
-                timeout=self.config.timeout,
+                timeout=remaining_timeout(self.config.timeout),
                 stream=True,
             )
+            self._update_rate_limit(raw_response.headers)
+            stream = raw_response.parse()
             
-            # Stream response chunks
-            for chunk in stream:
-                if chunk.choices[0].delta.content:
-                    yield StreamChunk(
-                        content=chunk.choices[0].delta.content,
-                        finish_reason=chunk.choices[0].finish_reason,
-                    )
+            # Closing the stream releases the connection when the consumer stops early
+            # (cancelled or superseded request)
+            async with stream:
+                # Stream response chunks
+                async for chunk in stream:
+                    if chunk.choices[0].delta.content:
+                        yield StreamChunk(
+                            content=chunk.choices[0].delta.content,
+                            finish_reason=chunk.choices[0].finish_reason,
+                        )
         
         except Exception as e:
             logger.error(f"OpenAI streaming call failed: {str(e)}")
@@ -222,6 +223,7 @@ class OpenAIWrapper(BaseModelWrapper):
                 openai_api_key=self.config.api_key,
                 request_timeout=self.config.timeout,
                 callbacks=callbacks,
+                include_response_headers=True,  # Feeds the client-side rate limiter
             )
         return self.model
 
@@ -0,0 +1,360 @@
+"""Client-side provider rate limiting.
+
+Each (provider, model) pair gets a limiter with two token buckets - requests
+per minute and tokens per minute. Requests are paced *before* they are sent:
+callers wait in FIFO order for capacity (briefly, bounded by ``max_wait``)
+instead of hitting a 429 and sleeping in a retry loop.
+
+Bucket state is corrected from rate-limit response headers when the provider
+sends them:
+
+- OpenAI / DeepSeek: ``x-ratelimit-{limit,remaining,reset}-{requests,tokens}``
+- Anthropic: ``anthropic-ratelimit-{requests,tokens}-{limit,remaining,reset}``
+- Any provider: ``retry-after``
+"""
+
+import asyncio
+import logging
+import re
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Mapping, Optional, Tuple
+
+from langchain_core.callbacks import AsyncCallbackHandler
+
+from ..config.rate_limit_config import RateLimitConfig, get_rate_limit_config
+
+logger = logging.getLogger(__name__)
+
+
+class RateLimitExceededError(Exception):
+    """Raised when capacity will not be available within the allowed wait."""
+    pass
+
+
+class TokenBucket:
+    """Continuously refilling token bucket.
+    
+    The level may go negative when actual usage exceeds the estimate that was
+    consumed up front; later requests then wait for the debt to refill.
+    
+    Attributes:
+        capacity: Maximum bucket level (the per-minute limit)
+        refill_rate: Units added per second
+        level: Current bucket level
+    """
+    
+    def __init__(self, per_minute: float):
+        """Initialize a full bucket.
+        
+        Args:
+            per_minute: Allowed units per minute
+        """
+        self.capacity = float(per_minute)
+        self.refill_rate = per_minute / 60.0
+        self.level = float(per_minute)
+        self._updated = time.monotonic()
+    
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.level = min(self.capacity, self.level + (now - self._updated) * self.refill_rate)
+        self._updated = now
+    
+    def wait_time(self, amount: float) -> float:
+        """Seconds until ``amount`` units are available (0 if available now)."""
+        self._refill()
+        # Requests larger than the whole bucket only need a full bucket
+        amount = min(amount, self.capacity)
+        if self.level >= amount:
+            return 0.0
+        return (amount - self.level) / self.refill_rate
+    
+    def consume(self, amount: float) -> None:
+        """Take ``amount`` units (may drive the level negative)."""
+        self._refill()
+        self.level -= amount
+    
+    def sync(self, limit: Optional[float], remaining: Optional[float], reset_seconds: Optional[float]) -> None:
+        """Align the bucket with server-reported state.
+        
+        Args:
+            limit: Per-minute limit reported by the server
+            remaining: Remaining units in the current window
+            reset_seconds: Seconds until the window is fully replenished
+        """
+        self._refill()
+        if limit:
+            self.capacity = float(limit)
+            self.refill_rate = limit / 60.0
+        if remaining is not None:
+            self.level = min(self.level, float(remaining))
+            if reset_seconds and remaining < self.capacity:
+                # Refill at least as fast as the server says the window resets
+                self.refill_rate = max(self.refill_rate, (self.capacity - remaining) / reset_seconds)
+
+
+class RateLimiter:
+    """Requests-per-minute and tokens-per-minute limiter for one provider model.
+    
+    Buckets are created lazily: with no configured limit a bucket only exists
+    once the provider has reported one in its headers.
+    
+    Attributes:
+        name: Limiter name for logging (provider/model)
+        max_wait: Maximum seconds a request may queue before failing
+        requests: Requests-per-minute bucket (None = unlimited)
+        tokens: Tokens-per-minute bucket (None = unlimited)
+    """
+    
+    def __init__(
+        self,
+        name: str,
+        requests_per_minute: Optional[int] = None,
+        tokens_per_minute: Optional[int] = None,
+        max_wait: float = 10.0,
+    ):
+        """Initialize the limiter.
+        
+        Args:
+            name: Limiter name for logging
+            requests_per_minute: Initial RPM limit (None = until headers say otherwise)
+            tokens_per_minute: Initial TPM limit (None = until headers say otherwise)
+            max_wait: Maximum seconds a request may queue
+        """
+        self.name = name
+        self.max_wait = max_wait
+        self.requests = TokenBucket(requests_per_minute) if requests_per_minute else None
+        self.tokens = TokenBucket(tokens_per_minute) if tokens_per_minute else None
+        self._blocked_until = 0.0
+        # Held while waiting so callers are served in FIFO order
+        self._lock = asyncio.Lock()
+    
+    def _wait_time(self, estimated_tokens: int) -> float:
+        wait = max(0.0, self._blocked_until - time.monotonic())
+        if self.requests:
+            wait = max(wait, self.requests.wait_time(1))
+        if self.tokens:
+            wait = max(wait, self.tokens.wait_time(estimated_tokens))
+        return wait
+    
+    async def acquire(self, estimated_tokens: int = 0, max_wait: Optional[float] = None) -> float:
+        """Wait for capacity and reserve it.
+        
+        Args:
+            estimated_tokens: Estimated prompt + completion tokens of the request
+            max_wait: Override of the maximum queueing time (e.g. math.inf for batches)
+        
+        Returns:
+            Seconds spent waiting
+        
+        Raises:
+            RateLimitExceededError: If capacity will not be available within max_wait
+        """
+        max_wait = self.max_wait if max_wait is None else max_wait
+        start = time.monotonic()
+        async with self._lock:
+            while True:
+                wait = self._wait_time(estimated_tokens)
+                if wait <= 0:
+                    break
+                waited = time.monotonic() - start
+                if waited + wait > max_wait:
+                    raise RateLimitExceededError(
+                        f"{self.name} 速率限制: 需要等待 {wait:.1f}s，超过最大排队时间 {max_wait}s"
+                    )
+                logger.info(f"⏳ {self.name} 速率限制，排队等待 {wait:.2f}s")
+                await asyncio.sleep(wait)
+            
+            if self.requests:
+                self.requests.consume(1)
+            if self.tokens:
+                self.tokens.consume(estimated_tokens)
+        
+        return time.monotonic() - start
+    
+    def record_usage(self, actual_tokens: Optional[int], estimated_tokens: int) -> None:
+        """Correct the token bucket with the actual usage of a finished request.
+        
+        Args:
+            actual_tokens: Tokens reported by the provider (None if unknown)
+            estimated_tokens: Tokens reserved in acquire()
+        """
+        if self.tokens and actual_tokens is not None:
+            self.tokens.consume(actual_tokens - estimated_tokens)
+    
+    def update_from_headers(self, headers: Optional[Mapping[str, str]]) -> None:
+        """Update bucket state from rate-limit response headers.
+        
+        Args:
+            headers: Response headers (case-insensitive mapping or plain dict)
+        """
+        if not headers:
+            return
+        headers = {k.lower(): v for k, v in headers.items()}
+        
+        for kind in ("requests", "tokens"):
+            limit = _parse_number(
+                headers.get(f"x-ratelimit-limit-{kind}")
+                or headers.get(f"anthropic-ratelimit-{kind}-limit")
+            )
+            remaining = _parse_number(
+                headers.get(f"x-ratelimit-remaining-{kind}")
+                or headers.get(f"anthropic-ratelimit-{kind}-remaining")
+            )
+            reset = _parse_reset(
+                headers.get(f"x-ratelimit-reset-{kind}")
+                or headers.get(f"anthropic-ratelimit-{kind}-reset")
+            )
+            if limit is None and remaining is None:
+                continue
+            
+            bucket = getattr(self, kind)
+            if bucket is None:
+                if not limit:
+                    continue
+                bucket = TokenBucket(limit)
+                setattr(self, kind, bucket)
+                logger.info(f"📏 {self.name} 从响应头获取速率限制: {kind}={int(limit)}/min")
+            bucket.sync(limit, remaining, reset)
+        
+        retry_after = _parse_number(headers.get("retry-after"))
+        if retry_after:
+            self._blocked_until = max(self._blocked_until, time.monotonic() + retry_after)
+    
+    def get_state(self) -> Dict[str, Any]:
+        """Get limiter state for debugging."""
+        return {
+            "name": self.name,
+            "requests_level": round(self.requests.level, 1) if self.requests else None,
+            "requests_capacity": self.requests.capacity if self.requests else None,
+            "tokens_level": round(self.tokens.level, 1) if self.tokens else None,
+            "tokens_capacity": self.tokens.capacity if self.tokens else None,
+        }
+
+
+def _parse_number(value: Optional[str]) -> Optional[float]:
+    if value is None:
+        return None
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+_DURATION_PATTERN = re.compile(r"(\d+(?:\.\d+)?)(ms|h|m|s)")
+_DURATION_UNITS = {"h": 3600.0, "m": 60.0, "s": 1.0, "ms": 0.001}
+
+
+def _parse_reset(value: Optional[str]) -> Optional[float]:
+    """Parse a reset header into seconds from now.
+    
+    Supports OpenAI durations ("1s", "6m0s", "20ms") and Anthropic RFC 3339
+    timestamps ("2025-01-01T00:00:30Z").
+    """
+    if not value:
+        return None
+    
+    parts = _DURATION_PATTERN.findall(value)
+    if parts and "".join(n + u for n, u in parts) == value.strip():
+        return sum(float(n) * _DURATION_UNITS[u] for n, u in parts)
+    
+    number = _parse_number(value)
+    if number is not None:
+        return number
+    
+    try:
+        reset_at = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    if reset_at.tzinfo is None:
+        reset_at = reset_at.replace(tzinfo=timezone.utc)
+    return max(0.0, (reset_at - datetime.now(timezone.utc)).total_seconds())
+
+
+# Shared limiters: one per (provider, model) across all sessions
+_limiters: Dict[Tuple[str, str], RateLimiter] = {}
+
+
+def get_rate_limiter(
+    provider: str,
+    model_name: str,
+    config: Optional[RateLimitConfig] = None,
+) -> Optional[RateLimiter]:
+    """Get the shared rate limiter for a provider model.
+    
+    Args:
+        provider: Provider name (openai, anthropic, deepseek)
+        model_name: Model name
+        config: Rate limit configuration (loads from env if None)
+    
+    Returns:
+        RateLimiter instance, or None if rate limiting is disabled
+    """
+    key = (str(provider), model_name)
+    limiter = _limiters.get(key)
+    if limiter is None:
+        config = config or get_rate_limit_config(provider)
+        if not config.enabled:
+            return None
+        limiter = RateLimiter(
+            name=f"{provider}/{model_name}",
+            requests_per_minute=config.requests_per_minute,
+            tokens_per_minute=config.tokens_per_minute,
+            max_wait=config.max_wait,
+        )
+        _limiters[key] = limiter
+    return limiter
+
+
+class RateLimitCallbackHandler(AsyncCallbackHandler):
+    """Paces LangChain chat model calls through a RateLimiter.
+    
+    ``on_chat_model_start`` is awaited before the request is sent, so waiting
+    there delays the call. Headers are read from ``response_metadata`` (set by
+    ChatOpenAI's ``include_response_headers``).
+    """
+    
+    # Exceptions must propagate so a request that cannot be paced is not sent
+    raise_error = True
+    
+    def __init__(self, limiter: RateLimiter, count_tokens, completion_tokens: int):
+        """Initialize the handler.
+        
+        Args:
+            limiter: Rate limiter to pace through
+            count_tokens: Token counting function for prompt estimates
+            completion_tokens: Completion reserve added to each estimate
+        """
+        self.limiter = limiter
+        self.count_tokens = count_tokens
+        self.completion_tokens = completion_tokens
+        self._estimates: Dict[Any, int] = {}
+    
+    async def on_chat_model_start(self, serialized, messages: List[List[Any]], *, run_id, **kwargs) -> None:
+        """Wait for rate-limit capacity before the model call."""
+        prompt_tokens = sum(
+            self.count_tokens(m.content) if isinstance(m.content, str) else 0
+            for batch in messages for m in batch
+        )
+        estimate = prompt_tokens + self.completion_tokens
+        self._estimates[run_id] = estimate
+        await self.limiter.acquire(estimate)
+    
+    async def on_llm_end(self, response, *, run_id, **kwargs) -> None:
+        """Update the limiter from usage and response headers."""
+        estimate = self._estimates.pop(run_id, 0)
+        actual = None
+        for generations in response.generations:
+            for generation in generations:
+                message = getattr(generation, "message", None)
+                if message is None:
+                    continue
+                self.limiter.update_from_headers(message.response_metadata.get("headers"))
+                usage = getattr(message, "usage_metadata", None)
+                if usage:
+                    actual = (actual or 0) + usage.get("total_tokens", 0)
+        self.limiter.record_usage(actual, estimate)
+    
+    async def on_llm_error(self, error, *, run_id, **kwargs) -> None:
+        """Forget the estimate of a failed call."""
+        self._estimates.pop(run_id, None)
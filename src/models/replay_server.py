@@ -0,0 +1,386 @@
+"""Fake OpenAI-compatible server with stream record/replay.
+
+The server speaks ``POST /v1/chat/completions`` (streaming and non-streaming)
+so every OpenAI-compatible client - the wrappers, ``ChatOpenAI`` and the ReAct
+agent - can run against it unchanged.
+
+- **record** mode proxies each request to a real upstream (OpenAI, DeepSeek,
+  ...) and saves the raw SSE ``data:`` payloads with the delay before each
+  one. Payloads are stored verbatim, so DeepSeek ``reasoning_content`` deltas,
+  tool-call deltas and usage chunks are preserved.
+- **replay** mode serves saved cassettes with the original inter-chunk timing
+  multiplied by ``timing_scale`` (0 = as fast as possible), without network
+  access or API keys.
+
+Requests are matched to cassettes by a hash of their messages and tools.
+Unless ``strict`` is set, a request without an exact match (e.g. because the
+system prompt contains today's date) gets the next cassette in recorded order.
+
+Run standalone::
+
+    python -m src.models.replay_server --mode replay --port 8765
+"""
+
+import argparse
+import hashlib
+import json
+import logging
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import httpx
+
+from ..config.replay_config import ReplayConfig, ReplayMode, get_replay_config
+
+logger = logging.getLogger(__name__)
+
+# Cassette file format version
+CASSETTE_VERSION = 1
+
+# Request fields that identify a cassette (sampling parameters are ignored)
+REQUEST_KEY_FIELDS = ("messages", "tools", "tool_choice", "stream")
+
+
+class CassetteStore:
+    """Directory of recorded request/response cassettes.
+    
+    Each cassette is one JSON file named ``<index>-<key prefix>.json`` so the
+    recorded order survives reloads.
+    
+    Attributes:
+        directory: Cassette directory
+        strict: Only serve exact request matches
+    """
+    
+    def __init__(self, directory: str, strict: bool = False):
+        """Initialize the store and load existing cassettes.
+        
+        Args:
+            directory: Cassette directory (created on first save)
+            strict: Only serve exact request matches
+        """
+        self.directory = Path(directory)
+        self.strict = strict
+        self._lock = threading.Lock()
+        self._cassettes: List[Dict[str, Any]] = []
+        self._index_by_key: Dict[str, int] = {}
+        self._cursor = 0
+        self.load()
+    
+    @staticmethod
+    def request_key(body: Dict[str, Any]) -> str:
+        """Hash the identifying fields of a chat completion request."""
+        fields = {name: body.get(name) for name in REQUEST_KEY_FIELDS}
+        canonical = json.dumps(fields, sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+    
+    def load(self) -> None:
+        """(Re)load all cassettes from the directory in recorded order."""
+        with self._lock:
+            self._cassettes = []
+            self._index_by_key = {}
+            self._cursor = 0
+            if not self.directory.is_dir():
+                return
+            for path in sorted(self.directory.glob("*.json")):
+                cassette = json.loads(path.read_text(encoding="utf-8"))
+                self._index_by_key.setdefault(cassette["key"], len(self._cassettes))
+                self._cassettes.append(cassette)
+        logger.debug(f"Loaded {len(self._cassettes)} cassettes from {self.directory}")
+    
+    def find(self, body: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Find the cassette for a request.
+        
+        Args:
+            body: Chat completion request body
+        
+        Returns:
+            Matching cassette, or None if nothing can be served
+        """
+        with self._lock:
+            index = self._index_by_key.get(self.request_key(body))
+            if index is None:
+                if self.strict or self._cursor >= len(self._cassettes):
+                    return None
+                index = self._cursor
+            self._cursor = max(self._cursor, index + 1)
+            return self._cassettes[index]
+    
+    def save(self, body: Dict[str, Any], cassette: Dict[str, Any]) -> Path:
+        """Store a new cassette.
+        
+        Args:
+            body: Chat completion request body
+            cassette: Recorded response (``stream`` plus ``events`` or ``body``)
+        
+        Returns:
+            Path of the written cassette file
+        """
+        key = self.request_key(body)
+        cassette = {"version": CASSETTE_VERSION, "key": key, "request": body, **cassette}
+        with self._lock:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            path = self.directory / f"{len(self._cassettes):04d}-{key[:12]}.json"
+            path.write_text(json.dumps(cassette, ensure_ascii=False, indent=2), encoding="utf-8")
+            self._index_by_key.setdefault(key, len(self._cassettes))
+            self._cassettes.append(cassette)
+        return path
+    
+    def __len__(self) -> int:
+        return len(self._cassettes)
+
+
+class _ChatCompletionsHandler(BaseHTTPRequestHandler):
+    """Request handler; ``server.fake`` is the owning FakeOpenAIServer."""
+    
+    server_version = "FakeOpenAI/1.0"
+    
+    def log_message(self, format: str, *args) -> None:
+        logger.debug(f"replay server: {format % args}")
+    
+    def do_POST(self) -> None:
+        if not self.path.rstrip("/").endswith("/chat/completions"):
+            self._send_error(404, f"Unknown endpoint: {self.path}", "not_found")
+            return
+        length = int(self.headers.get("Content-Length") or 0)
+        try:
+            body = json.loads(self.rfile.read(length) or b"{}")
+        except json.JSONDecodeError as e:
+            self._send_error(400, f"Invalid JSON body: {e}", "invalid_json")
+            return
+        
+        fake: FakeOpenAIServer = self.server.fake
+        try:
+            if fake.mode == ReplayMode.RECORD:
+                self._record(fake, body)
+            else:
+                self._replay(fake, body)
+        except (BrokenPipeError, ConnectionResetError):
+            logger.debug("replay server: client disconnected")
+    
+    def _send_error(self, status: int, message: str, code: str) -> None:
+        payload = json.dumps({
+            "error": {"message": message, "type": "invalid_request_error", "code": code}
+        }).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+    
+    def _start_event_stream(self, status: int = 200) -> None:
+        self.send_response(status)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.end_headers()
+    
+    def _write_event(self, data: str) -> None:
+        self.wfile.write(f"data: {data}\n\n".encode("utf-8"))
+        self.wfile.flush()
+    
+    def _send_json(self, status: int, content: bytes) -> None:
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+    
+    def _replay(self, fake: "FakeOpenAIServer", body: Dict[str, Any]) -> None:
+        cassette = fake.store.find(body)
+        if cassette is None:
+            self._send_error(404, "No cassette recorded for this request", "cassette_not_found")
+            return
+        
+        if cassette["stream"]:
+            self._start_event_stream(cassette.get("status", 200))
+            for event in cassette["events"]:
+                fake.sleep(event["delay"])
+                self._write_event(event["data"])
+        else:
+            fake.sleep(cassette.get("latency", 0.0))
+            content = json.dumps(cassette["body"], ensure_ascii=False).encode("utf-8")
+            self._send_json(cassette.get("status", 200), content)
+    
+    def _record(self, fake: "FakeOpenAIServer", body: Dict[str, Any]) -> None:
+        url = f"{fake.upstream_base_url.rstrip('/')}/chat/completions"
+        headers = {"Content-Type": "application/json"}
+        if fake.upstream_api_key:
+            headers["Authorization"] = f"Bearer {fake.upstream_api_key}"
+        
+        start = time.monotonic()
+        with httpx.Client(timeout=fake.upstream_timeout) as client:
+            with client.stream("POST", url, json=body, headers=headers) as response:
+                if body.get("stream") and response.status_code == 200:
+                    self._start_event_stream()
+                    events = []
+                    last = start
+                    for line in response.iter_lines():
+                        # Skip keep-alive comments and blank separators
+                        if not line.startswith("data:"):
+                            continue
+                        data = line[len("data:"):].strip()
+                        now = time.monotonic()
+                        events.append({"delay": round(now - last, 4), "data": data})
+                        last = now
+                        self._write_event(data)
+                    cassette = {"stream": True, "status": 200, "events": events}
+                else:
+                    content = response.read()
+                    latency = round(time.monotonic() - start, 4)
+                    self._send_json(response.status_code, content)
+                    if response.status_code != 200:
+                        # Errors are passed through but not recorded
+                        logger.warning(f"⚠️ 上游返回 {response.status_code}，未录制该请求")
+                        return
+                    cassette = {
+                        "stream": False,
+                        "status": 200,
+                        "latency": latency,
+                        "body": json.loads(content),
+                    }
+        
+        path = fake.store.save(body, cassette)
+        logger.info(f"📼 已录制 {path.name} ({time.monotonic() - start:.2f}s)")
+
+
+class FakeOpenAIServer:
+    """In-process OpenAI-compatible server that records or replays cassettes.
+    
+    Attributes:
+        store: Cassette store
+        mode: ReplayMode value
+        timing_scale: Multiplier for recorded delays
+        upstream_base_url: API to record from (record mode)
+        upstream_api_key: API key for the upstream
+        upstream_timeout: Upstream request timeout in seconds
+    """
+    
+    def __init__(
+        self,
+        store: CassetteStore,
+        mode: str = ReplayMode.REPLAY,
+        timing_scale: float = 1.0,
+        upstream_base_url: Optional[str] = None,
+        upstream_api_key: Optional[str] = None,
+        upstream_timeout: float = 120.0,
+        host: str = "127.0.0.1",
+        port: int = 0,
+    ):
+        """Initialize the server (call start() to serve).
+        
+        Args:
+            store: Cassette store
+            mode: "replay" or "record"
+            timing_scale: Multiplier for recorded delays (0 = no delays)
+            upstream_base_url: API to record from (required in record mode)
+            upstream_api_key: API key for the upstream
+            upstream_timeout: Upstream request timeout in seconds
+            host: Bind address
+            port: Bind port (0 = pick a free port)
+        
+        Raises:
+            ValueError: If record mode has no upstream
+        """
+        self.mode = ReplayMode(mode)
+        if self.mode == ReplayMode.RECORD and not upstream_base_url:
+            raise ValueError("Record mode requires an upstream base URL (REPLAY_UPSTREAM_BASE_URL)")
+        self.store = store
+        self.timing_scale = timing_scale
+        self.upstream_base_url = upstream_base_url
+        self.upstream_api_key = upstream_api_key
+        self.upstream_timeout = upstream_timeout
+        self._httpd = ThreadingHTTPServer((host, port), _ChatCompletionsHandler)
+        self._httpd.daemon_threads = True
+        self._httpd.fake = self
+        self._thread: Optional[threading.Thread] = None
+    
+    @classmethod
+    def from_config(cls, config: Optional[ReplayConfig] = None, **kwargs) -> "FakeOpenAIServer":
+        """Create a server from ReplayConfig (loads from env if None)."""
+        config = config or get_replay_config()
+        return cls(
+            store=CassetteStore(config.cassette_dir, strict=config.strict),
+            mode=config.mode,
+            timing_scale=config.timing_scale,
+            upstream_base_url=config.upstream_base_url,
+            upstream_api_key=config.upstream_api_key,
+            **kwargs,
+        )
+    
+    @property
+    def base_url(self) -> str:
+        """OpenAI-compatible base URL of the server (…/v1)."""
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}/v1"
+    
+    def sleep(self, delay: float) -> None:
+        """Sleep for a recorded delay scaled by timing_scale."""
+        delay *= self.timing_scale
+        if delay > 0:
+            time.sleep(delay)
+    
+    def start(self) -> "FakeOpenAIServer":
+        """Serve in a background daemon thread."""
+        if self._thread is None:
+            self._thread = threading.Thread(
+                target=self._httpd.serve_forever, name="fake-openai-server", daemon=True
+            )
+            self._thread.start()
+            logger.info(
+                f"📼 Fake OpenAI 服务已启动 ({self.mode.value}): {self.base_url}, "
+                f"{len(self.store)} 个录制"
+            )
+        return self
+    
+    def stop(self) -> None:
+        """Stop serving and close the socket."""
+        if self._thread is not None:
+            self._httpd.shutdown()
+            self._thread.join()
+            self._thread = None
+        self._httpd.server_close()
+    
+    def __enter__(self) -> "FakeOpenAIServer":
+        return self.start()
+    
+    def __exit__(self, *exc_info) -> None:
+        self.stop()
+
+
+def main() -> None:
+    """Run the fake server in the foreground (settings default to REPLAY_* env vars)."""
+    config = get_replay_config()
+    parser = argparse.ArgumentParser(description="Fake OpenAI-compatible record/replay server")
+    parser.add_argument("--mode", choices=[m.value for m in ReplayMode], default=config.mode)
+    parser.add_argument("--cassettes", default=config.cassette_dir)
+    parser.add_argument("--timing-scale", type=float, default=config.timing_scale)
+    parser.add_argument("--strict", action="store_true", default=config.strict)
+    parser.add_argument("--upstream", default=config.upstream_base_url)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+    
+    logging.basicConfig(level=logging.INFO)
+    server = FakeOpenAIServer(
+        store=CassetteStore(args.cassettes, strict=args.strict),
+        mode=args.mode,
+        timing_scale=args.timing_scale,
+        upstream_base_url=args.upstream,
+        upstream_api_key=config.upstream_api_key,
+        host=args.host,
+        port=args.port,
+    )
+    print(f"Serving {args.mode} on {server.base_url} (Ctrl+C to stop)")
+    try:
+        server._httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server._httpd.server_close()
+
+
+if __name__ == "__main__":
+    main()
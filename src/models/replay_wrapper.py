@@ -0,0 +1,96 @@
+"""Replay model wrapper backed by the fake OpenAI-compatible server."""
+
+import logging
+import math
+from typing import Optional
+
+from langchain_openai import ChatOpenAI
+from openai import AsyncOpenAI
+
+from ..config.model_config import ModelConfig
+from ..config.replay_config import ReplayConfig
+from .base import BaseModelWrapper
+from .deepseek_wrapper import DeepSeekChatOpenAI, DeepSeekWrapper
+from .replay_server import FakeOpenAIServer
+
+logger = logging.getLogger(__name__)
+
+
+class ReplayWrapper(DeepSeekWrapper):
+    """Wrapper that serves recorded streams for offline benchmarks and CI.
+    
+    Reuses the DeepSeek request/stream handling (a superset of OpenAI's:
+    ``reasoning_content`` deltas become reasoning chunks) against a
+    FakeOpenAIServer. Without ``config.base_url`` an in-process server is
+    started from the ``REPLAY_*`` settings; in record mode that server proxies
+    to the real upstream and saves cassettes.
+    """
+    
+    def __init__(self, config: ModelConfig, replay_config: Optional[ReplayConfig] = None):
+        """Initialize replay wrapper.
+        
+        Args:
+            config: Model configuration (base_url points to a running fake server)
+            replay_config: Settings for the in-process server (loads from env if None)
+        """
+        # Deliberately skips DeepSeekWrapper.__init__: no tokenizer download offline
+        BaseModelWrapper.__init__(self, config)
+        
+        self.server: Optional[FakeOpenAIServer] = None
+        base_url = config.base_url
+        if not base_url:
+            self.server = FakeOpenAIServer.from_config(replay_config).start()
+            base_url = self.server.base_url
+            self.config = config.model_copy(update={"base_url": base_url})
+        
+        self.client = AsyncOpenAI(
+            api_key=config.api_key,
+            base_url=base_url,
+            max_retries=0,  # The shared retry policy is the only retry layer
+        )
+        self.model = ChatOpenAI(
+            model=config.model_name,
+            temperature=config.temperature,
+            max_tokens=config.max_tokens,
+            openai_api_key=config.api_key,
+            openai_api_base=base_url,
+            request_timeout=config.timeout,
+        )
+        logger.info(f"📼 Replay provider 使用 {base_url}")
+    
+    def count_tokens(self, text: str) -> int:
+        """Estimate tokens as one per four characters (deterministic and offline).
+        
+        Args:
+            text: Text to count tokens for
+        
+        Returns:
+            Estimated number of tokens
+        """
+        return math.ceil(len(text) / 4)
+    
+    def get_langchain_llm(self):
+        """Get LangChain compatible LLM instance pointing at the fake server.
+        
+        Returns:
+            DeepSeekChatOpenAI instance, so recorded DeepSeek tool-call turns
+            replay with the same request payloads they were recorded with
+        """
+        callbacks = self._get_callbacks()
+        
+        return DeepSeekChatOpenAI(
+            model=self.config.model_name,
+            temperature=self.config.temperature,
+            max_tokens=self.config.max_tokens,
+            openai_api_key=self.config.api_key,
+            openai_api_base=self.config.base_url,
+            request_timeout=self.config.timeout,
+            callbacks=callbacks if callbacks else None,
+            include_response_headers=True,
+        )
+    
+    def close(self) -> None:
+        """Stop the in-process fake server, if one was started."""
+        if self.server is not None:
+            self.server.stop()
+            self.server = None
@@ -0,0 +1,43 @@
+"""Runtime policies shared across model, tool and search calls."""
+
+from .cancellation import (
+    CancellationStats,
+    CancelReason,
+    RequestTracker,
+    get_cancellation_stats,
+)
+from .deadline import (
+    Deadline,
+    deadline_expired,
+    deadline_scope,
+    get_deadline,
+    remaining_timeout,
+)
+from .retry_policy import (
+    ErrorKind,
+    RetryBudget,
+    RetryPolicy,
+    classify_error,
+    get_retry_policy,
+    with_retry,
+    with_stream_retry,
+)
+
+__all__ = [
+    "CancellationStats",
+    "CancelReason",
+    "RequestTracker",
+    "get_cancellation_stats",
+    "Deadline",
+    "deadline_expired",
+    "deadline_scope",
+    "get_deadline",
+    "remaining_timeout",
+    "ErrorKind",
+    "RetryBudget",
+    "RetryPolicy",
+    "classify_error",
+    "get_retry_policy",
+    "with_retry",
+    "with_stream_retry",
+]
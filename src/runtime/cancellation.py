@@ -0,0 +1,177 @@
+"""Cooperative cancellation of abandoned or superseded requests.
+
+A user request runs as one asyncio task (the Chainlit message handler). When
+the user presses stop, disconnects or sends a new message, that task is
+cancelled: ``CancelledError`` is raised at whatever network call it awaits -
+model stream, SearXNG request, MCP SSE session - and unwinds through the
+agent and the handlers, which discard their partial results instead of
+storing them. Layers only need to let ``CancelledError`` pass (it is not an
+``Exception``) and close what they opened.
+
+:class:`RequestTracker` keeps the in-flight request of one session;
+:class:`CancellationStats` counts cancelled requests and calls process-wide.
+"""
+
+import asyncio
+import logging
+import threading
+from contextlib import asynccontextmanager
+from enum import Enum
+from typing import AsyncIterator, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class CancelReason(str, Enum):
+    """Why a request was cancelled."""
+    
+    STOPPED = "stopped"
+    SUPERSEDED = "superseded"
+    DISCONNECTED = "disconnected"
+
+
+class CancellationStats:
+    """Process-wide counters of cancelled work.
+    
+    Requests are counted per kind (``chat`` / ``agent``) and reason; calls
+    per kind (``llm_stream``, ``search``, ``mcp_tool``, ...) that were
+    interrupted by a cancellation. ``discarded_chars`` sums the partial
+    answers that were thrown away.
+    """
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._requests: Dict[str, Dict[str, int]] = {}
+        self._calls: Dict[str, int] = {}
+        self.discarded_chars = 0
+    
+    def record_request(self, kind: str, reason: CancelReason) -> None:
+        """Record a cancelled request.
+        
+        Args:
+            kind: Request kind (``chat`` / ``agent``)
+            reason: Why it was cancelled
+        """
+        with self._lock:
+            per_reason = self._requests.setdefault(kind, {})
+            per_reason[reason.value] = per_reason.get(reason.value, 0) + 1
+    
+    def record_discarded(self, chars: int) -> None:
+        """Record the length of a partial answer that was discarded."""
+        with self._lock:
+            self.discarded_chars += chars
+    
+    def record_call(self, kind: str) -> None:
+        """Record a network call interrupted by a cancellation."""
+        with self._lock:
+            self._calls[kind] = self._calls.get(kind, 0) + 1
+    
+    def summary(self) -> dict:
+        """Get the cancellation counters.
+        
+        Returns:
+            Dict with ``requests`` (kind -> reason -> count), ``calls``
+            (kind -> count), ``total_requests`` and ``discarded_chars``
+        """
+        with self._lock:
+            requests = {kind: dict(reasons) for kind, reasons in self._requests.items()}
+            calls = dict(self._calls)
+            discarded_chars = self.discarded_chars
+        return {
+            "requests": requests,
+            "calls": calls,
+            "total_requests": sum(sum(reasons.values()) for reasons in requests.values()),
+            "discarded_chars": discarded_chars,
+        }
+
+
+class RequestTracker:
+    """In-flight request of one session.
+    
+    Starting a request supersedes the previous one: it is cancelled and
+    given a short grace period to unwind, so its cleanup never races the new
+    request's use of the session state.
+    
+    Attributes:
+        stats: Counters the cancellations are recorded in
+        grace_period: Seconds to wait for a superseded request to unwind
+    """
+    
+    def __init__(self, stats: Optional[CancellationStats] = None, grace_period: float = 2.0):
+        """Initialize the tracker.
+        
+        Args:
+            stats: Counters (defaults to the process-wide stats)
+            grace_period: Seconds to wait for a superseded request to unwind
+        """
+        self.stats = stats or get_cancellation_stats()
+        self.grace_period = grace_period
+        self._task: Optional[asyncio.Task] = None
+        # Reasons of cancelled requests that have not unwound yet
+        self._reasons: Dict[asyncio.Task, CancelReason] = {}
+    
+    @property
+    def active(self) -> bool:
+        """Whether a request is in flight."""
+        return self._task is not None and not self._task.done()
+    
+    def cancel(self, reason: CancelReason) -> bool:
+        """Cancel the in-flight request.
+        
+        Args:
+            reason: Why it is cancelled
+        
+        Returns:
+            True if a request was in flight
+        """
+        if not self.active:
+            return False
+        self._reasons.setdefault(self._task, reason)
+        self._task.cancel()
+        logger.info(f"🛑 取消进行中的请求 ({reason.value})")
+        return True
+    
+    async def wait(self) -> None:
+        """Wait (at most grace_period) for the in-flight request to unwind."""
+        if self.active:
+            await asyncio.wait({self._task}, timeout=self.grace_period)
+    
+    @asynccontextmanager
+    async def track(self, kind: str) -> AsyncIterator[None]:
+        """Run the current task as the session's request.
+        
+        A cancellation of the block is recorded with its reason and re-raised.
+        
+        Args:
+            kind: Request kind (``chat`` / ``agent``)
+        """
+        previous = self._task
+        if self.cancel(CancelReason.SUPERSEDED):
+            await asyncio.wait({previous}, timeout=self.grace_period)
+        
+        task = asyncio.current_task()
+        self._task = task
+        try:
+            yield
+        except asyncio.CancelledError:
+            # Chainlit's stop button cancels the task directly
+            reason = self._reasons.get(task, CancelReason.STOPPED)
+            self.stats.record_request(kind, reason)
+            logger.info(f"🛑 请求已取消 ({kind}, {reason.value})，丢弃未完成的结果")
+            raise
+        finally:
+            self._reasons.pop(task, None)
+            if self._task is task:
+                self._task = None
+
+
+# Process-wide singleton
+_cancellation_stats: Optional[CancellationStats] = None
+
+
+def get_cancellation_stats() -> CancellationStats:
+    """Get the process-wide cancellation counters."""
+    global _cancellation_stats
+    if _cancellation_stats is None:
+        _cancellation_stats = CancellationStats()
+    return _cancellation_stats
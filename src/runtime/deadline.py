@@ -0,0 +1,121 @@
+"""Request deadline carried through the call stack.
+
+An agent run has one overall time budget (``AgentConfig.max_execution_time``).
+Instead of every layer using its own fixed timeout and the outer timeout
+firing in the middle of an operation, the run opens a :func:`deadline_scope`
+and each layer derives its timeout from the time that is left: search, MCP
+and model calls shrink their timeouts, retries stop once no attempt can
+finish, and the agent stops its tool loop while there is still time to answer.
+
+The deadline lives in a ContextVar, so it follows the run into tool calls and
+tasks started from it without being threaded through every signature.
+"""
+
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Iterator, Optional
+
+# Smallest timeout handed to a call once a deadline is close (or passed): the
+# call fails fast instead of getting a zero or negative timeout
+MIN_TIMEOUT = 0.5
+
+
+class Deadline:
+    """Point in time by which a run must have finished.
+    
+    Attributes:
+        expires_at: Clock value of the deadline
+        clock: Monotonic clock in seconds
+    """
+    
+    def __init__(self, seconds: float, clock: Callable[[], float] = time.monotonic):
+        """Start a deadline.
+        
+        Args:
+            seconds: Time budget from now
+            clock: Monotonic clock in seconds
+        """
+        self.clock = clock
+        self.expires_at = clock() + seconds
+    
+    def remaining(self) -> float:
+        """Seconds left until the deadline (0 once it has passed)."""
+        return max(0.0, self.expires_at - self.clock())
+    
+    def expired(self, reserve: float = 0.0) -> bool:
+        """Whether less than ``reserve`` seconds are left."""
+        return self.remaining() <= reserve
+    
+    def timeout(self, default: Optional[float] = None, reserve: float = 0.0) -> float:
+        """Timeout for a call that must end ``reserve`` seconds before the deadline.
+        
+        Args:
+            default: The call's own timeout (the result never exceeds it)
+            reserve: Time kept back for work after the call
+        
+        Returns:
+            Timeout in seconds (at least MIN_TIMEOUT)
+        """
+        left = self.remaining() - reserve
+        if default is not None:
+            left = min(left, default)
+        return max(MIN_TIMEOUT, left)
+
+
+current_deadline: ContextVar[Optional[Deadline]] = ContextVar("current_deadline", default=None)
+
+
+def get_deadline() -> Optional[Deadline]:
+    """Get the deadline of the current run (None outside a deadline scope)."""
+    return current_deadline.get()
+
+
+@contextmanager
+def deadline_scope(seconds: float, clock: Callable[[], float] = time.monotonic) -> Iterator[Deadline]:
+    """Run a block under a deadline.
+    
+    A scope nested in a tighter one keeps the tighter deadline.
+    
+    Args:
+        seconds: Time budget of the block
+        clock: Monotonic clock in seconds
+    
+    Yields:
+        Deadline in effect inside the block
+    """
+    deadline = Deadline(seconds, clock)
+    outer = current_deadline.get()
+    if outer is not None and outer.expires_at <= deadline.expires_at:
+        deadline = outer
+    token = current_deadline.set(deadline)
+    try:
+        yield deadline
+    finally:
+        try:
+            current_deadline.reset(token)
+        except ValueError:
+            # An async generator closed from another context (e.g. by GC)
+            current_deadline.set(outer)
+
+
+def remaining_timeout(default: float, reserve: float = 0.0) -> float:
+    """Shrink a call's own timeout to the time left in the current run.
+    
+    Args:
+        default: The call's own timeout (used as is outside a deadline scope)
+        reserve: Time kept back for work after the call
+    
+    Returns:
+        Timeout in seconds
+    """
+    deadline = current_deadline.get()
+    if deadline is None:
+        return default
+    return deadline.timeout(default, reserve)
+
+
+def deadline_expired(reserve: float = 0.0) -> bool:
+    """Whether the current run has less than ``reserve`` seconds left (False without a deadline)."""
+    deadline = current_deadline.get()
+    return deadline is not None and deadline.expired(reserve)
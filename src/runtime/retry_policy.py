@@ -0,0 +1,378 @@
+"""Shared retry policy with error classification and a process-wide retry budget.
+
+Only transient failures are retried (timeouts, connection errors, 429, 5xx).
+Permanent failures - bad requests, authentication, context length, exhausted
+quota - fail immediately. Backoff uses full jitter, and every retry must be
+paid for from a process-wide :class:`RetryBudget`, so an outage cannot
+multiply load by the retry count.
+
+Streams are retried only before their first chunk; once output has reached
+the caller a failure is raised instead of replaying duplicate text.
+
+Inside a deadline scope (see :mod:`.deadline`) backoff is capped to the time
+left and no retry is started once the run's deadline is reached.
+"""
+
+import asyncio
+import functools
+from contextlib import aclosing
+import logging
+import random
+import time
+from collections import deque
+from enum import Enum
+from typing import (
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Deque,
+    Optional,
+    TypeVar,
+)
+
+import httpx
+
+from ..config.retry_config import RetryConfig, get_retry_config
+from .deadline import MIN_TIMEOUT, deadline_expired, get_deadline
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class ErrorKind(str, Enum):
+    """Retry classification of an error."""
+    
+    TRANSIENT = "transient"
+    RATE_LIMIT = "rate_limit"
+    PERMANENT = "permanent"
+
+
+# HTTP status codes that indicate a transient server-side condition
+TRANSIENT_STATUS_CODES = {408, 409, 500, 502, 503, 504, 529}
+
+# Error codes that come with a 429 but will not go away by retrying
+PERMANENT_RATE_LIMIT_CODES = {"insufficient_quota", "billing_hard_limit_reached"}
+
+
+def _get_status_code(error: BaseException) -> Optional[int]:
+    """Extract an HTTP status code from provider SDK or httpx errors."""
+    status = getattr(error, "status_code", None)
+    if isinstance(status, int):
+        return status
+    response = getattr(error, "response", None)
+    status = getattr(response, "status_code", None)
+    return status if isinstance(status, int) else None
+
+
+def classify_error(error: BaseException) -> ErrorKind:
+    """Classify an error for retrying.
+    
+    Works by duck typing so it covers openai, anthropic and httpx errors
+    without importing every SDK.
+    
+    Args:
+        error: Raised exception
+    
+    Returns:
+        ErrorKind of the error (unknown errors are permanent)
+    """
+    # anyio task groups (e.g. the MCP SSE client) wrap errors in groups
+    if isinstance(error, BaseExceptionGroup):
+        kinds = {classify_error(e) for e in error.exceptions}
+        if kinds and ErrorKind.PERMANENT not in kinds:
+            return ErrorKind.RATE_LIMIT if ErrorKind.RATE_LIMIT in kinds else ErrorKind.TRANSIENT
+        return ErrorKind.PERMANENT
+    
+    if isinstance(error, (asyncio.TimeoutError, TimeoutError, ConnectionError)):
+        return ErrorKind.TRANSIENT
+    if isinstance(error, (httpx.TimeoutException, httpx.TransportError)):
+        return ErrorKind.TRANSIENT
+    
+    status = _get_status_code(error)
+    if status is not None:
+        if status == 429:
+            code = getattr(error, "code", None)
+            body = getattr(error, "body", None)
+            if isinstance(body, dict):
+                code = code or (body.get("error") or {}).get("code") or body.get("code")
+            if code in PERMANENT_RATE_LIMIT_CODES:
+                return ErrorKind.PERMANENT
+            return ErrorKind.RATE_LIMIT
+        if status in TRANSIENT_STATUS_CODES:
+            return ErrorKind.TRANSIENT
+        return ErrorKind.PERMANENT
+    
+    # SDK connection/timeout errors carry no status code
+    if type(error).__name__ in ("APIConnectionError", "APITimeoutError"):
+        return ErrorKind.TRANSIENT
+    
+    return ErrorKind.PERMANENT
+
+
+def is_retryable(error: BaseException) -> bool:
+    """Whether an error is worth retrying."""
+    return classify_error(error) != ErrorKind.PERMANENT
+
+
+def is_retryable_before_send(error: BaseException) -> bool:
+    """Whether an error proves the request was not processed by the server.
+    
+    For non-idempotent operations (e.g. MCP tools that send messages) only
+    connection failures and explicit throttling/unavailability are safe to
+    retry - a read timeout may mean the operation already ran.
+    """
+    if isinstance(error, BaseExceptionGroup):
+        return bool(error.exceptions) and all(is_retryable_before_send(e) for e in error.exceptions)
+    if isinstance(error, (httpx.ConnectError, httpx.ConnectTimeout, ConnectionRefusedError)):
+        return True
+    return _get_status_code(error) in (429, 503)
+
+
+class RetryBudget:
+    """Process-wide cap on retries relative to request volume.
+    
+    Within a sliding window, retries are allowed up to
+    ``min_retries + ratio * requests``. Under normal load this is never hit;
+    during an outage it stops every caller from tripling traffic.
+    
+    Attributes:
+        ratio: Allowed retries per request
+        min_retries: Retries always allowed per window (for low traffic)
+        window: Sliding window length in seconds
+    """
+    
+    def __init__(self, ratio: float = 0.2, min_retries: int = 10, window: float = 10.0):
+        """Initialize the budget.
+        
+        Args:
+            ratio: Allowed retries per request
+            min_retries: Retries always allowed per window
+            window: Sliding window length in seconds
+        """
+        self.ratio = ratio
+        self.min_retries = min_retries
+        self.window = window
+        self._requests: Deque[float] = deque()
+        self._retries: Deque[float] = deque()
+    
+    def _prune(self, now: float) -> None:
+        cutoff = now - self.window
+        for events in (self._requests, self._retries):
+            while events and events[0] < cutoff:
+                events.popleft()
+    
+    def record_request(self) -> None:
+        """Record an original (non-retry) attempt."""
+        now = time.monotonic()
+        self._prune(now)
+        self._requests.append(now)
+    
+    def try_acquire(self) -> bool:
+        """Take one retry from the budget.
+        
+        Returns:
+            True if the retry is allowed
+        """
+        now = time.monotonic()
+        self._prune(now)
+        if len(self._retries) >= self.min_retries + self.ratio * len(self._requests):
+            return False
+        self._retries.append(now)
+        return True
+
+
+class RetryPolicy:
+    """Retry policy with classification, jittered backoff and a shared budget.
+    
+    Attributes:
+        max_attempts: Maximum attempts including the first one
+        base_delay: Backoff base in seconds
+        max_delay: Backoff ceiling in seconds
+        budget: Shared retry budget
+        retryable: Predicate deciding whether an error may be retried
+    """
+    
+    def __init__(
+        self,
+        max_attempts: int = 3,
+        base_delay: float = 0.5,
+        max_delay: float = 8.0,
+        budget: Optional[RetryBudget] = None,
+        retryable: Callable[[BaseException], bool] = is_retryable,
+    ):
+        """Initialize the policy.
+        
+        Args:
+            max_attempts: Maximum attempts including the first one
+            base_delay: Backoff base in seconds
+            max_delay: Backoff ceiling in seconds
+            budget: Shared retry budget (defaults to the process-wide budget)
+            retryable: Predicate deciding whether an error may be retried
+        """
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.budget = budget or get_retry_budget()
+        self.retryable = retryable
+    
+    def backoff(self, attempt: int, error: Optional[BaseException] = None) -> float:
+        """Delay before the retry following ``attempt`` (1-based).
+        
+        Uses full jitter. A server-provided ``retry-after`` wins when present
+        (capped at max_delay).
+        """
+        response = getattr(error, "response", None)
+        headers = getattr(response, "headers", None)
+        if headers:
+            try:
+                retry_after = float(headers.get("retry-after", ""))
+                return min(self.max_delay, max(0.0, retry_after))
+            except (TypeError, ValueError):
+                pass
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+    
+    def _should_retry(self, attempt: int, error: BaseException, name: str) -> bool:
+        if attempt >= self.max_attempts:
+            return False
+        if not self.retryable(error):
+            logger.debug(f"{name}: 不可重试的错误 ({classify_error(error).value}): {error}")
+            return False
+        if deadline_expired(reserve=MIN_TIMEOUT):
+            logger.warning(f"⏳ {name}: 已接近截止时间，不再重试: {error}")
+            return False
+        if not self.budget.try_acquire():
+            logger.warning(f"⚠️ {name}: 重试预算已耗尽，不再重试: {error}")
+            return False
+        return True
+    
+    @staticmethod
+    def _deadline_delay(delay: float) -> float:
+        """Cap a backoff delay so the retry still starts before the deadline."""
+        deadline = get_deadline()
+        if deadline is None:
+            return delay
+        return max(0.0, min(delay, deadline.remaining() - MIN_TIMEOUT))
+    
+    async def call(self, fn: Callable[..., Awaitable[T]], *args, **kwargs) -> T:
+        """Call a coroutine function with retries.
+        
+        Args:
+            fn: Coroutine function
+            *args, **kwargs: Arguments passed to ``fn`` on every attempt
+        
+        Returns:
+            Result of ``fn``
+        """
+        name = getattr(fn, "__qualname__", repr(fn))
+        self.budget.record_request()
+        attempt = 1
+        while True:
+            try:
+                return await fn(*args, **kwargs)
+            except Exception as e:
+                if not self._should_retry(attempt, e, name):
+                    raise
+                delay = self._deadline_delay(self.backoff(attempt, e))
+                logger.warning(
+                    f"🔁 {name} 第 {attempt} 次尝试失败 ({classify_error(e).value})，"
+                    f"{delay:.2f}s 后重试: {e}"
+                )
+                await asyncio.sleep(delay)
+                attempt += 1
+    
+    async def stream(self, fn: Callable[..., AsyncIterator[T]], *args, **kwargs) -> AsyncIterator[T]:
+        """Iterate an async generator function, retrying only before the first item.
+        
+        Args:
+            fn: Async generator function
+            *args, **kwargs: Arguments passed to ``fn`` on every attempt
+        
+        Yields:
+            Items of the stream
+        """
+        name = getattr(fn, "__qualname__", repr(fn))
+        self.budget.record_request()
+        attempt = 1
+        while True:
+            started = False
+            try:
+                # aclosing: a consumer that stops early also closes the attempt's stream
+                async with aclosing(fn(*args, **kwargs)) as items:
+                    async for item in items:
+                        started = True
+                        yield item
+                return
+            except Exception as e:
+                if started or not self._should_retry(attempt, e, name):
+                    raise
+                delay = self._deadline_delay(self.backoff(attempt, e))
+                logger.warning(
+                    f"🔁 {name} 流式调用在首个数据块前失败 ({classify_error(e).value})，"
+                    f"{delay:.2f}s 后重试: {e}"
+                )
+                await asyncio.sleep(delay)
+                attempt += 1
+
+
+def with_retry(policy: Optional[RetryPolicy] = None):
+    """Decorate a coroutine function with a retry policy.
+    
+    Args:
+        policy: Retry policy (defaults to the shared policy, resolved per call)
+    """
+    def decorator(fn):
+        @functools.wraps(fn)
+        async def wrapper(*args, **kwargs):
+            return await (policy or get_retry_policy()).call(fn, *args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def with_stream_retry(policy: Optional[RetryPolicy] = None):
+    """Decorate an async generator function; retries happen only before the first item.
+    
+    Args:
+        policy: Retry policy (defaults to the shared policy, resolved per call)
+    """
+    def decorator(fn):
+        @functools.wraps(fn)
+        async def wrapper(*args, **kwargs):
+            # Closing the wrapper closes the attempt (and the provider stream) right away
+            async with aclosing((policy or get_retry_policy()).stream(fn, *args, **kwargs)) as items:
+                async for item in items:
+                    yield item
+        return wrapper
+    return decorator
+
+
+# Process-wide singletons
+_retry_budget: Optional[RetryBudget] = None
+_retry_policy: Optional[RetryPolicy] = None
+
+
+def get_retry_budget(config: Optional[RetryConfig] = None) -> RetryBudget:
+    """Get the process-wide retry budget."""
+    global _retry_budget
+    if _retry_budget is None:
+        config = config or get_retry_config()
+        _retry_budget = RetryBudget(
+            ratio=config.budget_ratio,
+            min_retries=config.budget_min_retries,
+            window=config.budget_window,
+        )
+    return _retry_budget
+
+
+def get_retry_policy(config: Optional[RetryConfig] = None) -> RetryPolicy:
+    """Get the shared retry policy for model calls."""
+    global _retry_policy
+    if _retry_policy is None:
+        config = config or get_retry_config()
+        _retry_policy = RetryPolicy(
+            max_attempts=config.max_attempts,
+            base_delay=config.base_delay,
+            max_delay=config.max_delay,
+            budget=get_retry_budget(config),
+        )
+    return _retry_policy
@@ -2,7 +2,7 @@
 
 import logging
 import re
-from typing import Dict, List, Set
+from typing import Dict, List, Optional, Set
 from urllib.parse import urlparse
 
 from .models import SearchResponse
@@ -150,17 +150,36 @@ class CitationProcessor:
             logger.debug("No valid citations found in text")
             return ""
         
+        return self.format_citations_list(valid_citations)
+    
+    def format_citations_list(self, cited_nums) -> str:
+        """Format the citations section for already known citation numbers.
+        
+        Args:
+            cited_nums: Citation numbers present in the citation map
+                (e.g. ``StreamingCitationConverter.cited``)
+        
+        Returns:
+            Formatted citations section (empty string if no citations)
+        """
+        if not cited_nums:
+            return ""
+        
         # Build formatted citations list
         citations = "\n\n---\n**📚 参考文献:**\n"
         
-        for num in sorted(valid_citations):
+        for num in sorted(cited_nums):
             info = self.citation_map[num]
             citations += f"\n{num}. [{info['title']}]({info['url']}) - `{info['domain']}`"
         
-        logger.info(f"Generated citations list with {len(valid_citations)} reference(s)")
+        logger.info(f"Generated citations list with {len(cited_nums)} reference(s)")
         
         return citations
     
+    def stream_converter(self) -> "StreamingCitationConverter":
+        """Create a converter turning citations into links while the answer streams."""
+        return StreamingCitationConverter(self.citation_map)
+    
     def process_response(self, text: str) -> str:
         """Full processing: convert citations and add reference list.
         
@@ -178,3 +197,81 @@ class CitationProcessor:
         
         return converted + citations_list
 
+
+
+class StreamingCitationConverter:
+    """Convert [num] citations to [[num]](url) links token by token.
+    
+    A small state machine: text after an unmatched ``[`` followed only by
+    digits is held back until the closing ``]`` (or any other character)
+    decides whether it is a citation, so markers split across chunks are
+    converted exactly like ``CitationProcessor.convert_citations`` would
+    convert the full text. Used citation numbers are collected on the way.
+    
+    Attributes:
+        citation_map: Citation number -> {'url', 'title', 'domain'}
+        cited: Valid citation numbers in order of first use
+    """
+    
+    # Longer digit runs cannot be citation numbers, stop holding them back
+    MAX_DIGITS = 6
+    
+    def __init__(self, citation_map: Dict[int, Dict[str, str]]):
+        """Initialize with the citation map to link against.
+        
+        Args:
+            citation_map: Citation number -> info dict with at least 'url'
+        """
+        self.citation_map = citation_map
+        self.cited: List[int] = []
+        self._pending = ""
+    
+    def feed(self, token: str) -> str:
+        """Consume a streamed token.
+        
+        Args:
+            token: Next piece of the answer
+        
+        Returns:
+            Text that can be displayed now (possibly empty while a marker is open)
+        """
+        if not self._pending and "[" not in token:
+            return token
+        
+        out = []
+        for char in token:
+            if self._pending:
+                if char.isdigit() and len(self._pending) <= self.MAX_DIGITS:
+                    self._pending += char
+                    continue
+                if char == "]" and len(self._pending) > 1:
+                    out.append(self._link(int(self._pending[1:])))
+                    self._pending = ""
+                    continue
+                out.append(self._pending)
+                self._pending = ""
+            if char == "[":
+                self._pending = "["
+            else:
+                out.append(char)
+        return "".join(out)
+    
+    def flush(self) -> str:
+        """Return text still held back at the end of the stream."""
+        pending, self._pending = self._pending, ""
+        return pending
+    
+    def reset(self) -> None:
+        """Discard held-back text and collected citations (answer restarted)."""
+        self._pending = ""
+        self.cited = []
+    
+    def _link(self, num: int) -> str:
+        """Render one complete citation marker."""
+        info: Optional[Dict[str, str]] = self.citation_map.get(num)
+        if info is None:
+            logger.warning(f"Citation [{num}] not found in search results")
+            return f"[{num}]"
+        if num not in self.cited:
+            self.cited.append(num)
+        return f"[[{num}]]({info['url']})"
@@ -1,13 +1,20 @@
 """Global citation manager for Agent mode multi-round search."""
 
+import asyncio
 import logging
-from typing import Dict, List, Tuple, Optional
+from contextvars import ContextVar
+from typing import Dict, List, Set, Tuple, Optional
 from dataclasses import dataclass, field
 
+from .citation_processor import StreamingCitationConverter
 from .models import SearchResult
 
 logger = logging.getLogger(__name__)
 
+# Citation ticket of the search call running in the current task.
+# Set by the agent's tool node so parallel searches are numbered in call order.
+current_citation_ticket: ContextVar[Optional[int]] = ContextVar("current_citation_ticket", default=None)
+
 
 @dataclass
 class SearchRound:
@@ -41,6 +48,13 @@ class GlobalCitationManager:
     _current_number: int = field(default=1)
     _citation_map: Dict[int, Dict[str, str]] = field(default_factory=dict)
     
+    # Ordered tickets for parallel searches: results are numbered in ticket order
+    _tickets: Dict[str, int] = field(default_factory=dict)
+    _next_ticket: int = field(default=0)
+    _ticket_turn: int = field(default=0)
+    _released_tickets: Set[int] = field(default_factory=set)
+    _turn_changed: Optional[asyncio.Condition] = field(default=None)
+    
     def add_search_results(
         self, 
         results: List[SearchResult], 
@@ -100,6 +114,64 @@ class GlobalCitationManager:
         
         return (start_number, end_number)
     
+    def reserve_tickets(self, keys: List[str]) -> List[int]:
+        """Reserve numbering tickets for searches in call order.
+        
+        Searches running in parallel finish in arbitrary order; committing
+        their results by ticket keeps global numbers deterministic. Keys that
+        already have a ticket keep it, so calling this once per parallel call
+        is safe.
+        
+        Args:
+            keys: Search identifiers (e.g. tool call ids) in call order
+        
+        Returns:
+            Ticket numbers for the keys
+        """
+        for key in keys:
+            if key not in self._tickets:
+                self._tickets[key] = self._next_ticket
+                self._next_ticket += 1
+        return [self._tickets[key] for key in keys]
+    
+    async def add_search_results_in_order(
+        self,
+        results: List[SearchResult],
+        query: str,
+        ticket: int
+    ) -> Tuple[int, int]:
+        """Add search results once all earlier tickets have been released.
+        
+        Args:
+            results: List of search results from one search round
+            query: The search query that produced these results
+            ticket: Ticket from reserve_tickets()
+        
+        Returns:
+            Tuple of (start_number, end_number) for these results
+        """
+        async with self._get_turn_condition():
+            await self._turn_changed.wait_for(lambda: self._ticket_turn >= ticket)
+        return self.add_search_results(results, query)
+    
+    async def release_ticket(self, ticket: int) -> None:
+        """Mark a ticket as finished (whether or not it added results).
+        
+        Args:
+            ticket: Ticket from reserve_tickets()
+        """
+        async with self._get_turn_condition():
+            self._released_tickets.add(ticket)
+            while self._ticket_turn in self._released_tickets:
+                self._released_tickets.discard(self._ticket_turn)
+                self._ticket_turn += 1
+            self._turn_changed.notify_all()
+    
+    def _get_turn_condition(self) -> asyncio.Condition:
+        if self._turn_changed is None:
+            self._turn_changed = asyncio.Condition()
+        return self._turn_changed
+    
     def _extract_domain(self, url: str) -> str:
         """Extract domain from URL.
         
@@ -216,6 +288,41 @@ class GlobalCitationManager:
         """
         return self._citation_map.copy()
     
+    def stream_converter(self) -> StreamingCitationConverter:
+        """Create a converter linking citations while an answer streams.
+        
+        The converter reads the live citation map, so results added after it
+        was created (by a later search of the same turn) are linked as well.
+        
+        Returns:
+            StreamingCitationConverter over the global citation map
+        """
+        return StreamingCitationConverter(self._citation_map)
+    
+    def holds_results(
+        self,
+        results: List[SearchResult],
+        number_range: Optional[Tuple[int, int]]
+    ) -> bool:
+        """Check whether results are still registered under the given numbers.
+        
+        Args:
+            results: Search results added earlier
+            number_range: (start_number, end_number) they were assigned
+        
+        Returns:
+            True if every number still maps to the same URL
+        """
+        if not results or not number_range:
+            return False
+        start_number, end_number = number_range
+        if end_number - start_number + 1 != len(results):
+            return False
+        return all(
+            self._citation_map.get(start_number + i, {}).get('url') == result.url
+            for i, result in enumerate(results)
+        )
+    
     def get_citation_info(self, number: int) -> Optional[Dict[str, str]]:
         """Get information for a specific citation number.
         
@@ -252,6 +359,11 @@ class GlobalCitationManager:
         self._search_rounds.clear()
         self._current_number = 1
         self._citation_map.clear()
+        self._tickets.clear()
+        self._next_ticket = 0
+        self._ticket_turn = 0
+        self._released_tickets.clear()
+        self._turn_changed = None
         logger.info("🔄 重置全局引用管理器")
     
     def get_state(self) -> Dict:
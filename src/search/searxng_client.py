@@ -1,9 +1,12 @@
 """SearXNG API client."""
 
+import asyncio
 import logging
 from typing import Optional, Dict, Any, List
 import httpx
 
+from ..runtime.cancellation import get_cancellation_stats
+from ..runtime.deadline import deadline_expired, remaining_timeout
 from .models import SearchResult, SearchResponse
 
 logger = logging.getLogger(__name__)
@@ -63,18 +66,30 @@ class SearXNGClient:
             "safesearch": safesearch,
         }
         
+        # The run's deadline shrinks the request timeout
+        if deadline_expired():
+            logger.warning(f"Skipping search, deadline reached: {query}")
+            return None
+        timeout = remaining_timeout(self.timeout)
+        
         try:
             logger.info(f"Searching for: {query}")
             
-            async with httpx.AsyncClient(timeout=self.timeout) as client:
+            async with httpx.AsyncClient(timeout=timeout) as client:
                 response = await client.get(self.search_url, params=params)
                 response.raise_for_status()
                 
                 data = response.json()
                 return self._parse_response(query, data)
         
+        except asyncio.CancelledError:
+            # The request was abandoned: the connection is closed on the way out
+            get_cancellation_stats().record_call("search")
+            logger.info(f"Search cancelled: {query}")
+            raise
+        
         except httpx.TimeoutException:
-            logger.error(f"Search request timed out after {self.timeout}s")
+            logger.error(f"Search request timed out after {timeout:.1f}s")
             return None
         
         except httpx.HTTPError as e:
@@ -0,0 +1,7 @@
+"""Rendering helpers for the Chainlit UI."""
+
+from .render_scheduler import StreamRenderer
+
+__all__ = [
+    "StreamRenderer",
+]
@@ -0,0 +1,161 @@
+"""Frame-rate-limited streaming of text into Chainlit messages and steps.
+
+Setting ``message.content`` and calling ``update()`` per token re-sends the
+whole growing message over the websocket each time: O(n²) bytes and one
+round-trip per token. :class:`StreamRenderer` sends deltas through
+``stream_token()`` instead and coalesces them into frames: a token arriving
+within ``1 / fps`` of the last frame is buffered and sent with the next
+frame (at the latest when the frame interval has passed).
+"""
+
+import asyncio
+import logging
+import time
+from typing import Any, Callable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class StreamRenderer:
+    """Streams text into one Chainlit message or step at a bounded frame rate.
+    
+    The target only needs ``stream_token(token, is_sequence=False)`` and
+    ``update()``. Call :meth:`close` when the text is complete, then
+    ``update()`` (or close the step) to end the stream and persist it.
+    
+    Attributes:
+        target: Chainlit Message or Step being streamed into
+        field: Attribute holding the text (``content`` for messages,
+            ``output`` for steps)
+        interval: Minimum seconds between frames
+        received: Text updates handed to the renderer
+        frames: Frames sent to the UI
+        sent_chars: Characters sent to the UI
+    """
+    
+    def __init__(
+        self,
+        target: Any,
+        fps: float = 20.0,
+        field: str = "content",
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        """Initialize the renderer.
+        
+        Args:
+            target: Chainlit Message or Step (already sent or entered)
+            fps: Target frame rate
+            field: Attribute holding the text (``content`` / ``output``)
+            clock: Monotonic clock in seconds
+        """
+        self.target = target
+        self.field = field
+        self.interval = 1.0 / fps
+        self.clock = clock
+        self.received = 0
+        self.frames = 0
+        self.sent_chars = 0
+        self._parts: List[str] = []
+        # Full text replacing what is shown, sent before the pending parts
+        self._replacement: Optional[str] = None
+        self._snapshot: Optional[str] = None
+        self._last_frame: Optional[float] = None
+        self._timer: Optional[asyncio.Task] = None
+        self._lock = asyncio.Lock()
+    
+    async def append(self, delta: str) -> None:
+        """Append a delta to the shown text.
+        
+        Args:
+            delta: Text to append
+        """
+        if not delta:
+            return
+        self.received += 1
+        self._parts.append(delta)
+        await self._schedule()
+    
+    async def replace(self, text: str) -> None:
+        """Replace the shown text.
+        
+        Args:
+            text: New full text
+        """
+        self.received += 1
+        self._replacement = text
+        self._parts = []
+        await self._schedule()
+    
+    async def set_text(self, text: str) -> None:
+        """Show a snapshot of the full text.
+        
+        A snapshot that extends the previous one is sent as the new suffix
+        only.
+        
+        Args:
+            text: Full text so far
+        """
+        previous, self._snapshot = self._snapshot, text
+        if previous is not None and text.startswith(previous):
+            await self.append(text[len(previous):])
+        else:
+            await self.replace(text)
+    
+    async def _schedule(self) -> None:
+        """Send a frame now if the frame interval has passed, else later."""
+        now = self.clock()
+        if self._last_frame is None or now - self._last_frame >= self.interval:
+            await self.flush()
+        elif self._timer is None:
+            delay = self.interval - (now - self._last_frame)
+            self._timer = asyncio.create_task(self._flush_later(delay))
+    
+    async def _flush_later(self, delay: float) -> None:
+        """Send the pending text at the end of the frame interval."""
+        await asyncio.sleep(delay)
+        self._timer = None
+        try:
+            await self.flush()
+        except Exception as e:
+            logger.debug(f"延迟渲染失败: {e}")
+    
+    async def flush(self) -> None:
+        """Send the pending text as one frame."""
+        async with self._lock:
+            if self._replacement is None and not self._parts:
+                return
+            replacement, parts = self._replacement, self._parts
+            self._replacement, self._parts = None, []
+            self._last_frame = self.clock()
+            if replacement is None:
+                text = "".join(parts)
+                await self.target.stream_token(text)
+            else:
+                text = replacement + "".join(parts)
+                if text:
+                    await self.target.stream_token(text, is_sequence=True)
+                else:
+                    # stream_token ignores empty tokens
+                    setattr(self.target, self.field, "")
+                    await self.target.update()
+            self.frames += 1
+            self.sent_chars += len(text)
+    
+    async def close(self) -> None:
+        """Send the pending text and stop the frame timer."""
+        self._cancel_timer()
+        await self.flush()
+    
+    def discard(self) -> None:
+        """Drop the pending text and stop the frame timer."""
+        self._cancel_timer()
+        self._replacement, self._parts = None, []
+    
+    def _cancel_timer(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+    
+    def stats(self) -> dict:
+        """Get the renderer's counters."""
+        return {"received": self.received, "frames": self.frames, "sent_chars": self.sent_chars}
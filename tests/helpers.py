@@ -0,0 +1,171 @@
+"""Shared offline fakes for the agent tests."""
+
+import asyncio
+from typing import Any, Callable, Dict, List, Optional, Union
+
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessageChunk, message_chunk_to_message
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+from src.models.context_manager import ContextManager
+from src.search.models import SearchResponse, SearchResult
+from src.search.search_service import SearchService
+
+
+class ScriptedChatModel(BaseChatModel):
+    """Chat model replying with one scripted chunk list per call.
+    
+    Replies are taken from ``scripts`` in order, or built by ``reply`` from
+    the call's messages. Streamed chunks are reported to the callbacks like
+    a provider stream; non-streaming calls return the merged chunks.
+    
+    Attributes:
+        scripts: Chunk lists, one per call
+        reply: Builds the chunk list from the messages instead of scripts
+        chunk_delay: Seconds before each streamed chunk
+        failing_calls: Call numbers (1-based) whose stream raises
+        calls: Calls so far
+        streamed: Chunks streamed so far (to check what happened before a
+            chunk)
+        inputs: Messages of each call
+    """
+    
+    scripts: List[Any] = []
+    reply: Optional[Callable[[List[Any]], List[AIMessageChunk]]] = None
+    chunk_delay: float = 0.0
+    failing_calls: List[int] = []
+    calls: int = 0
+    streamed: int = 0
+    inputs: List[Any] = []
+    
+    @property
+    def _llm_type(self) -> str:
+        return "scripted"
+    
+    def bind_tools(self, tools, **kwargs):
+        return self
+    
+    def _next_reply(self, messages) -> List[AIMessageChunk]:
+        self.calls += 1
+        self.inputs.append(list(messages))
+        return self.reply(messages) if self.reply else self.scripts.pop(0)
+    
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        chunks = self._next_reply(messages)
+        message = chunks[0]
+        for chunk in chunks[1:]:
+            message = message + chunk
+        return ChatResult(generations=[ChatGeneration(message=message_chunk_to_message(message))])
+    
+    async def _astream(self, messages, stop=None, run_manager=None, **kwargs):
+        chunks = self._next_reply(messages)
+        if self.calls in self.failing_calls:
+            raise RuntimeError("connection reset while streaming")
+        for chunk in chunks:
+            await asyncio.sleep(self.chunk_delay)
+            self.streamed += 1
+            generation = ChatGenerationChunk(message=chunk)
+            if run_manager:
+                await run_manager.on_llm_new_token(chunk.content, chunk=generation)
+            yield generation
+
+
+class FakeSearchService(SearchService):
+    """Search service returning canned results and recording its queries.
+    
+    ``title``, ``url`` and ``content`` are formatted with the ``query``, the
+    search number ``n`` (1-based) and the result index ``i``.
+    
+    Attributes:
+        queries: Queries in the order the searches started
+        completed: Queries in the order the searches finished
+        started: Set when the first search starts
+        cancelled: Whether a search was cancelled
+        active: Searches running right now
+        peak_active: Most searches running at the same time
+    """
+    
+    def __init__(
+        self,
+        title: str = "About {query}",
+        url: str = "https://example.com/{query}",
+        content: str = "x",
+        results_per_query: int = 1,
+        delay: Union[float, Dict[str, float]] = 0.0,
+    ):
+        self.title = title
+        self.url = url
+        self.content = content
+        self.results_per_query = results_per_query
+        self.delay = delay
+        self.queries: List[str] = []
+        self.completed: List[str] = []
+        self.started = asyncio.Event()
+        self.cancelled = False
+        self.active = 0
+        self.peak_active = 0
+    
+    async def search(self, query, **kwargs):
+        self.queries.append(query)
+        self.started.set()
+        n = len(self.queries)
+        delay = self.delay[query] if isinstance(self.delay, dict) else self.delay
+        self.active += 1
+        self.peak_active = max(self.peak_active, self.active)
+        try:
+            if delay:
+                await asyncio.sleep(delay)
+        except asyncio.CancelledError:
+            self.cancelled = True
+            raise
+        finally:
+            self.active -= 1
+        self.completed.append(query)
+        fields = {"query": query, "n": n}
+        results = [
+            SearchResult(
+                title=self.title.format(i=i, **fields),
+                url=self.url.format(i=i, **fields),
+                content=self.content.format(i=i, **fields),
+            )
+            for i in range(self.results_per_query)
+        ]
+        return SearchResponse(query=query, results=results, total_results=len(results), search_time=delay)
+
+
+class Clock:
+    """Manually advanced clock."""
+    
+    def __init__(self):
+        self.now = 0.0
+    
+    def __call__(self):
+        return self.now
+
+
+def word_counter() -> ContextManager:
+    """Context manager counting words as tokens (no tiktoken download)."""
+    return ContextManager(8192, 1000, count_tokens=lambda text: len(text.split()))
+
+
+def search_call(query: str, message_id: str) -> List[AIMessageChunk]:
+    """Scripted reply calling web_search once."""
+    return [AIMessageChunk(content="", id=message_id, tool_call_chunks=[
+        {"name": "web_search", "args": f'{{"query": "{query}"}}', "id": f"call_{query}", "index": 0},
+    ])]
+
+
+def displayed_answer(steps) -> str:
+    """Answer text as the UI shows it (final appends, citation_update replaces)."""
+    text = ""
+    for step in steps:
+        if step.type == "final":
+            text += step.content
+        elif step.type == "citation_update":
+            text = step.content
+    return text
+
+
+async def consume(steps) -> list:
+    """Collect an async iterator of steps."""
+    return [step async for step in steps]
@@ -0,0 +1,68 @@
+"""Tests for checkpointed agent runs resuming on fallback."""
+
+import asyncio
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from langchain_core.messages import AIMessageChunk, ToolMessage
+
+from src.agents.checkpointing import get_checkpointer
+from src.agents.react_agent import ReActAgent
+from src.agents.tools.search_tool import SearchTool
+from src.config.agent_config import AgentConfig, CheckpointBackend
+
+from helpers import FakeSearchService, ScriptedChatModel, word_counter
+
+
+def _flaky_model():
+    """Calls web_search, then answers; the second streamed call fails."""
+    def reply(messages):
+        if any(isinstance(m, ToolMessage) for m in messages):
+            return [AIMessageChunk(content="Answer [1].", id="run-2")]
+        return [AIMessageChunk(content="", id="run-1", tool_call_chunks=[
+            {"name": "web_search", "args": '{"query": "alpha"}', "id": "call_alpha", "index": 0},
+        ])]
+    
+    return ScriptedChatModel(reply=reply, failing_calls=[2])
+
+
+def _agent(llm, service, backend):
+    config = AgentConfig(
+        speculative_search=False, router_enabled=False, checkpoint_backend=backend, multi_turn=False,
+    )
+    agent = ReActAgent(llm=llm, search_tool=SearchTool(search_service=service), config=config)
+    agent.context_manager = word_counter()
+    agent.tool_memo.config = agent.tool_memo.config.model_copy(update={"enabled": False})
+    return agent
+
+
+def _stream(agent):
+    async def run():
+        return [step async for step in agent.stream("tell me about alpha")]
+    
+    return asyncio.run(run())
+
+
+def test_fallback_resumes_without_repeating_tool_calls():
+    llm, service = _flaky_model(), FakeSearchService()
+    agent = _agent(llm, service, CheckpointBackend.MEMORY)
+    
+    steps = _stream(agent)
+    
+    assert service.queries == ["alpha"]
+    assert llm.calls == 3  # search call, failed call, answer
+    assert any(step.type == "final" and "Answer" in step.content for step in steps)
+    assert agent.citation_manager.get_total_citations() == 1
+    # Finished single-turn runs leave no checkpoints behind
+    assert not get_checkpointer(CheckpointBackend.MEMORY).storage
+
+
+def test_without_checkpoints_fallback_reruns_the_graph():
+    llm, service = _flaky_model(), FakeSearchService()
+    agent = _agent(llm, service, CheckpointBackend.NONE)
+    
+    _stream(agent)
+    
+    assert service.queries == ["alpha", "alpha"]
@@ -0,0 +1,128 @@
+"""Tests for conversation-scoped agent state across turns."""
+
+import asyncio
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from langchain_core.messages import AIMessage, AIMessageChunk, HumanMessage, SystemMessage, ToolMessage
+
+from src.agents.conversation_state import dangling_tool_calls, plain_answer, split_turns, trim_turns
+from src.agents.react_agent import ReActAgent
+from src.agents.tools.search_tool import SearchTool
+from src.config.agent_config import AgentConfig
+
+from helpers import FakeSearchService, ScriptedChatModel, consume, search_call, word_counter
+
+
+def _agent(llm, service, answer_llm=None):
+    agent = ReActAgent(
+        llm=llm,
+        answer_llm=answer_llm,
+        search_tool=SearchTool(search_service=service),
+        config=AgentConfig(speculative_search=False, router_enabled=False),
+    )
+    agent.context_manager = word_counter()
+    agent.answer_context_manager = word_counter()
+    return agent
+
+
+def _ask(agent, *questions):
+    async def run():
+        return [[step async for step in agent.stream(q)] for q in questions]
+    
+    return asyncio.run(run())
+
+
+def test_follow_up_reuses_earlier_evidence_and_citation_numbers():
+    llm = ScriptedChatModel(scripts=[
+        search_call("alpha", "run-1"),
+        [AIMessageChunk(content="Alpha is a letter [1].", id="run-2")],
+        [AIMessageChunk(content="It comes first [1].", id="run-3")],
+    ])
+    service = FakeSearchService(content="alpha facts")
+    agent = _agent(llm, service)
+    
+    _, follow_up = _ask(agent, "what is alpha?", "where is it in the alphabet?")
+    
+    assert service.queries == ["alpha"]
+    history = llm.inputs[2]
+    assert [i for i, m in enumerate(history) if isinstance(m, SystemMessage)] == [0]  # date replaced in place
+    assert any(isinstance(m, ToolMessage) and "[1] About alpha" in m.content for m in history)
+    assert [m.content for m in history if isinstance(m, HumanMessage)] == [
+        "what is alpha?", "where is it in the alphabet?",
+    ]
+    answer = "".join(step.content for step in follow_up if step.type == "final")
+    assert "[[1]](https://example.com/alpha)" in answer
+
+
+def test_answer_llm_sees_history_and_evidence_of_earlier_turns():
+    llm = ScriptedChatModel(scripts=[
+        search_call("alpha", "run-1"),
+        [AIMessageChunk(content="done", id="run-2")],
+        [AIMessageChunk(content="done", id="run-3")],
+    ])
+    answer_llm = ScriptedChatModel(scripts=[
+        [AIMessageChunk(content="Alpha is a letter [1].")],
+        [AIMessageChunk(content="It comes first [1].")],
+    ])
+    agent = _agent(llm, FakeSearchService(content="alpha facts"), answer_llm=answer_llm)
+    
+    _ask(agent, "what is alpha?", "where is it in the alphabet?")
+    
+    prompt = answer_llm.inputs[1][-1].content
+    assert "用户: what is alpha?\n助手: Alpha is a letter [1]." in prompt
+    assert "[1] About alpha" in prompt and "alpha facts" in prompt
+    # The function-call LLM also sees the answer the user was shown
+    assert any(isinstance(m, AIMessage) and m.content == "Alpha is a letter [1]." for m in llm.inputs[2])
+
+
+def test_oldest_turns_and_unanswered_tool_calls_are_removed():
+    def turn(n, words):
+        return [
+            HumanMessage(content=f"q{n}", id=f"h{n}"),
+            AIMessage(content="word " * words, id=f"a{n}"),
+        ]
+    
+    messages = [*turn(1, 500), *turn(2, 500), *turn(3, 100)]
+    removed = {r.id for r in trim_turns(messages, word_counter(), max_tokens=700)}
+    assert removed == {"h1", "a1"}
+    
+    stopped = AIMessage(content="", id="stopped", tool_calls=[{"name": "web_search", "args": {}, "id": "c1"}])
+    assert [r.id for r in dangling_tool_calls([*turn(1, 1), stopped])] == ["stopped"]
+    assert len(split_turns([*turn(1, 1), stopped])) == 1
+
+
+def test_displayed_answers_are_stored_without_links():
+    displayed = "Alpha [[1]](https://example.com/a).\n\n---\n**📚 引用文章列表:**\n1. [A](https://example.com/a)"
+    assert plain_answer(displayed) == "Alpha [1]."
+
+
+def test_saver_keeps_only_the_latest_conversation_state():
+    llm = ScriptedChatModel(scripts=[
+        search_call("alpha", "run-1"),
+        [AIMessageChunk(content="Alpha is a letter [1].", id="run-2")],
+        [AIMessageChunk(content="It comes first [1].", id="run-3")],
+    ])
+    agent = _agent(llm, FakeSearchService(content="alpha facts"))
+    storage = agent.checkpointer.storage
+    
+    async def run():
+        first_thread = agent.conversation_thread_id
+        await consume(agent.stream("what is alpha?"))
+        first_turn_checkpoints = len(storage[first_thread][""])
+        await consume(agent.stream("where is it in the alphabet?"))
+        second_thread = agent.conversation_thread_id
+        second_turn_checkpoints = len(storage[second_thread][""])
+        agent.reset()
+        await asyncio.sleep(0.01)
+        return first_thread, second_thread, first_turn_checkpoints, second_turn_checkpoints
+    
+    first_thread, second_thread, first_count, second_count = asyncio.run(run())
+    
+    assert first_thread not in storage  # superseded checkpoints were deleted
+    assert second_count <= first_count
+    assert second_thread not in storage  # reset discards the conversation
+    assert agent.conversation_thread_id not in (first_thread, second_thread)
+
@@ -0,0 +1,67 @@
+"""Tests for the answer fallbacks of ReActAgent.stream (dual LLM mode)."""
+
+import asyncio
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from langchain_core.messages import AIMessageChunk
+from langgraph.errors import GraphRecursionError
+
+from src.agents.react_agent import ITERATION_LIMIT_NOTE, ReActAgent
+from src.agents.tools.search_tool import SearchTool
+from src.config.agent_config import AgentConfig
+
+from helpers import FakeSearchService, ScriptedChatModel, displayed_answer, search_call, word_counter
+
+
+def _stream(llm, answer_llm, **config):
+    agent = ReActAgent(
+        llm=llm,
+        answer_llm=answer_llm,
+        search_tool=SearchTool(search_service=FakeSearchService(
+            title="Sunny", url="https://example.com/w", content="sunny " * 20,
+        )),
+        config=AgentConfig(speculative_search=False, speculative_answer=False, **config),
+    )
+    agent.context_manager = word_counter()
+    agent.answer_context_manager = word_counter()
+    
+    async def run():
+        return [step async for step in agent.stream("weather?")]
+    
+    return asyncio.run(run())
+
+
+def test_failed_answer_stream_falls_back_with_linked_citations():
+    llm = ScriptedChatModel(scripts=[search_call("weather", "run-1"), [AIMessageChunk(content="Done.", id="run-2")]])
+    answer_llm = ScriptedChatModel(
+        scripts=[[AIMessageChunk(content="never shown")], [AIMessageChunk(content="It is sunny [1].")]],
+        failing_calls=[1],
+    )
+    
+    steps = _stream(llm, answer_llm)
+    
+    assert answer_llm.calls == 2  # streamed attempt, then the non-streaming fallback
+    shown = displayed_answer(steps)
+    assert shown.startswith("It is sunny [[1]](https://example.com/w).")
+    assert shown.count("https://example.com/w") == 2  # inline link and reference list
+    assert not any(s.type == "error" for s in steps)
+
+
+def test_recursion_limit_answers_from_collected_results():
+    def reply(messages):
+        if len(messages) > 2:
+            raise GraphRecursionError("Recursion limit reached, need more steps")
+        return search_call("weather", "run-1")
+    
+    llm = ScriptedChatModel(reply=reply)
+    answer_llm = ScriptedChatModel(scripts=[[AIMessageChunk(content="Sunny [1].")]])
+    
+    steps = _stream(llm, answer_llm)
+    
+    assert displayed_answer(steps).startswith("Sunny [[1]](https://example.com/w).")
+    system_prompt = answer_llm.inputs[0][0].content
+    assert ITERATION_LIMIT_NOTE in system_prompt
+    assert "[搜索结果 1]" in answer_llm.inputs[0][-1].content
@@ -0,0 +1,75 @@
+"""Tests for the single-LLM answer policy of ReActAgent.stream."""
+
+import asyncio
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from langchain_core.messages import AIMessageChunk
+
+from src.agents.react_agent import ReActAgent
+from src.agents.tools.search_tool import SearchTool
+from src.config.agent_config import AgentConfig, AnswerPolicy
+
+from helpers import FakeSearchService, ScriptedChatModel, displayed_answer, word_counter
+
+
+def _search_turn(preamble=""):
+    chunks = [AIMessageChunk(content=preamble, id="run-1")] if preamble else []
+    return chunks + [AIMessageChunk(content="", id="run-1", tool_call_chunks=[
+        {"name": "web_search", "args": '{"query": "weather"}', "id": "call_1", "index": 0},
+    ])]
+
+
+def _answer_turn(*tokens):
+    return [AIMessageChunk(content=token, id="run-2") for token in tokens]
+
+
+def _stream(scripts, policy=AnswerPolicy.DIRECT):
+    llm = ScriptedChatModel(scripts=scripts)
+    agent = ReActAgent(
+        llm=llm,
+        search_tool=SearchTool(search_service=FakeSearchService(
+            title="Sunny", url="https://example.com/w", content="sunny",
+        )),
+        config=AgentConfig(answer_policy=policy, speculative_search=False),
+    )
+    agent.context_manager = word_counter()
+    agent.answer_context_manager = word_counter()
+    
+    async def run():
+        return [step async for step in agent.stream("weather?")]
+    
+    return asyncio.run(run()), llm
+
+
+def test_direct_policy_streams_graph_answer_without_second_call():
+    steps, llm = _stream([_search_turn(), _answer_turn("It ", "is ", "sunny [1].")])
+    
+    assert llm.calls == 2  # tool selection + final answer, no answer phase
+    finals = [s.content for s in steps if s.type == "final"]
+    # Graph tokens are forwarded as they arrive, citations linked on the way
+    assert finals[:3] == ["It ", "is ", "sunny [[1]](https://example.com/w)."]
+    assert not any(s.type == "citation_update" for s in steps)
+    assert "https://example.com/w" in finals[-1]  # reference list
+
+
+def test_auto_policy_resynthesizes_uncited_answer():
+    steps, llm = _stream(
+        [_search_turn(), _answer_turn("Sunny."), _answer_turn("Sunny ", "today [1].")],
+        policy=AnswerPolicy.AUTO,
+    )
+    
+    assert llm.calls == 3
+    assert displayed_answer(steps).startswith("Sunny today [[1]](https://example.com/w).")
+
+
+def test_tool_call_preamble_is_not_left_in_the_answer():
+    steps, _ = _stream([_search_turn(preamble="Let me check. "), _answer_turn("Sunny [1].")])
+    
+    assert displayed_answer(steps).startswith("Sunny [[1]]")
+    assert any(
+        s.metadata and s.metadata.get("reasoning_type") == "tool_selection" and "Let me check." in s.content
+        for s in steps
+    )
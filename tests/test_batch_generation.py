@@ -0,0 +1,127 @@
+"""Tests for BaseModelWrapper.generate_many batch generation."""
+
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import pytest
+
+from src.config.model_config import ModelConfig, ModelProvider
+from src.models.base import BaseModelWrapper, BatchStats, ModelResponse
+from src.models.rate_limiter import RateLimiter
+
+
+class _FakeWrapper(BaseModelWrapper):
+    """Wrapper whose generate() sleeps instead of calling a provider."""
+    
+    def __init__(self, delays=None, fail=(), cancel=()):
+        super().__init__(ModelConfig(
+            provider=ModelProvider.OPENAI, model_name="fake-model", api_key="sk-test"
+        ))
+        self.delays = delays or {}
+        self.fail = set(fail)
+        self.cancel = set(cancel)
+        self.in_flight = 0
+        self.max_in_flight = 0
+        # No rate limiting unless a test installs a limiter
+        self._rate_limiter_loaded = True
+    
+    async def generate(self, prompt, system_message=None, **kwargs):
+        await self._acquire_rate_limit(prompt, system_message, [], 10)
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(self.delays.get(prompt, 0.01))
+            if prompt in self.fail:
+                raise ValueError(f"bad prompt: {prompt}")
+            if prompt in self.cancel:
+                raise asyncio.CancelledError()
+            return ModelResponse(
+                content=prompt.upper(), model="fake-model", tokens_used=15,
+                prompt_tokens=5, completion_tokens=10, finish_reason="stop",
+            )
+        finally:
+            self.in_flight -= 1
+    
+    async def generate_stream(self, prompt, system_message=None, **kwargs):
+        yield
+    
+    def count_tokens(self, text):
+        return len(text.split())
+    
+    def get_langchain_llm(self):
+        return None
+
+
+async def _collect(wrapper, prompts, **kwargs):
+    return [result async for result in wrapper.generate_many(prompts, **kwargs)]
+
+
+def test_results_stream_in_completion_order():
+    wrapper = _FakeWrapper(delays={"slow": 0.2, "fast": 0.01})
+    results = asyncio.run(_collect(wrapper, ["slow", "fast"]))
+    
+    assert [r.prompt for r in results] == ["fast", "slow"]
+    assert [r.index for r in results] == [1, 0]
+    assert results[1].response.content == "SLOW"
+    assert results[1].latency >= 0.2
+
+
+def test_concurrency_is_bounded():
+    wrapper = _FakeWrapper()
+    prompts = [f"q{i}" for i in range(20)]
+    results = asyncio.run(_collect(wrapper, prompts, max_concurrency=3))
+    
+    assert len(results) == 20
+    assert sorted(r.index for r in results) == list(range(20))
+    assert wrapper.max_in_flight == 3
+
+
+def test_failures_do_not_stop_the_batch_and_stats_aggregate():
+    wrapper = _FakeWrapper(fail={"q1"})
+    stats = BatchStats()
+    results = asyncio.run(_collect(wrapper, ["q0", "q1", "q2"], stats=stats))
+    
+    failed = [r for r in results if not r.ok]
+    assert len(failed) == 1 and isinstance(failed[0].error, ValueError)
+    assert (stats.total, stats.succeeded, stats.failed) == (3, 2, 1)
+    assert stats.tokens_used == 30
+    assert stats.completion_tokens == 20
+    assert stats.requests_per_second > 0
+    assert stats.tokens_per_second > 0
+
+
+def test_worker_exiting_early_raises_instead_of_hanging():
+    wrapper = _FakeWrapper(cancel={"q1"})
+    received = []
+    
+    async def run():
+        async for result in wrapper.generate_many(["q0", "q1", "q2"], max_concurrency=2):
+            received.append(result.prompt)
+    
+    with pytest.raises(RuntimeError, match="1 条结果缺失"):
+        asyncio.run(asyncio.wait_for(run(), timeout=5))
+    # The other worker still finished the remaining prompts
+    assert sorted(received) == ["q0", "q2"]
+
+
+def test_batch_waits_for_rate_limit_instead_of_failing():
+    wrapper = _FakeWrapper()
+    # Interactive calls would fail immediately: no queueing allowed
+    wrapper._rate_limiter = RateLimiter("test", requests_per_minute=600, max_wait=0.0)
+    wrapper._rate_limiter.requests.consume(600)
+    
+    start = time.monotonic()
+    results = asyncio.run(_collect(wrapper, ["a", "b", "c"]))
+    
+    assert all(r.ok for r in results)
+    assert time.monotonic() - start >= 0.25  # paced at 10 requests/s
+
+
+def test_empty_batch():
+    stats = BatchStats()
+    assert asyncio.run(_collect(_FakeWrapper(), [], stats=stats)) == []
+    assert stats.total == 0
@@ -0,0 +1,93 @@
+"""Tests for cooperative cancellation of abandoned and superseded requests."""
+
+import asyncio
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from langchain_core.messages import HumanMessage
+
+from src.agents.react_agent import ReActAgent
+from src.agents.tools.search_tool import SearchTool
+from src.config.agent_config import AgentConfig
+from src.runtime.cancellation import CancellationStats, CancelReason, RequestTracker
+from src.runtime.retry_policy import RetryBudget, RetryPolicy
+
+from helpers import FakeSearchService, ScriptedChatModel, consume, search_call, word_counter
+
+
+def test_new_request_supersedes_the_running_one():
+    stats = CancellationStats()
+    tracker = RequestTracker(stats=stats)
+    cleaned_up = []
+    
+    async def request(kind, seconds):
+        async with tracker.track(kind):
+            try:
+                await asyncio.sleep(seconds)
+            finally:
+                cleaned_up.append(kind)
+    
+    async def run():
+        first = asyncio.create_task(request("chat", 10))
+        await asyncio.sleep(0)
+        second = asyncio.create_task(request("agent", 0.01))
+        await second
+        assert first.cancelled()
+        # The stop button cancels the task itself
+        third = asyncio.create_task(request("agent", 10))
+        await asyncio.sleep(0)
+        third.cancel()
+        await asyncio.gather(third, return_exceptions=True)
+        assert not tracker.cancel(CancelReason.DISCONNECTED)  # nothing in flight
+    
+    asyncio.run(run())
+    
+    assert cleaned_up == ["chat", "agent", "agent"]
+    assert stats.summary()["requests"] == {"chat": {"superseded": 1}, "agent": {"stopped": 1}}
+
+
+def test_closing_a_retried_stream_closes_the_attempt():
+    closed = []
+    
+    async def tokens():
+        try:
+            for token in ("a", "b", "c"):
+                yield token
+        finally:
+            closed.append(True)
+    
+    async def run():
+        policy = RetryPolicy(budget=RetryBudget())
+        stream = policy.stream(tokens)
+        assert await anext(stream) == "a"
+        await stream.aclose()
+    
+    asyncio.run(run())
+    
+    assert closed == [True]
+
+
+def test_cancelled_agent_turn_stops_the_search_and_is_discarded():
+    service = FakeSearchService(delay=60)
+    llm = ScriptedChatModel(reply=lambda messages: search_call("alpha", "run-1"))
+    config = AgentConfig(speculative_search=False, router_enabled=False)
+    agent = ReActAgent(llm=llm, search_tool=SearchTool(search_service=service), config=config)
+    agent.context_manager = word_counter()
+    
+    async def run():
+        task = asyncio.create_task(consume(agent.stream("tell me about alpha")))
+        await asyncio.wait_for(service.started.wait(), timeout=5)
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+        snapshot = await agent.agent_executor.aget_state(
+            agent._get_run_config(thread_id=agent.conversation_thread_id)
+        )
+        return snapshot.values.get("messages", [])
+    
+    messages = asyncio.run(run())
+    
+    assert service.cancelled
+    assert not any(isinstance(m, HumanMessage) for m in messages)
+
@@ -0,0 +1,153 @@
+"""Tests for context window management."""
+
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import pytest
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage, ToolMessage
+
+from src.config.model_config import ModelConfig, ModelProvider
+from src.models.context_manager import (
+    ContextManager,
+    ContextWindowExceededError,
+    DEFAULT_CONTEXT_WINDOW,
+    get_context_window,
+)
+from src.models.base import BaseModelWrapper
+
+
+def _count_words(text: str) -> int:
+    """Deterministic token counter for tests: one token per word."""
+    return len(text.split())
+
+
+def _manager(context_window: int = 300, completion_reserve: int = 50) -> ContextManager:
+    return ContextManager(
+        context_window=context_window,
+        completion_reserve=completion_reserve,
+        count_tokens=_count_words,
+        safety_margin=0,
+        min_observation_tokens=10,
+    )
+
+
+class _WordCountWrapper(BaseModelWrapper):
+    """Minimal wrapper using the word counter (no tokenizer download needed)."""
+    
+    async def generate(self, prompt, system_message=None, **kwargs):
+        raise NotImplementedError
+    
+    async def generate_stream(self, prompt, system_message=None, **kwargs):
+        raise NotImplementedError
+    
+    def count_tokens(self, text: str) -> int:
+        return _count_words(text)
+    
+    def get_langchain_llm(self):
+        raise NotImplementedError
+
+
+def _words(n: int, word: str = "w") -> str:
+    return " ".join([word] * n)
+
+
+def test_context_window_lookup():
+    assert get_context_window("gpt-4") == 8192
+    assert get_context_window("gpt-4o-mini") == 128000
+    assert get_context_window("claude-3-sonnet-20240229") == 200000
+    assert get_context_window("deepseek-reasoner") == 128000
+    assert get_context_window("unknown-model") == DEFAULT_CONTEXT_WINDOW
+    assert get_context_window("gpt-4", override=32000) == 32000
+
+
+def test_newer_openai_models_do_not_fall_back_to_gpt_4():
+    assert get_context_window("gpt-4.1") == 1047576
+    assert get_context_window("gpt-4.1-mini") == 1047576
+    assert get_context_window("gpt-5") == 400000
+    assert get_context_window("gpt-5-mini") == 400000
+    assert get_context_window("o4-mini") == 200000
+
+
+def test_prompt_budget_uses_context_window_not_max_tokens():
+    """validate_context_length budgets against the real context window."""
+    config = ModelConfig(
+        provider=ModelProvider.DEEPSEEK,
+        model_name="deepseek-chat",
+        api_key="sk-test",
+        max_tokens=2000,
+    )
+    wrapper = _WordCountWrapper(config)
+    prompt = _words(5000)  # well above the old max_tokens * 0.75 limit
+    
+    is_valid, token_count = wrapper.validate_context_length(prompt)
+    
+    assert token_count > 1500
+    assert is_valid
+
+
+def test_fit_prompt_keeps_fitting_prompt_unchanged():
+    manager = _manager()
+    assert manager.fit_prompt("question", "system") == ("question", "system")
+
+
+def test_fit_prompt_trims_system_context_middle_first():
+    manager = _manager()
+    system = "INSTRUCTIONS " + _words(500, "result") + " NOTES"
+    
+    prompt, trimmed = manager.fit_prompt("what is new", system)
+    
+    assert prompt == "what is new"
+    assert trimmed.startswith("INSTRUCTIONS")
+    assert trimmed.endswith("NOTES")
+    assert manager.count_prompt(prompt, trimmed) <= manager.budget.prompt_budget
+
+
+def test_fit_messages_compacts_oldest_observations_first():
+    manager = _manager()
+    messages = [SystemMessage(content="system"), HumanMessage(content="question")]
+    for i in range(3):
+        messages.append(AIMessage(content="", tool_calls=[{"name": "web_search", "args": {}, "id": f"c{i}"}]))
+        messages.append(ToolMessage(content=_words(100, f"r{i}"), tool_call_id=f"c{i}"))
+    
+    fitted = manager.fit_messages(messages)
+    tool_messages = [m for m in fitted if isinstance(m, ToolMessage)]
+    
+    assert manager.count_messages(fitted) <= manager.budget.prompt_budget
+    assert len(tool_messages) == 3
+    assert len(tool_messages[0].content) < len(messages[3].content)
+    assert tool_messages[-1].content == messages[-1].content  # newest kept intact
+    assert messages[3].content == _words(100, "r0")  # input not mutated
+
+
+def test_fit_messages_drops_old_turns_and_keeps_latest():
+    manager = _manager()
+    messages = [SystemMessage(content="system")]
+    for i in range(5):
+        messages.append(HumanMessage(content=_words(40, f"q{i}")))
+        messages.append(AIMessage(content=_words(40, f"a{i}")))
+    messages.append(HumanMessage(content="latest question"))
+    
+    fitted = manager.fit_messages(messages)
+    
+    assert isinstance(fitted[0], SystemMessage)
+    assert fitted[-1].content == "latest question"
+    assert fitted[1].content.startswith("q")
+    assert manager.count_messages(fitted) <= manager.budget.prompt_budget
+
+
+def test_fit_messages_raises_when_protected_messages_do_not_fit():
+    manager = _manager()
+    with pytest.raises(ContextWindowExceededError):
+        manager.fit_messages([SystemMessage(content=_words(400)), HumanMessage(content="q")])
+
+
+def test_fit_observations_equal_share_fallback():
+    manager = _manager()
+    observations = [_words(200, "a"), _words(200, "b")]
+    
+    fitted = manager.fit_observations(observations, reserved_tokens=20)
+    
+    assert sum(_count_words(o) for o in fitted) <= manager.budget.prompt_budget - 20
+    assert all(o for o in fitted)
@@ -0,0 +1,119 @@
+"""Tests for bounded multi-turn conversation memory."""
+
+import asyncio
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.config.memory_config import MemoryConfig
+from src.memory import ConversationMemory
+
+
+def _count_words(text: str) -> int:
+    """Deterministic token counter for tests: one token per word."""
+    return len(text.split())
+
+
+def _words(n: int, word: str = "w") -> str:
+    return " ".join([word] * n)
+
+
+def test_window_returns_turns_in_order():
+    memory = ConversationMemory(_count_words)
+    memory.add_turn("hello", "hi there")
+    memory.add_turn("how are you", "fine")
+
+    assert memory.get_messages() == [
+        {"role": "user", "content": "hello"},
+        {"role": "assistant", "content": "hi there"},
+        {"role": "user", "content": "how are you"},
+        {"role": "assistant", "content": "fine"},
+    ]
+
+
+def test_window_is_token_and_turn_bounded():
+    config = MemoryConfig(max_history_tokens=100, max_turns=3, summarize_evicted=False)
+    memory = ConversationMemory(_count_words, config=config)
+
+    for i in range(10):
+        memory.add_turn(_words(10, f"q{i}"), _words(10, f"a{i}"))
+
+    assert len(memory) == 3
+    assert memory.history_tokens <= 100
+    assert memory.get_messages()[-1]["content"].startswith("a9")
+
+    for i in range(3):
+        memory.add_turn(_words(40, f"q{i}"), _words(40, f"a{i}"))
+
+    assert len(memory) == 1
+    assert memory.history_tokens <= 100
+
+
+def test_evicted_turns_are_summarized_in_background():
+    calls = []
+
+    async def summarizer(previous_summary, transcript):
+        calls.append(transcript)
+        await asyncio.sleep(0.01)
+        return f"{previous_summary} summary-{len(calls)}".strip()
+
+    async def run():
+        config = MemoryConfig(max_turns=1)
+        memory = ConversationMemory(_count_words, config=config, summarizer=summarizer)
+
+        memory.add_turn("first", "one")
+        memory.add_turn("second", "two")  # evicts "first" without blocking
+        assert memory.summary == ""
+
+        memory.add_turn("third", "three")
+        await memory.wait_for_summary()
+        return memory
+
+    memory = asyncio.run(run())
+
+    assert "first" in calls[0]
+    assert any("second" in transcript for transcript in calls)
+    assert memory.summary.endswith(f"summary-{len(calls)}")
+    assert "之前对话的摘要" in memory.add_summary_to_system_message("system")
+
+
+def test_summarizer_failure_keeps_previous_summary():
+    async def failing(previous_summary, transcript):
+        raise RuntimeError("boom")
+
+    async def run():
+        memory = ConversationMemory(_count_words, config=MemoryConfig(max_turns=1), summarizer=failing)
+        memory.summary = "earlier"
+        memory.add_turn("a", "b")
+        memory.add_turn("c", "d")
+        await memory.wait_for_summary()
+        return memory
+
+    assert asyncio.run(run()).summary == "earlier"
+
+
+def test_summary_is_token_bounded():
+    async def verbose(previous_summary, transcript):
+        return _words(1000)
+
+    async def run():
+        config = MemoryConfig(max_turns=1, max_summary_tokens=50)
+        memory = ConversationMemory(_count_words, config=config, summarizer=verbose)
+        memory.add_turn("a", "b")
+        memory.add_turn("c", "d")
+        await memory.wait_for_summary()
+        return memory
+
+    assert _count_words(asyncio.run(run()).summary) <= 50
+
+
+def test_clear_resets_memory():
+    memory = ConversationMemory(_count_words)
+    memory.add_turn("a", "b")
+    memory.summary = "s"
+    memory.clear()
+
+    assert len(memory) == 0
+    assert memory.history_tokens == 0
+    assert memory.summary == ""
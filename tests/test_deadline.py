@@ -0,0 +1,101 @@
+"""Tests for the run deadline carried through agent, search and retries."""
+
+import asyncio
+import itertools
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from langchain_core.messages import AIMessageChunk, SystemMessage, ToolMessage
+
+from src.agents.react_agent import ReActAgent
+from src.agents.tools.search_tool import SearchTool
+from src.config.agent_config import AgentConfig
+from src.runtime.deadline import MIN_TIMEOUT, deadline_scope, get_deadline, remaining_timeout
+from src.runtime.retry_policy import RetryBudget, RetryPolicy
+from src.search.searxng_client import SearXNGClient
+
+from helpers import Clock, FakeSearchService, ScriptedChatModel, search_call, word_counter
+
+
+def test_timeouts_shrink_to_the_time_left():
+    clock = Clock()
+    assert remaining_timeout(5.0) == 5.0  # no deadline
+    
+    with deadline_scope(12, clock=clock) as deadline:
+        assert remaining_timeout(5.0) == 5.0
+        clock.now = 10
+        assert remaining_timeout(5.0) == 2.0
+        assert remaining_timeout(5.0, reserve=1.5) == MIN_TIMEOUT
+        with deadline_scope(60, clock=clock):
+            assert get_deadline() is deadline  # the tighter deadline wins
+        clock.now = 13
+        assert deadline.expired() and deadline.remaining() == 0.0
+    
+    assert get_deadline() is None
+
+
+def test_retries_stop_at_the_deadline():
+    attempts = []
+    
+    async def flaky():
+        attempts.append(1)
+        raise TimeoutError("read timed out")
+    
+    async def run():
+        policy = RetryPolicy(max_attempts=5, base_delay=10.0, budget=RetryBudget(min_retries=100))
+        with deadline_scope(0.2):
+            await policy.call(flaky)
+    
+    try:
+        asyncio.run(asyncio.wait_for(run(), timeout=5))
+    except TimeoutError as e:
+        assert "read timed out" in str(e)
+    assert 1 <= len(attempts) < 5
+
+
+def test_search_is_skipped_once_the_deadline_passed():
+    async def run():
+        with deadline_scope(0):
+            return await SearXNGClient(base_url="http://127.0.0.1:9").search("alpha")
+    
+    assert asyncio.run(run()) is None
+
+
+def _endless_search_model():
+    """Keeps calling web_search; answers only the answer-phase prompt."""
+    searches = itertools.count(1)
+    
+    def reply(messages):
+        answer_phase = not any(isinstance(m, ToolMessage) for m in messages) and any(
+            isinstance(m, SystemMessage) and "基于以下搜索结果" in m.content for m in messages
+        )
+        if answer_phase:
+            return [AIMessageChunk(content="Answer [1].")]
+        n = next(searches)
+        return search_call(f"q{n}", f"run-{n}")
+    
+    return ScriptedChatModel(reply=reply)
+
+
+def test_agent_stops_searching_and_answers_before_the_deadline():
+    service = FakeSearchService(delay=0.3)
+    config = AgentConfig(
+        speculative_search=False, router_enabled=False, multi_turn=False,
+        max_execution_time=10, answer_reserve_time=9.5,
+    )
+    agent = ReActAgent(llm=_endless_search_model(), search_tool=SearchTool(search_service=service), config=config)
+    agent.context_manager = word_counter()
+    agent.answer_context_manager = agent.context_manager
+    
+    async def run():
+        return [step async for step in agent.stream("tell me everything")]
+    
+    steps = asyncio.run(run())
+    
+    assert 1 <= len(service.queries) < config.max_iterations
+    assert any(step.type == "reasoning" and "剩余时间不足" in step.content for step in steps)
+    answer = "".join(step.content for step in steps if step.type == "final")
+    assert "Answer" in answer
+    assert not any(step.type == "error" for step in steps)
@@ -0,0 +1,114 @@
+"""Tests for one-pass DeepSeek message preprocessing.
+
+Run directly to print a small benchmark:
+    python tests/test_deepseek_preprocessing.py
+"""
+
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage, ToolMessage
+
+from src.models.deepseek_wrapper import (
+    DEFAULT_TOOL_CALL_REASONING,
+    DeepSeekChatOpenAI,
+    DeepSeekMessagePreprocessor,
+)
+
+
+def _tool_round(i: int, content: str = ""):
+    """Build one agent round: assistant tool call + tool result."""
+    call_id = f"call_{i}"
+    return [
+        AIMessage(
+            content=content,
+            id=f"ai-{i}",
+            tool_calls=[{"name": "web_search", "args": {"query": f"q{i}"}, "id": call_id}],
+        ),
+        ToolMessage(content=f"result {i}", tool_call_id=call_id, id=f"tool-{i}"),
+    ]
+
+
+def _history(rounds: int):
+    messages = [SystemMessage(content="system", id="sys"), HumanMessage(content="hi", id="human")]
+    for i in range(rounds):
+        messages.extend(_tool_round(i))
+    return messages
+
+
+def test_adds_reasoning_content_to_tool_call_messages():
+    """Tool-call messages get reasoning_content, others are untouched."""
+    messages = _history(1)
+    messages[2].content = "我需要搜索"
+    DeepSeekMessagePreprocessor().prepare(messages)
+
+    assert messages[2].additional_kwargs["reasoning_content"] == "我需要搜索"
+    assert "reasoning_content" not in messages[1].additional_kwargs
+    assert "reasoning_content" not in messages[3].additional_kwargs
+
+
+def test_empty_content_uses_placeholder():
+    messages = _history(1)
+    DeepSeekMessagePreprocessor().prepare(messages)
+    assert messages[2].additional_kwargs["reasoning_content"] == DEFAULT_TOOL_CALL_REASONING
+
+
+def test_existing_reasoning_content_is_preserved():
+    messages = _history(1)
+    messages[2].additional_kwargs["reasoning_content"] = "原始推理"
+    DeepSeekMessagePreprocessor().prepare(messages)
+    assert messages[2].additional_kwargs["reasoning_content"] == "原始推理"
+
+
+def test_only_new_messages_are_inspected():
+    """Appending to a processed history only inspects the new tail."""
+    preprocessor = DeepSeekMessagePreprocessor()
+    messages = _history(50)
+
+    assert preprocessor.prepare(messages) == len(messages)
+    assert preprocessor.prepare(messages) == 0
+
+    messages.extend(_tool_round(50))
+    assert preprocessor.prepare(messages) == 2
+    assert messages[-2].additional_kwargs["reasoning_content"] == DEFAULT_TOOL_CALL_REASONING
+
+
+def test_tracked_ids_are_bounded():
+    preprocessor = DeepSeekMessagePreprocessor(max_tracked=10)
+    preprocessor.prepare(_history(20))
+    assert len(preprocessor._processed) == 10
+
+
+def test_request_payload_contains_reasoning_content():
+    """The final API payload carries reasoning_content for tool-call messages."""
+    llm = DeepSeekChatOpenAI(model="deepseek-chat", openai_api_key="test-key")
+    messages = _history(2)
+
+    payload = llm._get_request_payload(messages)
+    assistant = [m for m in payload["messages"] if m["role"] == "assistant"]
+
+    assert len(assistant) == 2
+    assert all(m["reasoning_content"] == DEFAULT_TOOL_CALL_REASONING for m in assistant)
+    assert all("reasoning_content" not in m for m in payload["messages"] if m["role"] != "assistant")
+
+
+def benchmark(max_rounds: int = 400, step: int = 100):
+    """Print per-request preprocessing overhead as agent history grows."""
+    preprocessor = DeepSeekMessagePreprocessor()
+    messages = _history(0)
+
+    print(f"{'history':>8} | {'inspected':>9} | {'prepare (µs)':>12}")
+    for rounds in range(1, max_rounds + 1):
+        messages.extend(_tool_round(rounds))
+        start = time.perf_counter()
+        inspected = preprocessor.prepare(messages)
+        elapsed = (time.perf_counter() - start) * 1e6
+        if rounds % step == 0:
+            print(f"{len(messages):>8} | {inspected:>9} | {elapsed:>12.1f}")
+
+
+if __name__ == "__main__":
+    benchmark()
@@ -0,0 +1,134 @@
+"""Tests for the bounded, multi-subscriber Agent event bus."""
+
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.agents.base import AgentStep
+from src.agents.event_bus import AgentEventBus, OverflowPolicy
+
+SELECTION = {"reasoning_type": "tool_selection", "streaming": True}
+
+
+def test_token_steps_are_coalesced_for_each_subscriber():
+    async def run():
+        bus = AgentEventBus(maxsize=4)
+        ui = bus.subscribe("ui")
+        transcript = bus.subscribe("transcript")
+        for text in ("Th", "Thin", "Think"):
+            await bus.publish(AgentStep(type="reasoning", content=text, metadata=SELECTION))
+        await bus.publish(AgentStep(type="action", content="使用工具: web_search"))
+        for token in ("Hello", ", ", "world"):
+            await bus.publish(AgentStep(type="final", content=token))
+        # Read in between: later tokens start a new step
+        first = [await anext(ui) for _ in range(3)]
+        await bus.publish(AgentStep(type="final", content="!"))
+        bus.close()
+        return first + [step async for step in ui], [step async for step in transcript], bus.summary()
+    
+    ui_steps, transcript_steps, summary = asyncio.run(run())
+    
+    assert [(s.type, s.content) for s in ui_steps] == [
+        ("reasoning", "Think"),
+        ("action", "使用工具: web_search"),
+        ("final", "Hello, world"),
+        ("final", "!"),
+    ]
+    assert [s.content for s in transcript_steps] == ["Think", "使用工具: web_search", "Hello, world!"]
+    assert summary["published"] == 8
+    assert summary["subscribers"]["transcript"]["coalesced"] == 5
+
+
+def test_slow_subscribers_neither_stall_the_producer_nor_lose_steps():
+    async def run():
+        bus = AgentEventBus(maxsize=2, max_lag=0.05)
+        ui = bus.subscribe("ui")
+        metrics = bus.subscribe("metrics", policy=OverflowPolicy.DROP)
+        started = time.monotonic()
+        for i in range(20):
+            await bus.publish(AgentStep(type="observation", content=f"result {i}"))
+        # Reasoning deltas of a lagging subscriber still coalesce
+        for token in ("a", "b", "c"):
+            await bus.publish(AgentStep(type="reasoning", content=token, metadata={"delta": True}))
+        elapsed = time.monotonic() - started
+        received = [await anext(ui), await anext(ui)]
+        await bus.publish(AgentStep(type="final", content="late"))
+        bus.close()
+        received += [step async for step in ui]
+        return elapsed, received, ui.stats(), metrics.stats()
+    
+    elapsed, received, ui_stats, metrics_stats = asyncio.run(run())
+    
+    assert elapsed < 1.0  # waited for the UI once, not per step
+    assert [s.content for s in received] == [f"result {i}" for i in range(20)] + ["abc", "late"]
+    assert ui_stats["dropped"] == 0 and ui_stats["overflowed"] == 20 and ui_stats["coalesced"] == 2
+    assert metrics_stats["dropped"] == 22 and metrics_stats["buffered"] == 2
+
+
+def test_full_buffer_applies_backpressure_until_the_subscriber_reads():
+    async def run():
+        bus = AgentEventBus(maxsize=1, max_lag=5.0)
+        ui = bus.subscribe("ui")
+        
+        async def produce():
+            for i in range(3):
+                await bus.publish(AgentStep(type="action", content=str(i)))
+            bus.close()
+        
+        producer = asyncio.create_task(produce())
+        received = []
+        async for step in ui:
+            received.append(step.content)
+            await asyncio.sleep(0.01)
+        await producer
+        return received, ui.stats()
+    
+    received, stats = asyncio.run(run())
+    
+    assert received == ["0", "1", "2"]
+    assert stats["dropped"] == 0
+
+
+def test_pump_hands_producer_errors_to_subscribers_and_closes_on_cancel():
+    closed = []
+    
+    async def failing():
+        yield AgentStep(type="final", content="partial")
+        raise RuntimeError("model failed")
+    
+    async def endless():
+        try:
+            while True:
+                yield AgentStep(type="final", content="x")
+                await asyncio.sleep(0.01)
+        finally:
+            closed.append(True)
+    
+    async def run():
+        bus = AgentEventBus()
+        steps = bus.subscribe("ui")
+        await bus.pump(failing())
+        received = []
+        try:
+            async for step in steps:
+                received.append(step.content)
+        except RuntimeError as e:
+            received.append(str(e))
+        
+        bus = AgentEventBus()
+        steps = bus.subscribe("ui")
+        producer = asyncio.create_task(bus.pump(endless()))
+        await anext(steps)
+        producer.cancel()
+        await asyncio.gather(producer, return_exceptions=True)
+        remaining = [step async for step in steps]
+        return received, remaining
+    
+    received, remaining = asyncio.run(run())
+    
+    assert received == ["partial", "model failed"]
+    assert len(remaining) <= 1
+    assert closed == [True]
@@ -0,0 +1,84 @@
+"""Tests for observation compaction inside the ReAct loop."""
+
+import asyncio
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from langchain_core.messages import AIMessage, AIMessageChunk, HumanMessage, ToolMessage
+
+from src.agents.agent_graph import fit_context
+from src.agents.history_compaction import DIGEST_PREFIX, compact_observations
+from src.agents.react_agent import ReActAgent
+from src.agents.tools.search_tool import SearchTool
+from src.config.agent_config import AgentConfig
+
+from helpers import FakeSearchService, ScriptedChatModel, search_call, word_counter
+
+SEARCH_OBSERVATION = (
+    "搜索结果:\n\n[1] First title\n来源: https://example.com/1\n摘要: " + "long snippet " * 50 + "\n\n"
+    "[2] Second title\n来源: https://example.com/2\n摘要: " + "long snippet " * 50
+)
+
+
+def _tool_step(call_id, content):
+    return [
+        AIMessage(content="", tool_calls=[{"name": "web_search", "args": {"query": call_id}, "id": call_id}]),
+        ToolMessage(content=content, tool_call_id=call_id),
+    ]
+
+
+def test_older_observations_become_digests_with_citation_numbers():
+    messages = [HumanMessage(content="q"), *_tool_step("a", SEARCH_OBSERVATION), *_tool_step("b", "latest " * 300)]
+    
+    compacted = compact_observations(messages, word_counter(), verbatim_tool_steps=1)
+    
+    digest = compacted[2].content
+    assert digest.startswith(DIGEST_PREFIX)
+    assert "[1] First title" in digest and "[2] Second title" in digest and "snippet" not in digest
+    assert compacted[4].content == messages[4].content  # latest step verbatim
+    assert messages[2].content == SEARCH_OBSERVATION  # input not mutated
+
+
+def test_observations_without_citations_keep_their_head():
+    messages = [HumanMessage(content="q"), *_tool_step("a", "word " * 500), *_tool_step("b", "x")]
+    
+    digest = compact_observations(messages, word_counter(), digest_tokens=50)[2].content
+    
+    assert digest.startswith(DIGEST_PREFIX) and len(digest.split()) < 70
+
+
+def test_iteration_ceiling_applies_unless_protected_messages_exceed_it():
+    messages = [HumanMessage(content="q"), *_tool_step("a", "word " * 500)]
+    config = {"configurable": {"context_manager": word_counter(), "max_iteration_tokens": 300}}
+    
+    trimmed = fit_context({"messages": messages}, config)["llm_input_messages"]
+    assert word_counter().count_messages(trimmed) <= 300
+    
+    huge_question = [HumanMessage(content="word " * 1000)]
+    kept = fit_context({"messages": huge_question}, config)["llm_input_messages"]
+    assert kept == huge_question  # falls back to the context window
+
+
+def test_agent_loop_sends_digests_of_earlier_steps():
+    llm = ScriptedChatModel(scripts=[
+        search_call("alpha", "run-1"), search_call("beta", "run-2"),
+        [AIMessageChunk(content="Done [1][2].", id="run-3")],
+    ])
+    agent = ReActAgent(
+        llm=llm,
+        search_tool=SearchTool(search_service=FakeSearchService(content="y " * 90)),
+        config=AgentConfig(speculative_search=False, router_enabled=False),
+    )
+    agent.context_manager = word_counter()
+    agent.answer_context_manager = word_counter()
+    
+    async def run():
+        return [step async for step in agent.stream("compare alpha and beta")]
+    
+    asyncio.run(run())
+    
+    observations = [m.content for m in llm.inputs[2] if isinstance(m, ToolMessage)]
+    assert observations[0].startswith(DIGEST_PREFIX) and "[1] About alpha" in observations[0]
+    assert "[2] About beta" in observations[1] and "y y y" in observations[1]
@@ -0,0 +1,108 @@
+"""Tests for parallel tool execution with ordered citation numbering."""
+
+import asyncio
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from langchain_core.messages import AIMessageChunk, HumanMessage, ToolMessage
+
+from src.agents.react_agent import ReActAgent
+from src.agents.tools.search_tool import SearchTool
+from src.config.agent_config import AgentConfig
+from src.search.global_citation_manager import GlobalCitationManager
+from src.search.models import SearchResult
+
+from helpers import FakeSearchService, ScriptedChatModel, word_counter
+
+# Slowest search first, so completion order is the reverse of call order
+SEARCH_DELAYS = {"slow": 0.4, "medium": 0.2, "fast": 0.05}
+
+
+def _search_service():
+    """Two results per query, returned after the query's delay."""
+    return FakeSearchService(
+        title="{query} {i}", url="https://example.com/{query}/{i}", content="{query}",
+        results_per_query=2, delay=SEARCH_DELAYS,
+    )
+
+
+def _build_agent(config=None):
+    search_calls = AIMessageChunk(content="", tool_call_chunks=[
+        {"name": "web_search", "args": f'{{"query": "{query}"}}', "id": f"call_{query}", "index": i}
+        for i, query in enumerate(SEARCH_DELAYS)
+    ])
+    llm = ScriptedChatModel(scripts=[[search_calls], [AIMessageChunk(content="done")]])
+    service = _search_service()
+    agent = ReActAgent(llm=llm, search_tool=SearchTool(search_service=service), config=config)
+    agent.context_manager = word_counter()
+    return agent, service
+
+
+def _run_graph(agent):
+    return asyncio.run(agent.agent_executor.ainvoke(
+        {"messages": [HumanMessage(content="q")]}, config=agent._get_run_config()
+    ))
+
+
+def test_search_calls_run_concurrently_with_citations_in_call_order():
+    agent, service = _build_agent()
+    
+    state = _run_graph(agent)
+    
+    assert service.peak_active == 3  # all searches were in flight together
+    assert service.completed == ["fast", "medium", "slow"]
+    
+    tool_messages = [m for m in state["messages"] if isinstance(m, ToolMessage)]
+    assert [m.tool_call_id for m in tool_messages] == ["call_slow", "call_medium", "call_fast"]
+    assert "[1] slow 0" in tool_messages[0].content
+    assert "[3] medium 0" in tool_messages[1].content
+    assert "[5] fast 0" in tool_messages[2].content
+    
+    rounds = agent.citation_manager.get_state()["rounds"]
+    assert [r["query"] for r in rounds] == ["slow", "medium", "fast"]
+
+
+def test_per_session_limit_bounds_concurrency():
+    agent, service = _build_agent(AgentConfig(max_parallel_tools=1))
+    
+    state = _run_graph(agent)
+    
+    assert service.peak_active == 1
+    assert service.completed == ["slow", "medium", "fast"]  # one after another, in call order
+    tool_messages = [m for m in state["messages"] if isinstance(m, ToolMessage)]
+    assert "[1] slow 0" in tool_messages[0].content
+
+
+def test_sessions_share_compiled_graph_but_not_citations():
+    service = _search_service()
+    llm = ScriptedChatModel()
+    first = ReActAgent(llm=llm, search_tool=SearchTool(search_service=service))
+    second = ReActAgent(llm=llm, search_tool=SearchTool(search_service=service))
+    
+    assert first.agent_executor is second.agent_executor
+    assert first.citation_manager is not second.citation_manager
+    
+    other = ReActAgent(llm=llm, search_tool=SearchTool(search_service=_search_service()))
+    assert other.agent_executor is not first.agent_executor
+
+
+def test_tickets_commit_in_order_and_skip_released():
+    manager = GlobalCitationManager()
+    results = [SearchResult(title="t", url="https://example.com", content="c")]
+    
+    async def run():
+        first, second, third = manager.reserve_tickets(["a", "b", "c"])
+        later = asyncio.create_task(manager.add_search_results_in_order(results, "c", third))
+        await asyncio.sleep(0.01)
+        assert not later.done()  # waits for tickets a and b
+        
+        # Ticket a found nothing; ticket b commits next
+        await manager.release_ticket(first)
+        assert await manager.add_search_results_in_order(results, "b", second) == (1, 1)
+        await manager.release_ticket(second)
+        assert await later == (2, 2)
+    
+    asyncio.run(run())
+    assert manager.reserve_tickets(["a"]) == [0]  # existing keys keep their ticket
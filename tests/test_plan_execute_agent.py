@@ -0,0 +1,120 @@
+"""Tests for the plan-and-execute agent."""
+
+import asyncio
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import pytest
+from langchain_core.messages import AIMessageChunk
+
+from src.agents import AgentTimeoutError, PlanExecuteAgent, ReActAgent, create_agent
+from src.agents.plan_execute_agent import parse_plan
+from src.agents.tools.search_tool import SearchTool
+from src.agents.tools.tool_memo import ToolMemo
+from src.config.agent_config import AgentConfig, AgentType
+
+from helpers import Clock, FakeSearchService, ScriptedChatModel, displayed_answer, word_counter
+
+SEARCH_DELAY = 0.2
+
+
+def _make_agent(plan_reply, queries, answer_tokens):
+    planner = ScriptedChatModel(scripts=[[AIMessageChunk(content=plan_reply)]])
+    answer_llm = ScriptedChatModel(reply=lambda messages: [AIMessageChunk(content=t) for t in answer_tokens])
+    # Earlier queries take longer to finish
+    search_service = FakeSearchService(
+        content="x" * 80,
+        delay={query: SEARCH_DELAY * (len(queries) - i) for i, query in enumerate(queries)},
+    )
+    agent = PlanExecuteAgent(
+        llm=planner,
+        answer_llm=answer_llm,
+        search_tool=SearchTool(search_service=search_service),
+    )
+    agent.answer_context_manager = word_counter()
+    return agent, planner, answer_llm, search_service
+
+
+def test_planned_searches_run_in_parallel_with_plan_order_citations():
+    queries = ["alpha", "beta", "gamma"]
+    agent, planner, answer_llm, search_service = _make_agent(
+        '```json\n["alpha", "beta", "gamma"]\n```', queries, ["See ", "[3] ", "and [1]."]
+    )
+    
+    async def run():
+        return [step async for step in agent.stream("compare alpha, beta and gamma")]
+    
+    steps = asyncio.run(run())
+    
+    # One planning call and one answer call; searches overlapped
+    assert planner.calls == 1 and answer_llm.calls == 1
+    assert search_service.peak_active == 3
+    assert search_service.completed == ["gamma", "beta", "alpha"]
+    
+    # Citation numbers follow the plan, not completion order
+    observations = [s.content for s in steps if s.type == "observation"]
+    for number, (query, observation) in enumerate(zip(queries, observations), 1):
+        assert f"[{number}] About {query}" in observation
+    assert [s.metadata["tool_input"] for s in steps if s.type == "action"] == [
+        str({"query": q}) for q in queries
+    ]
+    shown = displayed_answer(steps)
+    assert shown.startswith("See [[3]](https://example.com/gamma) and [[1]](https://example.com/alpha).")
+
+
+def test_empty_plan_answers_without_searching():
+    agent, _, answer_llm, search_service = _make_agent("[]", [], ["Hi."])
+    
+    result = asyncio.run(agent.run("hello"))
+    
+    assert result.final_answer == "Hi."
+    assert search_service.completed == [] and result.total_iterations == 0
+    assert "搜索结果" not in answer_llm.inputs[0][-1].content
+
+
+def test_memo_hits_do_not_extend_the_ttl():
+    agent, planner, _, search_service = _make_agent('["alpha"]', ["alpha"], ["See [1]."])
+    planner.scripts = [[AIMessageChunk(content='["alpha"]')] for _ in range(3)]
+    clock = Clock()
+    agent.tool_memo = ToolMemo(clock=clock)
+    ttl = agent.tool_memo.ttl_for(agent.search_tool.name)
+    
+    asyncio.run(agent.run("alpha?"))
+    clock.now = ttl - 1
+    asyncio.run(agent.run("alpha?"))  # answered from the memo
+    assert search_service.queries == ["alpha"]
+    
+    clock.now = ttl + 1
+    asyncio.run(agent.run("alpha?"))  # expired despite the hit above
+    assert search_service.queries == ["alpha", "alpha"]
+
+
+def test_stream_stops_at_the_deadline():
+    agent, _, answer_llm, _ = _make_agent("[]", [], ["Hi."])
+    agent.config = agent.config.model_copy(update={"max_execution_time": 1})
+    answer_llm.chunk_delay = 60
+    
+    async def run():
+        return [step async for step in agent.stream("hello")]
+    
+    with pytest.raises(AgentTimeoutError):
+        asyncio.run(asyncio.wait_for(run(), timeout=10))
+
+
+def test_parse_plan_dedupes_caps_and_rejects_non_arrays():
+    assert parse_plan('计划: ["a", "b", "a", " ", "c"]', max_queries=2) == ["a", "b"]
+    assert parse_plan("[]", max_queries=4) == []
+    assert parse_plan("I will search the web.", max_queries=4) is None
+
+
+def test_create_agent_selects_configured_agent_type():
+    llm = ScriptedChatModel()
+    search_tool = SearchTool(search_service=FakeSearchService())
+    
+    plan_agent = create_agent(llm, search_tool, config=AgentConfig(agent_type=AgentType.PLAN_EXECUTE))
+    react_agent = create_agent(llm, search_tool, config=AgentConfig())
+    
+    assert isinstance(plan_agent, PlanExecuteAgent)
+    assert isinstance(react_agent, ReActAgent)
@@ -0,0 +1,85 @@
+"""Tests for the agent pre-router and its accuracy statistics."""
+
+import asyncio
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import pytest
+from langchain_core.messages import AIMessageChunk
+
+from src.agents.react_agent import ReActAgent
+from src.agents.router import QueryRouter, Route, RouteDecision, RouterStats, get_router_stats
+from src.agents.tools.search_tool import SearchTool
+from src.config.agent_config import AgentConfig
+
+from helpers import FakeSearchService, ScriptedChatModel
+
+
+@pytest.mark.parametrize("message", ["你好", "Hello!", "谢谢", "今天是星期几？", "什么是量子纠缠", "Explain recursion"])
+def test_messages_needing_no_tools_route_direct(message):
+    assert QueryRouter().route(message).route == Route.DIRECT
+
+
+@pytest.mark.parametrize("message", [
+    "今天北京天气怎么样", "What is the latest iPhone price?", "帮我搜索一下 OpenAI 新闻",
+    "总结 https://example.com/post", "北京有哪些好玩的地方",
+    # "why" / "how do" phrasing must not win over a time reference or a market event
+    "为什么今天股市下跌", "为什么比特币今天跌了", "Why did the market drop yesterday?",
+    # API and product questions depend on current documentation
+    "How do I use the OpenAI Responses API?",
+])
+def test_messages_needing_tools_route_to_agent(message):
+    assert QueryRouter().route(message).route == Route.AGENT
+
+
+def test_router_is_off_by_default():
+    assert AgentConfig().router_enabled is False
+
+
+def test_direct_route_streams_single_answer_without_agent_loop():
+    get_router_stats().reset()
+    function_call_llm = ScriptedChatModel(scripts=[])
+    answer_llm = ScriptedChatModel(scripts=[[
+        AIMessageChunk(content="", additional_kwargs={"reasoning_content": "用户在"}),
+        AIMessageChunk(content="", additional_kwargs={"reasoning_content": "打招呼"}),
+        AIMessageChunk(content="你好！"),
+        AIMessageChunk(content="有什么可以帮你？"),
+    ]])
+    service = FakeSearchService()
+    agent = ReActAgent(
+        llm=function_call_llm,
+        answer_llm=answer_llm,
+        search_tool=SearchTool(search_service=service),
+        config=AgentConfig(router_enabled=True),
+    )
+    
+    async def run():
+        return [step async for step in agent.stream("你好")]
+    
+    steps = asyncio.run(run())
+    
+    assert [s.content for s in steps if s.type == "final"] == ["你好！", "有什么可以帮你？"]
+    # Reasoning arrives as deltas, not as the accumulated text per token
+    reasoning = [s for s in steps if s.type == "reasoning"]
+    assert [s.content for s in reasoning] == ["用户在", "打招呼"]
+    assert all(s.metadata["delta"] for s in reasoning)
+    assert function_call_llm.calls == 0 and answer_llm.calls == 1
+    assert service.queries == []
+    assert get_router_stats().summary()["routes"]["direct"] == {"correct": 1, "total": 1, "accuracy": 1.0}
+
+
+def test_stats_measure_accuracy_per_route_and_bucket():
+    stats = RouterStats()
+    agent_decision = RouteDecision(route=Route.AGENT, score=0.5)
+    stats.record_agent_outcome(agent_decision, used_tools=True)
+    stats.record_agent_outcome(agent_decision, used_tools=False)  # could have been direct
+    stats.record_direct_outcome(RouteDecision(route=Route.DIRECT, score=0.05), "我无法获取实时天气信息。")
+    
+    summary = stats.summary()
+    assert summary["total"] == 3
+    assert summary["accuracy"] == pytest.approx(1 / 3)
+    assert summary["routes"]["agent"]["accuracy"] == 0.5
+    assert summary["buckets"][0.5] == {"agent": (1, 2)}
+    assert summary["buckets"][0.0] == {"direct": (0, 1)}
@@ -0,0 +1,117 @@
+"""Tests for the client-side provider rate limiter."""
+
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import pytest
+
+from src.config.rate_limit_config import RateLimitConfig
+from src.models.rate_limiter import (
+    RateLimiter,
+    RateLimitExceededError,
+    TokenBucket,
+    _parse_reset,
+    get_rate_limiter,
+)
+
+
+def test_parse_reset_formats():
+    assert _parse_reset("1s") == 1.0
+    assert _parse_reset("6m0s") == 360.0
+    assert _parse_reset("20ms") == pytest.approx(0.02)
+    assert _parse_reset("1h2m3.5s") == pytest.approx(3723.5)
+    assert _parse_reset("30") == 30.0
+    assert _parse_reset("2000-01-01T00:00:00Z") == 0.0
+    assert _parse_reset(None) is None
+
+
+def test_token_bucket_wait_time():
+    bucket = TokenBucket(per_minute=60)  # 1 unit per second
+    assert bucket.wait_time(10) == 0.0
+    bucket.consume(60)
+    assert bucket.wait_time(2) == pytest.approx(2.0, abs=0.05)
+    # Requests larger than the bucket only need a full bucket
+    assert bucket.wait_time(1000) == pytest.approx(60.0, abs=0.1)
+
+
+def test_unlimited_without_limits_or_headers():
+    limiter = RateLimiter("test", max_wait=0.0)
+    
+    async def run():
+        for _ in range(100):
+            await limiter.acquire(100000)
+    
+    asyncio.run(run())
+
+
+def test_acquire_queues_briefly_instead_of_failing():
+    limiter = RateLimiter("test", requests_per_minute=600, max_wait=1.0)  # 10 req/s
+    limiter.requests.consume(600)
+    
+    async def run():
+        start = time.monotonic()
+        waited = await limiter.acquire()
+        return time.monotonic() - start, waited
+    
+    elapsed, waited = asyncio.run(run())
+    assert 0.05 <= elapsed < 0.5
+    assert waited == pytest.approx(elapsed, abs=0.05)
+
+
+def test_acquire_fails_fast_beyond_max_wait():
+    limiter = RateLimiter("test", tokens_per_minute=600, max_wait=0.5)
+    limiter.tokens.consume(600)
+    
+    with pytest.raises(RateLimitExceededError):
+        asyncio.run(limiter.acquire(estimated_tokens=300))
+
+
+def test_openai_headers_create_and_sync_buckets():
+    limiter = RateLimiter("openai/test")
+    limiter.update_from_headers({
+        "x-ratelimit-limit-requests": "500",
+        "x-ratelimit-remaining-requests": "0",
+        "x-ratelimit-reset-requests": "120ms",
+        "x-ratelimit-limit-tokens": "30000",
+        "x-ratelimit-remaining-tokens": "29000",
+        "x-ratelimit-reset-tokens": "2s",
+    })
+    
+    assert limiter.requests.capacity == 500
+    assert limiter.requests.level < 1
+    assert limiter.requests.wait_time(1) <= 0.13
+    assert limiter.tokens.capacity == 30000
+    assert limiter.tokens.level <= 29000
+
+
+def test_anthropic_headers_and_retry_after():
+    limiter = RateLimiter("anthropic/test")
+    limiter.update_from_headers({
+        "Anthropic-Ratelimit-Requests-Limit": "50",
+        "Anthropic-Ratelimit-Requests-Remaining": "49",
+        "Anthropic-Ratelimit-Requests-Reset": "2099-01-01T00:00:00Z",
+        "Retry-After": "5",
+    })
+    
+    assert limiter.requests.capacity == 50
+    assert limiter._wait_time(0) > 4
+
+
+def test_record_usage_corrects_estimate():
+    limiter = RateLimiter("test", tokens_per_minute=10000)
+    asyncio.run(limiter.acquire(1000))
+    level = limiter.tokens.level
+    limiter.record_usage(actual_tokens=3000, estimated_tokens=1000)
+    assert limiter.tokens.level == pytest.approx(level - 2000, abs=5)
+
+
+def test_limiters_are_shared_per_provider_model():
+    config = RateLimitConfig(requests_per_minute=100)
+    first = get_rate_limiter("openai", "shared-model", config)
+    assert get_rate_limiter("openai", "shared-model", config) is first
+    assert get_rate_limiter("openai", "other-model", config) is not first
+    assert get_rate_limiter("openai", "disabled-model", RateLimitConfig(enabled=False)) is None
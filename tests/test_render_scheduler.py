@@ -0,0 +1,87 @@
+"""Tests for frame-rate-limited delta rendering."""
+
+import asyncio
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.ui.render_scheduler import StreamRenderer
+
+from helpers import Clock
+
+
+class _Message:
+    """Records what a Chainlit message would send over the websocket."""
+    
+    def __init__(self):
+        self.content = ""
+        self.sent = []
+    
+    async def stream_token(self, token, is_sequence=False):
+        self.content = token if is_sequence else self.content + token
+        self.sent.append((token, is_sequence))
+    
+    async def update(self):
+        self.sent.append((self.content, True))
+
+
+def test_tokens_within_a_frame_are_sent_as_one_delta():
+    clock = Clock()
+    message = _Message()
+    
+    async def run():
+        renderer = StreamRenderer(message, fps=10, clock=clock)
+        await renderer.append("Hello")  # first token is shown right away
+        for token in (", ", "wor", "ld"):
+            clock.now += 0.02
+            await renderer.append(token)
+        clock.now = 0.2
+        await renderer.append("!")
+        await renderer.append(" Bye")
+        await renderer.close()
+        return renderer.stats()
+    
+    stats = asyncio.run(run())
+    
+    assert message.content == "Hello, world! Bye"
+    # Only deltas are sent; the buffered ones were coalesced
+    assert message.sent[0] == ("Hello", False)
+    assert [token for token, is_sequence in message.sent] == ["Hello", ", world!", " Bye"]
+    assert stats == {"received": 6, "frames": 3, "sent_chars": len("Hello, world! Bye")}
+
+
+def test_pending_text_is_sent_at_the_end_of_the_frame():
+    message = _Message()
+    
+    async def run():
+        renderer = StreamRenderer(message, fps=50)
+        await renderer.append("a")
+        await renderer.append("b")
+        assert message.content == "a"
+        await asyncio.sleep(0.1)
+        return message.content
+    
+    assert asyncio.run(run()) == "ab"
+
+
+def test_snapshots_send_only_the_new_suffix():
+    clock = Clock()
+    message = _Message()
+    
+    async def run():
+        renderer = StreamRenderer(message, fps=10, clock=clock)
+        for text in ("Let me", "Let me search", "Something else", ""):
+            clock.now += 1
+            await renderer.set_text(text)
+        await renderer.close()
+    
+    asyncio.run(run())
+    
+    assert message.sent == [
+        ("Let me", True),
+        (" search", False),
+        ("Something else", True),
+        ("", True),  # cleared through update()
+    ]
+    assert message.content == ""
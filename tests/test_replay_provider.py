@@ -0,0 +1,132 @@
+"""Tests for the fake OpenAI-compatible record/replay server and replay provider."""
+
+import asyncio
+import json
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import pytest
+from openai import AsyncOpenAI, NotFoundError
+
+from src.config.model_config import ModelConfig, ModelProvider
+from src.config.replay_config import ReplayConfig
+from src.models.replay_server import CassetteStore, FakeOpenAIServer
+from src.models.replay_wrapper import ReplayWrapper
+
+
+def _chunk(delta, finish_reason=None):
+    return json.dumps({
+        "id": "chatcmpl-test",
+        "object": "chat.completion.chunk",
+        "created": 0,
+        "model": "deepseek-reasoner",
+        "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+    })
+
+
+REQUEST = {
+    "model": "deepseek-reasoner",
+    "messages": [{"role": "user", "content": "What is 2 + 2?"}],
+    "stream": True,
+}
+
+STREAM_EVENTS = [
+    {"delay": 0.05, "data": _chunk({"role": "assistant", "reasoning_content": "Adding."})},
+    {"delay": 0.01, "data": _chunk({"content": "4"})},
+    {"delay": 0.01, "data": _chunk({
+        "tool_calls": [{"index": 0, "id": "call_1", "type": "function",
+                        "function": {"name": "calc", "arguments": "{}"}}],
+    }, finish_reason="stop")},
+    {"delay": 0.0, "data": "[DONE]"},
+]
+
+
+def _make_store(tmp_path, strict=False):
+    store = CassetteStore(str(tmp_path), strict=strict)
+    store.save(REQUEST, {"stream": True, "status": 200, "events": STREAM_EVENTS})
+    return store
+
+
+async def _collect_stream(base_url, request=REQUEST):
+    client = AsyncOpenAI(api_key="replay", base_url=base_url, max_retries=0)
+    body = dict(request)
+    body.pop("stream")
+    stream = await client.chat.completions.create(stream=True, **body)
+    return [chunk async for chunk in stream]
+
+
+def test_replay_preserves_reasoning_and_tool_calls(tmp_path):
+    with FakeOpenAIServer(_make_store(tmp_path), timing_scale=0) as server:
+        chunks = asyncio.run(_collect_stream(server.base_url))
+    
+    deltas = [c.choices[0].delta for c in chunks]
+    assert deltas[0].reasoning_content == "Adding."
+    assert deltas[1].content == "4"
+    assert deltas[2].tool_calls[0].function.name == "calc"
+
+
+def test_replay_timing_is_scaled(tmp_path):
+    store = _make_store(tmp_path)
+    with FakeOpenAIServer(store, timing_scale=4.0) as server:
+        start = time.monotonic()
+        asyncio.run(_collect_stream(server.base_url))
+        elapsed = time.monotonic() - start
+    assert elapsed >= 0.28  # (0.05 + 0.01 + 0.01) * 4
+
+
+def test_unmatched_requests_fall_back_to_recorded_order(tmp_path):
+    other = {**REQUEST, "messages": [{"role": "user", "content": "Different date"}]}
+    
+    with FakeOpenAIServer(_make_store(tmp_path), timing_scale=0) as server:
+        assert len(asyncio.run(_collect_stream(server.base_url, other))) == 3
+    
+    with FakeOpenAIServer(_make_store(tmp_path / "strict", strict=True), timing_scale=0) as server:
+        with pytest.raises(NotFoundError):
+            asyncio.run(_collect_stream(server.base_url, other))
+
+
+def test_record_mode_saves_chunks_and_timing(tmp_path):
+    upstream = FakeOpenAIServer(_make_store(tmp_path / "upstream"), timing_scale=1.0).start()
+    recording = CassetteStore(str(tmp_path / "recorded"))
+    try:
+        with FakeOpenAIServer(
+            recording, mode="record", upstream_base_url=upstream.base_url
+        ) as recorder:
+            chunks = asyncio.run(_collect_stream(recorder.base_url))
+    finally:
+        upstream.stop()
+    
+    assert chunks[0].choices[0].delta.reasoning_content == "Adding."
+    saved = json.loads(next((tmp_path / "recorded").glob("*.json")).read_text())
+    assert saved["key"] == CassetteStore.request_key(REQUEST)
+    assert [e["data"] for e in saved["events"]] == [e["data"] for e in STREAM_EVENTS]
+    assert saved["events"][0]["delay"] >= 0.04
+
+
+def test_record_mode_requires_upstream(tmp_path):
+    with pytest.raises(ValueError):
+        FakeOpenAIServer(CassetteStore(str(tmp_path)), mode="record")
+
+
+def test_replay_wrapper_streams_offline(tmp_path):
+    _make_store(tmp_path)
+    config = ModelConfig(
+        provider=ModelProvider.REPLAY,
+        model_name="deepseek-reasoner",
+        api_key="replay",
+        model_variant="deepseek-reasoner",
+    )
+    wrapper = ReplayWrapper(config, ReplayConfig(cassette_dir=str(tmp_path), timing_scale=0))
+    
+    async def run():
+        return [chunk async for chunk in wrapper.generate_stream("What is 2 + 2?")]
+    
+    try:
+        chunks = asyncio.run(run())
+    finally:
+        wrapper.close()
+    
+    assert [(c.chunk_type, c.content) for c in chunks] == [("reasoning", "Adding."), ("answer", "4")]
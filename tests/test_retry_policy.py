@@ -0,0 +1,161 @@
+"""Tests for the shared retry policy."""
+
+import asyncio
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import httpx
+import pytest
+
+from src.runtime.retry_policy import (
+    ErrorKind,
+    RetryBudget,
+    RetryPolicy,
+    classify_error,
+    is_retryable_before_send,
+    with_stream_retry,
+)
+
+
+class _StatusError(Exception):
+    """Mimics provider SDK status errors (openai/anthropic APIStatusError)."""
+    
+    def __init__(self, status_code, code=None):
+        super().__init__(f"status {status_code}")
+        self.status_code = status_code
+        self.code = code
+
+
+def _policy(**kwargs):
+    kwargs.setdefault("budget", RetryBudget(ratio=1.0, min_retries=100))
+    return RetryPolicy(base_delay=0.0, max_delay=0.0, **kwargs)
+
+
+def test_classify_error():
+    assert classify_error(asyncio.TimeoutError()) == ErrorKind.TRANSIENT
+    assert classify_error(httpx.ConnectError("refused")) == ErrorKind.TRANSIENT
+    assert classify_error(_StatusError(503)) == ErrorKind.TRANSIENT
+    assert classify_error(_StatusError(429)) == ErrorKind.RATE_LIMIT
+    assert classify_error(_StatusError(429, code="insufficient_quota")) == ErrorKind.PERMANENT
+    assert classify_error(_StatusError(400)) == ErrorKind.PERMANENT
+    assert classify_error(_StatusError(401)) == ErrorKind.PERMANENT
+    assert classify_error(ValueError("context length exceeded")) == ErrorKind.PERMANENT
+    assert classify_error(ExceptionGroup("sse", [httpx.ReadTimeout("slow")])) == ErrorKind.TRANSIENT
+
+
+def test_transient_errors_are_retried():
+    calls = []
+    
+    async def flaky():
+        calls.append(1)
+        if len(calls) < 3:
+            raise _StatusError(502)
+        return "ok"
+    
+    assert asyncio.run(_policy(max_attempts=3).call(flaky)) == "ok"
+    assert len(calls) == 3
+
+
+def test_permanent_errors_fail_fast():
+    calls = []
+    
+    async def bad_request():
+        calls.append(1)
+        raise _StatusError(400)
+    
+    with pytest.raises(_StatusError):
+        asyncio.run(_policy(max_attempts=5).call(bad_request))
+    assert len(calls) == 1
+
+
+def test_retry_budget_caps_retries():
+    budget = RetryBudget(ratio=0.0, min_retries=2)
+    calls = []
+    
+    async def always_down():
+        calls.append(1)
+        raise _StatusError(503)
+    
+    policy = _policy(max_attempts=10, budget=budget)
+    with pytest.raises(_StatusError):
+        asyncio.run(policy.call(always_down))
+    assert len(calls) == 3  # first attempt + 2 budgeted retries
+    
+    calls.clear()
+    with pytest.raises(_StatusError):
+        asyncio.run(policy.call(always_down))
+    assert len(calls) == 1  # budget exhausted
+
+
+def test_stream_retries_only_before_first_chunk():
+    attempts = []
+    
+    async def fails_before_output():
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise _StatusError(503)
+        yield "a"
+        yield "b"
+    
+    async def collect(gen):
+        return [item async for item in gen]
+    
+    assert asyncio.run(collect(_policy().stream(fails_before_output))) == ["a", "b"]
+    assert len(attempts) == 2
+    
+    attempts.clear()
+    received = []
+    
+    @with_stream_retry(_policy())
+    async def fails_mid_stream():
+        attempts.append(1)
+        yield "a"
+        raise _StatusError(503)
+    
+    async def consume():
+        async for item in fails_mid_stream():
+            received.append(item)
+    
+    with pytest.raises(_StatusError):
+        asyncio.run(consume())
+    assert received == ["a"]  # no duplicate text
+    assert len(attempts) == 1
+
+
+def test_closing_a_decorated_stream_closes_the_provider_stream_at_once():
+    closed = []
+    
+    @with_stream_retry(_policy())
+    async def provider_stream():
+        try:
+            for token in ("a", "b", "c"):
+                yield token
+        finally:
+            closed.append(True)
+    
+    async def run():
+        stream = provider_stream()
+        assert await anext(stream) == "a"
+        await stream.aclose()
+        # No event-loop tick in between: the finalizer must not be needed
+        return list(closed)
+    
+    assert asyncio.run(run()) == [True]
+
+
+def test_retry_after_header_is_respected():
+    request = httpx.Request("POST", "http://test")
+    response = httpx.Response(429, headers={"retry-after": "3"}, request=request)
+    error = httpx.HTTPStatusError("throttled", request=request, response=response)
+    
+    assert RetryPolicy(max_delay=10.0, budget=RetryBudget()).backoff(1, error) == 3.0
+    assert RetryPolicy(max_delay=1.0, budget=RetryBudget()).backoff(1, error) == 1.0
+
+
+def test_side_effect_safe_classification():
+    assert is_retryable_before_send(httpx.ConnectError("refused"))
+    assert is_retryable_before_send(_StatusError(429))
+    assert not is_retryable_before_send(httpx.ReadTimeout("maybe executed"))
+    assert not is_retryable_before_send(_StatusError(500))
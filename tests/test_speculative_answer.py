@@ -0,0 +1,85 @@
+"""Tests for speculative answer generation in dual-LLM agent mode."""
+
+import asyncio
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from langchain_core.messages import AIMessageChunk
+
+from src.agents.react_agent import ReActAgent
+from src.agents.tools.search_tool import SearchTool
+from src.config.agent_config import AgentConfig
+
+from helpers import FakeSearchService, ScriptedChatModel, search_call, word_counter
+
+CHUNK_DELAY = 0.1
+
+
+def _answer_model(function_call_llm, started_at):
+    """Answer model reporting how many search results its prompt contained.
+    
+    Records how many chunks the function-call model had streamed when each
+    answer call started.
+    """
+    def reply(messages):
+        started_at.append(function_call_llm.streamed)
+        results = messages[-1].content.count("[搜索结果")
+        return [AIMessageChunk(content=token) for token in ["Based ", "on ", f"{results} ", "results."]]
+    
+    return ScriptedChatModel(reply=reply, chunk_delay=CHUNK_DELAY)
+
+
+def _final_turn(message_id, chunks):
+    return [AIMessageChunk(content="ok ", id=message_id) for _ in range(chunks)]
+
+
+def _run_agent(scripts, speculative_answer):
+    llm = ScriptedChatModel(scripts=scripts, chunk_delay=CHUNK_DELAY)
+    started_at = []
+    answer_llm = _answer_model(llm, started_at)
+    service = FakeSearchService(title="Result for {query}", url="https://example.com/w", content="x" * 80)
+    agent = ReActAgent(
+        llm=llm,
+        answer_llm=answer_llm,
+        search_tool=SearchTool(search_service=service),
+        config=AgentConfig(speculative_answer=speculative_answer, speculative_search=False),
+    )
+    agent.context_manager = word_counter()
+    agent.answer_context_manager = word_counter()
+    
+    async def run():
+        return [step async for step in agent.stream("weather?")]
+    
+    steps = asyncio.run(run())
+    answer = "".join(s.content for s in steps if s.type == "final")
+    return answer, answer_llm, started_at
+
+
+def test_answer_overlaps_final_function_call_turn():
+    # 1 tool-call chunk, then a 5-chunk final function-call turn
+    answer, answer_llm, started_at = _run_agent(
+        [search_call("weather", "run-1"), _final_turn("run-2", 5)], speculative_answer=True
+    )
+    baseline_answer, _, baseline_started_at = _run_agent(
+        [search_call("weather", "run-1"), _final_turn("run-2", 5)], speculative_answer=False
+    )
+    
+    assert answer.startswith("Based on 1 results.") and baseline_answer.startswith("Based on 1 results.")
+    assert answer_llm.calls == 1
+    # The answer started before the function-call model's last chunk,
+    # not after the whole turn as without speculation
+    assert started_at[0] < 6
+    assert baseline_started_at == [6]
+
+
+def test_answer_restarts_when_more_tools_are_called():
+    answer, answer_llm, _ = _run_agent(
+        [search_call("weather", "run-1"), search_call("forecast", "run-2"), _final_turn("run-3", 1)],
+        speculative_answer=True,
+    )
+    
+    # First speculative answer (1 result) was cancelled, the second one is used
+    assert answer_llm.calls == 2
+    assert answer.startswith("Based on 2 results.")
@@ -0,0 +1,154 @@
+"""Tests for speculative searches launched from streaming tool-call arguments."""
+
+import asyncio
+import sys
+from pathlib import Path
+from uuid import uuid4
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from langchain_core.messages import AIMessage, AIMessageChunk
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, LLMResult
+
+from src.agents.react_agent import ReActAgent
+from src.agents.speculative_search import SpeculativeSearch, extract_closed_query
+from src.agents.tools.search_tool import SearchTool
+from src.agents.tools.tool_memo import ToolMemo
+from src.config.agent_config import AgentConfig
+
+from helpers import FakeSearchService, ScriptedChatModel, word_counter
+
+SEARCH_DELAY = 0.3
+
+
+def _search_service():
+    return FakeSearchService(title="Sunny", url="https://example.com/w", content="sunny", delay=SEARCH_DELAY)
+
+
+def _tool_call_chunk(name, args, index=0):
+    return AIMessageChunk(content="", id="run-1", tool_call_chunks=[
+        {"name": name, "args": args, "id": "call_1" if name else None, "index": index},
+    ])
+
+
+def _run_agent(speculative):
+    # The query closes in the 2nd of 5 chunks; the rest is trailing arguments
+    llm = ScriptedChatModel(scripts=[
+        [
+            _tool_call_chunk("web_search", '{"query": "wea'),
+            _tool_call_chunk(None, 'ther"'),
+            _tool_call_chunk(None, ', "note": "a'),
+            _tool_call_chunk(None, 'b'),
+            _tool_call_chunk(None, 'c"}'),
+        ],
+        [AIMessageChunk(content="It is sunny [1].", id="run-2")],
+    ])
+    service = _search_service()
+    agent = ReActAgent(
+        llm=llm,
+        search_tool=SearchTool(search_service=service),
+        config=AgentConfig(speculative_search=speculative),
+    )
+    agent.context_manager = word_counter()
+    
+    async def run():
+        return [step async for step in agent.stream("weather?")]
+    
+    return asyncio.run(run()), service
+
+
+def test_search_overlaps_tool_call_generation(monkeypatch):
+    handlers = []
+    
+    class _RecordingSpeculativeSearch(SpeculativeSearch):
+        """Records how many searches were launched when each LLM call ended."""
+        
+        def __init__(self, search_tool, **kwargs):
+            super().__init__(search_tool, **kwargs)
+            self.launched_before_end = []
+            handlers.append(self)
+        
+        async def on_llm_end(self, response, *, run_id, **kwargs):
+            self.launched_before_end.append(self.launched)
+            await super().on_llm_end(response, run_id=run_id, **kwargs)
+    
+    monkeypatch.setattr("src.agents.react_agent.SpeculativeSearch", _RecordingSpeculativeSearch)
+    steps, service = _run_agent(speculative=True)
+    
+    [handler] = handlers
+    # Launched while the tool call was still streaming, then taken by the tool
+    assert handler.launched_before_end[0] == 1
+    assert handler.reused == 1 and handler.cancelled == 0
+    assert service.queries == ["weather"]  # not searched again
+    assert any(s.type == "final" and "sunny" in s.content for s in steps)
+
+
+def test_search_waits_for_the_tool_without_speculation():
+    steps, service = _run_agent(speculative=False)
+    
+    assert service.queries == ["weather"]
+    assert any(s.type == "final" and "sunny" in s.content for s in steps)
+
+
+def test_search_is_cancelled_when_final_call_differs():
+    service = _search_service()
+    speculative = SpeculativeSearch(SearchTool(search_service=service))
+    run_id = uuid4()
+    
+    async def run():
+        chunk = ChatGenerationChunk(message=_tool_call_chunk("web_search", '{"query": "draft"}'))
+        await speculative.on_llm_new_token("", chunk=chunk, run_id=run_id)
+        assert speculative.launched == 1
+        
+        final = AIMessage(content="", tool_calls=[
+            {"name": "web_search", "args": {"query": "final"}, "id": "call_1"},
+        ])
+        await speculative.on_llm_end(LLMResult(generations=[[ChatGeneration(message=final)]]), run_id=run_id)
+        await asyncio.sleep(0)
+        assert speculative.take("draft") is None
+        assert speculative.take("final") is None
+    
+    asyncio.run(run())
+    assert speculative.cancelled == 1
+
+
+def test_extract_closed_query():
+    assert extract_closed_query('{"query": "open') is None
+    assert extract_closed_query('{"query": "say \\"hi\\"", "x"') == 'say "hi"'
+    assert extract_closed_query('{"query": "北京天气"}') == "北京天气"
+
+
+def test_speculative_searches_take_the_session_tool_slots():
+    service = _search_service()
+    speculative = SpeculativeSearch(SearchTool(search_service=service), tool_semaphore=asyncio.Semaphore(1))
+    run_id = uuid4()
+    
+    async def run():
+        for index, query in enumerate(["a", "b"]):
+            chunk = ChatGenerationChunk(message=_tool_call_chunk("web_search", f'{{"query": "{query}"}}', index))
+            await speculative.on_llm_new_token("", chunk=chunk, run_id=run_id)
+        final = AIMessage(content="", tool_calls=[
+            {"name": "web_search", "args": {"query": query}, "id": f"call_{query}"} for query in ["a", "b"]
+        ])
+        await speculative.on_llm_end(LLMResult(generations=[[ChatGeneration(message=final)]]), run_id=run_id)
+        await asyncio.gather(speculative.take("a"), speculative.take("b"))
+    
+    asyncio.run(run())
+    assert service.completed == ["a", "b"]
+    assert service.peak_active == 1
+
+
+def test_memoized_query_is_not_launched():
+    service = _search_service()
+    tool = SearchTool(search_service=service)
+    memo = ToolMemo()
+    memo.put(tool.name, {"query": "weather"}, object(), ttl=60)
+    speculative = SpeculativeSearch(tool, tool_memo=memo)
+    
+    async def run():
+        chunk = ChatGenerationChunk(message=_tool_call_chunk("web_search", '{"query": "Weather "}'))
+        await speculative.on_llm_new_token("", chunk=chunk, run_id=uuid4())
+    
+    asyncio.run(run())
+    assert speculative.launched == 0 and service.queries == []
+    assert memo.hits == 0 and memo.misses == 0  # the check is not a lookup
@@ -0,0 +1,54 @@
+"""Tests for StreamingCitationConverter (token-by-token citation links)."""
+
+import random
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.search.citation_processor import CitationProcessor, StreamingCitationConverter
+from src.search.models import SearchResponse, SearchResult
+
+ANSWER = "Paris [1] is large [2][3]; see [1], [] and [x] or [[2]] and [99].\nEnd [3"
+
+
+def _processor():
+    results = [
+        SearchResult(title=f"Source {i}", url=f"https://example.com/{i}", content="...")
+        for i in range(1, 4)
+    ]
+    return CitationProcessor(SearchResponse(query="q", results=results, total_results=3, search_time=0.0))
+
+
+def _stream(converter, tokens):
+    return "".join(converter.feed(token) for token in tokens) + converter.flush()
+
+
+def test_split_markers_convert_like_full_text_conversion():
+    processor = _processor()
+    expected = processor.convert_citations(ANSWER)
+    rng = random.Random(0)
+    for _ in range(50):
+        cuts = sorted(rng.sample(range(1, len(ANSWER)), 12))
+        tokens = [ANSWER[a:b] for a, b in zip([0] + cuts, cuts + [len(ANSWER)])]
+        assert _stream(processor.stream_converter(), tokens) == expected
+
+
+def test_markers_are_held_back_only_until_decided():
+    converter = StreamingCitationConverter({12: {"url": "https://example.com/12"}})
+    
+    assert converter.feed("see [") == "see "
+    assert converter.feed("1") == ""
+    assert converter.feed("2") == ""
+    assert converter.feed("] ok") == "[[12]](https://example.com/12) ok"
+    assert converter.feed("[4") == ""
+    assert converter.flush() == "[4"
+
+
+def test_cited_numbers_are_collected_in_order_of_first_use():
+    processor = _processor()
+    converter = processor.stream_converter()
+    _stream(converter, ["[3] and [1", "] then [3] and [99]"])
+    
+    assert converter.cited == [3, 1]
+    assert processor.format_citations_list(converter.cited) == processor.get_citations_list("[1] [3]")
@@ -0,0 +1,51 @@
+"""Tests for structured search artifacts and the answer context built from them."""
+
+import asyncio
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from langchain_core.messages import ToolMessage
+
+from src.agents.answer_context import build_answer_context
+from src.agents.tools.search_tool import SearchArtifact, SearchTool
+from src.search.global_citation_manager import GlobalCitationManager
+from src.search.models import SearchResult
+
+from helpers import FakeSearchService
+
+LONG_CONTENT = "detail " * 100
+
+
+def test_tool_call_returns_compact_content_and_artifact():
+    tool = SearchTool(search_service=FakeSearchService(content=LONG_CONTENT))
+    manager = GlobalCitationManager()
+    manager.add_search_results([SearchResult(title="Earlier", url="https://example.com/0", content="x")], "earlier")
+    tool_call = {"name": "web_search", "args": {"query": "alpha"}, "id": "call_1", "type": "tool_call"}
+    
+    message = asyncio.run(tool.ainvoke(tool_call, config={"configurable": {"citation_manager": manager}}))
+    
+    assert isinstance(message, ToolMessage)
+    assert "[2] About alpha" in message.content and LONG_CONTENT not in message.content
+    assert isinstance(message.artifact, SearchArtifact)
+    assert [(n, r.title) for n, r in message.artifact.numbered()] == [(2, "About alpha")]
+
+
+def test_answer_context_renders_full_content_once_per_source():
+    alpha = SearchArtifact(query="alpha", results=[SearchResult(title="A", url="https://a", content=LONG_CONTENT)])
+    beta = SearchArtifact(
+        query="beta",
+        results=[SearchResult(title="B", url="https://b", content="b content")],
+        first_number=2,
+    )
+    
+    blocks = build_answer_context(
+        ["alpha observation", "alpha observation", "beta observation", "weather: sunny"],
+        [alpha, alpha, beta, None],
+    )
+    
+    assert len(blocks) == 3  # the repeated search adds nothing
+    assert "[1] A" in blocks[0] and LONG_CONTENT in blocks[0]
+    assert "[2] B" in blocks[1] and "b content" in blocks[1]
+    assert blocks[2] == "weather: sunny"  # tools without artifacts keep their text
@@ -0,0 +1,108 @@
+"""Tests for the per-conversation tool result memo."""
+
+import asyncio
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.agents.tools.search_tool import SearchTool
+from src.agents.tools.tool_memo import ToolMemo, normalize_args
+from src.config.tool_memo_config import ToolMemoConfig
+from src.mcp.client import MCPClient
+from src.mcp.models import MCPTool, MCPToolResult
+from src.mcp.tool_adapter import MCPToolAdapter
+from src.search.global_citation_manager import GlobalCitationManager
+
+from helpers import Clock, FakeSearchService
+
+
+class _CountingMCPClient(MCPClient):
+    def __init__(self):
+        self._client = None
+        self.calls = 0
+    
+    async def call_tool(self, tool_name, arguments):
+        self.calls += 1
+        return MCPToolResult(content=f"{tool_name} result {self.calls}")
+
+
+def test_trivially_different_arguments_share_a_key():
+    assert normalize_args({"query": "OpenAI  News "}) == normalize_args({"query": "openai news", "page": None})
+    assert normalize_args({"query": "openai news"}) != normalize_args({"query": "openai"})
+
+
+def test_entries_expire_and_are_evicted_lru():
+    clock = Clock()
+    memo = ToolMemo(ToolMemoConfig(max_entries=2), clock=clock)
+    memo.put("web_search", {"query": "a"}, "A", ttl=10)
+    memo.put("web_search", {"query": "b"}, "B", ttl=100)
+    assert memo.get("web_search", {"query": "a"}) == "A"  # a is now most recent
+    memo.put("web_search", {"query": "c"}, "C", ttl=100)
+    
+    assert memo.get("web_search", {"query": "b"}) is None
+    clock.now = 11
+    assert memo.get("web_search", {"query": "a"}) is None
+    assert memo.get("web_search", {"query": "c"}) == "C"
+    assert (memo.hits, memo.misses) == (2, 2)
+
+
+def test_ttl_overrides_and_cacheability():
+    config = ToolMemoConfig(default_ttl=60, tool_ttls={"web_search": 0, "get_weather": 30})
+    
+    assert config.ttl_for("web_search", cacheable_by_default=True) == 0
+    assert config.ttl_for("get_weather", cacheable_by_default=False) == 30
+    assert config.ttl_for("send_email", cacheable_by_default=False) == 0
+    assert ToolMemoConfig(enabled=False).ttl_for("web_search", cacheable_by_default=True) == 0
+
+
+def test_repeated_search_returns_earlier_observation_and_citations():
+    service = FakeSearchService(url="https://example.com/{n}")
+    tool = SearchTool(search_service=service)
+    manager = GlobalCitationManager()
+    config = {"configurable": {"citation_manager": manager, "tool_memo": ToolMemo(ToolMemoConfig())}}
+    
+    async def run():
+        first = await tool.ainvoke({"query": "OpenAI news"}, config=config)
+        second = await tool.ainvoke({"query": "openai  news"}, config=config)
+        return first, second
+    
+    first, second = asyncio.run(run())
+    
+    assert service.queries == ["OpenAI news"]
+    assert second == first and "[1] About OpenAI news" in first
+    assert manager.get_total_citations() == 1
+
+
+def test_next_turn_reuses_results_under_new_citation_numbers():
+    service = FakeSearchService(url="https://example.com/{n}")
+    tool = SearchTool(search_service=service)
+    manager = GlobalCitationManager()
+    config = {"configurable": {"citation_manager": manager, "tool_memo": ToolMemo(ToolMemoConfig())}}
+    
+    async def run():
+        await tool.ainvoke({"query": "weather"}, config=config)
+        manager.reset()  # new turn
+        await tool.ainvoke({"query": "news"}, config=config)
+        return await tool.ainvoke({"query": "weather"}, config=config)
+    
+    observation = asyncio.run(run())
+    
+    assert service.queries == ["weather", "news"]
+    assert "[2] About weather" in observation
+    assert manager.get_citation_info(2)["url"] == "https://example.com/1"
+
+
+def test_mcp_results_are_memoized_only_when_configured():
+    async def call_twice(memo):
+        client = _CountingMCPClient()
+        tool = MCPToolAdapter(mcp_client=client, mcp_tool=MCPTool(name="get_weather"))
+        config = {"configurable": {"tool_memo": memo}}
+        results = [await tool.ainvoke({"input": "Paris"}, config=config) for _ in range(2)]
+        return client.calls, results
+    
+    calls, _ = asyncio.run(call_twice(ToolMemo(ToolMemoConfig())))
+    assert calls == 2
+    
+    calls, results = asyncio.run(call_twice(ToolMemo(ToolMemoConfig(tool_ttls={"get_weather": 60}))))
+    assert calls == 1 and results == ["get_weather result 1"] * 2
@@ -0,0 +1,77 @@
+"""Tests for token-level streaming of the agent's tool-selection phase."""
+
+import asyncio
+import sys
+from pathlib import Path
+from typing import List
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from langchain_core.messages import AIMessage, AIMessageChunk
+
+from src.agents.react_agent import ReActAgent
+from src.agents.tool_selection_stream import ToolSelectionStream
+from src.agents.tools.search_tool import SearchTool
+
+from helpers import FakeSearchService, ScriptedChatModel, word_counter
+
+CHUNK_DELAY = 0.1
+
+
+def _tool_selection_chunks() -> List[AIMessageChunk]:
+    return [
+        AIMessageChunk(content="", id="run-1", additional_kwargs={"reasoning_content": "Need "}),
+        AIMessageChunk(content="", id="run-1", additional_kwargs={"reasoning_content": "fresh data."}),
+        AIMessageChunk(content="", id="run-1", tool_call_chunks=[
+            {"name": "web_search", "args": '{"query": ', "id": "call_1", "index": 0},
+        ]),
+        AIMessageChunk(content="", id="run-1", tool_call_chunks=[
+            {"name": None, "args": '"weather"}', "id": None, "index": 0},
+        ]),
+    ]
+
+
+def test_reasoning_streams_before_tool_selection_completes():
+    llm = ScriptedChatModel(chunk_delay=CHUNK_DELAY, scripts=[
+        _tool_selection_chunks(),
+        [AIMessageChunk(content="It is sunny [1].", id="run-2")],
+    ])
+    agent = ReActAgent(llm=llm, search_tool=SearchTool(search_service=FakeSearchService(
+        title="Sunny", url="https://example.com/w", content="sunny",
+    )))
+    agent.context_manager = word_counter()
+    
+    async def run():
+        # Pair each step with the number of chunks the model had streamed
+        return [(llm.streamed, step) async for step in agent.stream("weather?")]
+    
+    counted_steps = asyncio.run(run())
+    steps = [step for _, step in counted_steps]
+    first_at = counted_steps[0][0]
+    action_at = next(streamed for streamed, step in counted_steps if step.type == "action")
+    
+    # First token is shown before the whole tool-selection message (4 chunks)
+    assert first_at < 4
+    assert action_at >= 4
+    
+    deepseek = [s.content for s in steps if s.metadata and s.metadata.get("is_deepseek_reasoning")]
+    assert deepseek == ["Need ", "Need fresh data."]  # accumulated, not repeated after completion
+    
+    selection = [s.content for s in steps if s.metadata and s.metadata.get("reasoning_type") == "tool_selection"]
+    assert selection[-1] == '🔧 web_search: {"query": "weather"}'
+    
+    actions = [s for s in steps if s.type == "action"]
+    assert len(actions) == 1 and actions[0].metadata["tool"] == "web_search"
+    assert any(s.type == "final" and "sunny" in s.content for s in steps)
+
+
+def test_answer_text_without_tool_calls_is_not_shown_as_reasoning():
+    stream = ToolSelectionStream()
+    assert stream.feed(AIMessageChunk(content="The answer", id="run-1")) == []
+    assert not stream.was_streamed(AIMessage(content="The answer", id="run-1"), "tool_selection")
+    
+    steps = stream.feed(AIMessageChunk(content="", id="run-2", tool_call_chunks=[
+        {"name": "web_search", "args": '{"qu', "id": "call_1", "index": 0},
+    ]))
+    assert steps[0].content == '🔧 web_search: {"qu'
+    assert stream.was_streamed(AIMessage(content="", id="run-2"), "tool_selection")